@@ -0,0 +1,14 @@
+import { HydrationMarker } from '@/components/HydrationMarker'
+
+export default function ClientsLayout({
+  children,
+}: {
+  children: React.ReactNode
+}) {
+  return (
+    <>
+      {children}
+      <HydrationMarker />
+    </>
+  )
+}
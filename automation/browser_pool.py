@@ -0,0 +1,324 @@
+"""
+Warm Chromium pool for visual QA.
+
+run_qa used to enter sync_playwright() and launch a fresh Chromium for every
+QA attempt, paying driver and browser startup (typically 0.5-2s) on each of
+up to MAX_VISUAL_REPAIR_RETRIES attempts per client. This module keeps one or
+more browsers running for the life of the factory and gives every check a
+fresh BrowserContext instead: contexts are isolated (cookies, storage, cache,
+service workers) but cost milliseconds.
+
+Playwright's sync API is bound to the thread that started it, so each
+browser is owned by a dedicated worker thread. Callers hand a check function
+to `run()`; a free worker opens a context and page, calls the function with
+the page on its own thread and returns the result. Existing page helpers
+(check_missing_images_playwright, ...) therefore work unchanged.
+
+Before each check the worker verifies its browser is still connected and
+relaunches it if not; after MAX_PAGES_PER_BROWSER checks the browser is
+recycled to bound Chromium's memory growth. Every check reports its overhead
+(launch + context setup/teardown) so warm and cold checks can be compared.
+
+Configuration via environment variables:
+    GF_QA_BROWSERS=1             number of warm browsers (parallel QA checks)
+    GF_QA_BROWSER_MAX_PAGES=50   checks served before a browser is recycled
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from playwright.sync_api import sync_playwright
+
+
+DEFAULT_BROWSERS = 1
+MAX_PAGES_PER_BROWSER = 50
+CHECK_TIMEOUT = 180.0  # Upper bound for one check, including a cold launch
+WORKER_POLL_SECONDS = 1.0  # How often a queued caller checks the workers are still alive
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+@dataclass
+class CheckStats:
+    """
+    Timing for one check; overhead_ms is what the pool adds around the check itself.
+
+    For multi-page checks context_ms/teardown_ms cover all contexts and
+    browser_pages counts the last page opened.
+    """
+    launch_ms: float = 0.0
+    context_ms: float = 0.0
+    teardown_ms: float = 0.0
+    check_ms: float = 0.0
+    cold: bool = False
+    browser_pages: int = 0
+
+    @property
+    def overhead_ms(self) -> float:
+        return self.launch_ms + self.context_ms + self.teardown_ms
+
+
+@dataclass
+class _Job:
+    fn: Callable[[List[Any]], Any]
+    contexts: List[Dict[str, Any]]
+    future: "Future"
+    started: threading.Event = field(default_factory=threading.Event)
+
+
+def _start_driver():
+    """Start the Playwright driver for the calling thread."""
+    return sync_playwright().start()
+
+
+class _BrowserWorker(threading.Thread):
+    """Owns one Playwright driver and Chromium instance and serves jobs from the pool queue."""
+
+    def __init__(self, pool: "BrowserPool", index: int):
+        super().__init__(name=f"qa-browser-{index}", daemon=True)
+        self._pool = pool
+        self._driver = None
+        self._browser = None
+        self.pages = 0
+
+    def _healthy(self) -> bool:
+        if self._browser is None:
+            return False
+        try:
+            return bool(self._browser.is_connected())
+        except Exception:
+            return False
+
+    def _close_browser(self) -> None:
+        browser, self._browser = self._browser, None
+        if browser is None:
+            return
+        try:
+            browser.close()
+        except Exception as e:
+            logging.warning(f"[browser-pool] {self.name}: error closing browser: {e}")
+
+    def _ensure_browser(self) -> float:
+        """Launch or replace the browser if needed; returns launch time in ms (0 when warm)."""
+        if self._browser is not None and self.pages >= self._pool.max_pages:
+            logging.info(f"[browser-pool] {self.name}: recycling browser after {self.pages} pages")
+            self._close_browser()
+        elif self._browser is not None and not self._healthy():
+            logging.warning(f"[browser-pool] {self.name}: browser disconnected, relaunching")
+            self._close_browser()
+        if self._browser is not None:
+            return 0.0
+
+        started = time.perf_counter()
+        if self._driver is None:
+            self._driver = self._pool.driver_factory()
+        self._browser = self._driver.chromium.launch(**self._pool.launch_options)
+        self.pages = 0
+        launch_ms = (time.perf_counter() - started) * 1000
+        self._pool._count_launch()
+        logging.info(f"[browser-pool] {self.name}: Chromium launched in {launch_ms:.0f}ms")
+        return launch_ms
+
+    def _serve(self, job: _Job) -> None:
+        stats = CheckStats()
+        contexts = []
+        try:
+            stats.launch_ms = self._ensure_browser()
+            stats.cold = stats.launch_ms > 0
+
+            started = time.perf_counter()
+            pages = []
+            for options in job.contexts:
+                contexts.append(self._browser.new_context(**options))
+                pages.append(contexts[-1].new_page())
+            stats.context_ms = (time.perf_counter() - started) * 1000
+            self.pages += len(pages)
+            stats.browser_pages = self.pages
+
+            started = time.perf_counter()
+            result = job.fn(pages)
+            stats.check_ms = (time.perf_counter() - started) * 1000
+        except BaseException as exc:
+            if not contexts and not self._healthy():
+                # Could not even open a context: drop the browser so the next job relaunches
+                self._close_browser()
+            job.future.set_exception(exc)
+            return
+        finally:
+            started = time.perf_counter()
+            for context in contexts:
+                try:
+                    context.close()
+                except Exception as e:
+                    logging.warning(f"[browser-pool] {self.name}: error closing context: {e}")
+            stats.teardown_ms = (time.perf_counter() - started) * 1000
+        self._pool._record(stats)
+        job.future.set_result((result, stats))
+
+    def run(self) -> None:
+        try:
+            while True:
+                job = self._pool._jobs.get()
+                if job is None:
+                    return
+                if job.future.set_running_or_notify_cancel():
+                    job.started.set()
+                    self._serve(job)
+        finally:
+            self._close_browser()
+            if self._driver is not None:
+                try:
+                    self._driver.stop()
+                except Exception as e:
+                    logging.warning(f"[browser-pool] {self.name}: error stopping Playwright: {e}")
+                self._driver = None
+
+
+class BrowserPool:
+    """
+    A fixed number of warm Chromium browsers handing out fresh contexts.
+
+    Workers start lazily on the first check; each launches its browser on its
+    first job, so an unused pool costs nothing.
+    """
+
+    def __init__(
+        self,
+        size: int = DEFAULT_BROWSERS,
+        max_pages: int = MAX_PAGES_PER_BROWSER,
+        launch_options: Optional[Dict[str, Any]] = None,
+        driver_factory: Callable[[], Any] = _start_driver,
+    ):
+        self.size = max(1, size)
+        self.max_pages = max(1, max_pages)
+        self.launch_options = dict(launch_options or {})
+        self.driver_factory = driver_factory
+        self._jobs: "queue.Queue[Optional[_Job]]" = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.launches = 0
+        self.checks = 0
+        self.total_overhead_ms = 0.0
+
+    def _count_launch(self) -> None:
+        with self._lock:
+            self.launches += 1
+
+    def _record(self, stats: CheckStats) -> None:
+        with self._lock:
+            self.checks += 1
+            self.total_overhead_ms += stats.overhead_ms
+
+    def _start_workers(self) -> None:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("browser pool is closed")
+            while len(self._workers) < self.size:
+                worker = _BrowserWorker(self, len(self._workers))
+                worker.start()
+                self._workers.append(worker)
+
+    def run(self, fn: Callable[[Any], Any], timeout: float = CHECK_TIMEOUT, **context_options: Any):
+        """
+        Run `fn(page)` on a fresh page in an isolated context of a warm browser.
+
+        Parameters:
+            fn: Check to run; it is called on the browser's thread and must
+                finish with the page before returning
+            timeout: Seconds the check may take once a browser picks it up
+            **context_options: Passed to browser.new_context (viewport, ...)
+
+        Returns:
+            (fn's return value, CheckStats)
+        """
+        return self.run_pages(lambda pages: fn(pages[0]), [context_options], timeout=timeout)
+
+    def run_pages(
+        self,
+        fn: Callable[[List[Any]], Any],
+        contexts: List[Dict[str, Any]],
+        timeout: float = CHECK_TIMEOUT,
+    ):
+        """
+        Run `fn(pages)` with one fresh page per entry of `contexts`, all on the same browser.
+
+        The pages live in separate isolated contexts of one browser, so work
+        the browser does for them (network, layout, rendering) overlaps even
+        though fn drives them from a single thread.
+
+        `timeout` starts when a worker dequeues the job: with more QA callers
+        than browsers, time spent queued behind other checks is not counted
+        against this one.
+
+        Returns:
+            (fn's return value, CheckStats)
+        """
+        self._start_workers()
+        job = _Job(fn=fn, contexts=[dict(options) for options in contexts], future=Future())
+        self._jobs.put(job)
+        while not job.started.wait(WORKER_POLL_SECONDS):
+            if not any(worker.is_alive() for worker in self._workers):
+                job.future.cancel()
+                raise RuntimeError("browser pool workers stopped before the check started")
+        return job.future.result(timeout=timeout)
+
+    def stats(self) -> Dict[str, float]:
+        """Aggregate counters: launches, checks and mean per-check overhead."""
+        with self._lock:
+            return {
+                "launches": self.launches,
+                "checks": self.checks,
+                "avg_overhead_ms": self.total_overhead_ms / self.checks if self.checks else 0.0,
+            }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Stop all workers and close their browsers."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        for worker in workers:
+            worker.join(timeout=timeout)
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Return the process-wide pool (created on first use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                size=_env_int("GF_QA_BROWSERS", DEFAULT_BROWSERS),
+                max_pages=_env_int("GF_QA_BROWSER_MAX_PAGES", MAX_PAGES_PER_BROWSER),
+            )
+        return _pool
+
+
+def shutdown() -> None:
+    """Close the shared pool (registered with atexit)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,341 @@
+"""
+WCAG 2.x contrast checks for theme.json palettes.
+
+The Visual Designer used to send every candidate theme to an LLM critic and
+string-match its PASS/FAIL, paying a critic call per attempt for something
+that is pure arithmetic. check_theme() computes the contrast ratio of every
+pair the builder actually renders and returns a machine-readable verdict in
+microseconds:
+
+    primary on background     4.5:1  headings and CTA text
+    secondary on background   3.0:1  secondary elements and large text
+    accent on background      3.0:1  accent highlights, badges and large text
+    text on background        4.5:1  body text (white or black, whichever is better)
+    text on primary           4.5:1  button labels on primary
+    text on accent            4.5:1  labels on accent highlights
+
+Colors may be hex (#RGB, #RRGGBB, #RRGGBBAA), rgb()/rgba(), or the Tailwind
+names the palette generator uses for backgrounds ("white", "slate-900",
+"stone-100", ...). A pair whose colors cannot be resolved is reported as
+unresolved instead of failing; a theme with no resolvable pair is UNKNOWN so
+the caller can fall back to the LLM critic.
+
+repair_theme() fixes a failing palette without another designer round trip:
+each offending color is moved along OKLCH lightness only (hue kept, chroma
+reduced just enough to stay inside sRGB) to the nearest value where all of its
+pairs pass. The size of the change is measured as OKLab distance (deltaE OK);
+the caller decides whether a repair that large still respects the brand.
+"""
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+RGB = Tuple[int, int, int]
+
+AA_NORMAL_TEXT = 4.5
+AA_LARGE_TEXT = 3.0  # Also WCAG 1.4.11 for UI components
+
+WHITE: RGB = (255, 255, 255)
+BLACK: RGB = (0, 0, 0)
+
+# Tailwind CSS v3 neutral palettes (the background options of design/palette_generator.md)
+_TAILWIND_SHADES = (50, 100, 200, 300, 400, 500, 600, 700, 800, 900, 950)
+_TAILWIND_NEUTRALS = {
+    "slate": ("f8fafc", "f1f5f9", "e2e8f0", "cbd5e1", "94a3b8", "64748b", "475569", "334155", "1e293b", "0f172a", "020617"),
+    "gray": ("f9fafb", "f3f4f6", "e5e7eb", "d1d5db", "9ca3af", "6b7280", "4b5563", "374151", "1f2937", "111827", "030712"),
+    "zinc": ("fafafa", "f4f4f5", "e4e4e7", "d4d4d8", "a1a1aa", "71717a", "52525b", "3f3f46", "27272a", "18181b", "09090b"),
+    "neutral": ("fafafa", "f5f5f5", "e5e5e5", "d4d4d4", "a3a3a3", "737373", "525252", "404040", "262626", "171717", "0a0a0a"),
+    "stone": ("fafaf9", "f5f5f4", "e7e5e4", "d6d3d1", "a8a29e", "78716c", "57534e", "44403c", "292524", "1c1917", "0c0a09"),
+}
+TAILWIND_COLORS = {"white": "ffffff", "black": "000000"}
+for _family, _values in _TAILWIND_NEUTRALS.items():
+    TAILWIND_COLORS.update({f"{_family}-{shade}": value for shade, value in zip(_TAILWIND_SHADES, _values)})
+
+# (name, foreground role, background role, required ratio, label)
+# "text" is white or black, whichever contrasts more with the background role
+THEME_PAIRS = (
+    ("primary_on_background", "primary", "background", AA_NORMAL_TEXT, "Primary on background"),
+    ("secondary_on_background", "secondary", "background", AA_LARGE_TEXT, "Secondary on background"),
+    ("accent_on_background", "accent", "background", AA_LARGE_TEXT, "Accent on background"),
+    ("text_on_background", "text", "background", AA_NORMAL_TEXT, "Body text on background"),
+    ("text_on_primary", "text", "primary", AA_NORMAL_TEXT, "Button text on primary"),
+    ("text_on_accent", "text", "accent", AA_NORMAL_TEXT, "Text on accent"),
+)
+
+# Which role to move when a pair fails (the other side is fixed text or the page)
+REPAIR_ROLE = {
+    "primary_on_background": "primary",
+    "secondary_on_background": "secondary",
+    "accent_on_background": "accent",
+    "text_on_background": "background",
+    "text_on_primary": "primary",
+    "text_on_accent": "accent",
+}
+REPAIR_ORDER = ("background", "primary", "secondary", "accent")  # Background first: the others are checked against it
+REPAIR_MARGIN = 0.1  # Aim slightly above the target so rounding and rendering cannot tip a pair back under it
+REPAIR_STEP = 0.005  # OKLCH lightness step of the search
+DEFAULT_MAX_REPAIR_DELTA = 0.2  # deltaE OK; above this a repaired color no longer reads as the same brand color
+
+_RGB_FUNC = re.compile(r"rgba?\(\s*(\d{1,3})[\s,]+(\d{1,3})[\s,]+(\d{1,3})")
+
+
+def parse_color(value: Any) -> Optional[RGB]:
+    """Resolve a theme color value to sRGB, or None if it is not understood."""
+    if not isinstance(value, str):
+        return None
+    text = value.strip().lower()
+    if text.startswith("bg-"):
+        text = text[3:]
+    text = TAILWIND_COLORS.get(text, text)
+    match = _RGB_FUNC.match(text)
+    if match:
+        channels = tuple(int(c) for c in match.groups())
+        return channels if all(c <= 255 for c in channels) else None
+    hex_value = text.lstrip("#")
+    if not re.fullmatch(r"[0-9a-f]{3}|[0-9a-f]{6}|[0-9a-f]{8}", hex_value):
+        return None
+    if len(hex_value) == 3:
+        hex_value = "".join(c * 2 for c in hex_value)
+    return tuple(int(hex_value[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def to_hex(rgb: RGB) -> str:
+    return "#{:02X}{:02X}{:02X}".format(*rgb)
+
+
+def relative_luminance(rgb: RGB) -> float:
+    """WCAG relative luminance of an sRGB color (0 = black, 1 = white)."""
+    def linear(channel: int) -> float:
+        c = channel / 255
+        return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+    r, g, b = (linear(c) for c in rgb)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(a: RGB, b: RGB) -> float:
+    """WCAG contrast ratio between two colors (1-21)."""
+    la, lb = relative_luminance(a), relative_luminance(b)
+    lighter, darker = max(la, lb), min(la, lb)
+    return (lighter + 0.05) / (darker + 0.05)
+
+
+def best_text_color(background: RGB) -> RGB:
+    """White or black, whichever is more readable on `background`."""
+    return WHITE if contrast_ratio(WHITE, background) >= contrast_ratio(BLACK, background) else BLACK
+
+
+def theme_colors(theme: Dict[str, Any]) -> Dict[str, Optional[RGB]]:
+    """Resolve the palette roles of a theme; background defaults to white as in the builder."""
+    return {
+        "primary": parse_color(theme.get("primary")),
+        "secondary": parse_color(theme.get("secondary")),
+        "accent": parse_color(theme.get("accent")),
+        "background": parse_color(theme.get("background", "white")),
+    }
+
+
+def _pair_checks(colors: Dict[str, Optional[RGB]], names=None) -> List[Dict[str, Any]]:
+    """Contrast checks for the pairs (optionally only `names`) whose colors are all resolved."""
+    checks = []
+    for name, fg_role, bg_role, required, label in THEME_PAIRS:
+        if names is not None and name not in names:
+            continue
+        background = colors.get(bg_role)
+        foreground = best_text_color(background) if fg_role == "text" and background else colors.get(fg_role)
+        if foreground is None or background is None:
+            continue
+        ratio = contrast_ratio(foreground, background)
+        checks.append({
+            "name": name,
+            "label": label,
+            "foreground": to_hex(foreground),
+            "background": to_hex(background),
+            "ratio": round(ratio, 2),
+            "required": required,
+            # Compare unrounded, so 4.496 does not pass as 4.5
+            "passed": ratio >= required,
+            "_ratio": ratio,
+        })
+    return checks
+
+
+def check_theme(theme: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check every rendered color pair of a theme against its WCAG AA target.
+
+    Returns:
+        {
+            "status": "PASS" | "FAIL" | "UNKNOWN",
+            "checks": [{"name", "label", "foreground", "background", "ratio",
+                        "required", "passed"}, ...],
+            "failures": the failing checks,
+            "unresolved": names of pairs whose colors could not be parsed,
+        }
+    """
+    colors = theme_colors(theme)
+    unresolved: List[str] = []
+    for name, fg_role, bg_role, _, _ in THEME_PAIRS:
+        missing = [role for role in (fg_role, bg_role) if role != "text" and colors[role] is None]
+        # A role the theme does not set is not rendered; one it sets but we cannot parse is unresolved
+        if any(role == "background" or theme.get(role) for role in missing):
+            unresolved.append(name)
+    checks = _pair_checks(colors)
+    for check in checks:
+        del check["_ratio"]
+    failures = [check for check in checks if not check["passed"]]
+    if failures:
+        status = "FAIL"
+    elif checks:
+        status = "PASS"
+    else:
+        status = "UNKNOWN"
+    return {"status": status, "checks": checks, "failures": failures, "unresolved": unresolved}
+
+
+def format_feedback(verdict: Dict[str, Any]) -> str:
+    """Render a verdict as designer feedback in the critic's PASS/FAIL format."""
+    if verdict["status"] != "FAIL":
+        return verdict["status"]
+    lines = [f"FAIL: {len(verdict['failures'])} color pair(s) below WCAG AA contrast", "", "## Issues Found:"]
+    for i, check in enumerate(verdict["failures"], 1):
+        lines.append(
+            f"{i}. {check['label']} ({check['foreground']} on {check['background']}): "
+            f"contrast {check['ratio']}:1 (needs >= {check['required']}:1)"
+        )
+    return "\n".join(lines)
+
+
+# --- OKLCH palette repair ------------------------------------------------------
+
+def _srgb_to_linear(channel: float) -> float:
+    c = channel / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> float:
+    v = value * 12.92 if value <= 0.0031308 else 1.055 * value ** (1 / 2.4) - 0.055
+    return v * 255
+
+
+def to_oklab(rgb: RGB) -> Tuple[float, float, float]:
+    r, g, b = (_srgb_to_linear(c) for c in rgb)
+    l = (0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b) ** (1 / 3)
+    m = (0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b) ** (1 / 3)
+    s = (0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b) ** (1 / 3)
+    return (
+        0.2104542553 * l + 0.7936177850 * m - 0.0040720468 * s,
+        1.9779984951 * l - 2.4285922050 * m + 0.4505937099 * s,
+        0.0259040371 * l + 0.7827717662 * m - 0.8086757660 * s,
+    )
+
+
+def _oklab_to_linear(lab: Tuple[float, float, float]) -> Tuple[float, float, float]:
+    L, a, b = lab
+    l = (L + 0.3963377774 * a + 0.2158037573 * b) ** 3
+    m = (L - 0.1055613458 * a - 0.0638541728 * b) ** 3
+    s = (L - 0.0894841775 * a - 1.2914855480 * b) ** 3
+    return (
+        4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s,
+        -1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s,
+        -0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s,
+    )
+
+
+def from_oklch(lightness: float, chroma: float, hue: float) -> RGB:
+    """OKLCH to 8-bit sRGB, reducing chroma (never hue or lightness) until the color is in gamut."""
+    def linear(c: float) -> Tuple[float, float, float]:
+        return _oklab_to_linear((lightness, c * math.cos(hue), c * math.sin(hue)))
+
+    def in_gamut(channels) -> bool:
+        return all(-1e-6 <= v <= 1 + 1e-6 for v in channels)
+
+    channels = linear(chroma)
+    if not in_gamut(channels):
+        low, high = 0.0, chroma
+        for _ in range(20):
+            mid = (low + high) / 2
+            if in_gamut(linear(mid)):
+                low = mid
+            else:
+                high = mid
+        channels = linear(low)
+    return tuple(int(round(min(255, max(0, _linear_to_srgb(min(1.0, max(0.0, v))))))) for v in channels)
+
+
+def delta_e(a: RGB, b: RGB) -> float:
+    """Perceptual distance between two colors (Euclidean distance in OKLab)."""
+    return math.dist(to_oklab(a), to_oklab(b))
+
+
+def _repair_role(role: str, colors: Dict[str, Optional[RGB]]) -> Optional[RGB]:
+    """Nearest color along OKLCH lightness at which every pair involving `role` passes."""
+    names = [name for name, fg, bg, _, _ in THEME_PAIRS if role in (fg, bg)]
+
+    def passes(candidate: RGB) -> bool:
+        checks = _pair_checks(dict(colors, **{role: candidate}), names)
+        return all(check["_ratio"] >= check["required"] + REPAIR_MARGIN for check in checks)
+
+    original = colors[role]
+    lightness, a, b = to_oklab(original)
+    chroma, hue = math.hypot(a, b), math.atan2(b, a)
+    best = None
+    for direction in (-1, 1):
+        for step in range(1, int(1 / REPAIR_STEP) + 1):
+            target = lightness + direction * step * REPAIR_STEP
+            if not 0 <= target <= 1:
+                break
+            candidate = from_oklch(target, chroma, hue)
+            if passes(candidate):
+                if best is None or delta_e(original, candidate) < delta_e(original, best):
+                    best = candidate
+                break
+    return best
+
+
+def repair_theme(theme: Dict[str, Any], max_delta: float = DEFAULT_MAX_REPAIR_DELTA) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Move the colors of failing pairs along OKLCH lightness until they pass.
+
+    Parameters:
+        theme: theme.json data
+        max_delta: Largest acceptable change of any color (deltaE OK)
+
+    Returns:
+        (repaired theme, report) where report is
+        {
+            "status": check_theme() status of the repaired theme,
+            "changes": [{"role", "from", "to", "delta"}, ...],
+            "max_delta": largest change made,
+            "within_delta": whether every change is within max_delta,
+        }
+        Roles that need no change keep their original value (e.g. "white").
+    """
+    colors = theme_colors(theme)
+    repaired = dict(theme)
+    changes = []
+    for role in REPAIR_ORDER:
+        failing = [
+            check["name"] for check in _pair_checks(colors)
+            if not check["passed"] and REPAIR_ROLE[check["name"]] == role
+        ]
+        if not failing or colors[role] is None:
+            continue
+        fixed = _repair_role(role, colors)
+        if fixed is None:
+            continue
+        changes.append({
+            "role": role,
+            "from": theme.get(role, "white" if role == "background" else None),
+            "to": to_hex(fixed),
+            "delta": round(delta_e(colors[role], fixed), 3),
+        })
+        colors[role] = fixed
+        repaired[role] = to_hex(fixed)
+    largest = max((change["delta"] for change in changes), default=0.0)
+    return repaired, {
+        "status": check_theme(repaired)["status"],
+        "changes": changes,
+        "max_delta": largest,
+        "within_delta": largest <= max_delta,
+    }
@@ -1,5 +1,6 @@
 import json
 import logging
+import threading
 import unicodedata
 from datetime import datetime
 from pathlib import Path
@@ -10,6 +11,9 @@ CONFIG_PATH = Path("automation/tracker_config.json")
 API_COST_DIR = Path("data/costs/api")
 HOSTING_COST_DIR = Path("data/costs/hosting")
 
+# Serializes read-modify-write of the monthly ledgers when workers run in parallel
+_LEDGER_LOCK = threading.Lock()
+
 
 def load_config() -> Dict[str, Any]:
     if CONFIG_PATH.exists():
@@ -31,6 +35,11 @@ def _month_path(base: Path, month_str: str) -> Path:
 
 
 def _append_entry(base: Path, month_str: str, entry: Dict[str, Any]) -> None:
+    with _LEDGER_LOCK:
+        _append_entry_unlocked(base, month_str, entry)
+
+
+def _append_entry_unlocked(base: Path, month_str: str, entry: Dict[str, Any]) -> None:
     path = _month_path(base, month_str)
     if path.exists():
         try:
@@ -171,6 +180,42 @@ def _calculate_cost_with_tiered_pricing(
         return (cost_input, cost_output)
 
 
+def _calculate_prompt_cache_cost(
+    cache_write_tokens: int,
+    cache_read_tokens: int,
+    uncached_input_tokens: int,
+    pricing: Dict[str, Any]
+) -> tuple[float, float, float]:
+    """
+    Calculate prompt-cache costs.
+
+    Prices come from `cache_write_per_million` / `cache_read_per_million` in
+    the pricing entry (or its tier); when absent they default to 1.25x and
+    0.1x the input price (Anthropic's 5-minute cache rates). For tiered
+    pricing, the tier is determined by the total prompt size.
+    Returns (cache_write_cost, cache_read_cost, read_savings), where
+    read_savings is what the cached tokens would have cost at the input price.
+    """
+    if "tiered_pricing" in pricing:
+        tiered = pricing["tiered_pricing"]
+        total_prompt = uncached_input_tokens + cache_write_tokens + cache_read_tokens
+        if total_prompt <= tiered.get("threshold", 200000):
+            rates = tiered.get("below_threshold", {})
+        else:
+            rates = tiered.get("above_threshold", {})
+    else:
+        rates = pricing
+
+    input_price = rates.get("input_per_million", 0.0)
+    write_price = rates.get("cache_write_per_million", input_price * 1.25)
+    read_price = rates.get("cache_read_per_million", input_price * 0.1)
+
+    cost_write = (cache_write_tokens / 1_000_000) * write_price
+    cost_read = (cache_read_tokens / 1_000_000) * read_price
+    savings = (cache_read_tokens / 1_000_000) * (input_price - read_price)
+    return (cost_write, cost_read, savings)
+
+
 def record_api_cost(
     provider: str,
     model: str,
@@ -179,8 +224,21 @@ def record_api_cost(
     input_tokens: Optional[int],
     output_tokens: Optional[int],
     metadata: Optional[Dict[str, Any]] = None,
+    cache_hit: bool = False,
+    cache_creation_tokens: Optional[int] = None,
+    cache_read_tokens: Optional[int] = None,
 ) -> Dict[str, Any]:
-    """Record an API call cost for Anthropic/OpenAI."""
+    """
+    Record an API call cost for Anthropic/OpenAI.
+
+    A cache_hit (response served from the local LLM cache) is recorded at $0
+    with the would-be cost in `saved_usd`, so cache savings can be totalled.
+
+    `input_tokens` are the uncached prompt tokens. Provider prompt caching is
+    billed separately: `cache_creation_tokens` (written to the cache) and
+    `cache_read_tokens` (served from it) are priced with the cache rates and
+    recorded on the entry, together with `prompt_cache_savings_usd`.
+    """
     cfg = load_config()
     model_key = f"{provider}/{model}"
     pricing = _pricing_for(model_key, cfg)
@@ -188,9 +246,17 @@ def record_api_cost(
 
     in_tokens = input_tokens if input_tokens is not None else estimates.get("input", 0)
     out_tokens = output_tokens if output_tokens is not None else estimates.get("output", 0)
+    write_tokens = cache_creation_tokens or 0
+    read_tokens = cache_read_tokens or 0
 
     cost_input, cost_output = _calculate_cost_with_tiered_pricing(in_tokens, out_tokens, pricing)
-    total_cost = round(cost_input + cost_output, 4)
+    cost_write, cost_read, cache_savings = _calculate_prompt_cache_cost(
+        write_tokens, read_tokens, in_tokens, pricing
+    )
+    total_cost = round(cost_input + cost_output + cost_write + cost_read, 4)
+    saved_cost = 0.0
+    if cache_hit:
+        saved_cost, total_cost = total_cost, 0.0
 
     now = datetime.utcnow()
     entry = {
@@ -204,9 +270,25 @@ def record_api_cost(
         "cost_usd": total_cost,
         "metadata": metadata or {},
     }
+    if write_tokens or read_tokens:
+        entry["cache_creation_input_tokens"] = write_tokens
+        entry["cache_read_input_tokens"] = read_tokens
+        entry["prompt_cache_savings_usd"] = round(cache_savings, 4)
+    if cache_hit:
+        entry["cache_hit"] = True
+        entry["saved_usd"] = saved_cost
 
     month_str = now.strftime("%Y-%m")
     _append_entry(API_COST_DIR, month_str, entry)
+
+    if cache_hit:
+        _log_aligned(
+            "info",
+            "💾",
+            "API cache hit",
+            f"saved ${saved_cost} | model: {_simplify_model_name(model)} | activity: {_simplify_activity_name(activity)}"
+        )
+        return entry
     
     # Skip logging if cost is $0.0 to reduce console noise
     if total_cost == 0.0:
@@ -216,6 +298,11 @@ def record_api_cost(
     in_tokens_str = _format_token_count(in_tokens)
     out_tokens_str = _format_token_count(out_tokens)
     tokens_str = f"{in_tokens_str}+{out_tokens_str}"
+    if read_tokens or write_tokens:
+        tokens_str += (
+            f" | cache: {_format_token_count(read_tokens)} read, "
+            f"{_format_token_count(write_tokens)} written (saved ${round(cache_savings, 4)})"
+        )
     
     # Simplify model and activity names for cleaner logging
     simplified_model = _simplify_model_name(model)
@@ -230,6 +317,41 @@ def record_api_cost(
     return entry
 
 
+def critic_stats(month_str: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Summarize critic verdicts recorded in a month's API ledger, per critic activity.
+
+    `fails` counts FAIL verdicts; `minor_fails_accepted` are those the critic
+    rated minor, which were accepted without a retry, and
+    `minor_fail_accept_rate` is their share of all FAIL verdicts.
+    """
+    month_str = month_str or datetime.utcnow().strftime("%Y-%m")
+    path = API_COST_DIR / f"{month_str}.json"
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+    stats: Dict[str, Dict[str, Any]] = {}
+    for entry in entries:
+        metadata = entry.get("metadata") or {}
+        if "verdict" not in metadata:
+            continue
+        row = stats.setdefault(entry.get("activity", "unknown"), {
+            "reviews": 0, "retries": 0, "fails": 0, "minor_fails_accepted": 0, "cost_usd": 0.0,
+        })
+        failed = metadata.get("verdict") == "fail"
+        row["reviews"] += 1
+        row["retries"] += int(bool(metadata.get("retry")))
+        row["fails"] += int(failed)
+        row["minor_fails_accepted"] += int(failed and not metadata.get("retry"))
+        row["cost_usd"] = round(row["cost_usd"] + float(entry.get("cost_usd", 0) or 0), 4)
+    for row in stats.values():
+        row["minor_fail_accept_rate"] = round(row["minor_fails_accepted"] / row["fails"], 3) if row["fails"] else 0.0
+    return stats
+
+
 def record_hosting_costs(managed_clients: List[str], month_str: Optional[str] = None) -> List[Dict[str, Any]]:
     """Record hosting costs for managed clients for a month."""
     cfg = load_config()
@@ -0,0 +1,169 @@
+"""
+Structured verdicts for the critic loops.
+
+The strategy, copy and a11y critics used to answer free text, and the loops
+decided with `"FAIL" in text.upper()`: any critique that merely mentioned the
+word ("nothing here would fail review") cost a full strategist or copywriter
+regeneration. The critic prompts in prompts/critique/ now answer with a compact
+JSON verdict:
+
+    {"verdict": "fail", "severity": "major", "summary": "...",
+     "issues": [{"target": "Pricing", "problem": "...", "fix": "..."}]}
+
+parse() is tolerant about the wrapping (code fences, prose around the object,
+key case) but strict about the decision: only an explicit "pass"/"fail" verdict
+counts. Answers without a JSON object fall back to a leading PASS/FAIL token,
+so the old text format still works; anything else is "unclear" and the loops
+keep the draft, as before.
+
+Only a "fail" with major or critical severity triggers a regeneration; a
+"fail" the critic itself rates minor is logged and accepted. Each critic call
+records its verdict in the cost ledger (see ledger_metadata and
+cost_tracker.critic_stats), so the share of FAIL verdicts accepted as minor
+stays visible.
+"""
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+SEVERITIES = ("none", "minor", "major", "critical")
+BLOCKING_SEVERITIES = ("major", "critical")
+
+_FENCE = re.compile(r"```[a-zA-Z]*\s*([\s\S]*?)\s*```")
+_LEADING_TOKEN = re.compile(r"^\W*(PASS|FAIL)\b", re.IGNORECASE)
+
+
+@dataclass
+class Issue:
+    target: str
+    problem: str
+    fix: str = ""
+
+
+@dataclass
+class Verdict:
+    status: str  # "pass", "fail" or "unclear"
+    severity: str = "none"
+    summary: str = ""
+    issues: List[Issue] = field(default_factory=list)
+    format: str = "json"  # "json", "text" (leading PASS/FAIL token) or "none"
+    raw: str = ""
+
+    @property
+    def retry(self) -> bool:
+        """Whether this verdict is worth another generation."""
+        return self.status == "fail" and self.severity in BLOCKING_SEVERITIES
+
+    @property
+    def targets(self) -> List[str]:
+        """Distinct issue targets in the order the critic listed them."""
+        return list(dict.fromkeys(issue.target for issue in self.issues if issue.target))
+
+    def feedback(self) -> str:
+        """Feedback for the regeneration prompt."""
+        if self.format != "json":
+            return self.raw.strip()
+        lines = [f"FAIL ({self.severity}): {self.summary}".rstrip(": ")]
+        for number, issue in enumerate(self.issues, 1):
+            line = f"{number}. {issue.target}: {issue.problem}" if issue.target else f"{number}. {issue.problem}"
+            if issue.fix:
+                line += f" Fix: {issue.fix}"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+def _json_object(text: str) -> Optional[Dict[str, Any]]:
+    """First JSON object in the text, inside or outside a code fence."""
+    candidates = [match.group(1) for match in _FENCE.finditer(text)] + [text]
+    decoder = json.JSONDecoder()
+    for candidate in candidates:
+        start = candidate.find("{")
+        while start != -1:
+            try:
+                obj, _ = decoder.raw_decode(candidate, start)
+            except ValueError:
+                start = candidate.find("{", start + 1)
+                continue
+            if isinstance(obj, dict):
+                return obj
+            start = candidate.find("{", start + 1)
+    return None
+
+
+def _issues(value: Any) -> List[Issue]:
+    issues = []
+    for item in value if isinstance(value, list) else []:
+        if isinstance(item, str) and item.strip():
+            issues.append(Issue(target="", problem=item.strip()))
+        elif isinstance(item, dict):
+            lowered = {str(k).lower(): v for k, v in item.items()}
+            problem = str(lowered.get("problem") or lowered.get("issue") or "").strip()
+            if problem:
+                issues.append(Issue(
+                    target=str(lowered.get("target") or lowered.get("section") or "").strip(),
+                    problem=problem,
+                    fix=str(lowered.get("fix") or "").strip(),
+                ))
+    return issues
+
+
+def _from_json(obj: Dict[str, Any], raw: str) -> Optional[Verdict]:
+    lowered = {str(k).lower(): v for k, v in obj.items()}
+    status = str(lowered.get("verdict", "")).strip().lower()
+    if status not in ("pass", "fail"):
+        return None
+    severity = str(lowered.get("severity", "")).strip().lower()
+    if severity not in SEVERITIES:
+        # A fail without a usable severity is taken at its word
+        severity = "major" if status == "fail" else "none"
+    return Verdict(
+        status=status,
+        severity=severity,
+        summary=str(lowered.get("summary") or "").strip(),
+        issues=_issues(lowered.get("issues")),
+        format="json",
+        raw=raw,
+    )
+
+
+def parse(text: Optional[str]) -> Verdict:
+    """
+    Parse a critic answer.
+
+    Returns:
+        Verdict; status "unclear" (format "none") when neither a JSON verdict
+        nor a leading PASS/FAIL token is found
+    """
+    raw = (text or "").strip()
+    obj = _json_object(raw)
+    if obj is not None:
+        verdict = _from_json(obj, raw)
+        if verdict is not None:
+            return verdict
+
+    fenced = _FENCE.search(raw)
+    body = fenced.group(1).strip() if fenced else raw
+    match = _LEADING_TOKEN.match(body)
+    if match:
+        status = match.group(1).lower()
+        return Verdict(
+            status=status,
+            severity="major" if status == "fail" else "none",
+            summary=body[match.end():].lstrip(" :*-").split("\n", 1)[0].strip(),
+            format="text",
+            raw=body,
+        )
+    return Verdict(status="unclear", format="none", raw=raw)
+
+
+def ledger_metadata(verdict: Verdict) -> Dict[str, Any]:
+    """Verdict fields recorded on the critic's cost ledger entry."""
+    return {
+        "verdict": verdict.status,
+        "severity": verdict.severity,
+        "verdict_format": verdict.format,
+        "issues": len(verdict.issues),
+        "retry": verdict.retry,
+    }
@@ -10,34 +10,60 @@ import json
 import tempfile
 import shutil
 import threading
+import queue
+import asyncio
+import argparse
 import unicodedata
+import hashlib
 from pathlib import Path
-from typing import Tuple, Optional, Dict, Any
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, CancelledError
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import Tuple, Optional, Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait as futures_wait
 from dotenv import load_dotenv
 from openai import OpenAI
-from anthropic import Anthropic, RateLimitError
-from playwright.sync_api import sync_playwright
-try:
-    from PIL import Image
-    PIL_AVAILABLE = True
-except ImportError:
-    PIL_AVAILABLE = False
-
+from anthropic import Anthropic, AsyncAnthropic, RateLimitError
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 # Ensure local package imports work even if editable install isn't active
 try:
-    from automation import time_tracker, cost_tracker, memory
+    from automation import time_tracker, cost_tracker, memory, job_queue
     from automation.client_utils import validate_client_id_or_raise, is_valid_client_id
     from automation.lock_utils import client_lock, is_locked
     from automation.file_utils import atomic_write
+    from automation.worker_pool import run_pool
+    from automation.pipeline_dag import Node, run_dag, run_dag_async
+    from automation import llm_cache
+    from automation import rate_limiter
+    from automation import ts_checker
+    from automation import browser_pool
+    from automation import qa_server
+    from automation import screenshot_utils
+    from automation import contrast
+    from automation import critic_verdict
+    from automation import sections
+    from automation import niche_classifier
+    from automation.intake_watcher import IntakeWatcher
 except ModuleNotFoundError:
     repo_root = Path(__file__).resolve().parent.parent
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
-    from automation import time_tracker, cost_tracker, memory
+    from automation import time_tracker, cost_tracker, memory, job_queue
     from automation.client_utils import validate_client_id_or_raise, is_valid_client_id
     from automation.lock_utils import client_lock, is_locked
     from automation.file_utils import atomic_write
+    from automation.worker_pool import run_pool
+    from automation.pipeline_dag import Node, run_dag, run_dag_async
+    from automation import llm_cache
+    from automation import rate_limiter
+    from automation import ts_checker
+    from automation import browser_pool
+    from automation import qa_server
+    from automation import screenshot_utils
+    from automation import contrast
+    from automation import critic_verdict
+    from automation import sections
+    from automation import niche_classifier
+    from automation.intake_watcher import IntakeWatcher
 
 # 1. SETUP
 # Fix Windows console encoding for emoji support
@@ -120,22 +146,65 @@ LIBRARY_PATH = "./design-system/manifest.md"
 PROMPTS_DIR = "./prompts"
 BATCH_INTERVAL = 60  # Seconds, Check every 1 hour for testing
 MAX_CRITIC_RETRIES = 3  # Hard stop for critic loop to prevent infinite API costs
+DEFAULT_JOBS = 1  # Concurrent client pipelines in the batch loop (override with --jobs N)
+INTAKE_DEBOUNCE_SECONDS = 0.5  # --watch mode: how long an intake must stay unchanged before it is picked up
+ASYNC_MAX_LLM_CALLS = 16  # --async mode: LLM requests in flight at once across all pipelines
+ASYNC_MAX_BUILDERS = 2  # --async mode: builder/QA stages (tsc + Playwright) run in threads, capped separately
+BUILDER_STREAMING = os.getenv("GF_BUILDER_STREAM", "").strip().lower() in ("1", "true", "yes", "on")  # Stream builder output and stop at the closing code fence
+QA_READY_TIMEOUT_MS = int(os.getenv("GF_QA_READY_TIMEOUT_MS", "30000"))  # Ceiling for QA navigation + readiness waits
+QA_WAIT_FOR_HYDRATION = os.getenv("GF_QA_WAIT_FOR_HYDRATION", "true").strip().lower() in ("1", "true", "yes", "on")  # Wait for app/clients/layout.tsx's marker
+QA_HYDRATION_SELECTOR = "html[data-gf-hydrated]"
+QA_VIEWPORTS = os.getenv("GF_QA_VIEWPORTS", "mobile:390x844,tablet:820x1180,desktop:1440x900")  # name:WIDTHxHEIGHT, rendered in parallel
+QA_VISION_POLICY = os.getenv("GF_QA_VISION_POLICY", "gate").strip().lower()  # gate: vision only if DOM audits pass; enrich: always; off: never
+A11Y_LLM_CRITIC = os.getenv("GF_A11Y_LLM_CRITIC", "").strip().lower() in ("1", "true", "yes", "on")  # Also ask MODEL_CRITIC about subjective palette issues
+CRITIC_BEST_OF_N = os.getenv("GF_CRITIC_BEST_OF_N", "1")  # Strategist/copywriter candidates per critic round: "2", or per niche "saas:3,local_service:1,default:2"
+MAX_BEST_OF_N = 5
+SECTION_REGEN = os.getenv("GF_SECTION_REGEN", "true").strip().lower() in ("1", "true", "yes", "on")  # Rewrite only the sections a critic names
+SECTION_REGEN_MAX_SHARE = 0.5  # Regenerate the whole document when the named sections cover more of it than this
+SECTION_MAX_TOKENS = 800  # Output budget per rewritten section
+A11Y_REPAIR_MAX_DELTA = float(os.getenv("GF_A11Y_REPAIR_MAX_DELTA", contrast.DEFAULT_MAX_REPAIR_DELTA))  # Largest OKLab shift a local palette repair may make before the designer regenerates
+
+# Git operations switch branches in the shared working tree, so only one
+# worker may commit/push (or pull) at a time.
+_GIT_LOCK = threading.Lock()
+
+def _usage_value(usage, name):
+    """Read an integer usage field from an SDK object or dict (None if absent)."""
+    value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
 
 def _extract_usage_tokens(response):
-    """Best-effort extraction of token usage from API responses."""
+    """
+    Best-effort extraction of token usage from API responses.
+
+    Returns (input_tokens, output_tokens, cache_creation_tokens, cache_read_tokens).
+    input_tokens excludes prompt-cache writes/reads so each class is billed once
+    (Anthropic already reports them separately; OpenAI includes cached tokens in
+    prompt_tokens).
+    """
     usage = getattr(response, "usage", None)
-    if usage:
-        input_tokens = getattr(usage, "input_tokens", None) or usage.get("input_tokens") if isinstance(usage, dict) else None
-        output_tokens = getattr(usage, "output_tokens", None) or usage.get("output_tokens") if isinstance(usage, dict) else None
-        return input_tokens, output_tokens
-    return None, None
+    if not usage:
+        return None, None, None, None
+    input_tokens = _usage_value(usage, "input_tokens")
+    output_tokens = _usage_value(usage, "output_tokens")
+    cache_write = _usage_value(usage, "cache_creation_input_tokens")
+    cache_read = _usage_value(usage, "cache_read_input_tokens")
+    if input_tokens is None and output_tokens is None:
+        input_tokens = _usage_value(usage, "prompt_tokens")
+        output_tokens = _usage_value(usage, "completion_tokens")
+        details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(usage, "prompt_tokens_details", None)
+        cache_read = _usage_value(details, "cached_tokens") if details else None
+        if input_tokens is not None and cache_read:
+            input_tokens = max(0, input_tokens - cache_read)
+    return input_tokens, output_tokens, cache_write, cache_read
 
 
 def _record_model_cost(provider, model, activity, client_id, response, metadata=None):
-    """Send usage data to cost tracker; ignore errors to keep pipeline resilient."""
+    """Send usage data to cost tracker; ignore errors to keep pipeline resilient. Returns the ledger entry (None on error)."""
     try:
-        in_tokens, out_tokens = _extract_usage_tokens(response)
-        cost_tracker.record_api_cost(
+        in_tokens, out_tokens, cache_write, cache_read = _extract_usage_tokens(response)
+        return cost_tracker.record_api_cost(
             provider=provider,
             model=model,
             client_id=client_id,
@@ -143,26 +212,67 @@ def _record_model_cost(provider, model, activity, client_id, response, metadata=
             input_tokens=in_tokens,
             output_tokens=out_tokens,
             metadata=metadata or {},
+            cache_hit=getattr(response, "cache_hit", False) is True,
+            cache_creation_tokens=cache_write,
+            cache_read_tokens=cache_read,
         )
     except Exception as e:
         _log_aligned("warning", "⚠️", "Cost tracking", f"failed for {provider}:{model} - {e}")
+        return None
+
+def _system_blocks(*sections):
+    """
+    Build an Anthropic system prompt whose sections are prompt-cached.
+
+    Each non-empty section becomes a text block ending in a `cache_control`
+    breakpoint, so the API caches the prefix up to it and later requests that
+    repeat it (retries, other clients) are billed at the cache-read rate.
+    Order sections from most to least stable; Anthropic allows at most four
+    breakpoints per request, and prefixes below the model's minimum cacheable
+    length are simply sent uncached.
+    """
+    return [
+        {"type": "text", "text": section, "cache_control": {"type": "ephemeral"}}
+        for section in sections
+        if section and section.strip()
+    ]
+
+
+def _system_text(system) -> str:
+    """Flatten a system prompt (string or _system_blocks list) into plain text."""
+    if isinstance(system, str) or system is None:
+        return system or ""
+    return "\n\n".join(block.get("text", "") for block in system)
+
 
-def _llm_messages_create(model: str, client_id: str, activity: str, system: str, user_content: str, max_tokens: int):
+def _llm_messages_create(model: str, client_id: str, activity: str, system, user_content: str, max_tokens: int):
     """
     Unified LLM caller that routes to Anthropic (with backoff) or OpenAI.
+
+    `system` may be a string or a _system_blocks() list; OpenAI receives it
+    flattened (its prompt caching is automatic for repeated prefixes).
     """
     if model.startswith("gpt-"):
+        messages = [
+            {"role": "system", "content": _system_text(system)},
+            {"role": "user", "content": user_content},
+        ]
+        cache_key, cached = _cache_lookup("openai", model, {"messages": messages, "max_tokens": max_tokens})
+        if cached is not None:
+            _record_model_cost("openai", model, activity, client_id, cached)
+            return cached
+        reserved = rate_limiter.estimate_tokens(max_tokens=max_tokens, messages=messages)
+        _throttle_logged(rate_limiter.acquire("openai", model, reserved), activity, client_id)
         try:
             resp = client_openai.chat.completions.create(
                 model=model,
                 # OpenAI models in this family expect max_completion_tokens
                 max_completion_tokens=max_tokens,
-                messages=[
-                    {"role": "system", "content": system},
-                    {"role": "user", "content": user_content},
-                ],
+                messages=messages,
             )
+            _refund_rate_limit("openai", model, reserved, resp)
             _record_model_cost("openai", model, activity, client_id, resp)
+            _cache_store(cache_key, resp, llm_cache.openai_payload)
             return resp
         except Exception as e:
             raise
@@ -179,6 +289,205 @@ def _llm_messages_create(model: str, client_id: str, activity: str, system: str,
     return resp
 
 
+# Fenced code blocks: ```lang ...\n<body>```; the info line (and its newline) is
+# optional, so ```tsx <body>``` on one line is still found
+_CODE_FENCE_RE = re.compile(r"```([\w+-]*)(?:[^\n`]*\n)?(.*?)```", re.DOTALL)
+# Preferred block languages for generated pages (lower is better); unlabeled blocks rank last
+_CODE_FENCE_PRIORITY = {"tsx": 0, "typescript": 1, "ts": 2}
+
+
+def _extract_code_block(text: str) -> Optional[str]:
+    """
+    Return the body of the best fenced code block in an LLM response, or None.
+
+    Single pass over every fence: a tsx block wins over typescript/ts, and
+    those over any other block; ties go to the first one.
+    """
+    best = None
+    for match in _CODE_FENCE_RE.finditer(text or ""):
+        rank = _CODE_FENCE_PRIORITY.get(match.group(1).lower(), len(_CODE_FENCE_PRIORITY))
+        if best is None or rank < best[0]:
+            best = (rank, match.group(2).strip())
+            if rank == 0:
+                break
+    return best[1] if best else None
+
+
+def _code_block_end(text: str) -> Optional[int]:
+    """Offset just past the first closed multi-line TypeScript (or unlabeled) code block, if any."""
+    for match in _CODE_FENCE_RE.finditer(text):
+        lang = match.group(1).lower()
+        # Inline ```spans``` in prose must not end the stream before the page
+        if "\n" not in match.group(0):
+            continue
+        if not lang or lang in _CODE_FENCE_PRIORITY:
+            return match.end()
+    return None
+
+
+def _anthropic_stream_text(stream, usage: dict):
+    """Yield text deltas from a raw Anthropic event stream, collecting usage as it arrives."""
+    for event in stream:
+        event_type = getattr(event, "type", None)
+        if event_type == "message_start":
+            start_usage = getattr(getattr(event, "message", None), "usage", None)
+            for name in ("input_tokens", "cache_creation_input_tokens", "cache_read_input_tokens"):
+                usage[name] = _usage_value(start_usage, name) if start_usage else None
+        elif event_type == "content_block_delta":
+            text = getattr(event.delta, "text", None)
+            if text:
+                yield text
+        elif event_type == "message_delta":
+            usage["output_tokens"] = _usage_value(getattr(event, "usage", None), "output_tokens")
+            usage["stop_reason"] = getattr(getattr(event, "delta", None), "stop_reason", None)
+
+
+def _openai_stream_text(stream, usage: dict):
+    """Yield text deltas from an OpenAI chat completion stream, collecting usage."""
+    for chunk in stream:
+        chunk_usage = getattr(chunk, "usage", None)
+        if chunk_usage:
+            usage["prompt_tokens"] = _usage_value(chunk_usage, "prompt_tokens")
+            usage["completion_tokens"] = _usage_value(chunk_usage, "completion_tokens")
+        if getattr(chunk, "choices", None):
+            choice = chunk.choices[0]
+            text = getattr(choice.delta, "content", None)
+            if text:
+                yield text
+            if getattr(choice, "finish_reason", None):
+                usage["stop_reason"] = choice.finish_reason
+
+
+def _llm_messages_stream(model: str, client_id: str, activity: str, system, user_content: str, max_tokens: int):
+    """
+    Streaming variant of _llm_messages_create for code generation.
+
+    Reads the response incrementally and closes the stream as soon as the
+    first TypeScript code block is closed, so the caller can start its syntax
+    check without waiting for trailing prose. Time-to-first-token and
+    generation speed are logged and added to the cost entry's metadata.
+
+    Returns a response shaped like the provider's (text ends at the closing
+    fence), so _extract_response_text works on it unchanged.
+    """
+    if model.startswith("gpt-"):
+        provider = "openai"
+        params = {
+            "messages": [
+                {"role": "system", "content": _system_text(system)},
+                {"role": "user", "content": user_content},
+            ],
+            "max_tokens": max_tokens,
+        }
+    else:
+        provider = "anthropic"
+        params = {
+            "max_tokens": max_tokens,
+            "system": system,
+            "messages": [{"role": "user", "content": user_content}],
+        }
+
+    cache_key, cached = _cache_lookup(provider, model, params)
+    if cached is not None:
+        _record_model_cost(provider, model, activity, client_id, cached)
+        return cached
+
+    reserved = rate_limiter.estimate_tokens(**params)
+    usage: Dict[str, Any] = {}
+    max_attempts = 3
+    for attempt in range(1, max_attempts + 1):
+        _throttle_logged(rate_limiter.acquire(provider, model, reserved), activity, client_id)
+        started = time.monotonic()
+        try:
+            if provider == "openai":
+                stream = client_openai.chat.completions.create(
+                    model=model,
+                    max_completion_tokens=max_tokens,
+                    messages=params["messages"],
+                    stream=True,
+                    stream_options={"include_usage": True},
+                )
+                deltas = _openai_stream_text(stream, usage)
+            else:
+                stream = client_anthropic.messages.create(model=model, stream=True, **params)
+                deltas = _anthropic_stream_text(stream, usage)
+            break
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            _rate_limit_backoff(e, provider, model, reserved, activity, client_id, attempt, max_attempts)
+            if attempt == max_attempts:
+                raise
+
+    text = ""
+    first_token_at = None
+    stopped_at_fence = False
+    try:
+        for delta in deltas:
+            if first_token_at is None:
+                first_token_at = time.monotonic()
+            # Only re-scan when a fence may have just been completed
+            scan_from = max(0, len(text) - 2)
+            text += delta
+            if "```" in text[scan_from:]:
+                end = _code_block_end(text)
+                if end is not None:
+                    text = text[:end]
+                    stopped_at_fence = True
+                    break
+    finally:
+        close = getattr(stream, "close", None)
+        if callable(close):
+            close()
+
+    finished = time.monotonic()
+    first_token_at = first_token_at or finished
+    output_key = "completion_tokens" if provider == "openai" else "output_tokens"
+    # Usage arrives at the end of the stream; estimate it when we stopped early
+    output_tokens = usage.get(output_key) or max(1, len(text) // 4)
+    generation_seconds = finished - first_token_at
+    tokens_per_second = output_tokens / generation_seconds if generation_seconds > 0 else 0.0
+    stats = {
+        "ttft_seconds": round(first_token_at - started, 3),
+        "tokens_per_second": round(tokens_per_second, 1),
+        "stopped_at_fence": stopped_at_fence,
+    }
+    _log_aligned(
+        "info",
+        "📡",
+        "LLM stream",
+        f"{activity}/{client_id}: TTFT {stats['ttft_seconds']:.2f}s | {output_tokens} tokens "
+        f"@ {stats['tokens_per_second']:.0f} tok/s" + (" | stopped at closing fence" if stopped_at_fence else "")
+    )
+
+    stop_reason = "end_of_code_block" if stopped_at_fence else usage.get("stop_reason")
+    if provider == "openai":
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason=stop_reason)],
+            usage=SimpleNamespace(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=output_tokens),
+        )
+    else:
+        response = SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            stop_reason=stop_reason,
+            usage=SimpleNamespace(
+                input_tokens=usage.get("input_tokens"),
+                output_tokens=output_tokens,
+                cache_creation_input_tokens=usage.get("cache_creation_input_tokens"),
+                cache_read_input_tokens=usage.get("cache_read_input_tokens"),
+            ),
+        )
+    response.streaming = stats
+
+    _refund_rate_limit(provider, model, reserved, response)
+    _record_model_cost(provider, model, activity, client_id, response, stats)
+    _cache_store(
+        cache_key, response,
+        llm_cache.openai_payload if provider == "openai" else llm_cache.anthropic_payload,
+    )
+    return response
+
+
 def _start_heartbeat(label: str, interval: float = 30.0):
     """
     Start a background heartbeat logger to show long-running progress.
@@ -195,40 +504,321 @@ def _start_heartbeat(label: str, interval: float = 30.0):
     return stop_event, thread
 
 
+def _is_rate_limited(exc) -> bool:
+    """True if an API exception is a 429 (rate limit) that is worth retrying."""
+    if isinstance(exc, RateLimitError):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or "429" in str(exc)
+
+
+def _cache_lookup(provider: str, model: str, params: dict):
+    """
+    Return (cache_key, cached_response) for a request when GF_LLM_CACHE is on.
+
+    cache_key is None when caching is disabled; cached_response is None on a miss.
+    """
+    if not llm_cache.is_enabled():
+        return None, None
+    key = llm_cache.cache_key(provider, model, **params)
+    payload = llm_cache.get(key)
+    return key, (llm_cache.to_response(payload) if payload else None)
+
+
+def _cache_store(cache_key, response, to_payload):
+    """Store a response under cache_key (if caching is on); empty responses are never cached."""
+    if not cache_key:
+        return
+    try:
+        payload = to_payload(response)
+        if payload:
+            llm_cache.put(cache_key, payload)
+    except Exception as e:
+        _log_aligned("warning", "⚠️", "LLM cache", f"store failed: {e}")
+
+
+def _throttle_logged(waited: float, activity: str, client_id: str) -> None:
+    """Log time a call spent queued in the shared rate limiter (if noticeable)."""
+    if waited >= 1:
+        _log_aligned("info", "⏳", "Rate limiter", f"{activity}/{client_id} queued {waited:.1f}s for API budget")
+
+
+def _rate_limit_backoff(exc, provider: str, model: str, reserved: int, activity: str, client_id: str, attempt: int, max_attempts: int) -> None:
+    """
+    Handle a 429 that got past the limiter: return the attempt's reserved
+    tokens (a rejected request uses none) and block the model for every caller
+    (threads and processes) until the provider's retry-after has passed.
+    The wait itself happens in the next rate_limiter.acquire().
+    """
+    rate_limiter.refund(provider, model, reserved, used=0)
+    backoff = rate_limiter.retry_after_seconds(exc, min(5 * attempt, 15))
+    rate_limiter.penalize(provider, model, backoff)
+    _log_aligned(
+        "warning",
+        "⚠️ ",
+        "Rate limit",
+        f"{activity}/{client_id} (attempt {attempt}/{max_attempts}). Retrying in {backoff:g}s"
+    )
+
+
+def _refund_rate_limit(provider: str, model: str, reserved: int, response) -> None:
+    """Credit unused reserved tokens back to the shared bucket."""
+    in_tokens, out_tokens, cache_write, _ = _extract_usage_tokens(response)
+    if in_tokens is None or out_tokens is None:
+        return
+    rate_limiter.refund(provider, model, reserved, in_tokens + out_tokens + (cache_write or 0))
+
+
 def _anthropic_messages_create(model: str, client_id: str, activity: str, **kwargs):
     """
-    Call Anthropic with a small exponential backoff on 429 (rate limit) errors.
+    Call Anthropic through the shared rate limiter.
+
+    Each attempt first waits for the model's request/token budget
+    (rate_limits in tracker_config.json), so concurrent stages and workers
+    queue locally instead of being rejected. A 429 that still gets through
+    blocks the model for all callers until its retry-after has passed.
+
+    Identical requests are served from the LLM cache when GF_LLM_CACHE is on;
+    cached responses carry `cache_hit = True`.
     """
+    cache_key, cached = _cache_lookup("anthropic", model, kwargs)
+    if cached is not None:
+        return cached
+    reserved = rate_limiter.estimate_tokens(**kwargs)
     max_attempts = 3
     for attempt in range(1, max_attempts + 1):
+        _throttle_logged(rate_limiter.acquire("anthropic", model, reserved), activity, client_id)
         try:
-            return client_anthropic.messages.create(model=model, **kwargs)
-        except RateLimitError as e:
-            sleep = min(5 * attempt, 15)
-            _log_aligned(
-                "warning",
-                "⚠️ ",
-                "Rate limit",
-                f"{activity}/{client_id} (attempt {attempt}/{max_attempts}). Retrying in {sleep}s"
+            response = client_anthropic.messages.create(model=model, **kwargs)
+            _refund_rate_limit("anthropic", model, reserved, response)
+            _cache_store(cache_key, response, llm_cache.anthropic_payload)
+            return response
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            _rate_limit_backoff(e, "anthropic", model, reserved, activity, client_id, attempt, max_attempts)
+            if attempt == max_attempts:
+                raise
+
+
+# Async client and request semaphore are bound to the running event loop,
+# so they are created lazily by the first call in each asyncio.run()
+_async_loop = None
+_async_anthropic = None
+_async_llm_semaphore = None
+
+
+def _async_llm_resources():
+    """Return (AsyncAnthropic client, semaphore) for the running event loop."""
+    global _async_loop, _async_anthropic, _async_llm_semaphore
+    loop = asyncio.get_running_loop()
+    if _async_loop is not loop:
+        _async_anthropic = AsyncAnthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+        _async_llm_semaphore = asyncio.Semaphore(ASYNC_MAX_LLM_CALLS)
+        _async_loop = loop
+    return _async_anthropic, _async_llm_semaphore
+
+
+async def _close_async_llm_resources():
+    """Close the loop-bound async client before its event loop shuts down."""
+    global _async_loop, _async_anthropic, _async_llm_semaphore
+    if _async_anthropic is not None and _async_loop is asyncio.get_running_loop():
+        await _async_anthropic.close()
+        _async_loop = _async_anthropic = _async_llm_semaphore = None
+
+
+async def _anthropic_messages_create_async(model: str, client_id: str, activity: str, **kwargs):
+    """
+    Async twin of _anthropic_messages_create: same shared rate limiter, but
+    waits with asyncio.sleep and caps in-flight requests with
+    ASYNC_MAX_LLM_CALLS, so a single event loop can keep many pipelines
+    generating at once. Cache reads and writes and the limiter's SQLite
+    updates run in a worker thread.
+    """
+    cache_key, cached = await asyncio.to_thread(_cache_lookup, "anthropic", model, kwargs)
+    if cached is not None:
+        return cached
+    client, semaphore = _async_llm_resources()
+    reserved = rate_limiter.estimate_tokens(**kwargs)
+    max_attempts = 3
+    for attempt in range(1, max_attempts + 1):
+        # Queue for API budget outside the semaphore so other pipelines keep their slots
+        _throttle_logged(await rate_limiter.acquire_async("anthropic", model, reserved), activity, client_id)
+        try:
+            async with semaphore:
+                response = await client.messages.create(model=model, **kwargs)
+            await asyncio.to_thread(_refund_rate_limit, "anthropic", model, reserved, response)
+            await asyncio.to_thread(_cache_store, cache_key, response, llm_cache.anthropic_payload)
+            return response
+        except Exception as e:
+            if not _is_rate_limited(e):
+                raise
+            await asyncio.to_thread(
+                _rate_limit_backoff, e, "anthropic", model, reserved, activity, client_id, attempt, max_attempts
             )
-            time.sleep(sleep)
             if attempt == max_attempts:
                 raise
+
+
+class _ParallelSteps:
+    """
+    Yielded by a step generator, in place of request kwargs, to run several
+    step generators concurrently; the driver sends back their return values
+    in order.
+
+    Once a return value satisfies `done`, the remaining generators are
+    abandoned and their result is None: both drivers stop them before their
+    next request, but wait for requests already in flight so the cost those
+    generators record still lands before the results are sent back. A
+    generator that raises also yields None, unless every one of them raised.
+    """
+
+    def __init__(self, steps, done=None):
+        self.steps = list(steps)
+        self.done = done
+
+
+def _run_llm_steps(steps, cancelled=None):
+    """
+    Drive a stage step generator with blocking API calls.
+
+    LLM-only stages (router, visual designer, strategist, copywriter) are
+    written once as generators that `yield` the kwargs of each Anthropic
+    request and receive the response back. This driver serves them with
+    _anthropic_messages_create; _run_llm_steps_async serves the same
+    generators from an event loop. API errors are thrown into the generator
+    so its `with` blocks (time tracking spans) unwind normally.
+
+    Parameters:
+        steps: Step generator
+        cancelled (threading.Event, optional): Stop before the next request once set
+
+    Returns:
+        The generator's return value (None if cancelled)
+    """
+    try:
+        request = next(steps)
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                steps.close()
+                return None
+            try:
+                if isinstance(request, _ParallelSteps):
+                    response = _run_parallel_steps(request)
+                else:
+                    response = _anthropic_messages_create(**request)
+            except Exception as e:
+                request = steps.throw(e)
+            else:
+                request = steps.send(response)
+    except StopIteration as done:
+        return done.value
+
+
+def _run_parallel_steps(parallel):
+    """Blocking driver for _ParallelSteps: one thread per generator."""
+    cancelled = threading.Event()
+    results = [None] * len(parallel.steps)
+    errors = []
+    pool = ThreadPoolExecutor(max_workers=max(1, len(parallel.steps)), thread_name_prefix="llm-parallel")
+    futures = {pool.submit(_run_llm_steps, steps, cancelled): index for index, steps in enumerate(parallel.steps)}
+    pending = set(futures)
+    try:
+        while pending and not cancelled.is_set():
+            finished, pending = futures_wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                try:
+                    results[futures[future]] = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                if parallel.done and parallel.done(results[futures[future]]):
+                    cancelled.set()
+    finally:
+        # Abandoned generators stop at their next request; the one in flight still records its cost
+        cancelled.set()
+        pool.shutdown(wait=True, cancel_futures=True)
+    if errors and len(errors) == len(parallel.steps):
+        raise errors[0]
+    for error in errors:
+        _log_aligned("warning", "⚠️", "Parallel steps", f"one of {len(parallel.steps)} branches failed: {error}")
+    return results
+
+
+def _advance_steps(method, value):
+    """
+    Advance a step generator with steps.send or steps.throw.
+
+    Returns:
+        (finished, next request or return value); StopIteration cannot cross
+        an asyncio future, so it is turned into a flag
+    """
+    try:
+        return False, method(value)
+    except StopIteration as done:
+        return True, done.value
+
+
+async def _run_llm_steps_async(steps, cancelled=None):
+    """
+    Async driver for stage step generators (see _run_llm_steps).
+
+    Only the API requests are awaited on the event loop. The generator's own
+    code between requests (prompt and intake reads, cost ledger, time log and
+    job queue writes, and whole blocking stages such as the builder) runs in a
+    worker thread, so it never stalls the other pipelines on the loop.
+    """
+    finished, request = await asyncio.to_thread(_advance_steps, steps.send, None)
+    while not finished:
+        if cancelled is not None and cancelled.is_set():
+            await asyncio.to_thread(steps.close)
+            return None
+        try:
+            if isinstance(request, _ParallelSteps):
+                response = await _run_parallel_steps_async(request)
+            else:
+                response = await _anthropic_messages_create_async(**request)
         except Exception as e:
-            status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
-            if status == 429 or "429" in str(e):
-                sleep = min(5 * attempt, 15)
-                _log_aligned(
-                    "warning",
-                    "⚠️ ",
-                    "Rate limit",
-                    f"{activity}/{client_id} (attempt {attempt}/{max_attempts}). Retrying in {sleep}s"
-                )
-                time.sleep(sleep)
-                if attempt == max_attempts:
-                    raise
-                continue
-            raise
+            finished, request = await asyncio.to_thread(_advance_steps, steps.throw, e)
+        else:
+            finished, request = await asyncio.to_thread(_advance_steps, steps.send, response)
+    return request
+
+
+async def _run_parallel_steps_async(parallel):
+    """Async driver for _ParallelSteps: one task per generator."""
+    cancelled = asyncio.Event()
+    tasks = [asyncio.ensure_future(_run_llm_steps_async(steps, cancelled)) for steps in parallel.steps]
+    results = [None] * len(tasks)
+    errors = []
+    pending = set(tasks)
+    try:
+        while pending:
+            finished, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            stop = False
+            for task in finished:
+                if task.exception() is not None:
+                    errors.append(task.exception())
+                    continue
+                results[tasks.index(task)] = task.result()
+                stop = stop or bool(parallel.done and parallel.done(task.result()))
+            if stop:
+                break
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+    if pending:
+        # Abandoned generators stop at their next request; the one in flight still records its cost
+        cancelled.set()
+        for task in (await asyncio.wait(pending))[0]:
+            if not task.cancelled() and task.exception() is not None:
+                _log_aligned("warning", "⚠️", "Parallel steps", f"abandoned branch failed: {task.exception()}")
+    if errors and len(errors) == len(tasks):
+        raise errors[0]
+    for error in errors:
+        _log_aligned("warning", "⚠️", "Parallel steps", f"one of {len(tasks)} branches failed: {error}")
+    return results
 
 
 def _extract_response_text(response, default=None):
@@ -323,29 +913,69 @@ def validate_prompt_library():
     return all_valid
 
 
-def select_niche_persona(client_id, intake):
+# Router niche -> strategy prompt
+NICHE_PROMPTS = {
+    "saas": "saas.md",
+    "saas_b2b": "saas.md",
+    "local_service": "local_service.md",
+    "ecommerce": "ecommerce.md",
+    "ecommerce_dtc": "ecommerce.md",
+    "personal_brand": "personal_brand.md",
+    "webinar_funnel": "webinar.md"
+}
+# Strategy prompt -> niche name saved for local classifications (first alias wins)
+PROMPT_NICHES = {prompt: niche for niche, prompt in reversed(list(NICHE_PROMPTS.items()))}
+
+
+def select_niche_persona(client_id, intake, client_path=None):
     """
     Classify a client's intake into a niche and return the corresponding strategy prompt filename.
+
+    A niche already persisted in the client's niche.json is reused; otherwise the
+    local classifier (automation/niche_classifier.py) answers when it is confident
+    and the LLM router is asked only when it is not.
     
     Parameters:
         client_id (str): Client identifier used for logging and cost tracking.
         intake (str): The intake text to be classified.
+        client_path (str, optional): Client directory; the chosen niche is persisted there.
     
     Returns:
         str: Filename of the matched strategy prompt (for example "saas.md", "local_service.md", "ecommerce.md", "personal_brand.md", or "webinar.md").  
     """
+    return _run_llm_steps(_route_steps(client_id, intake, client_path))
+
+
+def _route_steps(client_id, intake, client_path=None):
+    """Router step generator for select_niche_persona; yields LLM requests (see _run_llm_steps)."""
+    if client_path:
+        choice = niche_classifier.load_choice(client_path)
+        if choice and choice["prompt"] in NICHE_PROMPTS.values():
+            _log_aligned("info", "📋", "Client classified", f"as: {choice['niche']} (saved {choice['source']} choice)")
+            return choice["prompt"]
+
+    # The classifier learns and answers strategy prompts, so router aliases share examples
+    local = niche_classifier.classify(intake, WATCH_DIR, PROMPT_NICHES)
+    if local and local[0] in PROMPT_NICHES:
+        prompt, confidence = local
+        niche = PROMPT_NICHES[prompt]
+        _log_aligned("info", "📋", "Client classified", f"as: {niche} (local classifier, held-out accuracy {confidence:.2f})")
+        if client_path:
+            niche_classifier.save_choice(client_path, niche, prompt, "local", confidence)
+        return prompt
+
     _log_aligned("info", "🔀", "Router", f"classifying {client_id}...")
 
     # Load router prompt
     router_prompt = _load_prompt("router.md")
 
     # Ask LLM to classify
-    msg = _anthropic_messages_create(
+    msg = yield dict(
         model=MODEL_ROUTER,
         client_id=client_id,
         activity="router_classify",
         max_tokens=50,
-        system=router_prompt,
+        system=_system_blocks(router_prompt),
         messages=[{"role": "user", "content": intake}],
     )
     _record_model_cost("anthropic", MODEL_ROUTER, "router_classify", client_id, msg)
@@ -359,22 +989,16 @@ def select_niche_persona(client_id, intake):
     niche = response_text.strip().lower()
 
     # Validate and map to filename
-    valid_niches = {
-        "saas": "saas.md",
-        "saas_b2b": "saas.md",
-        "local_service": "local_service.md",
-        "ecommerce": "ecommerce.md",
-        "ecommerce_dtc": "ecommerce.md",
-        "personal_brand": "personal_brand.md",
-        "webinar_funnel": "webinar.md"
-    }
-
-    if niche not in valid_niches:
+    if niche not in NICHE_PROMPTS:
+        # Not persisted or learned: a retry should ask the router again
         _log_aligned("warning", "⚠️", "Router", f"returned unknown niche '{niche}', defaulting to local_service")
-        niche = "local_service"
+        return NICHE_PROMPTS["local_service"]
 
     _log_aligned("info", "📋", "Client classified", f"as: {niche}")
-    return valid_niches[niche]
+    niche_classifier.learn(intake, NICHE_PROMPTS[niche], WATCH_DIR)
+    if client_path:
+        niche_classifier.save_choice(client_path, niche, NICHE_PROMPTS[niche], "router")
+    return NICHE_PROMPTS[niche]
 
 
 # 2. HELPER FUNCTIONS
@@ -394,16 +1018,38 @@ def git_pull():
         _log_aligned("error", "❌", "Git pull", f"Failed: {e}")
         return False
 
-def git_commit_and_push(client_id):
+# Shared tracking files every pipeline appends to (time logs, API costs,
+# failure memory, learned rules). Each client commit carries their current state.
+GIT_TRACKING_PATHS = (
+    "data/time_logs",
+    "data/costs",
+    "data/memory",
+    "design-system/dynamic_rules.md",
+    "docs/operations/project_tracker.md",
+)
+
+
+def _client_git_paths(client_id):
     """
-    Commits and pushes generated code to a client-specific branch.
-    
-    Creates/checks out a branch named 'client-{client_id}' and pushes changes there,
-    keeping main branch clean and client work segregated.
+    Paths a client's commit may stage.
+
+    Workers share one working tree, so `git add .` would also stage the
+    half-written clients/ and app/clients/ files of every other in-flight
+    client. Only this client's directories and the shared tracking files
+    are staged (paths that do not exist are skipped so git does not reject
+    the pathspec).
     """
-    _log_aligned("info", "💾", "Git commit", f"Committing changes for {client_id}...")
-    
-    # Sanitize client_id for branch name (git branch names have restrictions)
+    paths = [
+        os.path.join(WATCH_DIR, client_id),
+        os.path.join("app", "clients", client_id),
+        os.path.join("public", "clients", client_id),
+        *GIT_TRACKING_PATHS,
+    ]
+    return [os.path.normpath(path) for path in paths if os.path.exists(path)]
+
+
+def _client_branch_name(client_id):
+    """Sanitize `client-{client_id}` into a valid git branch name (None if nothing usable is left)."""
     # Valid characters: alphanumeric, forward slash, hyphen, underscore
     # Cannot start with . or end with .lock
     branch_name = f"client-{client_id}"
@@ -421,237 +1067,131 @@ def git_commit_and_push(client_id):
     # Ensure it doesn't end with .lock
     if branch_name.endswith('.lock'):
         branch_name = branch_name[:-5]
-    
     if not branch_name or len(branch_name) < 2:
+        return None
+    return branch_name
+
+
+def _git(*args, env=None, timeout=10):
+    """Run a git command, capturing text output."""
+    return subprocess.run(["git", *args], capture_output=True, text=True, env=env, timeout=timeout)
+
+
+def _git_error(result):
+    """Error text of a failed git command."""
+    return (result.stderr or result.stdout or "Unknown error").strip()
+
+
+def git_commit_and_push(client_id):
+    """
+    Commits and pushes generated code to a client-specific branch.
+
+    The commit is built with git plumbing in a temporary index on top of the
+    'client-{client_id}' branch (or main/master for a new branch): HEAD, the
+    shared index and the working tree are never touched, since the other
+    workers keep writing to the tracked files while a client finalizes.
+    Only this client's paths and the shared tracking files are staged (see
+    _client_git_paths).
+
+    Returns:
+        bool: True if the branch was committed (or already up to date) and pushed
+    """
+    _log_aligned("info", "💾", "Git commit", f"Committing changes for {client_id}...")
+
+    branch_name = _client_branch_name(client_id)
+    if not branch_name:
         _log_aligned("error", "❌", "Git branch", f"Invalid branch name generated from client_id: {client_id}")
-        return
-    
-    original_branch = None
-    had_uncommitted_changes = False
-    
-    try:
-        # Check if we're in a git repository
-        subprocess.run(
-            ["git", "rev-parse", "--git-dir"],
-            check=True,
-            capture_output=True
-        )
-    except subprocess.CalledProcessError:
-        _log_aligned("error", "❌", "Git", "Not in a git repository")
-        return
-    except FileNotFoundError:
-        _log_aligned("error", "❌", "Git", "Git not found. Is git installed?")
-        return
-    
+        return False
+
+    index_path = None
     try:
-        # Get current branch to restore later
-        try:
-            current_branch_result = subprocess.run(
-                ["git", "rev-parse", "--abbrev-ref", "HEAD"],
-                capture_output=True,
-                text=True,
-                check=True,
-                timeout=5
-            )
-            original_branch = current_branch_result.stdout.strip()
-        except subprocess.TimeoutExpired:
-            _log_aligned("warning", "⚠️", "Git", "Timeout checking current branch")
-            original_branch = None
-        except subprocess.CalledProcessError:
-            # Might be in detached HEAD state or new repo
-            original_branch = None
-        
-        # Check for uncommitted changes on current branch
-        status_result = subprocess.run(
-            ["git", "status", "--porcelain"],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        if status_result.returncode == 0 and status_result.stdout.strip():
-            had_uncommitted_changes = True
-            _log_aligned("info", "📝", "Git", "Uncommitted changes detected (will be included in client branch)")
-        
-        # Check if client branch exists locally
-        branch_check_result = subprocess.run(
-            ["git", "show-ref", "--verify", "--quiet", f"refs/heads/{branch_name}"],
-            capture_output=True,
-            timeout=5
-        )
-        branch_exists_locally = branch_check_result.returncode == 0
-        
-        if branch_exists_locally:
-            # Checkout existing branch
-            _log_aligned("info", "🌿", "Git branch", f"Switching to existing branch: {branch_name}")
-            checkout_result = subprocess.run(
-                ["git", "checkout", branch_name],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if checkout_result.returncode != 0:
-                error_msg = checkout_result.stderr or checkout_result.stdout or "Unknown error"
-                _log_aligned("error", "❌", "Git checkout", f"Failed to checkout {branch_name}: {error_msg}")
-                return
-        else:
-            # Create new branch from main (or master, or current branch as fallback)
-            base_branch = None
-            
-            # Try main first
-            try:
-                subprocess.run(
-                    ["git", "show-ref", "--verify", "--quiet", "refs/heads/main"],
-                    check=True,
-                    capture_output=True,
-                    timeout=5
-                )
-                base_branch = "main"
-            except subprocess.CalledProcessError:
-                # Try master as fallback
-                try:
-                    subprocess.run(
-                        ["git", "show-ref", "--verify", "--quiet", "refs/heads/master"],
-                        check=True,
-                        capture_output=True,
-                        timeout=5
-                    )
-                    base_branch = "master"
-                except subprocess.CalledProcessError:
-                    # Use current branch or HEAD as last resort
-                    if original_branch:
-                        base_branch = original_branch
-                    else:
-                        base_branch = "HEAD"
-            
-            _log_aligned("info", "🌿", "Git branch", f"Creating new branch {branch_name} from {base_branch}")
-            checkout_result = subprocess.run(
-                ["git", "checkout", "-b", branch_name, base_branch],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
-            if checkout_result.returncode != 0:
-                error_msg = checkout_result.stderr or checkout_result.stdout or "Unknown error"
-                _log_aligned("error", "❌", "Git branch", f"Failed to create branch {branch_name}: {error_msg}")
-                return
-        
-        # Stage all changes (new pages, tracking files, processed intakes)
-        add_result = subprocess.run(
-            ["git", "add", "."],
-            capture_output=True,
-            text=True,
-            timeout=30
-        )
-        if add_result.returncode != 0:
-            error_msg = add_result.stderr or add_result.stdout or "Unknown error"
-            _log_aligned("error", "❌", "Git add", f"Failed to stage changes: {error_msg}")
-            # Try to restore original branch before returning
-            if original_branch and original_branch != branch_name:
-                try:
-                    subprocess.run(["git", "checkout", original_branch], capture_output=True, timeout=10)
-                except:
-                    pass
-            return
-        
-        # Check if there are actually changes to commit
-        diff_result = subprocess.run(
-            ["git", "diff", "--cached", "--quiet"],
-            capture_output=True
-        )
-        if diff_result.returncode == 0:
+        git_dir = _git("rev-parse", "--git-dir", timeout=5)
+        if git_dir.returncode != 0:
+            _log_aligned("error", "❌", "Git", "Not in a git repository")
+            return False
+
+        # Parent commit: the client branch, or main/master/HEAD for a new branch
+        parent = None
+        for ref in (f"refs/heads/{branch_name}", "refs/heads/main", "refs/heads/master", "HEAD"):
+            result = _git("rev-parse", "--verify", "--quiet", f"{ref}^{{commit}}", timeout=5)
+            if result.returncode == 0 and result.stdout.strip():
+                parent = result.stdout.strip()
+                if ref != f"refs/heads/{branch_name}":
+                    _log_aligned("info", "🌿", "Git branch", f"Creating new branch {branch_name} from {ref.rsplit('/', 1)[-1]}")
+                break
+        if parent is None:
+            _log_aligned("error", "❌", "Git branch", f"No commit to branch {branch_name} from")
+            return False
+
+        # Stage this client's changes (new page, processed intake, tracking files)
+        client_paths = _client_git_paths(client_id)
+        if not client_paths:
+            # `git add -A --` without a pathspec would stage the whole tree
+            _log_aligned("warning", "⚠️", "Git add", f"No files to stage for {client_id}")
+            return False
+
+        fd, index_path = tempfile.mkstemp(prefix="client-index-", dir=git_dir.stdout.strip())
+        os.close(fd)
+        os.remove(index_path)  # git refuses an empty file as an index
+        env = {**os.environ, "GIT_INDEX_FILE": index_path}
+        for args, timeout in (
+            (("read-tree", parent), 30),
+            (("add", "-A", "--", *client_paths), 30),
+        ):
+            result = _git(*args, env=env, timeout=timeout)
+            if result.returncode != 0:
+                _log_aligned("error", "❌", "Git add", f"Failed to stage changes: {_git_error(result)}")
+                return False
+        tree = _git("write-tree", env=env, timeout=30)
+        if tree.returncode != 0:
+            _log_aligned("error", "❌", "Git commit", f"Failed to write tree: {_git_error(tree)}")
+            return False
+
+        commit = parent
+        if tree.stdout.strip() == _git("rev-parse", f"{parent}^{{tree}}", timeout=5).stdout.strip():
             _log_aligned("info", "ℹ️", "Git commit", "No changes to commit")
-            # Still try to push in case there are commits already
         else:
-            # Commit
             commit_msg = f"feat: Auto-generated landing page for {client_id}"
-            commit_result = subprocess.run(
-                ["git", "commit", "-m", commit_msg],
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
-            if commit_result.returncode != 0:
-                error_msg = commit_result.stderr or commit_result.stdout or "Unknown error"
-                # Check if it's just "nothing to commit"
-                if "nothing to commit" in error_msg.lower() or "no changes" in error_msg.lower():
-                    _log_aligned("info", "ℹ️", "Git commit", "No changes to commit (already up to date)")
-                else:
-                    _log_aligned("error", "❌", "Git commit", f"Failed to commit: {error_msg}")
-                    # Try to restore original branch before returning
-                    if original_branch and original_branch != branch_name:
-                        try:
-                            subprocess.run(["git", "checkout", original_branch], capture_output=True, timeout=10)
-                        except:
-                            pass
-                    return
-        
-        # Push to remote (create upstream if needed)
+            result = _git("commit-tree", tree.stdout.strip(), "-p", parent, "-m", commit_msg, timeout=30)
+            if result.returncode != 0:
+                _log_aligned("error", "❌", "Git commit", f"Failed to commit: {_git_error(result)}")
+                return False
+            commit = result.stdout.strip()
+        result = _git("update-ref", f"refs/heads/{branch_name}", commit, timeout=10)
+        if result.returncode != 0:
+            _log_aligned("error", "❌", "Git branch", f"Failed to update {branch_name}: {_git_error(result)}")
+            return False
+
+        # Push the commit itself, so nothing depends on what is checked out
         _log_aligned("info", "📤", "Git push", f"Pushing to origin/{branch_name}...")
-        
-        # First try with -u flag (sets upstream)
-        push_result = subprocess.run(
-            ["git", "push", "-u", "origin", branch_name],
-            capture_output=True,
-            text=True,
-            timeout=60
-        )
-        
-        if push_result.returncode == 0:
-            _log_aligned("info", "✅", "Git push", f"Successfully pushed to branch {branch_name}")
-        else:
-            # If that fails, try without -u (branch might already exist remotely)
-            error_msg = push_result.stderr or push_result.stdout or "Unknown error"
-            if "no upstream" in error_msg.lower() or "set upstream" in error_msg.lower():
-                # Try without -u
-                push_result2 = subprocess.run(
-                    ["git", "push", "origin", branch_name],
-                    capture_output=True,
-                    text=True,
-                    timeout=60
-                )
-                if push_result2.returncode == 0:
-                    _log_aligned("info", "✅", "Git push", f"Successfully pushed to branch {branch_name}")
-                else:
-                    error_msg2 = push_result2.stderr or push_result2.stdout or "Unknown error"
-                    _log_aligned("error", "❌", "Git push", f"Failed to push: {error_msg2}")
-                    # Don't return here - still try to restore branch
-            else:
-                _log_aligned("error", "❌", "Git push", f"Failed to push: {error_msg}")
-        
-        # Optionally switch back to original branch
-        # Uncomment the block below if you want to automatically switch back
-        # if original_branch and original_branch != branch_name:
-        #     try:
-        #         checkout_back_result = subprocess.run(
-        #             ["git", "checkout", original_branch],
-        #             capture_output=True,
-        #             text=True,
-        #             timeout=10
-        #         )
-        #         if checkout_back_result.returncode == 0:
-        #             _log_aligned("info", "🔄", "Git branch", f"Switched back to {original_branch}")
-        #         else:
-        #             _log_aligned("warning", "⚠️", "Git branch", f"Stayed on {branch_name} (could not switch back)")
-        #     except Exception as e:
-        #         _log_aligned("warning", "⚠️", "Git branch", f"Stayed on {branch_name} (error switching back: {e})")
-            
+        result = _git("push", "origin", f"{commit}:refs/heads/{branch_name}", timeout=60)
+        if result.returncode != 0:
+            _log_aligned("error", "❌", "Git push", f"Failed to push: {_git_error(result)}")
+            return False
+        _log_aligned("info", "✅", "Git push", f"Successfully pushed to branch {branch_name}")
+        return True
     except subprocess.TimeoutExpired:
         _log_aligned("error", "❌", "Git", f"Operation timed out for {client_id}")
     except FileNotFoundError:
         _log_aligned("error", "❌", "Git", "Git command not found. Is git installed?")
     except Exception as e:
         _log_aligned("error", "❌", "Git commit/push", f"Unexpected error for {client_id}: {e}")
-        # Try to restore original branch on unexpected error
-        if original_branch and original_branch != branch_name:
-            try:
-                subprocess.run(["git", "checkout", original_branch], capture_output=True, timeout=10)
-            except:
-                pass
+    finally:
+        if index_path and os.path.exists(index_path):
+            os.remove(index_path)
+    return False
+
 
 def run_intake_sanitizer():
-    """Converts any raw intakes (intake-raw.md) to structured intakes (intake.md)."""
+    """
+    Converts any raw intakes (intake-raw.md) to structured intakes (intake.md).
+
+    Returns:
+        int: Number of intakes sanitized
+    """
+    sanitized = 0
     if not os.path.exists(WATCH_DIR):
-        return
+        return sanitized
 
     for client_id in os.listdir(WATCH_DIR):
         # Skip dotfiles
@@ -662,60 +1202,39 @@ def run_intake_sanitizer():
         if not is_valid_client_id(client_id):
             _log_aligned("warning", "⚠️", "Sanitizer", f"Skipping invalid client ID: {client_id}")
             continue
-        
-        client_path = os.path.join(WATCH_DIR, client_id)
-        raw_intake_path = os.path.join(client_path, "intake-raw.md")
 
-        if os.path.isdir(client_path) and os.path.exists(raw_intake_path):
-            _log_aligned("info", "📝", "Sanitizer", f"Sanitizing raw intake for {client_id}...")
-            try:
-                result = subprocess.run(
-                    ["python", "automation/intake_sanitizer.py", raw_intake_path],
-                    capture_output=True, text=True
-                )
-                if result.returncode == 0:
-                    _log_aligned("info", "✅", "Sanitizer", f"Sanitized intake for {client_id}")
-                else:
-                    _log_aligned("error", "❌", "Sanitizer", f"failed for {client_id}: {result.stderr}")
-            except Exception as e:
-                _log_aligned("error", "❌", "Sanitizer", f"error for {client_id}: {e}")
+        if sanitize_client_intake(client_id):
+            sanitized += 1
 
-def check_server_status():
-    """Simple check if localhost:3000 is reachable."""
-    try:
-        requests.get("http://localhost:3000", timeout=2)
-        return True
-    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+    return sanitized
+
+
+def sanitize_client_intake(client_id: str) -> bool:
+    """
+    Convert one client's intake-raw.md into intake.md, if present.
+
+    Returns:
+        bool: True if a raw intake was sanitized successfully, False otherwise
+    """
+    client_path = os.path.join(WATCH_DIR, client_id)
+    raw_intake_path = os.path.join(client_path, "intake-raw.md")
+
+    if not (os.path.isdir(client_path) and os.path.exists(raw_intake_path)):
         return False
 
-def ensure_server_running():
-    """Ensures dev server is up. Attempts to start it if down."""
-    if check_server_status():
-        return True
-        
-    _log_aligned("warning", "⚠️", "Server", "localhost:3000 is down. Attempting to start dev server...")
+    _log_aligned("info", "📝", "Sanitizer", f"Sanitizing raw intake for {client_id}...")
     try:
-        # Start npm run dev in the background
-        # Note: This process will die if the script exits, which is usually fine for a worker
-        subprocess.Popen(
-            ["npm", "run", "dev"], 
-            stdout=subprocess.DEVNULL, 
-            stderr=subprocess.DEVNULL,
-            shell=True if os.name == 'nt' else False
+        result = subprocess.run(
+            ["python", "automation/intake_sanitizer.py", raw_intake_path],
+            capture_output=True, text=True
         )
-        
-        # Wait up to 15 seconds for it to boot
-        for _ in range(15):
-            time.sleep(1)
-            if check_server_status():
-                _log_aligned("info", "✅", "Server", "started successfully.")
-                return True
-                
-        _log_aligned("error", "❌", "Server", "Failed to start server within timeout.")
-        return False
+        if result.returncode == 0:
+            _log_aligned("info", "✅", "Sanitizer", f"Sanitized intake for {client_id}")
+            return True
+        _log_aligned("error", "❌", "Sanitizer", f"failed for {client_id}: {result.stderr}")
     except Exception as e:
-        _log_aligned("error", "❌", "Server", f"Error starting server: {e}")
-        return False
+        _log_aligned("error", "❌", "Sanitizer", f"error for {client_id}: {e}")
+    return False
 
 def send_discord_alert(client_name, status, report=None):
     """Send Discord notification for build status. Fails silently to keep pipeline resilient."""
@@ -906,11 +1425,148 @@ def _format_syntax_errors_human_readable(error_output: str) -> str:
     return " | ".join(parts) if parts else f"{total_errors} syntax error(s)"
 
 
+@lru_cache(maxsize=None)
+def _find_npx() -> Optional[str]:
+    """Locate npx once per process instead of probing PATH on every check."""
+    # Try to find npx - check common locations
+    npx_cmd = shutil.which("npx")
+    if not npx_cmd:
+        # Try to find npx in the same directory as node
+        node_path = shutil.which("node")
+        if node_path:
+            node_dir = os.path.dirname(node_path)
+            # On Windows, try both npx and npx.cmd
+            for npx_name in ["npx.cmd", "npx"]:
+                npx_path = os.path.join(node_dir, npx_name)
+                if os.path.exists(npx_path):
+                    npx_cmd = npx_path
+                    break
+            # Also try shutil.which for npx.cmd specifically
+            if not npx_cmd:
+                npx_cmd = shutil.which("npx.cmd")
+    
+    if not npx_cmd:
+        # Last resort: try direct path if we know node location
+        node_path = shutil.which("node")
+        if node_path:
+            node_dir = os.path.dirname(node_path)
+            potential_npx = os.path.join(node_dir, "npx")
+            if os.path.exists(potential_npx):
+                npx_cmd = potential_npx
+    return npx_cmd
+
+
+def _evaluate_tsc_output(returncode: int, error_output: str, temp_file_name: str, client_id: str) -> Tuple[bool, str]:
+    """
+    Turn TypeScript compiler output into check_syntax's (success, error_log).
+
+    Errors from dependencies (lib/, components/, node_modules/, ...) are
+    ignored so only problems in the generated page fail the check.
+
+    Parameters:
+        returncode: Compiler exit status (0 = compiled)
+        error_output: Compiler output ("file.tsx(line,col): error TS####: message" lines)
+        temp_file_name: Name the checked page appears under in the output
+        client_id: Client identifier for logging purposes
+    """
+    if returncode == 0:
+        _log_aligned("info", "✅", "Syntax check", f"passed for {client_id}")
+        return (True, "")
+    else:
+        # Combine stdout and stderr for full error output
+        error_output = error_output or "Unknown compilation error"
+        
+        # Filter to only show errors from the generated page.tsx file, ignore errors from dependencies
+        # This prevents false failures due to errors in lib/ or other project files
+        error_lines = error_output.split('\n')
+        filtered_errors = []
+        in_relevant_error = False
+        
+        for line in error_lines:
+            # Check if this line is an error from our generated file
+            # Errors are typically: "file.tsx(line,col): error TS####: message"
+            # After sanitization, temp file paths become "page.tsx"
+            is_our_error = (
+                "page.tsx" in line or  # Sanitized path
+                temp_file_name in line or  # Original temp file name
+                (line.strip().startswith("(") and "error TS" in line)  # Error continuation
+            )
+            
+            # Check if it's an error from a dependency file (lib/, node_modules/, etc.)
+            is_dependency_error = any(
+                dep_path in line for dep_path in [
+                    "lib/", "node_modules/", ".next/", 
+                    "components/", "app/", "tsconfig.json"
+                ]
+            ) and "page.tsx" not in line and temp_file_name not in line
+            
+            if is_our_error:
+                filtered_errors.append(line)
+                in_relevant_error = True
+            elif is_dependency_error:
+                # Skip dependency errors
+                in_relevant_error = False
+                continue
+            elif in_relevant_error and (line.startswith(' ') or line.startswith('\t') or not line.strip()):
+                # Include continuation lines if we're in a relevant error block
+                filtered_errors.append(line)
+            elif not is_dependency_error and 'error TS' in line:
+                # Include other errors that aren't from dependencies (safety net)
+                filtered_errors.append(line)
+                in_relevant_error = True
+        
+        # If we filtered out all errors, check if ALL errors were from dependencies
+        if not filtered_errors:
+            # Check if all errors in original output were from dependencies
+            all_errors_are_dependencies = True
+            for line in error_lines:
+                if 'error TS' in line:
+                    is_dep = any(
+                        dep_path in line for dep_path in [
+                            "lib/", "node_modules/", ".next/", 
+                            "components/", "app/", "tsconfig.json"
+                        ]
+                    ) and "page.tsx" not in line and temp_file_name not in line
+                    if not is_dep:
+                        all_errors_are_dependencies = False
+                        break
+            
+            if all_errors_are_dependencies:
+                # All errors are from dependencies, treat as success
+                _log_aligned("info", "✅", "Syntax check", f"passed for {client_id} (all errors from dependencies)")
+                return (True, "")
+            else:
+                # Some non-dependency errors, use original output
+                filtered_output = error_output
+        else:
+            filtered_output = '\n'.join(filtered_errors)
+        
+        # Sanitize Windows paths from error messages to prevent exposing local file paths
+        filtered_output = sanitize_windows_paths(filtered_output)
+        
+        # If no errors remain after filtering, treat as success (dependencies have errors, not our code)
+        if not filtered_output.strip() or not any('error' in line.lower() for line in filtered_output.split('\n')):
+            _log_aligned("info", "✅", "Syntax check", f"passed for {client_id} (dependency errors ignored)")
+            return (True, "")
+        
+        # Format human-readable summary for terminal
+        human_readable = _format_syntax_errors_human_readable(filtered_output)
+        
+        # Log verbose output to debug level (saved in logs but not shown in terminal by default)
+        logging.debug(f"[Syntax check] Full error output for {client_id}:\n{filtered_output}")
+        
+        # Show clean summary in terminal
+        _log_aligned("warning", "⚠️", "Syntax check", f"failed for {client_id}: {human_readable}")
+        return (False, filtered_output)
+
+
 def check_syntax(code_string: str, client_id: str = "unknown") -> Tuple[bool, str]:
     """
     Validate TypeScript/TSX code syntax by running the TypeScript compiler.
 
-    Saves the code to a temporary file and runs `npx tsc --noEmit --skipLibCheck --jsx preserve`.
+    Uses the warm TypeScript worker (automation/ts_checker.py) when available;
+    otherwise saves the code to a temporary file and runs
+    `npx tsc --noEmit --skipLibCheck --jsx preserve`.
     This catches syntax errors, type errors, and import issues before the code is saved.
 
     Parameters:
@@ -925,6 +1581,13 @@ def check_syntax(code_string: str, client_id: str = "unknown") -> Tuple[bool, st
     if not code_string or not code_string.strip():
         return (False, "Empty code string provided")
 
+    # Fast path: the warm TypeScript worker (falls back to npx tsc when unavailable)
+    started = time.monotonic()
+    diagnostics = ts_checker.check(code_string)
+    if diagnostics is not None:
+        logging.debug(f"[Syntax check] warm checker answered in {time.monotonic() - started:.2f}s for {client_id}")
+        return _evaluate_tsc_output(1 if diagnostics else 0, "\n".join(diagnostics), "page.tsx", client_id)
+
     temp_file = None
     temp_path = None
     try:
@@ -938,32 +1601,7 @@ def check_syntax(code_string: str, client_id: str = "unknown") -> Tuple[bool, st
             temp_file.write(code_string)
             temp_path = temp_file.name
 
-        # Try to find npx - check common locations
-        npx_cmd = shutil.which("npx")
-        if not npx_cmd:
-            # Try to find npx in the same directory as node
-            node_path = shutil.which("node")
-            if node_path:
-                node_dir = os.path.dirname(node_path)
-                # On Windows, try both npx and npx.cmd
-                for npx_name in ["npx.cmd", "npx"]:
-                    npx_path = os.path.join(node_dir, npx_name)
-                    if os.path.exists(npx_path):
-                        npx_cmd = npx_path
-                        break
-                # Also try shutil.which for npx.cmd specifically
-                if not npx_cmd:
-                    npx_cmd = shutil.which("npx.cmd")
-        
-        if not npx_cmd:
-            # Last resort: try direct path if we know node location
-            node_path = shutil.which("node")
-            if node_path:
-                node_dir = os.path.dirname(node_path)
-                potential_npx = os.path.join(node_dir, "npx")
-                if os.path.exists(potential_npx):
-                    npx_cmd = potential_npx
-        
+        npx_cmd = _find_npx()
         if not npx_cmd:
             raise FileNotFoundError("npx/tsc not found. Ensure Node.js and TypeScript are installed. Run: npm install -g typescript")
         
@@ -1054,96 +1692,9 @@ def check_syntax(code_string: str, client_id: str = "unknown") -> Tuple[bool, st
             except:
                 pass
 
-        if result.returncode == 0:
-            _log_aligned("info", "✅", "Syntax check", f"passed for {client_id}")
-            return (True, "")
-        else:
-            # Combine stdout and stderr for full error output
-            error_output = result.stderr or result.stdout or "Unknown compilation error"
-            
-            # Filter to only show errors from the generated page.tsx file, ignore errors from dependencies
-            # This prevents false failures due to errors in lib/ or other project files
-            error_lines = error_output.split('\n')
-            filtered_errors = []
-            temp_file_name = os.path.basename(temp_path)
-            in_relevant_error = False
-            
-            for line in error_lines:
-                # Check if this line is an error from our generated file
-                # Errors are typically: "file.tsx(line,col): error TS####: message"
-                # After sanitization, temp file paths become "page.tsx"
-                is_our_error = (
-                    "page.tsx" in line or  # Sanitized path
-                    temp_file_name in line or  # Original temp file name
-                    (line.strip().startswith("(") and "error TS" in line)  # Error continuation
-                )
-                
-                # Check if it's an error from a dependency file (lib/, node_modules/, etc.)
-                is_dependency_error = any(
-                    dep_path in line for dep_path in [
-                        "lib/", "node_modules/", ".next/", 
-                        "components/", "app/", "tsconfig.json"
-                    ]
-                ) and "page.tsx" not in line and temp_file_name not in line
-                
-                if is_our_error:
-                    filtered_errors.append(line)
-                    in_relevant_error = True
-                elif is_dependency_error:
-                    # Skip dependency errors
-                    in_relevant_error = False
-                    continue
-                elif in_relevant_error and (line.startswith(' ') or line.startswith('\t') or not line.strip()):
-                    # Include continuation lines if we're in a relevant error block
-                    filtered_errors.append(line)
-                elif not is_dependency_error and 'error TS' in line:
-                    # Include other errors that aren't from dependencies (safety net)
-                    filtered_errors.append(line)
-                    in_relevant_error = True
-            
-            # If we filtered out all errors, check if ALL errors were from dependencies
-            if not filtered_errors:
-                # Check if all errors in original output were from dependencies
-                all_errors_are_dependencies = True
-                for line in error_lines:
-                    if 'error TS' in line:
-                        is_dep = any(
-                            dep_path in line for dep_path in [
-                                "lib/", "node_modules/", ".next/", 
-                                "components/", "app/", "tsconfig.json"
-                            ]
-                        ) and "page.tsx" not in line and temp_file_name not in line
-                        if not is_dep:
-                            all_errors_are_dependencies = False
-                            break
-                
-                if all_errors_are_dependencies:
-                    # All errors are from dependencies, treat as success
-                    _log_aligned("info", "✅", "Syntax check", f"passed for {client_id} (all errors from dependencies)")
-                    return (True, "")
-                else:
-                    # Some non-dependency errors, use original output
-                    filtered_output = error_output
-            else:
-                filtered_output = '\n'.join(filtered_errors)
-            
-            # Sanitize Windows paths from error messages to prevent exposing local file paths
-            filtered_output = sanitize_windows_paths(filtered_output)
-            
-            # If no errors remain after filtering, treat as success (dependencies have errors, not our code)
-            if not filtered_output.strip() or not any('error' in line.lower() for line in filtered_output.split('\n')):
-                _log_aligned("info", "✅", "Syntax check", f"passed for {client_id} (dependency errors ignored)")
-                return (True, "")
-            
-            # Format human-readable summary for terminal
-            human_readable = _format_syntax_errors_human_readable(filtered_output)
-            
-            # Log verbose output to debug level (saved in logs but not shown in terminal by default)
-            logging.debug(f"[Syntax check] Full error output for {client_id}:\n{filtered_output}")
-            
-            # Show clean summary in terminal
-            _log_aligned("warning", "⚠️", "Syntax check", f"failed for {client_id}: {human_readable}")
-            return (False, filtered_output)
+        return _evaluate_tsc_output(
+            result.returncode, result.stderr or result.stdout, os.path.basename(temp_path), client_id
+        )
 
     except subprocess.TimeoutExpired:
         error_msg = "TypeScript compilation timed out (30s limit)"
@@ -1181,8 +1732,12 @@ def run_visual_designer(client_path):
 
     This function now implements a self-correcting loop:
     1. Generate initial theme from intake
-    2. Run a11y critic to check color contrast
-    3. If a11y fails, feed feedback back to designer and retry (up to MAX_A11Y_RETRIES)
+    2. Check WCAG contrast of every rendered color pair locally (automation/contrast.py);
+       the LLM a11y critic runs only for subjective review (GF_A11Y_LLM_CRITIC) or
+       when the theme's colors cannot be parsed
+    3. If contrast fails, shift the failing colors' OKLCH lightness until they pass; if that
+       would move a color further than GF_A11Y_REPAIR_MAX_DELTA, feed the feedback back to
+       the designer and retry instead (up to MAX_A11Y_RETRIES)
 
     Parameters:
         client_path (str): Filesystem path of the client directory; must contain an intake.md file.
@@ -1191,6 +1746,11 @@ def run_visual_designer(client_path):
         dict: Theme data written to theme.json (colors, fonts, and styling values) if generation or fallback succeeded.
         None: If intake.md is missing or the designer failed to produce usable output.
     """
+    return _run_llm_steps(_visual_designer_steps(client_path))
+
+
+def _visual_designer_steps(client_path):
+    """Visual Designer step generator for run_visual_designer; yields LLM requests (see _run_llm_steps)."""
     client_id = os.path.basename(client_path)
     # Validate client ID to prevent path traversal
     validate_client_id_or_raise(client_id, "run_visual_designer")
@@ -1206,9 +1766,8 @@ def run_visual_designer(client_path):
         with open(intake_path, "r", encoding="utf-8") as f:
             intake = f.read()
 
-        # Load prompts
+        # Load prompts (the a11y critic prompt only if the critic is needed)
         designer_prompt = _load_prompt("design/palette_generator.md")
-        a11y_critic_prompt = _load_prompt("critique/a11y_critic.md")
 
         default_theme = {
             "primary": "#3B82F6",
@@ -1244,12 +1803,12 @@ Generate an improved theme.json with better color contrast."""
                 user_content = intake
 
             # Generate theme
-            msg = _anthropic_messages_create(
+            msg = yield dict(
                 model=MODEL_COPY,
                 client_id=client_id,
                 activity="pipeline_visual_designer",
                 max_tokens=500,
-                system=designer_prompt,
+                system=_system_blocks(designer_prompt),
                 messages=[{"role": "user", "content": user_content}],
             )
             _record_model_cost("anthropic", MODEL_COPY, "pipeline_visual_designer", client_id, msg, {"attempt": attempt})
@@ -1286,51 +1845,104 @@ Generate an improved theme.json with better color contrast."""
                     break
                 continue
 
-            # A11y Critic Review
+            # Contrast is arithmetic: check every rendered color pair locally (automation/contrast.py)
+            verdict = contrast.check_theme(theme_data)
+            if verdict["status"] == "FAIL":
+                previous_feedback = contrast.format_feedback(verdict)
+                _log_aligned(
+                    "warning", "⚠️", "A11y Check",
+                    f"theme failed contrast on attempt {attempt}: "
+                    + ", ".join(f"{c['name']} {c['ratio']}:1" for c in verdict["failures"])
+                )
+
+                # Nudge the failing colors' lightness first; only a repair that would visibly
+                # change the brand colors goes back to the designer (always accepted on the last attempt)
+                repaired, repair = contrast.repair_theme(theme_data, max_delta=A11Y_REPAIR_MAX_DELTA)
+                accept_repair = repair["status"] == "PASS" and (repair["within_delta"] or attempt >= MAX_A11Y_RETRIES)
+
+                # Record to memory for learning
+                memory.record_failure(
+                    category="a11y",
+                    issue=f"Theme failed accessibility check: {previous_feedback[:200]}",
+                    fix="Adjusted palette lightness locally" if accept_repair else "Regenerated theme with improved contrast",
+                    metadata={
+                        "client_id": client_id,
+                        "attempt": attempt,
+                        "contrast": verdict["failures"],
+                        "repair": repair["changes"],
+                    }
+                )
+
+                if not accept_repair:
+                    if repair["status"] == "PASS":
+                        _log_aligned(
+                            "info", "🎨", "A11y Repair",
+                            f"repair would shift the palette by ΔE {repair['max_delta']} "
+                            f"(limit {A11Y_REPAIR_MAX_DELTA}), regenerating"
+                        )
+                    if attempt >= MAX_A11Y_RETRIES:
+                        _log_aligned("error", "❌", "A11y Check", f"Max a11y retries ({MAX_A11Y_RETRIES}) reached. Using last generated theme.")
+                        break
+                    continue
+
+                _log_aligned(
+                    "info", "🔧", "A11y Repair",
+                    ", ".join(f"{c['role']} {c['from']} → {c['to']} (ΔE {c['delta']})" for c in repair["changes"])
+                )
+                theme_data = repaired
+                verdict = contrast.check_theme(theme_data)
+
+            if verdict["status"] == "PASS":
+                _log_aligned("info", "✅", "A11y Check", f"theme meets WCAG AA contrast on attempt {attempt}")
+                if not A11Y_LLM_CRITIC:
+                    break
+            else:
+                _log_aligned("warning", "⚠️", "A11y Check", "theme colors could not be parsed, asking the a11y critic")
+
+            # The LLM critic only reviews what arithmetic cannot: color blindness, similar hues
+            # (or the whole palette if its colors could not be parsed)
+            a11y_critic_prompt = _load_prompt("critique/a11y_critic.md")
             _log_aligned("info", "🔍", "A11y Critic", f"reviewing theme (attempt {attempt})...")
 
+            contrast_note = ""
+            if verdict["checks"]:
+                contrast_note = "\n\n## Computed Contrast (already verified, do not re-check)\n" + "\n".join(
+                    f"- {c['label']}: {c['foreground']} on {c['background']} = {c['ratio']}:1" for c in verdict["checks"]
+                )
             a11y_input = f"""## Theme to Review
 ```json
 {json.dumps(theme_data, indent=2)}
-```
+```{contrast_note}
 
 Please evaluate the accessibility of this color palette."""
 
-            a11y_msg = _anthropic_messages_create(
+            a11y_msg = yield dict(
                 model=MODEL_CRITIC,
                 client_id=client_id,
                 activity="pipeline_visual_designer_a11y",
                 max_tokens=500,
-                system=a11y_critic_prompt,
+                system=_system_blocks(a11y_critic_prompt),
                 messages=[{"role": "user", "content": a11y_input}],
             )
-            _record_model_cost("anthropic", MODEL_CRITIC, "pipeline_visual_designer_a11y", client_id, a11y_msg, {"attempt": attempt})
-
             a11y_response_text = _extract_response_text(a11y_msg)
+            a11y_verdict = critic_verdict.parse(a11y_response_text)
+            _record_model_cost(
+                "anthropic", MODEL_CRITIC, "pipeline_visual_designer_a11y", client_id, a11y_msg,
+                {"attempt": attempt, **critic_verdict.ledger_metadata(a11y_verdict)}
+            )
             if not a11y_response_text:
                 _log_aligned("warning", "⚠️", "A11y Critic", f"returned empty response on attempt {attempt}. Treating as PASS.")
                 break
 
-            # Extract text from markdown code blocks if present
-            a11y_response = a11y_response_text.strip()
-            code_block_match = re.search(r'```(?:text|markdown)?\s*([\s\S]*?)\s*```', a11y_response)
-            if code_block_match:
-                a11y_response = code_block_match.group(1).strip()
-            else:
-                a11y_response = a11y_response_text.strip()
-
-            # Normalize: uppercase for case-insensitive matching
-            a11y_response_upper = a11y_response.upper()
-
-            # Decision - PASS or FAIL (search anywhere in response, not just start)
-            if "FAIL" in a11y_response_upper:
-                _log_aligned("warning", "⚠️", "A11y Critic", f"rejected theme on attempt {attempt}")
-                previous_feedback = a11y_response
+            # Decision - only a major/critical "fail" verdict costs another generation
+            if a11y_verdict.retry:
+                _log_aligned("warning", "⚠️", "A11y Critic", f"rejected theme on attempt {attempt} ({a11y_verdict.severity})")
+                previous_feedback = a11y_verdict.feedback()
 
                 # Record to memory for learning
                 memory.record_failure(
                     category="a11y",
-                    issue=f"Theme failed accessibility check: {a11y_response[:200]}",
+                    issue=f"Theme failed accessibility check: {previous_feedback[:200]}",
                     fix="Regenerated theme with improved contrast",
                     metadata={"client_id": client_id, "attempt": attempt}
                 )
@@ -1338,12 +1950,12 @@ Please evaluate the accessibility of this color palette."""
                 if attempt >= MAX_A11Y_RETRIES:
                     _log_aligned("error", "❌", "A11y Critic", f"Max a11y retries ({MAX_A11Y_RETRIES}) reached. Using last generated theme.")
                     break
-            elif "PASS" in a11y_response_upper:
+            elif a11y_verdict.status in ("pass", "fail"):
                 _log_aligned("info", "✅", "A11y Critic", f"approved theme on attempt {attempt}")
                 break
             else:
                 # Log the actual response for debugging
-                _log_aligned("warning", "⚠️", "A11y Critic", f"response unclear (no PASS/FAIL found). Response: {a11y_response[:200]}... Proceeding with theme.")
+                _log_aligned("warning", "⚠️", "A11y Critic", f"response unclear (no verdict found). Response: {a11y_verdict.raw[:200]}... Proceeding with theme.")
                 break
 
         # Ensure we have a valid theme
@@ -1359,209 +1971,320 @@ Please evaluate the accessibility of this color palette."""
         return theme_data
 
 
-def run_architect(client_path):
+def _best_of_n(niche_prompt_file=None):
     """
-    Orchestrates the Architect stage: routes the client to a niche, generates a strategy brief with retrying critic validation, and advances the pipeline.
-    
-    Spawns the Visual Designer in parallel to produce a theme.json, runs a Router to classify the client's niche, invokes the Strategist to generate a project brief using the niche-specific prompt, and runs a Critic loop that may request regenerated briefs up to MAX_CRITIC_RETRIES. Saves the immutable original brief to brief.orig.md and a working copy to brief.md. Does not rename intake.md; after architect work completes it invokes the Copywriter and waits briefly for the Visual Designer to finish (logs and proceeds if the designer fails or times out).
-    
-    Parameters:
-        client_path (str): Filesystem path to the client's directory (must contain intake.md); the client ID is derived from the directory basename.
+    Candidates to generate per critic round (GF_CRITIC_BEST_OF_N).
+
+    Accepts a single count ("2") or counts per niche, keyed by strategy prompt
+    name ("saas:3,local_service:1,default:2"); unparseable values mean 1.
     """
-    client_id = os.path.basename(client_path)
-    # Validate client ID to prevent path traversal
-    validate_client_id_or_raise(client_id, "run_architect")
-    
-    # Check for existing brief.md - skip generation if already exists, but continue pipeline
-    brief_path = os.path.join(client_path, "brief.md")
-    brief_exists = os.path.exists(brief_path)
-    if brief_exists:
-        _log_aligned("info", "⏭️", "Architect", f"Brief already exists for {client_id}, skipping architect generation")
-        # Still need to continue pipeline to copywriter and builder stages
-        run_copywriter(client_path)
-        return
-    
-    _log_aligned("info", "🏗️", "Architect", f"analyzing {client_id}...")
+    niche = os.path.splitext(os.path.basename(niche_prompt_file or ""))[0]
+    counts = {}
+    for part in CRITIC_BEST_OF_N.split(","):
+        key, _, value = part.strip().rpartition(":")
+        try:
+            counts[key.strip() or "default"] = int(value)
+        except ValueError:
+            continue
+    count = counts.get(niche, counts.get("default", 1))
+    return max(1, min(count, MAX_BEST_OF_N))
 
-    # Load intake ONCE (before time tracking to avoid including file I/O in span)
-    with open(os.path.join(client_path, "intake.md"), "r", encoding="utf-8") as f:
-        intake = f.read()
 
-    # Spawn Visual Designer in parallel using ThreadPoolExecutor
-    # max_workers=2 allows true concurrency: Visual Designer runs while Architect works
-    # The Visual Designer only needs intake.md which is already loaded, so no file conflicts
-    with ThreadPoolExecutor(max_workers=2) as executor:
-        visual_designer_future = executor.submit(run_visual_designer, client_path)
+def _candidate_rank(candidate):
+    """Sort key for critic candidates: accepted first, then by severity and issue count."""
+    verdict = candidate["verdict"]
+    if verdict is None:
+        return (False, 0, 0)
+    return (verdict.retry, critic_verdict.SEVERITIES.index(verdict.severity), len(verdict.issues))
 
-        # NOTE: Visual Designer timing is intentionally excluded from pipeline_architect span
-        # since it runs concurrently. Its own timing is tracked via pipeline_visual_designer span.
-        with time_tracker.track_span("pipeline_architect", client_id, {"stage": "architect"}):
-            # Step 1: Router - Classify the client niche
-            niche_prompt_file = select_niche_persona(client_id, intake)
-            strategy_prompt = _load_prompt(f"strategy/{niche_prompt_file}")
-
-            # Step 2: Load the Critic prompt
-            critic_prompt = _load_prompt("critique/strategy_critic.md")
-
-            # Step 3: Critic Loop with max retries
-            brief_content = None
-            previous_feedback = None
-            attempt = 0
-
-            while attempt < MAX_CRITIC_RETRIES:
-                attempt += 1
-                _log_aligned("info", "📝", "Strategist", f"generating brief (attempt {attempt}/{MAX_CRITIC_RETRIES})...")
-
-                # Build messages for the strategist
-                if previous_feedback:
-                    # Include feedback from previous failed attempt
-                    user_content = f"""## Client Intake
-{intake}
 
-## Previous Attempt Feedback
-The previous brief was rejected by our QA system. Please address these issues:
-{previous_feedback}
+def _is_clean_pass(candidate):
+    """A candidate the critic passed without issues; later candidates cannot beat it."""
+    return bool(
+        candidate and candidate["content"] and candidate["verdict"] is not None
+        and candidate["verdict"].status == "pass" and not candidate["verdict"].issues
+    )
 
-Generate an improved Project Brief that addresses the feedback above."""
-                else:
-                    user_content = intake
 
-                # Generate brief
-                msg = _anthropic_messages_create(
-                    model=MODEL_STRATEGY,
-                    client_id=client_id,
-                    activity="pipeline_architect",
-                    max_tokens=2000,
-                    system=strategy_prompt,
-                    messages=[{"role": "user", "content": user_content}],
-                )
-                _record_model_cost(
-                    "anthropic", MODEL_STRATEGY, "pipeline_architect",
-                    client_id, msg, {"attempt": attempt, "niche": niche_prompt_file}
-                )
+def _critic_round(candidate_steps, count):
+    """
+    Step helper: generate and critique `count` candidates.
+
+    With more than one, the candidates run concurrently and the round stops
+    at the first clean pass (see _ParallelSteps). `candidate_steps(index)`
+    returns a step generator producing {"content", "verdict"}; index is None
+    for a single candidate.
+
+    Returns:
+        list: Candidates with content, best first (see _candidate_rank)
+    """
+    if count > 1:
+        results = yield _ParallelSteps([candidate_steps(index) for index in range(count)], done=_is_clean_pass)
+    else:
+        results = [(yield from candidate_steps(None))]
+    return sorted((c for c in results if c and c["content"]), key=_candidate_rank)
+
+
+def _record_best_of_n(stage, client_id, niche_prompt_file, count, rounds, started, spent):
+    """Log and time-log the latency/cost of a best-of-N critic loop, so N can be tuned per niche."""
+    elapsed = time.monotonic() - started
+    cost = round(sum(spent), 4)
+    _log_aligned(
+        "info", "📊", "Best-of-N",
+        f"{stage} for {client_id}: {count} candidates x {rounds} round(s), {elapsed:.1f}s, ${cost} ({len(spent)} calls)"
+    )
+    try:
+        time_tracker.log_time_entry("critic_best_of_n", client_id, elapsed, 0.0, {
+            "stage": stage,
+            "niche": os.path.splitext(os.path.basename(niche_prompt_file or ""))[0] or None,
+            "best_of": count,
+            "rounds": rounds,
+            "calls": len(spent),
+            "cost_usd": cost,
+        })
+    except Exception as e:
+        _log_aligned("warning", "⚠️", "Best-of-N", f"failed to record trade-off for {client_id}: {e}")
+
+
+def _spend(spent, entry):
+    """Collect a ledger entry's cost for _record_best_of_n."""
+    if isinstance(entry, dict):
+        spent.append(float(entry.get("cost_usd") or 0.0))
+
+
+def _section_plan(document, verdict):
+    """
+    Sections of a rejected document to rewrite instead of regenerating it.
+
+    Every issue of a JSON verdict must name a target that resolves to a
+    heading of the document (automation/sections.py), and together they must
+    cover at most SECTION_REGEN_MAX_SHARE of it.
+
+    Returns:
+        list: Sections to rewrite, or None for a full regeneration
+    """
+    if not SECTION_REGEN or not document or verdict.format != "json" or not verdict.issues:
+        return None
+    if any(not issue.target for issue in verdict.issues):
+        return None
+    plan = sections.resolve(document, verdict.targets)
+    if not plan or sections.share(document, plan) > SECTION_REGEN_MAX_SHARE:
+        return None
+    return plan
+
 
-                brief_content = _extract_response_text(msg)
-                if not brief_content:
-                    _log_aligned("error", "❌", "Strategist", f"returned empty response on attempt {attempt}")
-                    if attempt >= MAX_CRITIC_RETRIES:
-                        raise RuntimeError(f"Strategist failed to generate brief after {MAX_CRITIC_RETRIES} attempts")
-                    continue  # Retry without critic feedback
+def _section_rewrite_content(context, document, plan, feedback, name):
+    """User message asking for only the planned sections of `document` (a "brief" or "content")."""
+    headings = "\n".join(f"- {section.title}" for section in plan)
+    return f"""{context}
 
-                # Step 4: Critic reviews the brief
-                _log_aligned("info", "🔍", "Critic", f"reviewing brief (attempt {attempt})...")
+## Current {name.title()}
+{document}
 
-                critic_input = f"""## Original Client Intake
+## Sections to Rewrite
+{headings}
+
+## Feedback
+The previous {name} was rejected by our QA system because of these sections:
+{feedback}
+
+Rewrite ONLY the sections listed above to address the feedback. Return each of them starting with its heading line, and nothing else: the rest of the {name} is kept as is."""
+
+
+def _write_brief(client_path, intake, niche_prompt_file):
+    """
+    Run the Strategist with its Critic loop and save brief.orig.md / brief.md.
+
+    The Critic may reject a brief up to MAX_CRITIC_RETRIES times; its feedback
+    is fed back to the Strategist on the next attempt.
+
+    Returns:
+        str: The saved brief content
+
+    Raises:
+        RuntimeError: If no brief could be generated or brief.md could not be written.
+    """
+    return _run_llm_steps(_write_brief_steps(client_path, intake, niche_prompt_file))
+
+
+def _write_brief_steps(client_path, intake, niche_prompt_file):
+    """Strategist + Critic step generator for _write_brief; yields LLM requests (see _run_llm_steps)."""
+    client_id = os.path.basename(client_path)
+    strategy_prompt = _load_prompt(f"strategy/{niche_prompt_file}")
+
+    # Load the Critic prompt
+    critic_prompt = _load_prompt("critique/strategy_critic.md")
+
+    count = _best_of_n(niche_prompt_file)
+    started = time.monotonic()
+    spent = []
+
+    def candidate_steps(user_content, attempt, index, base=None, plan=None):
+        """One Strategist draft (or rewrite of the planned sections of `base`) and its Critic review."""
+        metadata = {"attempt": attempt, "niche": niche_prompt_file}
+        if index is not None:
+            metadata["candidate"] = index
+        if plan:
+            metadata["sections"] = len(plan)
+
+        # Generate brief
+        msg = yield dict(
+            model=MODEL_STRATEGY,
+            client_id=client_id,
+            activity="pipeline_architect",
+            max_tokens=min(2000, SECTION_MAX_TOKENS * len(plan)) if plan else 2000,
+            system=_system_blocks(strategy_prompt),
+            messages=[{"role": "user", "content": user_content}],
+        )
+        _spend(spent, _record_model_cost("anthropic", MODEL_STRATEGY, "pipeline_architect", client_id, msg, metadata))
+
+        brief = _extract_response_text(msg)
+        if brief and plan:
+            brief = sections.splice(base, plan, brief)
+            if brief is None:
+                _log_aligned("warning", "⚠️", "Strategist", "rewritten sections not found in the response")
+        if not brief:
+            return {"content": None, "verdict": None}
+
+        # Critic reviews the brief
+        _log_aligned("info", "🔍", "Critic", f"reviewing brief (attempt {attempt})...")
+
+        critic_input = f"""## Original Client Intake
 {intake}
 
 ## Generated Project Brief
-{brief_content}
+{brief}
 
 Please evaluate this brief against the original intake."""
 
-                critic_msg = _anthropic_messages_create(
-                    model=MODEL_CRITIC,
-                    client_id=client_id,
-                    activity="pipeline_architect_critic",
-                    max_tokens=500,
-                    system=critic_prompt,
-                    messages=[{"role": "user", "content": critic_input}],
-                )
-                _record_model_cost(
-                    "anthropic", MODEL_CRITIC, "pipeline_architect_critic",
-                    client_id, critic_msg, {"attempt": attempt}
-                )
+        critic_msg = yield dict(
+            model=MODEL_CRITIC,
+            client_id=client_id,
+            activity="pipeline_architect_critic",
+            max_tokens=500,
+            system=_system_blocks(critic_prompt),
+            messages=[{"role": "user", "content": critic_input}],
+        )
+        critic_response_text = _extract_response_text(critic_msg)
+        verdict = critic_verdict.parse(critic_response_text)
+        _spend(spent, _record_model_cost(
+            "anthropic", MODEL_CRITIC, "pipeline_architect_critic",
+            client_id, critic_msg, {**metadata, **critic_verdict.ledger_metadata(verdict)}
+        ))
+        if not critic_response_text:
+            _log_aligned("warning", "⚠️", "Critic", f"returned empty response on attempt {attempt}. Treating as PASS.")
+        return {"content": brief, "verdict": verdict}
+
+    # Critic Loop with max retries
+    brief_content = None
+    previous_feedback = None
+    plan = None  # Sections of brief_content to rewrite instead of regenerating it
+    attempt = 0
+
+    while attempt < MAX_CRITIC_RETRIES:
+        attempt += 1
+        candidates_note = f", {count} candidates" if count > 1 else ""
+        _log_aligned("info", "📝", "Strategist", f"generating brief (attempt {attempt}/{MAX_CRITIC_RETRIES}{candidates_note})...")
+
+        # Build messages for the strategist
+        if plan:
+            _log_aligned("info", "✂️", "Strategist", "rewriting " + ", ".join(section.title for section in plan))
+            user_content = _section_rewrite_content(
+                f"## Client Intake\n{intake}", brief_content, plan, previous_feedback, "brief"
+            )
+        elif previous_feedback:
+            # Include feedback from previous failed attempt
+            user_content = f"""## Client Intake
+{intake}
 
-                critic_response_text = _extract_response_text(critic_msg)
-                if not critic_response_text:
-                    _log_aligned("warning", "⚠️", "Critic", f"returned empty response on attempt {attempt}. Treating as PASS.")
-                    break
+## Previous Attempt Feedback
+The previous brief was rejected by our QA system. Please address these issues:
+{previous_feedback}
 
-                # Extract text from markdown code blocks if present
-                critic_response = critic_response_text.strip()
-                code_block_match = re.search(r'```(?:text|markdown)?\s*([\s\S]*?)\s*```', critic_response)
-                if code_block_match:
-                    clean_response = code_block_match.group(1).strip()
-                else:
-                    # Handle markdown headers (e.g. "# PASS" or "**FAIL**")
-                    clean_response = critic_response.lstrip("#*").strip()
-
-                # Normalize: uppercase for case-insensitive matching
-                clean_response_upper = clean_response.upper()
-
-                # Step 5: Decision - PASS or FAIL (search anywhere in response, not just start)
-                # IMPORTANT: Check FAIL first to avoid false positives when "PASS" appears in failure text
-                if "FAIL" in clean_response_upper:
-                    _log_aligned("warning", "⚠️", "Critic", f"rejected brief on attempt {attempt}")
-                    previous_feedback = clean_response
-                    if attempt >= MAX_CRITIC_RETRIES:
-                        _log_aligned("error", "❌", "Critic", f"Max critic retries ({MAX_CRITIC_RETRIES}) reached. Using last generated brief.")
-                        break  # Explicit break to exit loop after max retries
-                elif "PASS" in clean_response_upper:
-                    _log_aligned("info", "✅", "Critic", f"approved brief on attempt {attempt}")
-                    break
-                else:
-                    # Ambiguous response - log the actual response for debugging
-                    _log_aligned("warning", "⚠️", "Critic", f"response unclear (no PASS/FAIL found). Response: {clean_response[:200]}... Proceeding with brief.")
-                    break
+Generate an improved Project Brief that addresses the feedback above."""
+        else:
+            user_content = intake
+
+        candidates = yield from _critic_round(
+            lambda index: candidate_steps(user_content, attempt, index, brief_content, plan), count
+        )
+        if not candidates and plan:
+            # The section rewrite could not be spliced; keep the rejected brief and regenerate it in full
+            plan = None
+            _log_aligned("warning", "⚠️", "Strategist", f"section rewrite failed on attempt {attempt}, keeping the previous brief")
+            if attempt >= MAX_CRITIC_RETRIES:
+                _log_aligned("error", "❌", "Critic", f"Max critic retries ({MAX_CRITIC_RETRIES}) reached. Using last generated brief.")
+                break
+            continue
+        if not candidates:
+            _log_aligned("error", "❌", "Strategist", f"returned empty response on attempt {attempt}")
+            if attempt >= MAX_CRITIC_RETRIES:
+                raise RuntimeError(f"Strategist failed to generate brief after {MAX_CRITIC_RETRIES} attempts")
+            continue  # Retry without critic feedback
+
+        brief_content, verdict = candidates[0]["content"], candidates[0]["verdict"]
+
+        # Decision - only a major/critical "fail" verdict costs another generation
+        if verdict.retry:
+            _log_aligned("warning", "⚠️", "Critic", f"rejected brief on attempt {attempt} ({verdict.severity})")
+            previous_feedback = verdict.feedback()
+            plan = _section_plan(brief_content, verdict)
+            if attempt >= MAX_CRITIC_RETRIES:
+                _log_aligned("error", "❌", "Critic", f"Max critic retries ({MAX_CRITIC_RETRIES}) reached. Using last generated brief.")
+                break  # Explicit break to exit loop after max retries
+        elif verdict.status in ("pass", "fail"):
+            note = f" with {len(verdict.issues)} minor issue(s)" if verdict.issues else ""
+            _log_aligned("info", "✅", "Critic", f"approved brief on attempt {attempt}{note}")
+            break
+        else:
+            if verdict.raw:
+                # Ambiguous response - log the actual response for debugging
+                _log_aligned("warning", "⚠️", "Critic", f"response unclear (no verdict found). Response: {verdict.raw[:200]}... Proceeding with brief.")
+            break
 
-            # Step 6: Validate and save the brief
-            if not brief_content:
-                raise RuntimeError(f"Failed to generate brief for {client_id} after {MAX_CRITIC_RETRIES} attempts")
+    if count > 1:
+        _record_best_of_n("strategist", client_id, niche_prompt_file, count, attempt, started, spent)
 
-            # Save immutable original for future optimization analysis
-            brief_orig_path = os.path.join(client_path, "brief.orig.md")
-            if atomic_write(brief_orig_path, brief_content):
-                _log_aligned("info", "💾", "Architect", "Saved original AI output to brief.orig.md")
-            else:
-                _log_aligned("error", "❌", "Architect", f"Failed to write {brief_orig_path}")
+    # Validate and save the brief
+    if not brief_content:
+        raise RuntimeError(f"Failed to generate brief for {client_id} after {MAX_CRITIC_RETRIES} attempts")
 
-            # Save the working copy
-            brief_path = os.path.join(client_path, "brief.md")
-            if atomic_write(brief_path, brief_content):
-                _log_aligned("info", "💾", "Architect", "Saved brief.md")
-            else:
-                _log_aligned("error", "❌", "Architect", f"Failed to write {brief_path}")
-                raise RuntimeError(f"Failed to write brief.md for {client_id}")
+    # Save immutable original for future optimization analysis
+    brief_orig_path = os.path.join(client_path, "brief.orig.md")
+    if atomic_write(brief_orig_path, brief_content):
+        _log_aligned("info", "💾", "Architect", "Saved original AI output to brief.orig.md")
+    else:
+        _log_aligned("error", "❌", "Architect", f"Failed to write {brief_orig_path}")
 
-        # Wait for visual designer to complete
-        # NOTE: The ThreadPoolExecutor context manager calls shutdown(wait=True) on exit,
-        # so we always wait for completion regardless of timeout. The timeout here only
-        # controls when we log a warning - it doesn't actually limit blocking time.
-        try:
-            visual_designer_future.result(timeout=60)
-        except (TimeoutError, FuturesTimeoutError, CancelledError) as e:
-            _log_aligned("warning", "⚠️", "Visual Designer", f"timed out or was cancelled: {type(e).__name__}")
+    # Save the working copy
+    brief_path = os.path.join(client_path, "brief.md")
+    if atomic_write(brief_path, brief_content):
+        _log_aligned("info", "💾", "Architect", "Saved brief.md")
+    else:
+        _log_aligned("error", "❌", "Architect", f"Failed to write {brief_path}")
+        raise RuntimeError(f"Failed to write brief.md for {client_id}")
 
-    # NOTE: We do NOT rename intake.md yet. We wait until the entire pipeline finishes.
-    # This prevents the "Limbo" state if the script crashes later.
-    run_copywriter(client_path)
+    return brief_content
 
-def run_copywriter(client_path):
+
+def _write_content(client_path):
     """
-    Generate website copy from the client's brief, iteratively validate it with a Copy Critic, and save results.
-    
-    Runs a critic loop (up to MAX_CRITIC_RETRIES) that:
-    - Generates website content (hero, features, testimonials) from the brief.
-    - Sends the generated content to a copy critic for review; if the critic returns `FAIL` the feedback is fed back and the model retries.
-    - Stops early on a `PASS` or an unclear critic response.
-    
-    Saves the immutable original AI output to `content.orig.md` and the working copy to `content.md`, then invokes the builder stage.
-    
+    Run the Copywriter with its Copy Critic loop and save content.orig.md / content.md.
+
+    Returns:
+        str: The saved content
+
     Raises:
-        RuntimeError: If the copywriter model returns no content for every attempt and generation ultimately fails.
+        RuntimeError: If no content could be generated or content.md could not be written.
     """
+    return _run_llm_steps(_write_content_steps(client_path))
+
+
+def _write_content_steps(client_path):
+    """Copywriter + Copy Critic step generator for _write_content; yields LLM requests (see _run_llm_steps)."""
     client_id = os.path.basename(client_path)
-    
-    # Check for existing content.md - skip generation if already exists, but continue pipeline
-    content_path = os.path.join(client_path, "content.md")
-    content_exists = os.path.exists(content_path)
-    if content_exists:
-        _log_aligned("info", "⏭️", "Copywriter", f"Content already exists for {client_id}, skipping copywriter generation")
-        # Still need to continue pipeline to builder stage
-        run_builder(client_path)
-        return
-    
     _log_aligned("info", "✍️", "Copywriter", f"writing for {client_id}...")
+    job_queue.set_stage(client_id, "copywriter")
 
     with time_tracker.track_span("pipeline_copywriter", client_id, {"stage": "copywriter"}):
         # Load brief and intake
@@ -1589,55 +2312,40 @@ def run_copywriter(client_path):
         else:
             critic_prompt = _load_prompt("critique/copy_critic.md")
 
-        copywriter_prompt = "You are a Conversion Copywriter. Write website content (Hero, Features, Testimonials) based on this brief. Output Markdown."
-
-        # Critic Loop with max retries
-        content = None
-        previous_feedback = None
-        attempt = 0
-
-        while attempt < MAX_CRITIC_RETRIES:
-            attempt += 1
-            _log_aligned("info", "📝", "Copywriter", f"generating content (attempt {attempt}/{MAX_CRITIC_RETRIES})...")
-
-            # Build messages for the copywriter
-            if previous_feedback:
-                user_content = f"""## Project Brief
-{brief}
+        copywriter_prompt = "You are a Conversion Copywriter. Write website content (Hero, Features, Testimonials) based on this brief. Output Markdown with one `## ` heading per page section."
 
-## Previous Attempt Feedback
-The previous content was rejected by our Copy Critic. Please address these issues:
-{previous_feedback}
+        # Without a critic there is nothing to choose between candidates
+        niche_choice = niche_classifier.load_choice(client_path) or {}
+        count = 1 if skip_critic else _best_of_n(niche_choice.get("prompt"))
+        started = time.monotonic()
+        spent = []
 
-Generate improved website content that addresses the feedback above."""
-            else:
-                user_content = brief
+        def candidate_steps(user_content, attempt, index, base=None, plan=None):
+            """One Copywriter draft (or rewrite of the planned sections of `base`) and its Copy Critic review (none without an intake)."""
+            metadata = {"attempt": attempt}
+            if index is not None:
+                metadata["candidate"] = index
+            if plan:
+                metadata["sections"] = len(plan)
 
             # Generate content
-            msg = _anthropic_messages_create(
+            msg = yield dict(
                 model=MODEL_COPY,
                 client_id=client_id,
                 activity="pipeline_copywriter",
-                max_tokens=4000,
-                system=copywriter_prompt,
+                max_tokens=min(4000, SECTION_MAX_TOKENS * len(plan)) if plan else 4000,
+                system=_system_blocks(copywriter_prompt),
                 messages=[{"role": "user", "content": user_content}],
             )
-            _record_model_cost(
-                "anthropic", MODEL_COPY, "pipeline_copywriter",
-                client_id, msg, {"attempt": attempt}
-            )
+            _spend(spent, _record_model_cost("anthropic", MODEL_COPY, "pipeline_copywriter", client_id, msg, metadata))
 
             content = _extract_response_text(msg)
-            if not content:
-                _log_aligned("error", "❌", "Copywriter", f"returned empty response on attempt {attempt}")
-                if attempt >= MAX_CRITIC_RETRIES:
-                    raise RuntimeError(f"Copywriter failed to generate content after {MAX_CRITIC_RETRIES} attempts")
-                continue
-
-            # Skip critic review if intake is not available
-            if skip_critic:
-                _log_aligned("info", "⏭️", "Copy Critic", "Skipping Copy Critic review - no intake available")
-                break
+            if content and plan:
+                content = sections.splice(base, plan, content)
+                if content is None:
+                    _log_aligned("warning", "⚠️", "Copywriter", "rewritten sections not found in the response")
+            if not content or skip_critic:
+                return {"content": content, "verdict": None}
 
             # Copy Critic reviews the content
             _log_aligned("info", "🔍", "Copy Critic", f"reviewing content (attempt {attempt})...")
@@ -1653,52 +2361,98 @@ Generate improved website content that addresses the feedback above."""
 
 Please evaluate this content against the intake and brief."""
 
-            critic_msg = _anthropic_messages_create(
+            critic_msg = yield dict(
                 model=MODEL_CRITIC,
                 client_id=client_id,
                 activity="pipeline_copywriter_critic",
                 max_tokens=500,
-                system=critic_prompt,
+                system=_system_blocks(critic_prompt),
                 messages=[{"role": "user", "content": critic_input}],
             )
-            _record_model_cost(
-                "anthropic", MODEL_CRITIC, "pipeline_copywriter_critic",
-                client_id, critic_msg, {"attempt": attempt}
-            )
-
             critic_response_text = _extract_response_text(critic_msg)
+            verdict = critic_verdict.parse(critic_response_text)
+            _spend(spent, _record_model_cost(
+                "anthropic", MODEL_CRITIC, "pipeline_copywriter_critic",
+                client_id, critic_msg, {**metadata, **critic_verdict.ledger_metadata(verdict)}
+            ))
             if not critic_response_text:
                 _log_aligned("warning", "⚠️", "Copy Critic", f"returned empty response on attempt {attempt}. Treating as PASS.")
-                break
+            return {"content": content, "verdict": verdict}
 
-            # Extract text from markdown code blocks if present
-            critic_response = critic_response_text.strip()
-            code_block_match = re.search(r'```(?:text|markdown)?\s*([\s\S]*?)\s*```', critic_response)
-            if code_block_match:
-                clean_response = code_block_match.group(1).strip()
-            else:
-                # Handle markdown headers (e.g. "# PASS" or "**FAIL**")
-                clean_response = critic_response.lstrip("#*").strip()
+        # Critic Loop with max retries
+        content = None
+        previous_feedback = None
+        plan = None  # Sections of content to rewrite instead of regenerating it
+        attempt = 0
+
+        while attempt < MAX_CRITIC_RETRIES:
+            attempt += 1
+            candidates_note = f", {count} candidates" if count > 1 else ""
+            _log_aligned("info", "📝", "Copywriter", f"generating content (attempt {attempt}/{MAX_CRITIC_RETRIES}{candidates_note})...")
+
+            # Build messages for the copywriter
+            if plan:
+                _log_aligned("info", "✂️", "Copywriter", "rewriting " + ", ".join(section.title for section in plan))
+                user_content = _section_rewrite_content(
+                    f"## Project Brief\n{brief}", content, plan, previous_feedback, "content"
+                )
+            elif previous_feedback:
+                user_content = f"""## Project Brief
+{brief}
+
+## Previous Attempt Feedback
+The previous content was rejected by our Copy Critic. Please address these issues:
+{previous_feedback}
+
+Generate improved website content that addresses the feedback above."""
+            else:
+                user_content = brief
+
+            candidates = yield from _critic_round(
+                lambda index: candidate_steps(user_content, attempt, index, content, plan), count
+            )
+            if not candidates and plan:
+                # The section rewrite could not be spliced; keep the rejected content and regenerate it in full
+                plan = None
+                _log_aligned("warning", "⚠️", "Copywriter", f"section rewrite failed on attempt {attempt}, keeping the previous content")
+                if attempt >= MAX_CRITIC_RETRIES:
+                    _log_aligned("error", "❌", "Copy Critic", f"Max critic retries ({MAX_CRITIC_RETRIES}) reached. Using last generated content.")
+                    break
+                continue
+            if not candidates:
+                _log_aligned("error", "❌", "Copywriter", f"returned empty response on attempt {attempt}")
+                if attempt >= MAX_CRITIC_RETRIES:
+                    raise RuntimeError(f"Copywriter failed to generate content after {MAX_CRITIC_RETRIES} attempts")
+                continue
+
+            content, verdict = candidates[0]["content"], candidates[0]["verdict"]
 
-            # Normalize: uppercase for case-insensitive matching
-            clean_response_upper = clean_response.upper()
+            # Skip critic review if intake is not available
+            if verdict is None:
+                _log_aligned("info", "⏭️", "Copy Critic", "Skipping Copy Critic review - no intake available")
+                break
 
-            # Decision - PASS or FAIL (search anywhere in response, not just start)
-            # IMPORTANT: Check FAIL first to avoid false positives when "PASS" appears in failure text
-            if "FAIL" in clean_response_upper:
-                _log_aligned("warning", "⚠️", "Copy Critic", f"rejected content on attempt {attempt}")
-                previous_feedback = clean_response
+            # Decision - only a major/critical "fail" verdict costs another generation
+            if verdict.retry:
+                _log_aligned("warning", "⚠️", "Copy Critic", f"rejected content on attempt {attempt} ({verdict.severity})")
+                previous_feedback = verdict.feedback()
+                plan = _section_plan(content, verdict)
                 if attempt >= MAX_CRITIC_RETRIES:
                     _log_aligned("error", "❌", "Copy Critic", f"Max critic retries ({MAX_CRITIC_RETRIES}) reached. Using last generated content.")
                     break
-            elif "PASS" in clean_response_upper:
-                _log_aligned("info", "✅", "Copy Critic", f"approved content on attempt {attempt}")
+            elif verdict.status in ("pass", "fail"):
+                note = f" with {len(verdict.issues)} minor issue(s)" if verdict.issues else ""
+                _log_aligned("info", "✅", "Copy Critic", f"approved content on attempt {attempt}{note}")
                 break
             else:
-                # Ambiguous response - log the actual response for debugging
-                _log_aligned("warning", "⚠️", "Copy Critic", f"response unclear (no PASS/FAIL found). Response: {clean_response[:200]}... Proceeding with content.")
+                if verdict.raw:
+                    # Ambiguous response - log the actual response for debugging
+                    _log_aligned("warning", "⚠️", "Copy Critic", f"response unclear (no verdict found). Response: {verdict.raw[:200]}... Proceeding with content.")
                 break
 
+        if count > 1:
+            _record_best_of_n("copywriter", client_id, niche_choice.get("prompt"), count, attempt, started, spent)
+
         # Validate content before saving
         if not content:
             raise RuntimeError(f"Failed to generate content for {client_id} after {MAX_CRITIC_RETRIES} attempts")
@@ -1718,9 +2472,10 @@ Please evaluate this content against the intake and brief."""
             _log_aligned("error", "❌", "Copywriter", f"Failed to write {content_path}")
             raise RuntimeError(f"Failed to write content.md for {client_id}")
 
-    run_builder(client_path)
+    return content
+
 
-def run_builder(client_path):
+def _build_page(client_path):
     """
     Generate a Next.js page with self-correcting Generate->Validate->Repair loop.
 
@@ -1734,18 +2489,27 @@ def run_builder(client_path):
     Parameters:
         client_path (str): Path to the client directory (contains brief.md, content.md,
                           and optionally theme.json). Client ID is derived from basename.
+
+    Returns:
+        tuple: (qa_status, qa_report) for finalize_client, or None if the page
+               already existed and the stage was skipped.
     """
     client_id = os.path.basename(client_path)
     # Validate client ID to prevent path traversal
-    validate_client_id_or_raise(client_id, "run_builder")
+    validate_client_id_or_raise(client_id, "_build_page")
     
+    # Resume from the last checkpointed attempt if a previous run was interrupted
+    resume_attempts, resume_feedback = job_queue.resume_point(client_id, "builder")
+
     # Check for existing page.tsx - skip if already generated
+    # (an interrupted run leaves page.tsx behind mid-QA, so a checkpoint overrides this)
     target_file = f"./app/clients/{client_id}/page.tsx"
-    if os.path.exists(target_file):
+    if os.path.exists(target_file) and not resume_attempts:
         _log_aligned("info", "⏭️", "Builder", f"Page already exists for {client_id}, skipping builder stage")
-        return
+        return None
     
     _log_aligned("info", "🧱", "Builder", f"assembling {client_id} (Self-Correcting Mode)...")
+    job_queue.set_stage(client_id, "builder")
 
     with time_tracker.track_span("pipeline_builder", client_id, {"stage": "builder"}):
         # Load inputs
@@ -1789,11 +2553,10 @@ Apply these colors, fonts, and styles using Tailwind CSS classes:
         memory_prompt = memory.get_memory_prompt()
         golden_reference = memory.get_golden_reference_prompt()
 
-        # Build base system prompt
-        base_prompt = f"""You are a React Engineer building production-quality Next.js landing pages.
-
-{memory_prompt}
-{golden_reference}
+        # Build base system prompt, most stable sections first so they can be
+        # prompt-cached: the instructions and manifest are identical for every
+        # client; learned rules, the golden sample and theme for every retry.
+        static_prompt = f"""You are a React Engineer building production-quality Next.js landing pages.
 
 Your goal: Create the `page.tsx` file for a Next.js landing page.
 
@@ -1816,9 +2579,12 @@ FORBIDDEN (DO NOT USE):
 
 MANIFEST:
 {manifest}
-
+"""
+        client_prompt = f"""{memory_prompt}
+{golden_reference}
 {theme_section}
 """
+        base_prompt = _system_blocks(static_prompt, client_prompt)
 
         # target_file already set above in partial state check
         os.makedirs(os.path.dirname(target_file), exist_ok=True)
@@ -1832,6 +2598,16 @@ MANIFEST:
         screenshot_path = None
         total_attempts = 0
         max_total_attempts = MAX_SYNTAX_RETRIES + MAX_VISUAL_REPAIR_RETRIES
+
+        if resume_attempts:
+            total_attempts = min(resume_attempts, max_total_attempts - 1)
+            syntax_feedback = resume_feedback.get("syntax")
+            visual_feedback = resume_feedback.get("visual")
+            screenshot_path = resume_feedback.get("screenshot")
+            if visual_feedback:
+                final_qa_status = "FAIL"
+                final_qa_report = visual_feedback
+            _log_aligned("info", "♻️", "Builder", f"resuming {client_id} after attempt {total_attempts} from checkpoint")
         
         # Progress tracking to detect when we're not making progress (save API costs)
         error_history = []  # Track last 3 errors to detect repetition
@@ -1843,6 +2619,13 @@ MANIFEST:
 
         try:
             while total_attempts < max_total_attempts:
+                # Checkpoint the completed attempts and the feedback the next one will use,
+                # so a crash mid-attempt resumes right here instead of from attempt 1
+                job_queue.checkpoint(client_id, "builder", total_attempts, {
+                    "syntax": syntax_feedback,
+                    "visual": visual_feedback,
+                    "screenshot": screenshot_path,
+                })
                 total_attempts += 1
                 _log_aligned("info", "🔄", "Builder cycle", f"{total_attempts}/{max_total_attempts}...")
 
@@ -1875,8 +2658,9 @@ The previous code rendered but had visual issues detected by our QA system:
 
 Please fix the visual issues while maintaining correct syntax."""
 
-                # Generate code
-                msg = _llm_messages_create(
+                # Generate code (streamed and cut at the closing fence when BUILDER_STREAMING is on)
+                generate = _llm_messages_stream if BUILDER_STREAMING else _llm_messages_create
+                msg = generate(
                     model=MODEL_CODER,
                     client_id=client_id,
                     activity="pipeline_builder",
@@ -1896,22 +2680,8 @@ Please fix the visual issues while maintaining correct syntax."""
                     )
                     continue
 
-                # Extract code from response
-                # Try multiple regex patterns in order of specificity
-                patterns = [
-                    r'```tsx\s*(.*?)```',  # Explicit tsx block
-                    r'```typescript\s*(.*?)```',  # Explicit typescript block
-                    r'```ts\s*(.*?)```',  # Explicit ts block
-                    r'```(?:tsx|typescript|ts)?\s*(.*?)```',  # Any code block with optional language
-                    r'```\s*(.*?)```',  # Generic code block (fallback)
-                ]
-                
-                code = None
-                for pattern in patterns:
-                    match = re.search(pattern, raw_response, re.DOTALL)
-                    if match:
-                        code = match.group(1).strip()
-                        break
+                # Extract code from response (prefers tsx, then typescript/ts, then any block)
+                code = _extract_code_block(raw_response)
                 
                 if not code:
                     _log_aligned("warning", "⚠️", "Builder", "No code blocks found in Builder response. Using raw output.")
@@ -1998,6 +2768,9 @@ Please fix the visual issues while maintaining correct syntax."""
                     )
                     continue  # Retry
 
+                # Start compiling/building the new page while QA sets up
+                qa_server.warm_up(client_id)
+
                 # Run QA
                 qa_status, qa_report, screenshot_path = run_qa(client_path)
 
@@ -2044,8 +2817,7 @@ Please fix the visual issues while maintaining correct syntax."""
         if total_attempts > 1:
             memory.compile_and_save_rules()
 
-    # Finalize the client (notifications, git, mark processed)
-    finalize_client(client_path, final_qa_status, final_qa_report)
+    return final_qa_status, final_qa_report
 
 def check_invisible_text_static(page_tsx_path: str, theme_path: Optional[str] = None) -> list:
     """
@@ -2122,223 +2894,671 @@ def check_invisible_text_static(page_tsx_path: str, theme_path: Optional[str] =
     return issues
 
 
-def check_missing_images_playwright(page) -> list:
+# Collects every image the page references in one pass: <img> (currentSrc, so
+# the <picture>/<source> or srcset candidate actually chosen), <picture> sources
+# and CSS background images (url() values of computed backgroundImage). Load
+# state comes from the element for <img> and from Resource Timing for
+# backgrounds; Next.js /_next/image URLs are unwrapped to the original path.
+_IMAGE_AUDIT_JS = """
+() => {
+    const started = performance.now();
+    const statuses = new Map();
+    for (const entry of performance.getEntriesByType('resource')) {
+        statuses.set(entry.name, entry.responseStatus || 0);
+    }
+    const describe = (el) => {
+        const className = typeof el.className === 'string' ? el.className.trim().split(/\\s+/)[0] : '';
+        return el.tagName.toLowerCase() + (className ? '.' + className : '');
+    };
+    const resolve = (src) => {
+        try {
+            const url = new URL(src, location.href);
+            const original = url.pathname.includes('/_next/image') ? url.searchParams.get('url') : null;
+            return {src: url.href, original: original || src, optimized: original ? url.href : null};
+        } catch (err) {
+            return {src, original: src, optimized: null};
+        }
+    };
+
+    const images = [];
+    for (const img of document.images) {
+        const raw = img.currentSrc || img.getAttribute('src') || img.getAttribute('data-src') || '';
+        if (!raw) continue;
+        const parent = img.parentElement;
+        const parentHides = !!parent && (parent.style.display === 'none' || parent.classList.contains('image-error'));
+        const hasError = img.hasAttribute('data-error') || img.classList.contains('error') || img.style.display === 'none';
+        const src = resolve(raw);
+        images.push(Object.assign(src, {
+            kind: parent && parent.tagName === 'PICTURE' ? 'picture' : 'img',
+            element: describe(img),
+            alt: img.getAttribute('alt') || '',
+            loaded: img.complete && img.naturalWidth > 0 && img.naturalHeight > 0 && !hasError && !parentHides,
+            status: statuses.get(src.src) || 0,
+        }));
+    }
+    for (const source of document.querySelectorAll('picture source[srcset]')) {
+        // Candidates the browser did not pick are never fetched; only report the ones that were
+        for (const candidate of source.srcset.split(',')) {
+            const raw = candidate.trim().split(/\\s+/)[0];
+            if (!raw) continue;
+            const src = resolve(raw);
+            if (!statuses.has(src.src)) continue;
+            images.push(Object.assign(src, {
+                kind: 'picture', element: describe(source), alt: '',
+                loaded: statuses.get(src.src) < 400, status: statuses.get(src.src),
+            }));
+        }
+    }
+    const urlPattern = /url\\(\\s*(['"]?)(.*?)\\1\\s*\\)/g;
+    for (const el of document.querySelectorAll('body *')) {
+        const background = getComputedStyle(el).backgroundImage;
+        if (!background || background === 'none' || !background.includes('url(')) continue;
+        for (const match of background.matchAll(urlPattern)) {
+            if (!match[2] || match[2].startsWith('data:')) continue;
+            const src = resolve(match[2]);
+            const status = statuses.get(src.src);
+            images.push(Object.assign(src, {
+                kind: 'background', element: describe(el), alt: '',
+                // Not in Resource Timing: not fetched (yet), so its state is unknown
+                loaded: status === undefined ? null : (status === 0 || status < 400),
+                status: status || 0,
+            }));
+        }
+    }
+    return {images, elapsed_ms: performance.now() - started};
+}
+"""
+
+
+def _image_filename(url: str) -> Tuple[str, str]:
+    """Return (display path, filename) for an image URL, unwrapping Next.js optimized URLs."""
+    from urllib.parse import urlparse, unquote, parse_qs
+    parsed = urlparse(url)
+
+    # Handle Next.js optimized URLs
+    clean_path = parsed.path
+    if "_next/image" in url:
+        # Extract original URL from query parameter
+        query_params = parse_qs(parsed.query)
+        if 'url' in query_params:
+            clean_path = unquote(query_params['url'][0])
+
+    filename = unquote(clean_path.split("/")[-1]) if clean_path else ""
+    # Format as /images/filename for consistency
+    display_path = f"/images/{filename}" if filename and '.' in filename else clean_path
+    return display_path, filename
+
+
+def check_missing_images_playwright(page, network_errors: Optional[list] = None) -> list:
     """
-    Check for missing or broken images using Playwright.
-    
+    Check for missing or broken images with a single in-page evaluation.
+
+    One evaluate() reports every <img>, <picture> source and CSS background
+    image with its load state; the result is correlated with the 404s seen
+    by run_qa's response listener, so a failed request is attributed to the
+    element that referenced it and reported once.
+
     Parameters:
         page: Playwright page object
-        
+        network_errors: Image 404s captured from page responses ({"url": ...})
+
     Returns:
         list: List of dicts with missing image issues, each containing:
-            - element: description of the element (tag + class/id)
-            - src: image source URL/path
-            - issue_type: "missing", "broken", or "error"
+            - element: description of the element (tag + class), or
+              "network_request" for a 404 no element could be matched to
+            - src / original_src / optimized_src: image URL (original path for
+              Next.js optimized images)
+            - alt: alt text (empty for backgrounds)
+            - kind: "img", "picture", "background" or "network"
+            - issue_type: "broken" or "404_not_found"
     """
-    issues = []
-    
+    failed_urls = {error["url"] for error in network_errors or []}
     try:
-        # Check all img elements
-        img_elements = page.query_selector_all("img")
-        
-        for img in img_elements:
-            try:
-                src = img.get_attribute("src") or img.get_attribute("data-src") or ""
-                if not src:
-                    continue
-                
-                # Check if image loaded successfully
-                # Also check for error state (Next.js Image components might have error handlers)
-                img_state = img.evaluate("""
-                    (el) => {
-                        // Check if image loaded successfully
-                        const isComplete = el.complete;
-                        const hasDimensions = el.naturalWidth > 0 && el.naturalHeight > 0;
-                        
-                        // Check if image has error attribute (some frameworks set this)
-                        const hasError = el.hasAttribute('data-error') || 
-                                       el.classList.contains('error') ||
-                                       el.style.display === 'none';
-                        
-                        // Check if parent has error handling (Next.js Image might hide broken images)
-                        const parent = el.parentElement;
-                        const parentHidesImage = parent && (
-                            parent.style.display === 'none' ||
-                            parent.classList.contains('image-error')
-                        );
-                        
-                        return {
-                            isLoaded: isComplete && hasDimensions && !hasError && !parentHidesImage,
-                            naturalWidth: el.naturalWidth,
-                            naturalHeight: el.naturalHeight,
-                            complete: isComplete,
-                            hasError: hasError
-                        };
-                    }
-                """)
-                
-                # Also check network errors by attempting to verify the image actually loaded
-                # If naturalWidth/Height are 0, the image likely failed to load
-                if not img_state["isLoaded"] or img_state["naturalWidth"] == 0 or img_state["naturalHeight"] == 0:
-                    tag_name = img.evaluate("el => el.tagName.toLowerCase()")
-                    class_name = img.get_attribute("class") or ""
-                    alt_text = img.get_attribute("alt") or ""
-                    
-                    # Extract actual source URL (Next.js might use optimized URLs)
-                    actual_src = src
-                    original_src = src
-                    if "_next/image" in src:
-                        # Try to extract the original URL from Next.js optimized image URL
-                        import urllib.parse
-                        try:
-                            parsed = urllib.parse.urlparse(src)
-                            query_params = urllib.parse.parse_qs(parsed.query)
-                            if 'url' in query_params:
-                                original_src = urllib.parse.unquote(query_params['url'][0])
-                                actual_src = original_src  # Use original for reporting
-                        except:
-                            pass
-                    
-                    issues.append({
-                        "element": f"{tag_name}" + (f".{class_name.split()[0]}" if class_name else ""),
-                        "src": actual_src,
-                        "original_src": original_src,  # Keep both for reference
-                        "optimized_src": src if "_next/image" in src else None,
-                        "alt": alt_text,
-                        "issue_type": "broken"
-                    })
-            except Exception as e:
-                continue
-        
-        # Check Next.js Image components (they render as img with specific classes)
-        # Also check for background-image CSS that might reference missing images
-        bg_image_elements = page.query_selector_all("[style*='background-image'], [style*='backgroundImage']")
-        
+        result = page.evaluate(_IMAGE_AUDIT_JS)
+        images = list(result.get("images") or [])
     except Exception as e:
         _log_aligned("warning", "⚠️", "QA", f"Missing images check failed: {e}")
-    
+        images = []
+        result = {}
+
+    issues = []
+    matched = set()
+    for image in images:
+        not_found = image.get("src") in failed_urls or (image.get("status") or 0) == 404
+        if not not_found and image.get("loaded") is not False:
+            continue
+        if image.get("src") in failed_urls:
+            matched.add(image["src"])
+        issues.append({
+            "element": image.get("element", "img"),
+            "src": image.get("original") or image.get("src", ""),
+            "original_src": image.get("original") or image.get("src", ""),
+            "optimized_src": image.get("optimized"),
+            "alt": image.get("alt", ""),
+            "kind": image.get("kind", "img"),
+            "issue_type": "404_not_found" if not_found else "broken",
+        })
+
+    # 404s no element referenced (preloads, lazy candidates, CSS in pseudo-elements)
+    for url in sorted(failed_urls - matched):
+        display_path, filename = _image_filename(url)
+        issues.append({
+            "element": "network_request",
+            "src": display_path,
+            "original_src": display_path,
+            "optimized_src": url if "_next/image" in url else None,
+            "alt": "",
+            "kind": "network",
+            "issue_type": "404_not_found",
+            "filename": filename
+        })
+
+    if images:
+        _log_aligned(
+            "debug", "🔍", "QA",
+            f"image audit: {len(images)} images, {len(issues)} issues in {result.get('elapsed_ms', 0):.0f}ms"
+        )
     return issues
 
 
+# Contrast thresholds for the in-page text audit (WCAG 2.x contrast ratio, 1-21).
+# Any finding forces a QA FAIL, so these match the old average-RGB-difference
+# cut-offs (13 and 30, about 1.1-1.2:1 and 1.3-1.5:1) rather than WCAG AA:
+# light gray body text (e.g. gray-400 on white, ~2.5:1) is not a broken page.
+INVISIBLE_TEXT_MAX_CONTRAST = 1.15  # Text effectively the same color as its background
+LOW_CONTRAST_MAX_RATIO = 1.4  # Barely distinguishable from its background
+TEXT_AUDIT_MAX_ISSUES = 200  # Keeps the evaluate() result compact on broken pages
+
+# Walks the DOM once in the page and returns only the failing text elements.
+# Colors are normalized through a 1x1 canvas so any CSS color syntax (rgb, hsl,
+# oklch, color()) is compared in sRGB; backgrounds are alpha-composited from the
+# root down (memoized per element) onto the white canvas, and text over a
+# background image is skipped because its backdrop cannot be known from CSS.
+_TEXT_CONTRAST_AUDIT_JS = """
+({invisibleMax, lowMax, maxIssues}) => {
+    const started = performance.now();
+    const canvas = document.createElement('canvas');
+    canvas.width = canvas.height = 1;
+    const ctx = canvas.getContext('2d', {willReadFrequently: true});
+    const parsed = new Map();
+    const toRgba = (css) => {
+        if (parsed.has(css)) return parsed.get(css);
+        ctx.clearRect(0, 0, 1, 1);
+        ctx.fillStyle = 'rgba(0, 0, 0, 0)';
+        ctx.fillStyle = css;
+        ctx.fillRect(0, 0, 1, 1);
+        const [r, g, b, a] = ctx.getImageData(0, 0, 1, 1).data;
+        const rgba = [r, g, b, a / 255];
+        parsed.set(css, rgba);
+        return rgba;
+    };
+    const over = (top, bottom) => {
+        const a = top[3];
+        return [0, 1, 2].map((i) => top[i] * a + bottom[i] * (1 - a)).concat(1);
+    };
+    const channel = (v) => {
+        v /= 255;
+        return v <= 0.03928 ? v / 12.92 : Math.pow((v + 0.055) / 1.055, 2.4);
+    };
+    const luminance = (c) => 0.2126 * channel(c[0]) + 0.7152 * channel(c[1]) + 0.0722 * channel(c[2]);
+    const contrast = (a, b) => {
+        const [hi, lo] = [luminance(a), luminance(b)].sort((x, y) => y - x);
+        return (hi + 0.05) / (lo + 0.05);
+    };
+    const css = (c) => `rgb(${Math.round(c[0])}, ${Math.round(c[1])}, ${Math.round(c[2])})`;
+
+    const styles = new Map();
+    const styleOf = (el) => {
+        let style = styles.get(el);
+        if (!style) {
+            style = getComputedStyle(el);
+            styles.set(el, style);
+        }
+        return style;
+    };
+    // Effective backdrop of an element: {color, unknown} where unknown means a background image shows through
+    const backdrops = new Map();
+    const backdropOf = (el) => {
+        if (!el || el.nodeType !== 1) return {color: [255, 255, 255, 1], unknown: false};
+        let backdrop = backdrops.get(el);
+        if (backdrop) return backdrop;
+        const parent = backdropOf(el.parentElement);
+        const style = styleOf(el);
+        const bg = toRgba(style.backgroundColor);
+        if (bg[3] >= 1) {
+            backdrop = {color: bg, unknown: false};
+        } else {
+            backdrop = {color: bg[3] > 0 ? over(bg, parent.color) : parent.color, unknown: parent.unknown};
+        }
+        if (style.backgroundImage && style.backgroundImage !== 'none') {
+            backdrop = {color: backdrop.color, unknown: true};
+        }
+        backdrops.set(el, backdrop);
+        return backdrop;
+    };
+
+    const issues = [];
+    let checked = 0;
+    // Skip whole subtrees that hold no rendered text (SVG text is painted with fill, not color)
+    const skipped = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'SVG', 'CANVAS', 'IFRAME']);
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT, {
+        acceptNode: (node) => (skipped.has(node.tagName.toUpperCase()) ? NodeFilter.FILTER_REJECT : NodeFilter.FILTER_ACCEPT),
+    });
+    for (let el = walker.currentNode; el; el = walker.nextNode()) {
+        if (issues.length >= maxIssues) break;
+        let text = '';
+        for (const node of el.childNodes) {
+            if (node.nodeType === 3) text += node.textContent;
+        }
+        text = text.replace(/\\s+/g, ' ').trim();
+        if (!text) continue;
+        const style = styleOf(el);
+        if (style.visibility !== 'visible' || style.display === 'none') continue;
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) continue;
+
+        const backdrop = backdropOf(el);
+        if (backdrop.unknown) continue;
+        checked += 1;
+        const fg = over(toRgba(style.color), backdrop.color);
+        const ratio = contrast(fg, backdrop.color);
+        if (ratio >= lowMax) continue;
+
+        const size = parseFloat(style.fontSize) || 16;
+        const weight = parseInt(style.fontWeight, 10) || 400;
+        const className = typeof el.className === 'string' ? el.className.trim().split(/\\s+/)[0] : '';
+        issues.push({
+            element: el.tagName.toLowerCase() + (className ? '.' + className : ''),
+            text_color: css(fg),
+            background_color: css(backdrop.color),
+            text_preview: text.slice(0, 50),
+            contrast_ratio: Math.round(ratio * 100) / 100,
+            large_text: size >= 24 || (size >= 18.66 && weight >= 700),
+            severity: ratio < invisibleMax ? 'invisible' : 'hard_to_read',
+        });
+    }
+    return {issues, checked, elapsed_ms: performance.now() - started};
+}
+"""
+
+
 def check_invisible_text_playwright(page) -> list:
     """
-    Check for invisible text using Playwright's computed styles.
-    
+    Check for invisible and low-contrast text with a single in-page DOM audit.
+
+    One evaluate() walks the DOM, resolves each text element's effective
+    foreground and background colors (alpha-composited) and computes the
+    WCAG contrast ratio, so the check costs one round trip however large the
+    page is.
+
     Parameters:
         page: Playwright page object
-        
+
     Returns:
         list: List of dicts with invisible text issues, each containing:
-            - element: description of the element
-            - text_color: RGB color string
-            - background_color: RGB color string
-            - text_preview: first 50 chars of text content
+            - element: description of the element (tag + first class)
+            - text_color / background_color: effective colors as rgb() strings
+            - text_preview: first 50 chars of the element's own text
+            - contrast_ratio: WCAG contrast ratio (1-21)
+            - large_text: whether WCAG treats the text as large
+            - severity: "invisible" or "hard_to_read"
     """
-    issues = []
-    
     try:
-        # Query all text-containing elements
-        text_selectors = [
-            'p', 'span', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'a', 'button', 'label', 'li', 'td', 'th', 'div'
-        ]
-        
-        for selector in text_selectors:
-            elements = page.query_selector_all(selector)
-            for element in elements:
-                try:
-                    # Get text content - skip if empty
-                    text_content = element.inner_text().strip()
-                    if not text_content or len(text_content) < 1:
-                        continue
-                    
-                    # Get computed styles
-                    text_color = element.evaluate("""
-                        (el) => {
-                            const style = window.getComputedStyle(el);
-                            return style.color;
-                        }
-                    """)
-                    
-                    # Get background color from element or parent
-                    bg_color = element.evaluate("""
-                        (el) => {
-                            let current = el;
-                            for (let i = 0; i < 5 && current; i++) {
-                                const style = window.getComputedStyle(current);
-                                const bg = style.backgroundColor;
-                                // Check if background is not transparent
-                                if (bg && bg !== 'rgba(0, 0, 0, 0)' && bg !== 'transparent') {
-                                    return bg;
-                                }
-                                current = current.parentElement;
-                            }
-                            // Fallback to body background
-                            return window.getComputedStyle(document.body).backgroundColor;
-                        }
-                    """)
-                    
-                    # Convert RGB strings to comparable values
-                    def parse_rgb(rgb_str):
-                        """Parse rgb/rgba string to (r, g, b, a) tuple."""
-                        if not rgb_str or rgb_str == 'transparent':
-                            return None
-                        # Match rgb(r, g, b) or rgba(r, g, b, a)
-                        match = re.match(r'rgba?\((\d+),\s*(\d+),\s*(\d+)(?:,\s*([\d.]+))?\)', rgb_str)
-                        if match:
-                            r, g, b = int(match.group(1)), int(match.group(2)), int(match.group(3))
-                            a = float(match.group(4)) if match.group(4) else 1.0
-                            return (r, g, b, a)
-                        return None
-                    
-                    text_rgb = parse_rgb(text_color)
-                    bg_rgb = parse_rgb(bg_color)
-                    
-                    if text_rgb and bg_rgb:
-                        # Calculate color difference (Euclidean distance in RGB space)
-                        r_diff = abs(text_rgb[0] - bg_rgb[0])
-                        g_diff = abs(text_rgb[1] - bg_rgb[1])
-                        b_diff = abs(text_rgb[2] - bg_rgb[2])
-                        total_diff = (r_diff + g_diff + b_diff) / 3.0
-                        
-                        # Flag if colors are very similar (within 5% of 255 range = ~13 units)
-                        # Also flag low contrast cases (within ~12% = ~30 units) for hard-to-read text
-                        if total_diff < 13:
-                            # Get element description
-                            tag_name = element.evaluate("el => el.tagName.toLowerCase()")
-                            class_name = element.get_attribute("class") or ""
-                            text_preview = text_content[:50].replace('\n', ' ')
-                            
-                            issues.append({
-                                "element": f"{tag_name}" + (f".{class_name.split()[0]}" if class_name else ""),
-                                "text_color": text_color,
-                                "background_color": bg_color,
-                                "text_preview": text_preview,
-                                "color_diff": round(total_diff, 1),
-                                "severity": "invisible"
-                            })
-                        elif total_diff < 30:  # Hard to read but not invisible
-                            tag_name = element.evaluate("el => el.tagName.toLowerCase()")
-                            class_name = element.get_attribute("class") or ""
-                            text_preview = text_content[:50].replace('\n', ' ')
-                            
-                            issues.append({
-                                "element": f"{tag_name}" + (f".{class_name.split()[0]}" if class_name else ""),
-                                "text_color": text_color,
-                                "background_color": bg_color,
-                                "text_preview": text_preview,
-                                "color_diff": round(total_diff, 1),
-                                "severity": "hard_to_read"
-                            })
-                except Exception as e:
-                    # Skip elements that can't be inspected
-                    continue
+        result = page.evaluate(_TEXT_CONTRAST_AUDIT_JS, {
+            "invisibleMax": INVISIBLE_TEXT_MAX_CONTRAST,
+            "lowMax": LOW_CONTRAST_MAX_RATIO,
+            "maxIssues": TEXT_AUDIT_MAX_ISSUES,
+        })
     except Exception as e:
         _log_aligned("warning", "⚠️", "QA", f"Invisible text check failed: {e}")
-    
+        return []
+
+    issues = list(result.get("issues") or [])
+    _log_aligned(
+        "debug", "🔍", "QA",
+        f"text contrast audit: {result.get('checked', 0)} elements, {len(issues)} issues "
+        f"in {result.get('elapsed_ms', 0):.0f}ms"
+    )
+    return issues
+
+
+LAYOUT_OVERFLOW_TOLERANCE_PX = 1  # Sub-pixel rounding is not overflow
+LAYOUT_AUDIT_MAX_ISSUES = 20
+
+# Detects horizontal overflow (the page scrolls sideways, usually on mobile) and
+# names the outermost elements that stick out past the right edge of the
+# viewport. Elements inside a container that clips or scrolls horizontally
+# (carousels, overflow-x-auto tables) and fixed elements are not overflow.
+_LAYOUT_OVERFLOW_AUDIT_JS = """
+({tolerance, maxIssues}) => {
+    const started = performance.now();
+    const root = document.documentElement;
+    const viewportWidth = root.clientWidth;
+    const pageWidth = Math.max(root.scrollWidth, document.body ? document.body.scrollWidth : 0);
+    const overflows = [];
+    if (!document.body || pageWidth <= viewportWidth + tolerance) {
+        return {overflows, page_width: pageWidth, viewport_width: viewportWidth, elapsed_ms: performance.now() - started};
+    }
+
+    const clipped = (el) => {
+        for (let p = el.parentElement; p && p !== document.body && p !== root; p = p.parentElement) {
+            if (getComputedStyle(p).overflowX !== 'visible') return true;
+        }
+        return false;
+    };
+    const flagged = [];
+    const walker = document.createTreeWalker(document.body, NodeFilter.SHOW_ELEMENT);
+    for (let el = walker.nextNode(); el && overflows.length < maxIssues; el = walker.nextNode()) {
+        if (flagged.some((outer) => outer.contains(el))) continue;
+        const rect = el.getBoundingClientRect();
+        if (rect.width === 0 || rect.height === 0) continue;
+        const right = rect.right + window.scrollX;
+        if (right <= viewportWidth + tolerance) continue;
+        const style = getComputedStyle(el);
+        if (style.position === 'fixed' || style.visibility === 'hidden' || clipped(el)) continue;
+        flagged.push(el);
+        const className = typeof el.className === 'string' ? el.className.trim().split(/\\s+/)[0] : '';
+        overflows.push({
+            element: el.tagName.toLowerCase() + (className ? '.' + className : ''),
+            right: Math.round(right),
+            overflow_px: Math.round(right - viewportWidth),
+            viewport_width: viewportWidth,
+            text_preview: (el.innerText || '').trim().slice(0, 50),
+        });
+    }
+    return {overflows, page_width: pageWidth, viewport_width: viewportWidth, elapsed_ms: performance.now() - started};
+}
+"""
+
+
+def check_layout_overflow_playwright(page) -> list:
+    """
+    Check for horizontal layout overflow with a single in-page DOM audit.
+
+    Parameters:
+        page: Playwright page object
+
+    Returns:
+        list: List of dicts with overflow issues, each containing:
+            - element: description of the element (tag + first class)
+            - right: the element's right edge in CSS pixels
+            - overflow_px: how far it extends past the viewport
+            - viewport_width: width of the viewport it overflows
+            - text_preview: first 50 chars of its text
+    """
+    try:
+        result = page.evaluate(_LAYOUT_OVERFLOW_AUDIT_JS, {
+            "tolerance": LAYOUT_OVERFLOW_TOLERANCE_PX,
+            "maxIssues": LAYOUT_AUDIT_MAX_ISSUES,
+        })
+    except Exception as e:
+        _log_aligned("warning", "⚠️", "QA", f"Layout overflow check failed: {e}")
+        return []
+
+    issues = list(result.get("overflows") or [])
+    _log_aligned(
+        "debug", "🔍", "QA",
+        f"layout overflow audit: page {result.get('page_width', 0)}px wide in a "
+        f"{result.get('viewport_width', 0)}px viewport, {len(issues)} issues "
+        f"in {result.get('elapsed_ms', 0):.0f}ms"
+    )
     return issues
 
 
+# Resolves once web fonts are loaded and every eagerly loaded image is decoded,
+# or after timeoutMs (lazy images below the fold never load, so they are skipped)
+_MEDIA_READY_JS = """
+async (timeoutMs) => {
+    const pending = [document.fonts ? document.fonts.ready : null];
+    for (const img of document.images) {
+        if (img.complete || img.loading !== 'lazy') {
+            pending.push(img.decode().catch(() => null));
+        }
+    }
+    const timeout = new Promise((resolve) => setTimeout(() => resolve(false), timeoutMs));
+    return Promise.race([Promise.all(pending).then(() => true), timeout]);
+}
+"""
+
+
+def _wait_for_page_ready(
+    page,
+    url: str,
+    timeout_ms: Optional[int] = None,
+    navigate: bool = True,
+    started: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Navigate to a page and wait until it is ready for a screenshot.
+
+    Replaces a fixed hydration sleep: waits for network idle, for the
+    hydration marker set by app/clients/layout.tsx (QA_WAIT_FOR_HYDRATION),
+    then for web fonts and images to decode. All waits share one deadline of
+    timeout_ms (QA_READY_TIMEOUT_MS); a step that runs out of time is noted
+    and the remaining steps are skipped rather than failing the check. Only
+    navigation itself failing raises.
+
+    Parameters:
+        page: Playwright page object
+        url: Page URL
+        timeout_ms: Ceiling for navigation plus readiness, in milliseconds
+        navigate: False when the caller already started navigation (multi-viewport
+            QA starts every page first so they load concurrently)
+        started: time.monotonic() when navigation started; defaults to now
+
+    Returns:
+        dict: time_to_ready_ms and timed_out (names of the steps that hit the ceiling)
+    """
+    timeout_ms = QA_READY_TIMEOUT_MS if timeout_ms is None else timeout_ms
+    started = time.monotonic() if started is None else started
+    deadline = started + timeout_ms / 1000.0
+
+    def remaining_ms() -> float:
+        return max(0.0, (deadline - time.monotonic()) * 1000.0)
+
+    timed_out = []
+    # A route the dev server is still compiling can take most of the budget here
+    if navigate:
+        page.goto(url, wait_until="domcontentloaded", timeout=timeout_ms)
+    else:
+        page.wait_for_load_state("domcontentloaded", timeout=remaining_ms())
+
+    steps = [("network_idle", lambda: page.wait_for_load_state("networkidle", timeout=remaining_ms()))]
+    if QA_WAIT_FOR_HYDRATION:
+        steps.append(("hydration", lambda: page.wait_for_selector(
+            QA_HYDRATION_SELECTOR, state="attached", timeout=remaining_ms()
+        )))
+    steps.append(("media", lambda: page.evaluate(_MEDIA_READY_JS, remaining_ms())))
+
+    for name, wait in steps:
+        if remaining_ms() <= 0:
+            timed_out.append(name)
+            continue
+        try:
+            # The media script reports its own timeout by resolving to false
+            if wait() is False:
+                timed_out.append(name)
+        except PlaywrightTimeoutError:
+            timed_out.append(name)
+
+    return {
+        "time_to_ready_ms": round((time.monotonic() - started) * 1000.0),
+        "timed_out": timed_out,
+    }
+
+
+def _parse_viewports(spec: str) -> List[Tuple[str, int, int]]:
+    """
+    Parse QA_VIEWPORTS ("mobile:390x844,desktop:1440x900") into (name, width, height).
+
+    Invalid entries are logged and skipped; an empty result falls back to mobile.
+    """
+    viewports = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        match = re.fullmatch(r"([a-z0-9_-]+):(\d+)x(\d+)", entry, re.IGNORECASE)
+        if not match or int(match.group(2)) == 0 or int(match.group(3)) == 0:
+            _log_aligned("warning", "⚠️", "QA", f"ignoring invalid viewport '{entry}' (expected name:WIDTHxHEIGHT)")
+            continue
+        viewports.append((match.group(1).lower(), int(match.group(2)), int(match.group(3))))
+    return viewports or [("mobile", 390, 844)]
+
+
+def _merge_viewport_findings(findings: Dict[str, list], key_fields: Tuple[str, ...]) -> list:
+    """
+    Merge per-viewport issue lists, reporting an issue found in several viewports once.
+
+    Each merged issue gets a "viewports" list naming where it was found.
+    """
+    merged: Dict[tuple, dict] = {}
+    for viewport, issues in findings.items():
+        for issue in issues:
+            key = tuple(issue.get(field) for field in key_fields)
+            if key not in merged:
+                merged[key] = dict(issue, viewports=[])
+            merged[key]["viewports"].append(viewport)
+    return list(merged.values())
+
+
+def _vision_image_content(viewports, prepared, sent) -> List[Dict[str, Any]]:
+    """
+    Build the image blocks of the vision request.
+
+    Each image is labelled with its viewport when several are reviewed, and
+    with its position on the page when a viewport was split into tiles.
+    """
+    content = []
+    for name, width, height in viewports:
+        total = len(prepared[name].tiles)
+        for tile in sent[name]:
+            label = f"{name.capitalize()} viewport ({width}x{height})" if len(viewports) > 1 else ""
+            if total > 1:
+                section = f"section {tile.index + 1} of {total} (page y {tile.top}-{tile.bottom}px)"
+                label = f"{label}, {section}" if label else section.capitalize()
+            if label:
+                content.append({"type": "text", "text": f"{label}:"})
+            content.append({
+                "type": "image",
+                "source": {"type": "base64", "media_type": tile.media_type, "data": base64.b64encode(tile.data).decode("utf-8")},
+            })
+    return content
+
+
+def _vision_review(client_path: str, client_id: str, viewports, screenshots: Dict[str, bytes], qa_metadata: dict) -> str:
+    """
+    Stage 2 of QA: review the screenshots with the vision model.
+
+    The screenshots are tiled, downscaled and re-encoded in memory
+    (automation/screenshot_utils.py) and every viewport's images go in a
+    single request; a previous verdict is reused when the renders are unchanged.
+
+    Returns:
+        The model's verdict ("PASS" or "FAIL: ...")
+    """
+    vision_settings = screenshot_utils.VisionSettings.from_env()
+    prepared = {
+        name: screenshot_utils.prepare(screenshots[name], height, vision_settings)
+        for name, _, height in viewports
+    }
+
+    if len(viewports) > 1:
+        names = ", ".join(name for name, _, _ in viewports)
+        review_intro = (
+            f"Review these UI screenshots of the same page at {len(viewports)} viewports ({names}). "
+            "Name the viewport for each problem. Evaluate:"
+        )
+    else:
+        review_intro = f"Review this {viewports[0][0]} UI screenshot. Evaluate:"
+    review_prompt = review_intro + """
+1. Visual completeness (no broken layouts, missing sections)
+2. Text readability (no overlapping, truncated text)
+3. Button/CTA visibility
+4. Overall professional appearance
+5. Missing images and logos (CRITICAL)
+   - Check for any broken image placeholders, missing logos, or image loading errors
+   - Look for empty image containers, broken image icons, or placeholder text where images should be
+   - Verify all logos, hero images, testimonial avatars, and other visual assets are present
+   - Report any instances where images appear to be missing or failed to load
+6. Invisible or hard-to-read text detection
+   - Check for any text that appears to have the same color as its background
+   - Look for text elements that are present in the DOM but not visible
+   - Report any instances where text color matches or is too similar to background color
+   - Pay special attention to text on colored backgrounds (not just white)
+   - Flag text that is hard to read due to low contrast, even if not completely invisible
+
+Return 'PASS' if the page looks good and functional.
+If there are issues, return 'FAIL: [list specific visual problems]'."""
+
+    # Reuse the previous verdict if the renders are (nearly) unchanged since it was given
+    render_hashes = {}
+    if screenshot_utils.is_enabled():
+        for name, _, _ in viewports:
+            render_hash = prepared[name].render_hash
+            if render_hash is None:
+                render_hashes = {}
+                break
+            render_hashes[name] = render_hash
+    verdict_key = hashlib.sha256(f"{MODEL_QA}\n{review_prompt}".encode("utf-8")).hexdigest()[:16]
+    cached = screenshot_utils.lookup(client_path, verdict_key, render_hashes) if render_hashes else None
+
+    if cached:
+        report, distance = cached
+        qa_metadata["vision_cache_hit"] = True
+        _log_aligned("info", "♻️", "QA", f"render unchanged (distance {distance}), reusing previous vision verdict")
+    else:
+        # With GF_QA_VISION_CHANGED_TILES, a repair attempt only sends the tiles that
+        # changed since the previous review, along with that review's verdict
+        sent = {name: prepared[name].tiles for name, _, _ in viewports}
+        prompt = review_prompt
+        previous = (
+            screenshot_utils.last_review(client_path, verdict_key)
+            if screenshot_utils.changed_tiles_only() else None
+        )
+        if previous:
+            changed = {
+                name: screenshot_utils.changed_tiles(prepared[name], previous["tiles"].get(name))
+                for name, _, _ in viewports
+            }
+            if any(changed.values()) and any(len(changed[name]) < len(sent[name]) for name in sent):
+                sent = changed
+                prompt += (
+                    "\n\nOnly the sections shown changed since the previous review of this page; "
+                    "all other sections are unchanged. The previous review's verdict was:\n"
+                    f"{previous['verdict']}\n"
+                    "Problems it reported in sections not shown still apply: include them in your answer."
+                )
+                qa_metadata["vision_changed_tiles"] = {name: len(tiles) for name, tiles in sent.items()}
+
+        image_content = _vision_image_content(viewports, prepared, sent)
+        image_count = sum(len(tiles) for tiles in sent.values())
+        image_tokens = sum(tile.tokens for tiles in sent.values() for tile in tiles)
+        qa_metadata.update({"vision_images": image_count, "vision_image_tokens": image_tokens})
+        token_note = f" (~{image_tokens} image tokens)" if image_tokens else ""
+        _log_aligned("info", "🖼️", "QA", f"sending {image_count} image(s) to the vision model{token_note}")
+
+        msg = _anthropic_messages_create(
+            model=MODEL_QA,
+            client_id=client_id,
+            activity="pipeline_qa",
+            max_tokens=1000,
+            messages=[{
+                "role": "user",
+                "content": image_content + [{"type": "text", "text": prompt}]
+            }],
+        )
+        _record_model_cost("anthropic", MODEL_QA, "pipeline_qa", client_id, msg)
+
+        report = msg.content[0].text
+        screenshot_utils.store(client_path, verdict_key, render_hashes, report)
+        if screenshot_utils.changed_tiles_only():
+            tile_hashes = {name: prepared[name].tile_hashes() for name, _, _ in viewports}
+            if all(tile_hashes.values()):
+                screenshot_utils.remember_review(client_path, verdict_key, tile_hashes, report)
+    return report
+
+
 def run_qa(client_path) -> Tuple[str, str, str]:
     """
     Run visual QA on a generated page and return the results.
@@ -2358,161 +3578,132 @@ def run_qa(client_path) -> Tuple[str, str, str]:
     client_id = os.path.basename(client_path)
     # Validate client ID to prevent path traversal
     validate_client_id_or_raise(client_id, "run_qa")
-    screenshot_path = os.path.join(client_path, "qa_mobile.jpg")
+    viewports = _parse_viewports(QA_VIEWPORTS)
+    screenshot_paths = {name: os.path.join(client_path, f"qa_{name}.jpg") for name, _, _ in viewports}
+    # The first viewport's screenshot is the one returned to the builder loop
+    screenshot_path = screenshot_paths[viewports[0][0]]
 
-    # Server Check with Auto-Start
-    server_ready = ensure_server_running()
+    # Server Check with Auto-Start (dev server, or a production build with GF_QA_SERVER_MODE=prod)
+    base_url = qa_server.ensure_ready(client_id)
 
-    if not server_ready:
+    if not base_url:
         _log_aligned("error", "❌", "QA", "Server unavailable. QA Skipped.")
         return ("SKIPPED", "Server unavailable - QA could not run", screenshot_path)
 
-    with time_tracker.track_span("pipeline_qa", client_id, {"stage": "qa"}):
+    # Filled in during the span; track_span logs it when the span closes
+    qa_metadata = {"stage": "qa"}
+    with time_tracker.track_span("pipeline_qa", client_id, qa_metadata):
         _log_aligned("info", "🧐", "QA Inspector", "starting...")
-        url = f"http://localhost:3000/clients/{client_id}"
+        url = f"{base_url}/clients/{client_id}"
 
-        browser = None
         try:
-            # Capture screenshot and check for invisible text and missing images
-            invisible_text_issues = []
-            missing_image_issues = []
-            network_errors = []
-            with sync_playwright() as p:
-                browser = p.chromium.launch()
-                try:
-                    page = browser.new_page(viewport={"width": 390, "height": 844})
-                    
+            # Capture screenshots and check for invisible text and missing images in
+            # every viewport, each in its own fresh context of one warm pooled browser
+            # (automation/browser_pool.py)
+            def capture(pages):
+                started = time.monotonic()
+                network_errors = {name: [] for name, _, _ in viewports}
+
+                # Start every navigation before waiting on any page, so the
+                # browser loads and renders all viewports concurrently
+                for (name, _, _), page in zip(viewports, pages):
                     # Monitor network requests to catch 404s for images
-                    def handle_response(response):
+                    def handle_response(response, errors=network_errors[name]):
                         if response.status == 404:
                             url = response.url
                             # Only track image-related 404s
                             if any(ext in url.lower() for ext in ['.jpg', '.jpeg', '.png', '.svg', '.gif', '.webp', '/images/', '/image']):
-                                network_errors.append({
+                                errors.append({
                                     "url": url,
                                     "status": 404,
                                     "type": "network_404"
                                 })
-                    
+
                     page.on("response", handle_response)
-                    
-                    page.goto(url)
-                    page.wait_for_timeout(3000)  # Wait for hydration
-                    page.screenshot(path=screenshot_path, full_page=True)
-                    
-                    # Check for missing images before closing browser
-                    missing_image_issues = check_missing_images_playwright(page)
-                    
-                    # Add network 404s to missing image issues
-                    for error in network_errors:
-                        # Extract filename and clean path from URL
-                        from urllib.parse import urlparse, unquote, parse_qs
-                        parsed = urlparse(error["url"])
-                        
-                        # Handle Next.js optimized URLs
-                        clean_path = parsed.path
-                        if "_next/image" in error["url"]:
-                            # Extract original URL from query parameter
-                            query_params = parse_qs(parsed.query)
-                            if 'url' in query_params:
-                                clean_path = unquote(query_params['url'][0])
-                        
-                        filename = unquote(clean_path.split("/")[-1]) if clean_path else ""
-                        # Format as /images/filename for consistency
-                        display_path = f"/images/{filename}" if filename and '.' in filename else clean_path
-                        
-                        missing_image_issues.append({
-                            "element": "network_request",
-                            "src": display_path,
-                            "original_src": display_path,
-                            "optimized_src": error["url"] if "_next/image" in error["url"] else None,
-                            "alt": "",
-                            "issue_type": "404_not_found",
-                            "filename": filename
-                        })
-                    
-                    # Check for invisible text before closing browser
-                    invisible_text_issues = check_invisible_text_playwright(page)
-                finally:
-                    # Ensure browser is always closed, even on exception
-                    if browser:
-                        try:
-                            browser.close()
-                        except Exception as e:
-                            _log_aligned("warning", "⚠️", "QA", f"Error closing browser: {e}")
-
-            # Resize image if dimensions exceed 8000 pixels (Anthropic API limit)
-            max_dimension = 8000
-            if os.path.exists(screenshot_path):
-                if PIL_AVAILABLE:
-                    try:
-                        with Image.open(screenshot_path) as img:
-                            width, height = img.size
-                            
-                            if width > max_dimension or height > max_dimension:
-                                # Calculate new dimensions maintaining aspect ratio
-                                if width > height:
-                                    new_width = max_dimension
-                                    new_height = int(height * (max_dimension / width))
-                                else:
-                                    new_height = max_dimension
-                                    new_width = int(width * (max_dimension / height))
-                                
-                                # Resize image
-                                resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                                resized_img.save(screenshot_path, "JPEG", quality=85)
-                                
-                                _log_aligned("info", "📐", "QA", f"resized screenshot from {width}x{height} to {new_width}x{new_height}")
-                    except Exception as e:
-                        _log_aligned("warning", "⚠️", "QA", f"Failed to resize screenshot: {e}, using original")
-                else:
-                    # PIL not available - check file size as a rough proxy for dimensions
-                    # This is not perfect but better than nothing
-                    file_size = os.path.getsize(screenshot_path)
-                    # Rough estimate: if file is > 50MB, it's likely too large
-                    # (8000x8000 JPEG at quality 85 is roughly 20-30MB)
-                    if file_size > 50 * 1024 * 1024:  # 50MB
-                        _log_aligned("warning", "⚠️", "QA", "Screenshot may be too large and PIL unavailable for resizing. Install Pillow: pip install Pillow")
-            
-            # Analyze with Vision Model
-            with open(screenshot_path, "rb") as f:
-                img_b64 = base64.b64encode(f.read()).decode("utf-8")
+                    page.goto(url, wait_until="commit", timeout=QA_READY_TIMEOUT_MS)
+
+                results = {}
+                for (name, _, _), page in zip(viewports, pages):
+                    readiness = _wait_for_page_ready(page, url, navigate=False, started=started)
+                    results[name] = {
+                        "readiness": readiness,
+                        # Kept in memory: written once as qa_<viewport>.jpg and preprocessed for the vision model
+                        "screenshot": page.screenshot(full_page=True, type="jpeg", quality=screenshot_utils.CAPTURE_QUALITY),
+                        # Check for missing images before the context is closed, attributing
+                        # the 404s seen above to the elements that requested them
+                        "missing_images": check_missing_images_playwright(page, network_errors[name]),
+                        # Check for invisible text before the context is closed
+                        "invisible_text": check_invisible_text_playwright(page),
+                        # Check for elements overflowing the viewport horizontally
+                        "layout_overflow": check_layout_overflow_playwright(page),
+                    }
+                return results
 
-            msg = _anthropic_messages_create(
-                model=MODEL_QA,
-                client_id=client_id,
-                activity="pipeline_qa",
-                max_tokens=1000,
-                messages=[{
-                    "role": "user",
-                    "content": [
-                        {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": img_b64}},
-                        {"type": "text", "text": """Review this mobile UI screenshot. Evaluate:
-1. Visual completeness (no broken layouts, missing sections)
-2. Text readability (no overlapping, truncated text)
-3. Button/CTA visibility
-4. Overall professional appearance
-5. Missing images and logos (CRITICAL)
-   - Check for any broken image placeholders, missing logos, or image loading errors
-   - Look for empty image containers, broken image icons, or placeholder text where images should be
-   - Verify all logos, hero images, testimonial avatars, and other visual assets are present
-   - Report any instances where images appear to be missing or failed to load
-6. Invisible or hard-to-read text detection
-   - Check for any text that appears to have the same color as its background
-   - Look for text elements that are present in the DOM but not visible
-   - Report any instances where text color matches or is too similar to background color
-   - Pay special attention to text on colored backgrounds (not just white)
-   - Flag text that is hard to read due to low contrast, even if not completely invisible
+            # A production server restart waits for these page loads to finish
+            with qa_server.rendering():
+                results, check_stats = browser_pool.get_pool().run_pages(
+                    capture, [{"viewport": {"width": width, "height": height}} for _, width, height in viewports]
+                )
+            missing_image_issues = _merge_viewport_findings(
+                {name: result["missing_images"] for name, result in results.items()},
+                ("src", "issue_type"),
+            )
+            invisible_text_issues = _merge_viewport_findings(
+                {name: result["invisible_text"] for name, result in results.items()},
+                ("element", "text_preview", "text_color", "background_color"),
+            )
+            overflow_issues = _merge_viewport_findings(
+                {name: result["layout_overflow"] for name, result in results.items()},
+                ("element", "text_preview"),
+            )
 
-Return 'PASS' if the page looks good and functional.
-If there are issues, return 'FAIL: [list specific visual problems]'."""}
-                    ]
-                }],
+            ready_ms = {name: result["readiness"]["time_to_ready_ms"] for name, result in results.items()}
+            timed_out = sorted({
+                step for result in results.values() for step in result["readiness"]["timed_out"]
+            })
+            qa_metadata.update({
+                "time_to_ready_ms": max(ready_ms.values()),
+                "timed_out": timed_out,
+                "viewport_ready_ms": ready_ms,
+            })
+            ready_note = f", timed out waiting for {', '.join(timed_out)}" if timed_out else ""
+            _log_aligned(
+                "info", "⏳", "QA",
+                f"{len(viewports)} viewport(s) ready in {qa_metadata['time_to_ready_ms']}ms{ready_note}"
+            )
+            _log_aligned(
+                "info", "🌐", "QA",
+                f"browser overhead {check_stats.overhead_ms:.0f}ms "
+                f"({'cold launch' if check_stats.cold else 'warm'}, page {check_stats.browser_pages})"
             )
-            _record_model_cost("anthropic", MODEL_QA, "pipeline_qa", client_id, msg)
 
-            report = msg.content[0].text
-            
+            # Keep the captured screenshots as artifacts (the vision stage works on the same bytes in memory)
+            for name, _, _ in viewports:
+                with open(screenshot_paths[name], "wb") as f:
+                    f.write(results[name]["screenshot"])
+
+            # Stage 1 (above) is the deterministic DOM audits. The vision model is stage 2:
+            # with the default GF_QA_VISION_POLICY=gate it only runs when stage 1 passes,
+            # since a page the audits already fail needs no model to fail it
+            automated_failures = [
+                label for label, issues in (
+                    ("missing images", missing_image_issues),
+                    ("text readability issues", invisible_text_issues),
+                    ("layout overflow", overflow_issues),
+                ) if issues
+            ]
+            policy = QA_VISION_POLICY if QA_VISION_POLICY in ("gate", "enrich", "off") else "gate"
+            if policy == "enrich" or (policy == "gate" and not automated_failures):
+                screenshots = {name: result["screenshot"] for name, result in results.items()}
+                report = _vision_review(client_path, client_id, viewports, screenshots, qa_metadata)
+            else:
+                qa_metadata["vision_skipped"] = True
+                if automated_failures:
+                    report = f"FAIL: Automated checks found {', '.join(automated_failures)} (vision review skipped)"
+                    _log_aligned("info", "⏭️", "QA", f"automated checks failed ({', '.join(automated_failures)}), skipping vision review")
+                else:
+                    report = "PASS (automated checks only, vision review disabled)"
+
             # Append missing image issues if found
             if missing_image_issues:
                 report += "\n\n## Missing/Broken Images Detected (Automated Check)\n\n"
@@ -2546,6 +3737,10 @@ If there are issues, return 'FAIL: [list specific visual problems]'."""}
                             pass
                     
                     report += f"{i}. **{issue['element']}**: Image source `{display_src}` failed to load"
+                    if issue.get('kind') == 'background':
+                        report += " (CSS background image)"
+                    if len(viewports) > 1:
+                        report += f" [{', '.join(issue.get('viewports', []))}]"
                     if issue.get('alt'):
                         report += f" (alt: \"{issue['alt']}\")"
                     # Show optimized URL if different from original
@@ -2569,7 +3764,10 @@ If there are issues, return 'FAIL: [list specific visual problems]'."""}
                 if invisible_issues:
                     report += f"Found {len(invisible_issues)} element(s) with invisible text (color matches background):\n\n"
                     for i, issue in enumerate(invisible_issues[:10], 1):  # Limit to 10 for brevity
-                        report += f"{i}. **{issue['element']}**: Text color `{issue['text_color']}` matches background `{issue['background_color']}` (diff: {issue['color_diff']})\n"
+                        report += f"{i}. **{issue['element']}**: Text color `{issue['text_color']}` matches background `{issue['background_color']}` (contrast {issue['contrast_ratio']}:1)"
+                        if len(viewports) > 1:
+                            report += f" [{', '.join(issue.get('viewports', []))}]"
+                        report += "\n"
                         report += f"   Text preview: \"{issue['text_preview']}\"\n\n"
                     if len(invisible_issues) > 10:
                         report += f"... and {len(invisible_issues) - 10} more invisible text issues.\n\n"
@@ -2577,7 +3775,10 @@ If there are issues, return 'FAIL: [list specific visual problems]'."""}
                 if hard_to_read_issues:
                     report += f"Found {len(hard_to_read_issues)} element(s) with hard-to-read text (low contrast):\n\n"
                     for i, issue in enumerate(hard_to_read_issues[:10], 1):  # Limit to 10 for brevity
-                        report += f"{i}. **{issue['element']}**: Text color `{issue['text_color']}` has low contrast with background `{issue['background_color']}` (diff: {issue['color_diff']})\n"
+                        report += f"{i}. **{issue['element']}**: Text color `{issue['text_color']}` has low contrast with background `{issue['background_color']}` (contrast {issue['contrast_ratio']}:1)"
+                        if len(viewports) > 1:
+                            report += f" [{', '.join(issue.get('viewports', []))}]"
+                        report += "\n"
                         report += f"   Text preview: \"{issue['text_preview']}\"\n\n"
                     if len(hard_to_read_issues) > 10:
                         report += f"... and {len(hard_to_read_issues) - 10} more hard-to-read text issues.\n\n"
@@ -2587,6 +3788,28 @@ If there are issues, return 'FAIL: [list specific visual problems]'."""}
                     report = "FAIL: Text readability issues detected\n\n" + report
                     _log_aligned("warning", "⚠️", "QA", f"text readability issues detected for {client_id}: {len(invisible_text_issues)} issues")
             
+            # Append layout overflow issues if found
+            if overflow_issues:
+                report += "\n\n## Layout Overflow Detected (Automated Check)\n\n"
+                report += f"Found {len(overflow_issues)} element(s) wider than the viewport (the page scrolls horizontally):\n\n"
+                for i, issue in enumerate(overflow_issues[:10], 1):  # Limit to 10 for brevity
+                    report += (
+                        f"{i}. **{issue['element']}**: extends {issue['overflow_px']}px past the right edge "
+                        f"of the {issue['viewport_width']}px viewport"
+                    )
+                    if len(viewports) > 1:
+                        report += f" [{', '.join(issue.get('viewports', []))}]"
+                    report += "\n"
+                    if issue.get('text_preview'):
+                        report += f"   Text preview: \"{issue['text_preview']}\"\n"
+                    report += "\n"
+                if len(overflow_issues) > 10:
+                    report += f"... and {len(overflow_issues) - 10} more overflowing elements.\n\n"
+                # If layout overflow found, force FAIL status
+                if "PASS" in report and not report.strip().startswith("FAIL"):
+                    report = "FAIL: Layout overflow detected\n\n" + report
+                    _log_aligned("warning", "⚠️", "QA", f"layout overflow detected for {client_id}: {len(overflow_issues)} issues")
+
             with open(os.path.join(client_path, "qa_report.md"), "w", encoding="utf-8") as f:
                 f.write(report)
 
@@ -2618,6 +3841,7 @@ def finalize_client(client_path: str, qa_status: str, qa_report: str) -> None:
     client_id = os.path.basename(client_path)
     # Validate client ID to prevent path traversal
     validate_client_id_or_raise(client_id, "finalize_client")
+    job_queue.set_stage(client_id, "finalize")
 
     # Map status to Discord alert type
     discord_status_map = {
@@ -2629,8 +3853,14 @@ def finalize_client(client_path: str, qa_status: str, qa_report: str) -> None:
     discord_status = discord_status_map.get(qa_status, "WARNING")
     send_discord_alert(client_id, discord_status, qa_report)
 
-    # Commit and Push to Git
-    git_commit_and_push(client_id)
+    # Commit and Push to Git (serialized - workers share one repository)
+    with _GIT_LOCK:
+        pushed = git_commit_and_push(client_id)
+    if not pushed:
+        # Not marked done and intake.md stays, so the next loop retries the
+        # commit (the builder skips the existing page; see run_pipeline's _finalize)
+        job_queue.checkpoint(client_id, "finalize", 1, {"qa_status": qa_status, "qa_report": qa_report})
+        raise RuntimeError(f"Git commit/push failed for {client_id}")
 
     # Mark as processed
     _log_aligned("info", "🏁", "Finalizing", f"job for {client_id}...")
@@ -2641,9 +3871,500 @@ def finalize_client(client_path: str, qa_status: str, qa_report: str) -> None:
             os.rename(intake_path, processed_path)
     except OSError:
         _log_aligned("warning", "⚠️", "Finalizing", "Failed to rename intake.md")
+    job_queue.mark_done(client_id)
+
+def _scan_intakes() -> list:
+    """Client IDs in WATCH_DIR with an unprocessed intake.md (a full directory scan)."""
+    found = []
+    if not os.path.exists(WATCH_DIR):
+        return found
+
+    for client_id in os.listdir(WATCH_DIR):
+        # Skip dotfiles
+        if client_id.startswith("."):
+            continue
+
+        # Validate client ID to prevent path traversal attacks
+        if not is_valid_client_id(client_id):
+            _log_aligned("warning", "⚠️", "Batch loop", f"Skipping invalid client ID: {client_id}")
+            continue
+
+        path = os.path.join(WATCH_DIR, client_id)
+        # Look for unprocessed intake files
+        if os.path.isdir(path) and os.path.exists(os.path.join(path, "intake.md")):
+            found.append(client_id)
+
+    return found
+
+
+def sync_job_queue() -> int:
+    """
+    Scan WATCH_DIR once and enqueue every client with an unprocessed intake.md.
+
+    Run on every polling pass (see _poll_intakes), since intakes can arrive
+    without a watcher event: pulled, dropped in by hand or re-opened.
+    Enqueueing is idempotent and keeps existing checkpoints.
+
+    Returns:
+        int: Number of clients with an unprocessed intake
+    """
+    found = _scan_intakes()
+    for client_id in found:
+        job_queue.enqueue(client_id)
+    return len(found)
+
+
+def _poll_intakes() -> list:
+    """
+    One polling pass of the batch loop and of watch mode's reconcile: git pull,
+    sanitize raw intakes, rescan WATCH_DIR into the job queue (a listdir, so
+    cheap enough for every BATCH_INTERVAL) and return the pending clients.
+    """
+    with _GIT_LOCK:
+        git_pull()
+    run_intake_sanitizer()
+    sync_job_queue()
+    return find_pending_clients()
+
+
+def find_pending_clients() -> list:
+    """
+    Return clients the job queue has pending that are not locked.
+
+    Queries the persistent queue (an indexed lookup) rather than scanning
+    WATCH_DIR; call sync_job_queue() first to pick up new intakes. If the
+    queue database cannot be read, falls back to scanning WATCH_DIR.
+
+    Returns:
+        list: Client IDs ready to be processed, oldest first
+    """
+    queued = job_queue.pending_clients()
+    if queued is None:
+        _log_aligned("warning", "⚠️", "Batch loop", "Job queue unavailable, scanning clients directory instead")
+        queued = _scan_intakes()
+
+    pending = []
+    for client_id in queued:
+        # Check if client is already being processed
+        if is_locked(client_id):
+            _log_aligned("info", "⏸️", "Batch loop", f"Client {client_id} is already being processed, skipping")
+            continue
+
+        # Intake removed by hand since it was queued - nothing left to build
+        if not os.path.exists(os.path.join(WATCH_DIR, client_id, "intake.md")):
+            continue
+
+        pending.append(client_id)
+
+    return pending
+
+
+def _blocking_steps(func, *args):
+    """
+    Step generator without LLM requests: runs func(*args) when first advanced.
+
+    Lets blocking stages (builder, finalize) be DAG nodes like the LLM stages;
+    under run_pipeline_async the driver advances it in a worker thread.
+    """
+    return func(*args)
+    yield  # pragma: no cover - makes this a generator
+
+
+def _pipeline_nodes(client_path, drive):
+    """
+    The pipeline's stages as DAG nodes, shared by run_pipeline and run_pipeline_async.
+
+    Every stage body is a step generator (see _run_llm_steps). `drive(name, steps)`
+    runs one for a node: _run_llm_steps on run_dag's threads, or a coroutine
+    around _run_llm_steps_async on run_dag_async's event loop.
+
+    Stages whose output already exists are skipped, so a re-run resumes where
+    the last one stopped. The Critic loops stay inside the Strategist and
+    Copywriter nodes, and Visual QA inside the Builder node, because each
+    retry feeds on the previous attempt's feedback.
+    """
+    client_id = os.path.basename(client_path)
+
+    def _exists(filename):
+        return lambda: os.path.exists(os.path.join(client_path, filename))
+
+    def _design(inputs):
+        return {"theme.json": (yield from _visual_designer_steps(client_path))}
+
+    def _route(inputs):
+        return {"niche": (yield from _route_steps(client_id, inputs["intake.md"], client_path))}
+
+    def _strategize(inputs):
+        _log_aligned("info", "🏗️", "Architect", f"analyzing {client_id}...")
+        job_queue.set_stage(client_id, "architect")
+        with time_tracker.track_span("pipeline_architect", client_id, {"stage": "architect"}):
+            yield from _write_brief_steps(client_path, inputs["intake.md"], inputs["niche"])
+
+    def _copywrite(inputs):
+        yield from _write_content_steps(client_path)
+
+    def _build(inputs):
+        return {"qa_result": (yield from _blocking_steps(_build_page, client_path))}
+
+    def _finalize(inputs):
+        if inputs["qa_result"] is None:
+            # Builder skipped an existing page - nothing new to ship, unless
+            # the last run built it but failed to commit it
+            attempts, pending = job_queue.resume_point(client_id, "finalize")
+            if not attempts:
+                return
+            inputs = {"qa_result": (pending.get("qa_status", "PASS"), pending.get("qa_report", ""))}
+        qa_status, qa_report = inputs["qa_result"]
+        yield from _blocking_steps(finalize_client, client_path, qa_status, qa_report)
+
+    def node(name, stage, **kwargs):
+        return Node(name, lambda inputs: drive(name, stage(inputs)), **kwargs)
+
+    return [
+        node("visual_designer", _design, requires=("intake.md",), produces=("theme.json",),
+             optional=True, skip_if=_exists("theme.json")),
+        node("router", _route, requires=("intake.md",), produces=("niche",),
+             skip_if=_exists("brief.md")),
+        node("strategist", _strategize, requires=("intake.md", "niche"), produces=("brief.md",),
+             skip_if=_exists("brief.md")),
+        node("copywriter", _copywrite, requires=("brief.md",), produces=("content.md",),
+             skip_if=_exists("content.md")),
+        node("builder", _build, requires=("brief.md", "content.md", "theme.json"), produces=("qa_result",)),
+        node("finalize", _finalize, requires=("qa_result",)),
+    ]
+
+
+def _log_pipeline_report(client_id, report, mode=""):
+    """Log a pipeline run's failures, critical path and per-stage timings."""
+    for result in report.failed:
+        if result.optional:
+            _log_aligned("warning", "⚠️", "Pipeline", f"{result.name} failed ({result.error}), continuing without it")
+    critical = report.critical_path()
+    if critical:
+        critical_seconds = sum(report.results[name].seconds for name in critical)
+        _log_aligned("info", "🧭", "Pipeline", f"{client_id} took {report.wall_seconds:.1f}s{mode}; critical path {critical_seconds:.1f}s")
+        _log_aligned("info", "🧭", "Critical path", " -> ".join(critical))
+    for line in report.summary_lines():
+        _log_aligned("info", "🧭", "Pipeline", line)
+
+
+def _read_intake(client_path):
+    with open(os.path.join(client_path, "intake.md"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def run_pipeline(client_path):
+    """
+    Run every stage for one client as a DAG instead of a chain of nested calls.
+
+    Stages start as soon as the artifacts they need exist, so the Visual
+    Designer (which only needs intake.md) overlaps the Router, Strategist and
+    Copywriter, and only the Builder waits for theme.json. Stages whose output
+    already exists are skipped, so a re-run resumes where the last one stopped.
+    The per-stage timings and critical path are logged after the run.
+
+    Parameters:
+        client_path (str): Filesystem path to the client's directory (must contain intake.md)
+
+    Returns:
+        DagReport: Per-node status and timings
+
+    Raises:
+        Exception: The first failure of a required stage (a failing Visual
+                   Designer is logged and the page is built without a theme).
+    """
+    client_id = os.path.basename(client_path)
+    # Validate client ID to prevent path traversal
+    validate_client_id_or_raise(client_id, "run_pipeline")
+
+    nodes = _pipeline_nodes(client_path, lambda name, steps: _run_llm_steps(steps))
+    report = run_dag(nodes, initial={"intake.md": _read_intake(client_path)},
+                     thread_name_prefix=f"pipeline-{client_id}")
+    _log_pipeline_report(client_id, report)
+    report.raise_for_failure()
+    return report
+
+
+async def run_pipeline_async(client_path, builder_slots=None):
+    """
+    Asyncio-native twin of run_pipeline for running many clients in one process.
+
+    Schedules the same stage graph (_pipeline_nodes) with run_dag_async. The
+    LLM stages run on the event loop through AsyncAnthropic, so an in-flight
+    generation holds no thread; their file and database I/O between requests
+    runs in worker threads. The Builder (TypeScript check and Playwright QA)
+    and finalize (git) are blocking and run in worker threads, capped by
+    `builder_slots`.
+
+    Parameters:
+        client_path (str): Filesystem path to the client's directory (must contain intake.md)
+        builder_slots (asyncio.Semaphore): Shared cap on concurrent builder threads
+
+    Returns:
+        DagReport: Per-node status and timings
+
+    Raises:
+        Exception: The first failure of a required stage (a failing Visual
+                   Designer is logged and the page is built without a theme).
+    """
+    client_id = os.path.basename(client_path)
+    # Validate client ID to prevent path traversal
+    validate_client_id_or_raise(client_id, "run_pipeline_async")
+    builder_slots = builder_slots or asyncio.Semaphore(ASYNC_MAX_BUILDERS)
+
+    async def drive(name, steps):
+        if name in ("builder", "finalize"):
+            async with builder_slots:
+                return await _run_llm_steps_async(steps)
+        return await _run_llm_steps_async(steps)
+
+    intake = await asyncio.to_thread(_read_intake, client_path)
+    report = await run_dag_async(_pipeline_nodes(client_path, drive), initial={"intake.md": intake})
+    _log_pipeline_report(client_id, report, " (async)")
+    report.raise_for_failure()
+    return report
+
+
+async def process_client_async(client_id: str, builder_slots=None) -> bool:
+    """
+    Async twin of process_client: run one client's pipeline under its lock.
+
+    Returns:
+        bool: True if the pipeline ran to completion, False if it crashed,
+        None if another worker holds the client's lock (skipped, not failed)
+    """
+    path = os.path.join(WATCH_DIR, client_id)
+    _log_aligned("info", "🚀", "Batch loop", f"Found pending job: {client_id}")
+    acquired = False
+    try:
+        with client_lock(client_id):
+            acquired = True
+            # Job queue writes are SQLite transactions - keep them off the event loop
+            await asyncio.to_thread(job_queue.mark_running, client_id)
+            try:
+                await run_pipeline_async(path, builder_slots)
+            finally:
+                # No-op once finalize_client marked the job done
+                await asyncio.to_thread(job_queue.release, client_id)
+        return True
+    except RuntimeError as e:
+        if acquired:
+            _log_aligned("error", "❌", "Batch loop", f"Pipeline crashed for {client_id}: {e}")
+            await asyncio.to_thread(job_queue.release, client_id, str(e))
+            return False
+        # Lock acquisition failed - another instance is processing
+        _log_aligned("info", "⏸️", "Batch loop", f"Could not acquire lock for {client_id}, skipping")
+        return None
+    except Exception as e:
+        _log_aligned("error", "❌", "Batch loop", f"Pipeline crashed for {client_id}: {e}")
+        await asyncio.to_thread(job_queue.release, client_id, str(e))
+    return False
+
+
+def run_async_batch(client_ids: list, max_in_flight: int = DEFAULT_JOBS) -> list:
+    """
+    Run up to `max_in_flight` client pipelines concurrently on one event loop.
+
+    Unlike run_batch, in-flight pipelines waiting on the API hold no thread,
+    so max_in_flight can be in the dozens; total LLM concurrency is capped by
+    ASYNC_MAX_LLM_CALLS and builder threads by ASYNC_MAX_BUILDERS.
+
+    Returns:
+        list: process_client_async result per client, in input order
+    """
+    max_in_flight = max(1, int(max_in_flight))
+
+    async def _run_all():
+        pipeline_slots = asyncio.Semaphore(max_in_flight)
+        builder_slots = asyncio.Semaphore(ASYNC_MAX_BUILDERS)
+
+        async def _one(client_id):
+            async with pipeline_slots:
+                return await process_client_async(client_id, builder_slots)
+
+        try:
+            return await asyncio.gather(*(_one(client_id) for client_id in client_ids))
+        finally:
+            await _close_async_llm_resources()
+
+    start = time.monotonic()
+    results = asyncio.run(_run_all())
+    if len(client_ids) > 1:
+        _log_aligned("info", "📊", "Async batch", f"{len(client_ids)} client(s) in {time.monotonic() - start:.1f}s ({max_in_flight} in flight)")
+    return results
+
+
+def process_client(client_id: str) -> bool:
+    """
+    Run the full pipeline for one client under its lock.
+
+    Lock contention and pipeline crashes are logged, never raised, so one
+    client cannot take down the other workers in the pool.
+
+    Returns:
+        bool: True if the pipeline ran to completion, False if it crashed,
+        None if another worker holds the client's lock (skipped, not failed)
+    """
+    path = os.path.join(WATCH_DIR, client_id)
+    _log_aligned("info", "🚀", "Batch loop", f"Found pending job: {client_id}")
+    acquired = False
+    try:
+        # Acquire lock before processing
+        with client_lock(client_id):
+            acquired = True
+            job_queue.mark_running(client_id)
+            try:
+                run_pipeline(path)
+            finally:
+                # No-op once finalize_client marked the job done
+                job_queue.release(client_id)
+        return True
+    except RuntimeError as e:
+        if acquired:
+            # The pipeline itself raised (e.g. a stage gave up), not the lock
+            _log_aligned("error", "❌", "Batch loop", f"Pipeline crashed for {client_id}: {e}")
+            job_queue.release(client_id, error=str(e))
+            return False
+        # Lock acquisition failed - another instance is processing
+        _log_aligned("info", "⏸️", "Batch loop", f"Could not acquire lock for {client_id}, skipping")
+        return None
+    except Exception as e:
+        _log_aligned("error", "❌", "Batch loop", f"Pipeline crashed for {client_id}: {e}")
+        job_queue.release(client_id, error=str(e))
+        # Since we didn't rename intake.md, it will be retried next loop from its checkpoint
+    return False
+
+
+def run_batch(client_ids: list, jobs: int = DEFAULT_JOBS):
+    """
+    Process pending clients, dispatching them to up to `jobs` worker threads.
+
+    Each worker honors the per-client lock from lock_utils, so running several
+    factory instances side by side stays safe. Per-worker utilization is
+    logged when more than one worker is used.
+
+    Returns:
+        PoolReport: Wall time and per-worker busy time for the batch
+    """
+    jobs = max(1, int(jobs))
+    if jobs > 1 and len(client_ids) > 1:
+        _log_aligned("info", "👷", "Worker pool", f"dispatching {len(client_ids)} client(s) to {min(jobs, len(client_ids))} workers")
+
+    report = run_pool(client_ids, process_client, jobs=jobs)
+
+    if jobs > 1 and report.workers:
+        busy_total = sum(w.busy_seconds for w in report.workers.values())
+        speedup = busy_total / report.wall_seconds if report.wall_seconds > 0 else 0.0
+        _log_aligned("info", "📊", "Worker pool", f"{report.jobs} job(s) in {report.wall_seconds:.1f}s ({speedup:.1f}x vs serial)")
+        for line in report.summary_lines():
+            _log_aligned("info", "📊", "Worker pool", line)
+    return report
+
+
+def run_watch_mode(jobs: int = DEFAULT_JOBS):
+    """
+    Event-driven main loop: start a client's pipeline as soon as its intake lands.
+
+    An IntakeWatcher reports settled `intake.md` / `intake-raw.md` files; raw
+    intakes are sanitized (which writes intake.md and triggers a second event)
+    and structured intakes are dispatched to a pool of `jobs` workers. Every
+    BATCH_INTERVAL we still git pull (pulled intakes then arrive as file events)
+    and reconcile with a directory scan, so failed pipelines are retried and
+    missed events cannot strand a client.
+    """
+    jobs = max(1, int(jobs))
+    events = queue.Queue()
+    in_flight = set()
+    in_flight_lock = threading.Lock()
+
+    def _on_intake(client_id, filename):
+        events.put((client_id, filename, time.monotonic()))
+
+    def _run_client(client_id, queued_at):
+        try:
+            wait = time.monotonic() - queued_at
+            _log_aligned("info", "⚡", "Watcher", f"starting {client_id} {wait:.2f}s after its intake settled")
+            process_client(client_id)
+        finally:
+            with in_flight_lock:
+                in_flight.discard(client_id)
+
+    def _dispatch(client_id, queued_at):
+        path = os.path.join(WATCH_DIR, client_id)
+        if not os.path.exists(os.path.join(path, "intake.md")):
+            return
+        job_queue.enqueue(client_id)
+        with in_flight_lock:
+            if client_id in in_flight:
+                return
+            in_flight.add(client_id)
+        if is_locked(client_id):
+            _log_aligned("info", "⏸️", "Watcher", f"Client {client_id} is already being processed, skipping")
+            with in_flight_lock:
+                in_flight.discard(client_id)
+            return
+        executor.submit(_run_client, client_id, queued_at)
+
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="factory-worker")
+    watcher = IntakeWatcher(WATCH_DIR, _on_intake, debounce_seconds=INTAKE_DEBOUNCE_SECONDS)
+    watcher.start()
+    _log_aligned("info", "👀", "Watcher", f"watching {WATCH_DIR} for intakes ({jobs} worker(s))")
+
+    next_reconcile = 0.0
+    try:
+        while True:
+            if time.monotonic() >= next_reconcile:
+                # Pulled and sanitized intakes also arrive as watcher events;
+                # the rescan is the safety net for missed events
+                for client_id in _poll_intakes():
+                    _dispatch(client_id, time.monotonic())
+                next_reconcile = time.monotonic() + BATCH_INTERVAL
+
+            try:
+                client_id, filename, queued_at = events.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            if filename == "intake-raw.md":
+                # Writes intake.md, which the watcher reports as its own event
+                sanitize_client_intake(client_id)
+            else:
+                _dispatch(client_id, queued_at)
+    except KeyboardInterrupt:
+        _log_aligned("info", "🛑", "Watcher", "stopping...")
+    finally:
+        watcher.stop()
+        executor.shutdown(wait=True)
+
+
+def _parse_args(argv=None):
+    """Parse factory command-line arguments."""
+    parser = argparse.ArgumentParser(description="Ghost Factory pipeline")
+    parser.add_argument("client_id", nargs="?", help="Process a single client and exit")
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=DEFAULT_JOBS,
+        help=f"Number of clients to process concurrently in the batch loop (default: {DEFAULT_JOBS})"
+    )
+    parser.add_argument(
+        "--watch", action="store_true",
+        help="Start pipelines as soon as intake files land instead of polling every BATCH_INTERVAL"
+    )
+    parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="Run the batch on one asyncio event loop; --jobs then sets how many pipelines are in flight"
+    )
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    if args.use_async and args.watch:
+        parser.error("--async cannot be combined with --watch")
+    return args
+
 
 # 4. MAIN BATCH LOOP
 if __name__ == "__main__":
+    args = _parse_args()
+
     print("\n🏭  FACTORY V4.0 ONLINE: Self-Correcting & Evolutionary Mode  🏭")
     print("    Features: Memory System | Syntax Guard | Visual Repair | A11y Critic")
 
@@ -2663,9 +4384,18 @@ if __name__ == "__main__":
         _log_aligned("error", "❌", "Startup", f"Playwright install failed: {e}")
         _log_aligned("warning", "⚠️", "Startup", "Visual QA may fail.")
 
+    # Perceptual hashing and tiling quietly fall back to full-price vision calls without Pillow
+    if not screenshot_utils.PIL_AVAILABLE:
+        _log_aligned("warning", "⚠️", "Startup", "Pillow not installed: QA screenshots are sent untiled and the vision cache is off (pip install -r requirements.txt)")
+
+    # Jobs left 'running' by a crash resume from their last checkpoint
+    recovered = job_queue.recover_interrupted()
+    if recovered:
+        _log_aligned("info", "♻️", "Startup", f"Resuming {recovered} interrupted job(s) from checkpoints")
+
     # Check for command-line argument (client ID)
-    if len(sys.argv) > 1:
-        client_id_arg = sys.argv[1]
+    if args.client_id:
+        client_id_arg = args.client_id
         if is_valid_client_id(client_id_arg):
             # Use absolute path to avoid Windows path issues
             base_dir = os.path.abspath(WATCH_DIR)
@@ -2675,7 +4405,7 @@ if __name__ == "__main__":
                 _log_aligned("info", "🚀", "CLI", f"Processing client from command line: {client_id_arg}")
                 try:
                     with client_lock(client_id_arg):
-                        run_architect(client_path)
+                        run_pipeline(client_path)
                     _log_aligned("info", "✅", "CLI", f"Completed processing for {client_id_arg}")
                     exit(0)
                 except RuntimeError as e:
@@ -2691,40 +4421,21 @@ if __name__ == "__main__":
             _log_aligned("error", "❌", "CLI", f"Invalid client ID: {client_id_arg}")
             exit(1)
 
-    while True:
-        has_new_data = git_pull()
-        run_intake_sanitizer()
+    if args.watch:
+        run_watch_mode(jobs=args.jobs)
+        exit(0)
 
-        if os.path.exists(WATCH_DIR):
-            for client_id in os.listdir(WATCH_DIR):
-                # Skip dotfiles
-                if client_id.startswith("."):
-                    continue
+    if args.use_async:
+        _log_aligned("info", "👷", "Startup", f"Async mode: up to {args.jobs} pipelines in flight, {ASYNC_MAX_LLM_CALLS} LLM calls")
+    elif args.jobs > 1:
+        _log_aligned("info", "👷", "Startup", f"Worker pool enabled: {args.jobs} concurrent clients")
 
-                # Validate client ID to prevent path traversal attacks
-                if not is_valid_client_id(client_id):
-                    _log_aligned("warning", "⚠️", "Batch loop", f"Skipping invalid client ID: {client_id}")
-                    continue
-                
-                # Check if client is already being processed
-                if is_locked(client_id):
-                    _log_aligned("info", "⏸️", "Batch loop", f"Client {client_id} is already being processed, skipping")
-                    continue
-                
-                path = os.path.join(WATCH_DIR, client_id)
-                # Look for unprocessed intake files
-                if os.path.isdir(path) and os.path.exists(f"{path}/intake.md"):
-                    _log_aligned("info", "🚀", "Batch loop", f"Found pending job: {client_id}")
-                    try:
-                        # Acquire lock before processing
-                        with client_lock(client_id):
-                            run_architect(path)
-                    except RuntimeError as e:
-                        # Lock acquisition failed - another instance is processing
-                        _log_aligned("info", "⏸️", "Batch loop", f"Could not acquire lock for {client_id}, skipping")
-                    except Exception as e:
-                        _log_aligned("error", "❌", "Batch loop", f"Pipeline crashed for {client_id}: {e}")
-                        # Since we didn't rename intake.md, it will be retried next loop
+    while True:
+        pending_clients = _poll_intakes()
+        if pending_clients and args.use_async:
+            run_async_batch(pending_clients, max_in_flight=args.jobs)
+        elif pending_clients:
+            run_batch(pending_clients, jobs=args.jobs)
 
         _log_aligned("info", "💤", "Batch loop", f"Batch complete. Sleeping for {BATCH_INTERVAL/60} minutes...")
-        time.sleep(BATCH_INTERVAL)
\ No newline at end of file
+        time.sleep(BATCH_INTERVAL)
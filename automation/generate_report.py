@@ -2,9 +2,10 @@ import argparse
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from automation.balance_sheet import compute_balance_sheet, _write_outputs  # type: ignore
+from automation.cost_tracker import critic_stats
 
 
 REPORTS_DIR = Path("reports")
@@ -18,7 +19,7 @@ def _format_currency(value: float) -> str:
     return f"${value:,.2f}"
 
 
-def build_report(month: str, data: Dict[str, Any]) -> str:
+def build_report(month: str, data: Dict[str, Any], critics: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
     totals = data.get("totals", {})
     running = data.get("running_balance", [])
 
@@ -46,6 +47,14 @@ def build_report(month: str, data: Dict[str, Any]) -> str:
     for point in running:
         lines.append(f"- {point['day']}: {_format_currency(point['balance_usd'])}")
 
+    if critics:
+        lines += ["", "## Critic Loops"]
+        for activity, row in sorted(critics.items()):
+            lines.append(
+                f"- {activity}: {row['reviews']} reviews, {row['retries']} retries, "
+                f"{row['minor_fails_accepted']} minor fails accepted ({row['minor_fail_accept_rate']:.0%} of FAIL verdicts)"
+            )
+
     return "\n".join(lines) + "\n"
 
 
@@ -60,7 +69,7 @@ def main() -> None:
 
     _ensure_dir(REPORTS_DIR)
     report_path = REPORTS_DIR / f"{args.month}-report.md"
-    report_content = build_report(args.month, data)
+    report_content = build_report(args.month, data, critic_stats(args.month))
     report_path.write_text(report_content, encoding="utf-8")
 
     logging.info(f"[report] Generated {report_path}")
@@ -0,0 +1,162 @@
+"""
+Event-driven intake discovery for the factory.
+
+Watches the clients directory with watchdog and reports a client as soon as
+its `intake.md` or `intake-raw.md` is created, modified or moved into place.
+Events are debounced per file: a client is only reported once the file has
+stopped changing (no new events and a stable size) for `debounce_seconds`,
+so partially written or still-syncing intakes are never picked up.
+"""
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+
+from automation.client_utils import is_valid_client_id
+
+
+INTAKE_FILENAMES = ("intake.md", "intake-raw.md")
+DEFAULT_DEBOUNCE_SECONDS = 0.5
+_POLL_INTERVAL_SECONDS = 0.05
+
+
+class _IntakeEventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "IntakeWatcher") -> None:
+        super().__init__()
+        self.watcher = watcher
+
+    def on_created(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.record_event(Path(event.src_path))
+
+    def on_modified(self, event: FileSystemEvent) -> None:
+        if not event.is_directory:
+            self.watcher.record_event(Path(event.src_path))
+
+    def on_moved(self, event: FileSystemEvent) -> None:
+        # Editors and git write to a temp file and rename it into place
+        if not event.is_directory:
+            self.watcher.record_event(Path(event.dest_path))
+
+
+class IntakeWatcher:
+    """
+    Report new or changed client intakes the moment they settle on disk.
+
+    The callback receives (client_id, filename) where filename is one of
+    INTAKE_FILENAMES. It runs on the watcher's debounce thread, so it should
+    be cheap (e.g. put the client on a queue).
+    """
+
+    def __init__(
+        self,
+        watch_dir: str,
+        on_intake: Callable[[str, str], None],
+        debounce_seconds: float = DEFAULT_DEBOUNCE_SECONDS,
+    ) -> None:
+        self.watch_dir = Path(watch_dir)
+        self.on_intake = on_intake
+        self.debounce_seconds = debounce_seconds
+        self._lock = threading.Lock()
+        self._observer: Optional[Observer] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # (client_id, filename) -> {"first_event", "last_event", "size"}
+        self._pending: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def start(self) -> None:
+        self.watch_dir.mkdir(parents=True, exist_ok=True)
+        observer = Observer()
+        observer.schedule(_IntakeEventHandler(self), str(self.watch_dir), recursive=True)
+        observer.start()
+        self._observer = observer
+        self._thread = threading.Thread(target=self._debounce_loop, name="intake-watcher", daemon=True)
+        self._thread.start()
+        logging.info(f"IntakeWatcher watching: {self.watch_dir}")
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def record_event(self, path: Path) -> None:
+        """Register a filesystem event; non-intake paths are ignored."""
+        key = self._intake_key(path)
+        if key is None:
+            return
+        now = time.monotonic()
+        size = self._file_size(path)
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {"first_event": now, "last_event": now, "size": size}
+            else:
+                entry["last_event"] = now
+                entry["size"] = size
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    @staticmethod
+    def _file_size(path: Path) -> float:
+        try:
+            return float(os.path.getsize(path))
+        except OSError:
+            return -1.0
+
+    def _intake_key(self, path: Path) -> Optional[Tuple[str, str]]:
+        """Return (client_id, filename) if path is clients/<client_id>/<intake file>."""
+        if path.name not in INTAKE_FILENAMES:
+            return None
+        try:
+            relative = path.resolve().relative_to(self.watch_dir.resolve())
+        except ValueError:
+            return None
+        # Only direct children of a client folder count (not clients/x/assets/intake.md)
+        if len(relative.parts) != 2:
+            return None
+        client_id = relative.parts[0]
+        if client_id.startswith(".") or not is_valid_client_id(client_id):
+            return None
+        return (client_id, path.name)
+
+    def _debounce_loop(self) -> None:
+        while not self._stop_event.wait(_POLL_INTERVAL_SECONDS):
+            self._flush_settled()
+
+    def _flush_settled(self) -> None:
+        now = time.monotonic()
+        ready = []
+        with self._lock:
+            for key, entry in list(self._pending.items()):
+                if now - entry["last_event"] < self.debounce_seconds:
+                    continue
+                client_id, filename = key
+                size = self._file_size(self.watch_dir / client_id / filename)
+                if size < 0:
+                    # File vanished (renamed to -processed, deleted) before settling
+                    del self._pending[key]
+                    continue
+                if size != entry["size"]:
+                    # Size changed without an event reaching us yet - wait another window
+                    entry["size"] = size
+                    entry["last_event"] = now
+                    continue
+                del self._pending[key]
+                ready.append((client_id, filename, now - entry["first_event"]))
+
+        for client_id, filename, latency in ready:
+            logging.debug(f"IntakeWatcher: {client_id}/{filename} settled after {latency:.2f}s")
+            try:
+                self.on_intake(client_id, filename)
+            except Exception as exc:
+                logging.error(f"IntakeWatcher callback failed for {client_id}/{filename}: {exc}")
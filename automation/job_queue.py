@@ -0,0 +1,273 @@
+"""
+Persistent job queue with stage checkpoints for the factory pipeline.
+
+Pipeline progress used to be inferred from which files existed (brief.md,
+content.md, page.tsx), so a crash mid-builder lost every attempt and its
+syntax/QA feedback. This module keeps one row per client in a WAL-mode
+SQLite database under data/ recording the status, current stage, attempt
+number, last feedback and timestamps. A restarted factory resumes at the
+exact stage and attempt, and "what is pending" is an indexed query instead
+of a directory scan.
+
+Every public function is best-effort: database errors are logged and never
+raised, so a broken queue degrades to the old file-based behavior instead of
+stopping the pipeline.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+DB_PATH = Path("data/jobs.db")
+
+STAGES = ("architect", "copywriter", "builder", "finalize")
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    client_id     TEXT PRIMARY KEY,
+    status        TEXT NOT NULL,
+    stage         TEXT NOT NULL,
+    attempt       INTEGER NOT NULL DEFAULT 0,
+    last_feedback TEXT,
+    last_error    TEXT,
+    created_at    REAL NOT NULL,
+    updated_at    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, updated_at);
+"""
+
+# Paths whose schema has been created in this process
+_initialized: set = set()
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    """Open a short-lived connection; SQLite handles cross-process locking."""
+    db_path = Path(DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    # isolation_level=None: autocommit, each statement is its own transaction
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    try:
+        key = str(db_path.resolve())
+        with _init_lock:
+            if key not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized.add(key)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+    job = dict(row)
+    feedback = job.get("last_feedback")
+    if feedback:
+        try:
+            job["last_feedback"] = json.loads(feedback)
+        except json.JSONDecodeError:
+            job["last_feedback"] = None
+    return job
+
+
+def _upsert(conn: sqlite3.Connection, client_id: str, status: str, stage: str, now: float) -> None:
+    conn.execute(
+        "INSERT OR IGNORE INTO jobs (client_id, status, stage, attempt, created_at, updated_at) "
+        "VALUES (?, ?, ?, 0, ?, ?)",
+        (client_id, status, stage, now, now),
+    )
+
+
+def enqueue(client_id: str) -> bool:
+    """
+    Add a client to the queue (idempotent).
+
+    New clients start pending at the architect stage. A client already marked
+    done is re-queued from scratch (a new intake arrived); pending or running
+    clients keep their checkpoint.
+
+    Returns:
+        True if the client is now pending or running, False on database error
+    """
+    now = time.time()
+    try:
+        with _connect() as conn:
+            _upsert(conn, client_id, STATUS_PENDING, STAGES[0], now)
+            conn.execute(
+                "UPDATE jobs SET status = ?, stage = ?, attempt = 0, last_feedback = NULL, "
+                "last_error = NULL, updated_at = ? WHERE client_id = ? AND status = ?",
+                (STATUS_PENDING, STAGES[0], now, client_id, STATUS_DONE),
+            )
+        return True
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to enqueue {client_id}: {exc}")
+        return False
+
+
+def mark_running(client_id: str) -> None:
+    """Mark a client as being processed by this instance."""
+    now = time.time()
+    try:
+        with _connect() as conn:
+            _upsert(conn, client_id, STATUS_RUNNING, STAGES[0], now)
+            conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE client_id = ?",
+                (STATUS_RUNNING, now, client_id),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to mark {client_id} running: {exc}")
+
+
+def set_stage(client_id: str, stage: str) -> None:
+    """
+    Record that a client entered a pipeline stage.
+
+    Moving to a different stage resets the attempt counter and feedback;
+    re-entering the current stage (a resume) keeps its checkpoint.
+    """
+    if stage not in STAGES:
+        raise ValueError(f"Unknown pipeline stage: {stage}")
+    now = time.time()
+    try:
+        with _connect() as conn:
+            _upsert(conn, client_id, STATUS_RUNNING, stage, now)
+            conn.execute(
+                "UPDATE jobs SET attempt = 0, last_feedback = NULL WHERE client_id = ? AND stage != ?",
+                (client_id, stage),
+            )
+            conn.execute(
+                "UPDATE jobs SET stage = ?, status = ?, updated_at = ? WHERE client_id = ?",
+                (stage, STATUS_RUNNING, now, client_id),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to record stage {stage} for {client_id}: {exc}")
+
+
+def checkpoint(client_id: str, stage: str, attempt: int, feedback: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Persist the last completed attempt of a stage and the feedback for the next one.
+
+    Parameters:
+        client_id: The client being processed
+        stage: One of STAGES
+        attempt: Number of attempts completed so far
+        feedback: JSON-serializable feedback to replay on resume (e.g. syntax/visual errors)
+    """
+    now = time.time()
+    payload = json.dumps(feedback) if feedback else None
+    try:
+        with _connect() as conn:
+            _upsert(conn, client_id, STATUS_RUNNING, stage, now)
+            conn.execute(
+                "UPDATE jobs SET stage = ?, attempt = ?, last_feedback = ?, updated_at = ? WHERE client_id = ?",
+                (stage, attempt, payload, now, client_id),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to checkpoint {client_id}: {exc}")
+
+
+def resume_point(client_id: str, stage: str) -> Tuple[int, Dict[str, Any]]:
+    """
+    Return (attempts_completed, feedback) to resume `stage` from.
+
+    Returns (0, {}) when there is nothing to resume: no row, a finished job,
+    or a checkpoint for a different stage.
+    """
+    job = get_job(client_id)
+    if not job or job["status"] == STATUS_DONE or job["stage"] != stage:
+        return 0, {}
+    return int(job["attempt"] or 0), job.get("last_feedback") or {}
+
+
+def mark_done(client_id: str) -> None:
+    """Mark a client's pipeline as finished."""
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = NULL, updated_at = ? WHERE client_id = ?",
+                (STATUS_DONE, now, client_id),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to mark {client_id} done: {exc}")
+
+
+def release(client_id: str, error: Optional[str] = None) -> None:
+    """
+    Return an unfinished client to the pending set, keeping its checkpoint.
+
+    Used when a pipeline crashes or stops early; finished jobs are left alone.
+    """
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, last_error = ?, updated_at = ? WHERE client_id = ? AND status != ?",
+                (STATUS_PENDING, error, now, client_id, STATUS_DONE),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to release {client_id}: {exc}")
+
+
+def recover_interrupted() -> int:
+    """
+    Return jobs left 'running' by a crashed process to the pending set.
+
+    Call once at startup. Jobs still owned by another live instance are
+    protected by their client lock, so re-queuing them is harmless.
+
+    Returns:
+        Number of jobs recovered
+    """
+    try:
+        with _connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE status = ?",
+                (STATUS_PENDING, time.time(), STATUS_RUNNING),
+            )
+            return cursor.rowcount
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to recover interrupted jobs: {exc}")
+        return 0
+
+
+def pending_clients() -> Optional[List[str]]:
+    """
+    Return pending client IDs, oldest first (indexed by status).
+
+    Returns:
+        List of client IDs, or None if the database cannot be read (callers
+        fall back to scanning the clients directory)
+    """
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                "SELECT client_id FROM jobs WHERE status = ? ORDER BY updated_at",
+                (STATUS_PENDING,),
+            ).fetchall()
+        return [row["client_id"] for row in rows]
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to list pending jobs: {exc}")
+        return None
+
+
+def get_job(client_id: str) -> Optional[Dict[str, Any]]:
+    """Return a client's job row (with last_feedback decoded), or None."""
+    try:
+        with _connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE client_id = ?", (client_id,)).fetchone()
+        return _row_to_job(row) if row else None
+    except sqlite3.Error as exc:
+        logging.warning(f"Job queue: failed to read job for {client_id}: {exc}")
+        return None
@@ -0,0 +1,213 @@
+"""
+Content-addressed on-disk cache for LLM responses.
+
+Re-running a client (after deleting brief.md, while iterating on prompts, or
+replaying in CI) re-issues identical requests. When enabled, responses are
+stored under data/llm_cache keyed by a SHA-256 of the provider, model and
+request parameters (system prompt, messages, max_tokens, ...). Entries expire
+after a TTL and the store is kept under a size bound by evicting the least
+recently used files (access refreshes a file's mtime).
+
+Opt-in via environment variables:
+    GF_LLM_CACHE=true            enable the cache
+    GF_LLM_CACHE_MAX_MB=200      size bound for the store
+    GF_LLM_CACHE_TTL_HOURS=168   entry lifetime
+
+Only the parts of a response the pipeline reads are stored (text blocks,
+usage and stop reason); hits are rebuilt as lightweight objects with
+`cache_hit = True` so cost tracking can record them at $0.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+from automation.file_utils import atomic_write
+
+
+CACHE_DIR = Path("data/llm_cache")
+DEFAULT_MAX_MB = 200
+DEFAULT_TTL_HOURS = 168
+
+# Serializes eviction so parallel workers don't race deleting the same files
+_EVICT_LOCK = threading.Lock()
+
+
+def is_enabled() -> bool:
+    return os.getenv("GF_LLM_CACHE", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _max_bytes() -> int:
+    try:
+        return int(float(os.getenv("GF_LLM_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+    except ValueError:
+        return DEFAULT_MAX_MB * 1024 * 1024
+
+
+def _ttl_seconds() -> float:
+    try:
+        return float(os.getenv("GF_LLM_CACHE_TTL_HOURS", DEFAULT_TTL_HOURS)) * 3600
+    except ValueError:
+        return DEFAULT_TTL_HOURS * 3600.0
+
+
+def cache_key(provider: str, model: str, **params: Any) -> str:
+    """
+    Hash a request into a stable cache key.
+
+    `params` are the request parameters that affect the output (system,
+    messages, max_tokens, temperature, ...); they are serialized with sorted
+    keys so argument order does not matter.
+    """
+    canonical = json.dumps(
+        {"provider": provider, "model": model, "params": params},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    # Two-level fan-out keeps directories small
+    return CACHE_DIR / key[:2] / f"{key}.json"
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Return the cached payload for a key, or None on miss/expiry/corruption."""
+    path = _entry_path(key)
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, json.JSONDecodeError) as exc:
+        logging.warning(f"LLM cache: unreadable entry {path.name}: {exc}")
+        _remove(path)
+        return None
+
+    if time.time() - entry.get("created_at", 0) > _ttl_seconds():
+        _remove(path)
+        return None
+
+    # Refresh mtime so LRU eviction keeps recently used entries
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+    return entry.get("payload")
+
+
+def put(key: str, payload: Dict[str, Any]) -> None:
+    """Store a payload and evict old entries if the store is over its size bound."""
+    entry = {"created_at": time.time(), "payload": payload}
+    if atomic_write(str(_entry_path(key)), json.dumps(entry, ensure_ascii=False)):
+        evict()
+
+
+def evict(max_bytes: Optional[int] = None) -> int:
+    """
+    Delete expired entries, then least recently used ones until under max_bytes.
+
+    Returns:
+        Number of entries removed
+    """
+    max_bytes = _max_bytes() if max_bytes is None else max_bytes
+    ttl = _ttl_seconds()
+    now = time.time()
+    removed = 0
+    with _EVICT_LOCK:
+        files = []
+        for path in CACHE_DIR.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > ttl:
+                # Not even read within the TTL, so it is certainly expired
+                _remove(path)
+                removed += 1
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            removed += 1
+    return removed
+
+
+def _remove(path: Path) -> None:
+    try:
+        path.unlink()
+    except OSError:
+        pass
+
+
+def anthropic_payload(response: Any) -> Optional[Dict[str, Any]]:
+    """Extract the cacheable parts of an Anthropic Message; None if it has no text."""
+    texts: List[str] = []
+    for block in getattr(response, "content", None) or []:
+        text = getattr(block, "text", None)
+        if text:
+            texts.append(text)
+    if not texts:
+        return None
+    usage = getattr(response, "usage", None)
+    return {
+        "provider": "anthropic",
+        "texts": texts,
+        "stop_reason": getattr(response, "stop_reason", None),
+        "input_tokens": getattr(usage, "input_tokens", None),
+        "output_tokens": getattr(usage, "output_tokens", None),
+    }
+
+
+def openai_payload(response: Any) -> Optional[Dict[str, Any]]:
+    """Extract the cacheable parts of an OpenAI ChatCompletion; None if it has no text."""
+    try:
+        choice = response.choices[0]
+        text = choice.message.content
+    except (AttributeError, IndexError, TypeError):
+        return None
+    if not isinstance(text, str) or not text:
+        return None
+    usage = getattr(response, "usage", None)
+    return {
+        "provider": "openai",
+        "texts": [text],
+        "stop_reason": getattr(choice, "finish_reason", None),
+        "input_tokens": getattr(usage, "prompt_tokens", None),
+        "output_tokens": getattr(usage, "completion_tokens", None),
+    }
+
+
+def to_response(payload: Dict[str, Any]) -> SimpleNamespace:
+    """Rebuild a response object shaped like the provider's, flagged as a cache hit."""
+    if payload.get("provider") == "openai":
+        return SimpleNamespace(
+            choices=[SimpleNamespace(
+                message=SimpleNamespace(content=payload["texts"][0]),
+                finish_reason=payload.get("stop_reason"),
+            )],
+            usage=SimpleNamespace(
+                prompt_tokens=payload.get("input_tokens"),
+                completion_tokens=payload.get("output_tokens"),
+            ),
+            cache_hit=True,
+        )
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text) for text in payload["texts"]],
+        stop_reason=payload.get("stop_reason"),
+        usage=SimpleNamespace(
+            input_tokens=payload.get("input_tokens"),
+            output_tokens=payload.get("output_tokens"),
+        ),
+        cache_hit=True,
+    )
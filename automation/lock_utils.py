@@ -13,6 +13,7 @@ from contextlib import contextmanager
 
 
 LOCK_TIMEOUT_SECONDS = 3600  # 1 hour - locks older than this are considered stale
+LOCK_WRITE_GRACE_SECONDS = 5  # An empty/unreadable lock younger than this is still being written
 LOCK_DIR = Path("data/locks")
 
 
@@ -27,12 +28,23 @@ def get_lock_path(client_id: str) -> Path:
     return LOCK_DIR / f"{client_id}.lock"
 
 
+def _remove_stale_lock(lock_path: Path) -> None:
+    try:
+        lock_path.unlink()
+    except OSError:
+        pass
+
+
 def is_locked(client_id: str) -> bool:
     """
     Check if a client is currently locked.
     
     Returns True if lock exists and is not stale, False otherwise.
-    Stale locks (older than LOCK_TIMEOUT_SECONDS) are considered unlocked.
+    Stale locks (older than LOCK_TIMEOUT_SECONDS) are removed and considered
+    unlocked. So are empty or unparseable lock files (a worker that crashed
+    between creating the file and writing its timestamp) once they are older
+    than LOCK_WRITE_GRACE_SECONDS by mtime; otherwise acquire_lock's exclusive
+    create would fail on them forever.
     
     Args:
         client_id: The client ID to check
@@ -41,33 +53,37 @@ def is_locked(client_id: str) -> bool:
         True if locked, False otherwise
     """
     lock_path = get_lock_path(client_id)
-    if not lock_path.exists():
-        return False
-    
     try:
+        mtime = lock_path.stat().st_mtime
         # Read timestamp from lock file
         with lock_path.open("r") as f:
             timestamp_str = f.read().strip()
-            if not timestamp_str:
-                # Empty lock file - consider it stale
-                return False
-            timestamp = float(timestamp_str)
-        
-        # Check if lock is stale
-        age = time.time() - timestamp
-        if age > LOCK_TIMEOUT_SECONDS:
-            logging.warning(f"⚠️ Stale lock detected for {client_id} (age: {age:.0f}s), removing")
-            try:
-                lock_path.unlink()
-            except OSError:
-                pass
-            return False
-        
-        return True
-    except (ValueError, OSError) as e:
+    except FileNotFoundError:
+        return False
+    except OSError as e:
         logging.warning(f"⚠️ Error reading lock file for {client_id}: {e}, considering unlocked")
         return False
 
+    try:
+        timestamp = float(timestamp_str)
+    except ValueError:
+        age = time.time() - mtime
+        if age < LOCK_WRITE_GRACE_SECONDS:
+            # Just created by another worker that has not written its timestamp yet
+            return True
+        logging.warning(f"⚠️ Empty or corrupt lock file for {client_id} (age: {age:.0f}s), removing")
+        _remove_stale_lock(lock_path)
+        return False
+
+    # Check if lock is stale
+    age = time.time() - timestamp
+    if age > LOCK_TIMEOUT_SECONDS:
+        logging.warning(f"⚠️ Stale lock detected for {client_id} (age: {age:.0f}s), removing")
+        _remove_stale_lock(lock_path)
+        return False
+
+    return True
+
 
 def acquire_lock(client_id: str) -> bool:
     """
@@ -81,15 +97,27 @@ def acquire_lock(client_id: str) -> bool:
     """
     if is_locked(client_id):
         return False
-    
+
     lock_path = get_lock_path(client_id)
+    try:
+        # O_EXCL makes creation atomic, so two workers (threads or processes)
+        # racing past is_locked() cannot both acquire the same client
+        fd = os.open(str(lock_path), os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+    except FileExistsError:
+        return False
+    except OSError as e:
+        logging.error(f"❌ Failed to create lock file for {client_id}: {e}")
+        return False
+
     try:
         # Write current timestamp to lock file
-        with lock_path.open("w") as f:
+        with os.fdopen(fd, "w") as f:
             f.write(str(time.time()))
         return True
     except OSError as e:
         logging.error(f"❌ Failed to create lock file for {client_id}: {e}")
+        # Do not leave an empty lock behind
+        _remove_stale_lock(lock_path)
         return False
 
 
@@ -13,6 +13,7 @@ import os
 import random
 import re
 import logging
+import threading
 import unicodedata
 from datetime import datetime
 from typing import Optional, List, Dict, Any, Tuple
@@ -23,6 +24,9 @@ RAW_ERRORS_PATH = os.path.join(DATA_MEMORY_DIR, "raw_errors.json")
 DYNAMIC_RULES_PATH = "./design-system/dynamic_rules.md"
 GOLDEN_SAMPLES_DIR = "./automation/memory/golden_samples"
 
+# Serializes read-modify-write of raw_errors.json when workers run in parallel
+_ERRORS_LOCK = threading.Lock()
+
 # Ensure directories exist on module load
 os.makedirs(DATA_MEMORY_DIR, exist_ok=True)
 os.makedirs(GOLDEN_SAMPLES_DIR, exist_ok=True)
@@ -178,16 +182,6 @@ def record_failure(category: str, issue: str, fix: str, metadata: Optional[Dict[
         bool: True if successfully recorded, False on error
     """
     try:
-        # Load existing errors or create empty list
-        errors = []
-        if os.path.exists(RAW_ERRORS_PATH):
-            with open(RAW_ERRORS_PATH, "r", encoding="utf-8") as f:
-                try:
-                    errors = json.load(f)
-                except json.JSONDecodeError as e:
-                    logging.warning(f"Corrupted raw_errors.json at {RAW_ERRORS_PATH}: {e}, starting fresh")
-                    errors = []
-
         # Create error record
         error_record = {
             "timestamp": datetime.utcnow().isoformat(),
@@ -197,11 +191,22 @@ def record_failure(category: str, issue: str, fix: str, metadata: Optional[Dict[
             "metadata": metadata or {}
         }
 
-        errors.append(error_record)
-
-        # Save back to file
-        with open(RAW_ERRORS_PATH, "w", encoding="utf-8") as f:
-            json.dump(errors, f, indent=2)
+        with _ERRORS_LOCK:
+            # Load existing errors or create empty list
+            errors = []
+            if os.path.exists(RAW_ERRORS_PATH):
+                with open(RAW_ERRORS_PATH, "r", encoding="utf-8") as f:
+                    try:
+                        errors = json.load(f)
+                    except json.JSONDecodeError as e:
+                        logging.warning(f"Corrupted raw_errors.json at {RAW_ERRORS_PATH}: {e}, starting fresh")
+                        errors = []
+
+            errors.append(error_record)
+
+            # Save back to file
+            with open(RAW_ERRORS_PATH, "w", encoding="utf-8") as f:
+                json.dump(errors, f, indent=2)
 
         # Format issue for terminal display
         # If it's a syntax error with TypeScript compilation output, format it human-readably
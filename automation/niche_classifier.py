@@ -0,0 +1,270 @@
+"""
+Local niche classifier in front of the LLM router.
+
+Every client used to pay a MODEL_ROUTER round trip in select_niche_persona
+just to pick one of five strategy prompts, on the critical path before the
+strategist can start. Most intakes are easy: a coffee roaster with a shop and
+shipping is ecommerce, a dentist with a service area is a local service.
+
+This module keeps a multinomial naive Bayes model over intake words, trained
+on past intakes and the niche the LLM router gave them (the niche.json files
+persisted next to each intake under clients/). A niche is identified by its
+strategy prompt (saas.md, ...), so router aliases such as SAAS and SAAS_B2B
+are one niche. Classifying is a dictionary lookup per word, so it answers in
+microseconds.
+
+Every niche the caller can route to is scored, learned or not, and the model
+is only trusted once each of them has enough routed intakes. Naive Bayes
+posteriors are badly overconfident (every word is treated as independent
+evidence, so a long intake scores 0.999+ either way), so the confidence used
+for the gate is calibrated on held-out data instead. Every learned intake is
+scored leave-one-out, and the confidence of a new prediction is the share of
+those the model was no more sure about that it still got right: a lower bound
+on its accuracy at this score, since surer predictions are not less accurate.
+An intake scored below everything seen in held-out data gets 0.5, as if
+nothing were known. The router LLM is only asked when that is not high enough:
+
+    GF_NICHE_CLASSIFIER=true          use the local classifier (default on)
+    GF_NICHE_CONFIDENCE=0.95          held-out accuracy needed to skip the LLM router
+    GF_NICHE_MIN_EXAMPLES=5           routed intakes needed per niche before it is trusted
+
+Only LLM-routed labels are learned from, so the classifier never trains on its
+own guesses. The chosen niche is persisted in niche.json next to the intake
+(by either path), so retries and re-runs never classify the same client twice.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from automation.file_utils import atomic_write
+
+
+NICHE_FILE = "niche.json"
+INTAKE_FILES = ("intake.md", "intake-processed.md")
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_MIN_EXAMPLES = 5
+SMOOTHING = 1.0  # Laplace smoothing for priors and word likelihoods
+
+_TOKEN = re.compile(r"[a-z][a-z0-9'-]{2,}")
+_STOPWORDS = frozenset(
+    "the and for with that this our are you your from have has was were will can all not but "
+    "they their them its into about more also any what who how why when where which would should "
+    "could been being than then there these those each other some such only very just".split()
+)
+
+
+def is_enabled() -> bool:
+    return os.getenv("GF_NICHE_CLASSIFIER", "true").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _confidence_threshold() -> float:
+    try:
+        return float(os.getenv("GF_NICHE_CONFIDENCE", DEFAULT_CONFIDENCE))
+    except ValueError:
+        return DEFAULT_CONFIDENCE
+
+
+def _min_examples() -> int:
+    try:
+        return int(os.getenv("GF_NICHE_MIN_EXAMPLES", DEFAULT_MIN_EXAMPLES))
+    except ValueError:
+        return DEFAULT_MIN_EXAMPLES
+
+
+def tokenize(text: str) -> Iterable[str]:
+    """Distinct content words of an intake (presence, not frequency, so repetition does not dominate)."""
+    return {token for token in _TOKEN.findall(text.lower()) if token not in _STOPWORDS}
+
+
+class NicheClassifier:
+    """Multinomial naive Bayes over intake words; safe to update and query from several threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.doc_counts: Counter = Counter()  # niche -> intakes learned
+        self.word_counts: Dict[str, Counter] = {}  # niche -> word -> intakes containing it
+        self.total_words: Counter = Counter()  # niche -> sum of word_counts[niche]
+        self.vocabulary: set = set()
+        self.documents: List[Tuple[FrozenSet[str], str]] = []  # Learned intakes, for held-out calibration
+        self._calibration: Dict[Tuple[str, ...], List[Tuple[float, bool]]] = {}  # niches -> (posterior, correct)
+
+    @property
+    def examples(self) -> int:
+        return sum(self.doc_counts.values())
+
+    def learn(self, text: str, niche: str) -> None:
+        tokens = tokenize(text)
+        with self._lock:
+            self.doc_counts[niche] += 1
+            self.word_counts.setdefault(niche, Counter()).update(tokens)
+            self.total_words[niche] += len(tokens)
+            self.vocabulary.update(tokens)
+            self.documents.append((frozenset(tokens), niche))
+            self._calibration.clear()
+
+    def _posteriors(self, tokens: Iterable[str], niches: Tuple[str, ...], held_out: Optional[str] = None) -> Dict[str, float]:
+        """
+        Posterior of every niche in `niches` (caller holds the lock).
+
+        held_out names the niche `tokens` were learned under, to score them as
+        if that intake had not been learned (leave-one-out).
+        """
+        total_docs = self.examples - (held_out is not None)
+        vocabulary_size = len(self.vocabulary) + 1
+        scores = {}
+        for niche in niches:
+            own = niche == held_out
+            counts = self.word_counts.get(niche, Counter())
+            docs = self.doc_counts[niche] - own
+            denominator = self.total_words[niche] - (len(tokens) if own else 0) + SMOOTHING * vocabulary_size
+            score = math.log((docs + SMOOTHING) / (total_docs + SMOOTHING * len(niches)))
+            for token in tokens:
+                # Words never seen in training carry no evidence for any niche;
+                # a held-out intake contained every one of its tokens, so they lose one count
+                if token in self.vocabulary:
+                    score += math.log((counts[token] - own + SMOOTHING) / denominator)
+            scores[niche] = score
+        # Normalize via log-sum-exp so long intakes do not underflow
+        top = max(scores.values())
+        total = sum(math.exp(score - top) for score in scores.values())
+        return {niche: math.exp(score - top) / total for niche, score in scores.items()}
+
+    def predict(self, text: str, niches: Optional[Iterable[str]] = None) -> Optional[Tuple[str, float]]:
+        """
+        Most likely niche for an intake.
+
+        Parameters:
+            text: Intake text
+            niches: Niches to score (default: those learned); unlearned ones
+                are scored on their smoothed prior
+
+        Returns:
+            (niche, raw naive Bayes posterior), or None before anything was learned
+        """
+        tokens = tokenize(text)
+        with self._lock:
+            if not self.doc_counts:
+                return None
+            posteriors = self._posteriors(tokens, tuple(sorted(set(niches or self.doc_counts))))
+        best = max(posteriors, key=posteriors.get)
+        return best, posteriors[best]
+
+    def calibrated(self, posterior: float, niches: Iterable[str]) -> float:
+        """
+        Held-out accuracy at a raw posterior.
+
+        Each learned intake is scored leave-one-out; of those whose top
+        posterior was at most `posterior`, returns the Laplace-smoothed share
+        that was predicted correctly (0.5 when there are none).
+        """
+        key = tuple(sorted(set(niches)))
+        with self._lock:
+            held_out = self._calibration.get(key)
+            if held_out is None:
+                held_out = []
+                for tokens, label in self.documents:
+                    if label not in key:
+                        continue
+                    posteriors = self._posteriors(tokens, key, held_out=label)
+                    best = max(posteriors, key=posteriors.get)
+                    held_out.append((posteriors[best], best == label))
+                self._calibration[key] = held_out
+        hits = [correct for score, correct in held_out if score <= posterior]
+        return (sum(hits) + 1) / (len(hits) + 2)
+
+
+def load_choice(client_path: str) -> Optional[Dict[str, Any]]:
+    """The niche persisted for a client, or None if it was never classified (or the file is unreadable)."""
+    path = os.path.join(client_path, NICHE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            choice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(choice, dict) or not choice.get("niche") or not choice.get("prompt"):
+        return None
+    return choice
+
+
+def save_choice(client_path: str, niche: str, prompt: str, source: str, confidence: Optional[float] = None) -> None:
+    """Persist the routed niche next to the intake ("source" is "router" or "local")."""
+    choice = {"niche": niche, "prompt": prompt, "source": source}
+    if confidence is not None:
+        choice["confidence"] = round(confidence, 4)
+    if not atomic_write(os.path.join(client_path, NICHE_FILE), json.dumps(choice, indent=2)):
+        logging.warning(f"[niche] could not save {NICHE_FILE} for {os.path.basename(client_path)}")
+
+
+def train_from_clients(clients_dir: str) -> NicheClassifier:
+    """Build a classifier from every client whose niche was chosen by the LLM router (keyed by strategy prompt)."""
+    classifier = NicheClassifier()
+    root = Path(clients_dir)
+    if not root.is_dir():
+        return classifier
+    for client_dir in sorted(p for p in root.iterdir() if p.is_dir()):
+        choice = load_choice(str(client_dir))
+        if not choice or choice.get("source") != "router":
+            continue
+        for name in INTAKE_FILES:
+            intake = client_dir / name
+            if intake.is_file():
+                try:
+                    classifier.learn(intake.read_text(encoding="utf-8"), choice["prompt"])
+                except (OSError, UnicodeDecodeError):
+                    pass
+                break
+    logging.info(f"[niche] trained on {classifier.examples} routed intakes from {clients_dir}")
+    return classifier
+
+
+_classifier: Optional[NicheClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier(clients_dir: str) -> NicheClassifier:
+    """The process-wide classifier (trained from clients_dir on first use)."""
+    global _classifier
+    with _classifier_lock:
+        if _classifier is None:
+            _classifier = train_from_clients(clients_dir)
+        return _classifier
+
+
+def classify(intake: str, clients_dir: str, niches: Iterable[str]) -> Optional[Tuple[str, float]]:
+    """
+    Classify an intake locally if the model is trusted and confident enough.
+
+    Parameters:
+        intake: Intake text
+        clients_dir: Where routed intakes are learned from on first use
+        niches: Every niche (strategy prompt) the router can choose
+
+    Returns:
+        (niche, calibrated confidence) when the LLM router can be skipped, otherwise None
+    """
+    if not is_enabled():
+        return None
+    niches = set(niches)
+    classifier = get_classifier(clients_dir)
+    if any(classifier.doc_counts[niche] < _min_examples() for niche in niches):
+        return None
+    prediction = classifier.predict(intake, niches)
+    if prediction is None:
+        return None
+    confidence = classifier.calibrated(prediction[1], niches)
+    if confidence < _confidence_threshold():
+        return None
+    return prediction[0], confidence
+
+
+def learn(intake: str, niche: str, clients_dir: str) -> None:
+    """Add an LLM-routed intake (niche = its strategy prompt) to the running classifier (call before save_choice, or it is counted twice)."""
+    if not is_enabled():
+        return
+    get_classifier(clients_dir).learn(intake, niche)
@@ -0,0 +1,324 @@
+"""
+Minimal DAG executor for the factory pipeline.
+
+Stages are declared as nodes that consume and produce named artifacts
+(`intake.md`, `brief.md`, `theme.json`, ...). A node starts as soon as every
+artifact it requires is available, so independent stages overlap instead of
+running in a fixed call chain. After the run, the report shows which chain of
+nodes gated the wall-clock time (the critical path).
+
+Node functions receive a dict of their input artifacts and may return a dict
+of produced artifact values; artifacts a node declares but does not return
+are recorded as None (useful for files written to disk).
+
+run_dag runs nodes on a thread pool; run_dag_async schedules the same graph
+as tasks on an event loop, for node functions that return coroutines.
+"""
+import asyncio
+import inspect
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+STATUS_OK = "ok"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+STATUS_BLOCKED = "blocked"
+
+
+@dataclass
+class Node:
+    """
+    One pipeline stage.
+
+    Attributes:
+        name: Unique node name (used in logs and the critical path)
+        func: Callable taking {artifact: value} for `requires`, returning an optional dict
+        requires: Artifacts that must be available before the node starts
+        produces: Artifacts the node makes available when it finishes
+        optional: If True, a failure is recorded but downstream nodes still run
+                  (its artifacts are then None)
+        skip_if: Optional predicate; when it returns True the node is not run
+                 and its artifacts are treated as already present
+    """
+    name: str
+    func: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]
+    requires: Tuple[str, ...] = ()
+    produces: Tuple[str, ...] = ()
+    optional: bool = False
+    skip_if: Optional[Callable[[], bool]] = None
+
+
+@dataclass
+class NodeResult:
+    name: str
+    status: str = STATUS_BLOCKED
+    optional: bool = False
+    started: float = 0.0
+    finished: float = 0.0
+    error: Optional[BaseException] = None
+
+    @property
+    def seconds(self) -> float:
+        return max(0.0, self.finished - self.started)
+
+
+@dataclass
+class DagReport:
+    """Outcome and timing of a DAG run."""
+    wall_seconds: float = 0.0
+    results: Dict[str, NodeResult] = field(default_factory=dict)
+    artifacts: Dict[str, Any] = field(default_factory=dict)
+    # node name -> names of the nodes producing its inputs
+    upstream: Dict[str, List[str]] = field(default_factory=dict)
+
+    @property
+    def failed(self) -> List[NodeResult]:
+        return [r for r in self.results.values() if r.status == STATUS_FAILED]
+
+    def raise_for_failure(self) -> None:
+        """Re-raise the first failure of a required (non-optional) node."""
+        for result in sorted(self.results.values(), key=lambda r: r.finished):
+            if result.status == STATUS_FAILED and not result.optional and result.error:
+                raise result.error
+
+    def critical_path(self) -> List[str]:
+        """
+        Return the chain of nodes that determined the wall-clock time.
+
+        Starting from the node that finished last, repeatedly step to the
+        upstream node that finished last (the one that actually gated the
+        start). Skipped and blocked nodes take no time and are left out.
+        """
+        ran = {n: r for n, r in self.results.items() if r.status in (STATUS_OK, STATUS_FAILED)}
+        if not ran:
+            return []
+        current = max(ran.values(), key=lambda r: r.finished).name
+        path = [current]
+        while True:
+            candidates = [ran[u] for u in self.upstream.get(current, []) if u in ran]
+            if not candidates:
+                break
+            current = max(candidates, key=lambda r: r.finished).name
+            path.append(current)
+        return list(reversed(path))
+
+    def summary_lines(self) -> List[str]:
+        """Human-readable per-node timings, in start order."""
+        lines = []
+        ordered = sorted(self.results.values(), key=lambda r: (r.started or float("inf"), r.name))
+        origin = min((r.started for r in ordered if r.started), default=0.0)
+        for result in ordered:
+            if result.status in (STATUS_OK, STATUS_FAILED):
+                lines.append(
+                    f"{result.name}: {result.status} {result.seconds:.1f}s "
+                    f"(+{result.started - origin:.1f}s)"
+                )
+            else:
+                lines.append(f"{result.name}: {result.status}")
+        return lines
+
+
+def _producers(nodes: List[Node], initial: Iterable[str]) -> Dict[str, str]:
+    """Map artifact -> producing node name, validating the graph."""
+    producers: Dict[str, str] = {}
+    names = set()
+    for node in nodes:
+        if node.name in names:
+            raise ValueError(f"Duplicate node name: {node.name}")
+        names.add(node.name)
+        for artifact in node.produces:
+            if artifact in producers:
+                raise ValueError(f"Artifact {artifact!r} produced by both {producers[artifact]} and {node.name}")
+            producers[artifact] = node.name
+
+    available = set(initial)
+    for node in nodes:
+        for artifact in node.requires:
+            if artifact not in producers and artifact not in available:
+                raise ValueError(f"Node {node.name} requires {artifact!r}, which nothing produces")
+
+    # Kahn's algorithm: every node must be reachable in topological order
+    upstream = {n.name: {producers[a] for a in n.requires if a in producers} for n in nodes}
+    done: set = set()
+    while len(done) < len(nodes):
+        ready = [name for name, deps in upstream.items() if name not in done and deps <= done]
+        if not ready:
+            cycle = sorted(set(upstream) - done)
+            raise ValueError(f"Pipeline graph has a cycle between: {', '.join(cycle)}")
+        done.update(ready)
+    return producers
+
+
+class _Schedule:
+    """Graph state shared by run_dag and run_dag_async: which nodes are ready, running or finished."""
+
+    def __init__(self, nodes: List[Node], initial: Optional[Dict[str, Any]]):
+        self.nodes = nodes
+        self.artifacts: Dict[str, Any] = dict(initial or {})
+        producers = _producers(nodes, self.artifacts)
+        self.by_name = {n.name: n for n in nodes}
+        self.report = DagReport(artifacts=self.artifacts)
+        self.report.upstream = {
+            n.name: sorted({producers[a] for a in n.requires if a in producers}) for n in nodes
+        }
+        for node in nodes:
+            self.report.results[node.name] = NodeResult(name=node.name, optional=node.optional)
+        self.lock = threading.Lock()
+        self.finished: Dict[str, str] = {}  # node name -> terminal status
+        self.running: set = set()
+
+    @property
+    def done(self) -> bool:
+        return len(self.finished) == len(self.nodes)
+
+    def inputs(self, node: Node) -> Dict[str, Any]:
+        with self.lock:
+            return {a: self.artifacts.get(a) for a in node.requires}
+
+    def _ready(self, node: Node) -> Optional[bool]:
+        """True: runnable, False: waiting, None: blocked by a failed input."""
+        for upstream in self.report.upstream[node.name]:
+            status = self.finished.get(upstream)
+            if status is None:
+                return False
+            if status in (STATUS_FAILED, STATUS_BLOCKED) and not self.by_name[upstream].optional:
+                return None
+        return True
+
+    def _complete(self, node: Node, status: str, produced: Optional[Dict[str, Any]] = None) -> None:
+        with self.lock:
+            for artifact in node.produces:
+                self.artifacts[artifact] = (produced or {}).get(artifact, self.artifacts.get(artifact))
+        self.finished[node.name] = status
+        self.report.results[node.name].status = status
+
+    def startable(self) -> List[Node]:
+        """
+        Mark blocked and skipped nodes, then return the nodes that can start now
+        (recorded as running).
+        """
+        started = []
+        progressed = True
+        while progressed:
+            # Skips and blocks may unlock more nodes without any node finishing
+            progressed = False
+            for node in self.nodes:
+                if node.name in self.finished or node.name in self.running:
+                    continue
+                state = self._ready(node)
+                if state is None:
+                    self._complete(node, STATUS_BLOCKED)
+                    progressed = True
+                elif state:
+                    if node.skip_if is not None and node.skip_if():
+                        self._complete(node, STATUS_SKIPPED)
+                        progressed = True
+                        continue
+                    self.report.results[node.name].started = time.monotonic()
+                    self.running.add(node.name)
+                    started.append(node)
+        return started
+
+    def finish(self, name: str, produced: Optional[Dict[str, Any]] = None,
+               error: Optional[BaseException] = None) -> None:
+        self.running.discard(name)
+        result = self.report.results[name]
+        result.finished = time.monotonic()
+        if error is not None:
+            result.error = error
+            self._complete(self.by_name[name], STATUS_FAILED)
+        else:
+            self._complete(self.by_name[name], STATUS_OK, produced)
+
+
+def run_dag(
+    nodes: List[Node],
+    initial: Optional[Dict[str, Any]] = None,
+    max_workers: Optional[int] = None,
+    thread_name_prefix: str = "pipeline",
+) -> DagReport:
+    """
+    Run nodes as soon as their inputs are available, overlapping independent ones.
+
+    A failing required node blocks everything downstream of it; unrelated
+    branches still run to completion. Exceptions never escape - call
+    DagReport.raise_for_failure() to propagate them.
+
+    Parameters:
+        nodes: Pipeline nodes (order does not matter)
+        initial: Artifacts available before the run (e.g. {"intake.md": text})
+        max_workers: Thread cap (default: one per node)
+    """
+    schedule = _Schedule(nodes, initial)
+    running: Dict[Any, str] = {}
+
+    start = time.monotonic()
+    workers = max_workers or max(1, len(nodes))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+        while not schedule.done:
+            for node in schedule.startable():
+                running[executor.submit(node.func, schedule.inputs(node))] = node.name
+            if not running:  # pragma: no cover - _producers() rules out deadlocks
+                break
+
+            done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    produced = future.result()
+                except Exception as exc:
+                    schedule.finish(name, error=exc)
+                else:
+                    schedule.finish(name, produced)
+
+    schedule.report.wall_seconds = time.monotonic() - start
+    return schedule.report
+
+
+async def _call_async(node: Node, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    result = node.func(inputs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def run_dag_async(nodes: List[Node], initial: Optional[Dict[str, Any]] = None) -> DagReport:
+    """
+    Asyncio twin of run_dag: same scheduling, failure and report semantics,
+    but every node runs as a task on the running event loop.
+
+    Node functions are called on the loop and should return an awaitable
+    (a coroutine); a plain return value is accepted as the node's result.
+    Anything blocking must be moved to a thread by the node itself (e.g.
+    asyncio.to_thread). If the run is cancelled, running nodes are cancelled.
+    """
+    schedule = _Schedule(nodes, initial)
+    running: Dict[Any, str] = {}
+
+    start = time.monotonic()
+    try:
+        while not schedule.done:
+            for node in schedule.startable():
+                running[asyncio.ensure_future(_call_async(node, schedule.inputs(node)))] = node.name
+            if not running:  # pragma: no cover - _producers() rules out deadlocks
+                break
+
+            done, _ = await asyncio.wait(list(running), return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = running.pop(task)
+                try:
+                    produced = task.result()
+                except Exception as exc:
+                    schedule.finish(name, error=exc)
+                else:
+                    schedule.finish(name, produced)
+    finally:
+        for task in running:
+            task.cancel()
+
+    schedule.report.wall_seconds = time.monotonic() - start
+    return schedule.report
@@ -0,0 +1,403 @@
+"""
+Next.js server used by visual QA.
+
+QA used to hit `npm run dev` on localhost:3000, so every freshly written
+page.tsx was compiled on demand by the dev server: the first request stalled
+for seconds, rendering was slower than in production and the bundles were
+unminified, so QA timings said little about what clients get.
+
+Two modes, chosen with GF_QA_SERVER_MODE:
+
+    dev   `npm run dev` on port 3000, started if it is not already running
+          (the previous behaviour, and the default)
+    prod  `next build` into a separate dist dir (.next-qa, so it never clashes
+          with a developer's dev server), served by `next start` on
+          GF_QA_SERVER_PORT (default 3100)
+
+In prod mode the server is rebuilt only when a source file (app/, components/,
+lib/, configs) changed since the last build; next build's own cache under the
+dist dir keeps rebuilds incremental. Builds alternate between two dist dirs,
+so the one being served is never rewritten: QA keeps rendering from the
+previous build while the next one runs. The `next start` process is owned by
+the factory and restarted on each new build, once the renders in flight have
+finished (QA holds `rendering()` around its page loads).
+
+If a build fails (for example a page that passed the syntax check but does not
+build), the previous build keeps being served for the pages it contains; only
+pages written after it fall back to the dev server.
+
+`warm_up(client_id)` is called right after the builder writes a page: it
+starts the rebuild (prod) and requests the page in the background, so the
+first QA navigation does not pay for compilation.
+"""
+import atexit
+import logging
+import os
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+import requests
+
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+DEV_PORT = 3000
+DEFAULT_PROD_PORT = 3100
+PROD_DIST_DIR = ".next-qa"  # Read by next.config.js through GF_NEXT_DIST_DIR
+PROD_DIST_DIRS = (PROD_DIST_DIR, f"{PROD_DIST_DIR}-b")  # Alternated so a build never rewrites the served one
+DEV_START_TIMEOUT = 15  # Seconds for `npm run dev` to answer
+PROD_START_TIMEOUT = 30  # Seconds for `next start` to answer
+BUILD_TIMEOUT = 600  # Seconds for `next build`
+WARM_UP_TIMEOUT = 60  # Seconds for the warm-up request (dev compiles the route on it)
+
+# Inputs of the production build; a change to any of them triggers a rebuild
+BUILD_INPUTS = ("app", "components", "lib", "public", "next.config.js", "tailwind.config.ts", "postcss.config.js", "package.json")
+SOURCE_SUFFIXES = {".ts", ".tsx", ".js", ".jsx", ".css", ".json", ".svg", ".png", ".jpg", ".jpeg", ".webp", ".gif"}
+
+
+def server_mode() -> str:
+    mode = os.getenv("GF_QA_SERVER_MODE", "dev").strip().lower()
+    return mode if mode in ("dev", "prod") else "dev"
+
+
+def _prod_port() -> int:
+    try:
+        return int(os.getenv("GF_QA_SERVER_PORT", DEFAULT_PROD_PORT))
+    except ValueError:
+        return DEFAULT_PROD_PORT
+
+
+def _is_up(base_url: str) -> bool:
+    """Simple check if the server is reachable."""
+    try:
+        requests.get(base_url, timeout=2)
+        return True
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        return False
+
+
+def _wait_until_up(base_url: str, timeout: float, proc: Optional[subprocess.Popen] = None) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(1)
+        if _is_up(base_url):
+            return True
+        if proc is not None and proc.poll() is not None:
+            return False
+    return False
+
+
+class _ReadWriteLock:
+    """
+    Any number of readers (QA renders) or one writer (a server restart).
+
+    A waiting writer blocks new readers, so a restart is not starved by a
+    steady stream of renders.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def reading(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
+class QaServer:
+    """
+    Starts and tracks the server QA renders pages from.
+
+    ensure_ready() is safe to call from several QA threads; only one of them
+    starts or builds the server while the others wait. A restart additionally
+    waits for every render holding rendering() to finish.
+    """
+
+    def __init__(self, mode: Optional[str] = None, port: Optional[int] = None, repo_root: Path = REPO_ROOT):
+        self.mode = mode or server_mode()
+        self.port = port or (_prod_port() if self.mode == "prod" else DEV_PORT)
+        self.repo_root = Path(repo_root)
+        self._lock = threading.Lock()
+        self._renders = _ReadWriteLock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._built_at = 0.0  # Newest source mtime included in the last successful build
+        self._built_dir: Optional[str] = None  # Dist dir holding that build
+        self._serving_dir: Optional[str] = None  # Dist dir the running next start serves
+        self._failed_at = 0.0  # Same for the last failed build, so it is not retried until sources change
+        self.builds = 0
+
+    @property
+    def dev_url(self) -> str:
+        return f"http://localhost:{DEV_PORT}"
+
+    @property
+    def base_url(self) -> str:
+        return f"http://localhost:{self.port}"
+
+    def ensure_ready(self, client_id: Optional[str] = None) -> Optional[str]:
+        """
+        Make sure a server with the current pages is answering.
+
+        Parameters:
+            client_id: Client whose page will be loaded; in prod mode a page
+                missing from the served build (its build failed) is sent to
+                the dev server, while other clients keep the production build
+
+        Returns:
+            Base URL to load pages from, or None if no server could be started
+        """
+        if self.mode != "prod":
+            return self.dev_url if self._ensure_dev() else None
+        with self._lock:
+            if self._ensure_prod() and self._has_page(client_id):
+                return self.base_url
+        if client_id and self._built_dir:
+            logging.warning(f"[qa-server] /clients/{client_id} is not in the production build, using the dev server")
+        else:
+            logging.warning("[qa-server] production build unavailable, falling back to the dev server")
+        return self.dev_url if self._ensure_dev() else None
+
+    @contextmanager
+    def rendering(self):
+        """Hold the server while QA loads pages from it; restarts wait until every render has finished."""
+        with self._renders.reading():
+            yield
+
+    # --- dev -----------------------------------------------------------------
+
+    def _ensure_dev(self) -> bool:
+        """Ensures dev server is up. Attempts to start it if down."""
+        if _is_up(self.dev_url):
+            return True
+        # Only one worker should try to boot the dev server; the others wait and re-check
+        with _DEV_LOCK:
+            if _is_up(self.dev_url):
+                return True
+            return self._start_dev()
+
+    def _start_dev(self) -> bool:
+        """Start `npm run dev` in the background and wait for it to answer."""
+        logging.warning(f"[qa-server] localhost:{DEV_PORT} is down. Attempting to start dev server...")
+        try:
+            # Note: This process will die if the script exits, which is usually fine for a worker
+            subprocess.Popen(
+                ["npm", "run", "dev"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                cwd=str(self.repo_root),
+                shell=True if os.name == 'nt' else False
+            )
+            if _wait_until_up(self.dev_url, DEV_START_TIMEOUT):
+                logging.info("[qa-server] dev server started successfully.")
+                return True
+            logging.error("[qa-server] Failed to start dev server within timeout.")
+        except Exception as e:
+            logging.error(f"[qa-server] Error starting dev server: {e}")
+        return False
+
+    # --- prod ----------------------------------------------------------------
+
+    def _source_mtime(self) -> float:
+        """Newest modification time among the build inputs."""
+        newest = 0.0
+        for name in BUILD_INPUTS:
+            path = self.repo_root / name
+            if path.is_file():
+                newest = max(newest, path.stat().st_mtime)
+                continue
+            for root, dirs, files in os.walk(path):
+                dirs[:] = [d for d in dirs if not d.startswith(".") and d != "node_modules"]
+                for file_name in files:
+                    if Path(file_name).suffix in SOURCE_SUFFIXES:
+                        try:
+                            newest = max(newest, os.stat(os.path.join(root, file_name)).st_mtime)
+                        except OSError:
+                            continue
+        return newest
+
+    def _has_page(self, client_id: Optional[str]) -> bool:
+        """Whether the served build includes the client's current page."""
+        if not client_id:
+            return True
+        try:
+            return (self.repo_root / "app" / "clients" / client_id / "page.tsx").stat().st_mtime <= self._built_at
+        except OSError:
+            return True  # No page to be stale; next start answers the 404 itself
+
+    def _env(self, dist_dir: str) -> dict:
+        return dict(os.environ, GF_NEXT_DIST_DIR=dist_dir, NEXT_TELEMETRY_DISABLED="1")
+
+    def _npx(self, *args: str) -> List[str]:
+        return ["npx", "--no-install", "next", *args]
+
+    def _running(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _build(self, dist_dir: str) -> bool:
+        started = time.monotonic()
+        logging.info(f"[qa-server] building production bundle into {dist_dir}...")
+        try:
+            result = subprocess.run(
+                self._npx("build"),
+                cwd=str(self.repo_root),
+                env=self._env(dist_dir),
+                capture_output=True,
+                text=True,
+                timeout=BUILD_TIMEOUT,
+                shell=True if os.name == 'nt' else False,
+            )
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logging.error(f"[qa-server] next build failed: {e}")
+            return False
+        if result.returncode != 0:
+            tail = "\n".join(((result.stdout or "") + (result.stderr or "")).strip().splitlines()[-15:])
+            logging.error(f"[qa-server] next build failed (exit {result.returncode}):\n{tail}")
+            return False
+        self.builds += 1
+        logging.info(f"[qa-server] build finished in {time.monotonic() - started:.1f}s")
+        return True
+
+    def _stop_prod(self) -> None:
+        proc, self._proc = self._proc, None
+        self._serving_dir = None
+        if proc is None or proc.poll() is not None:
+            return
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait(timeout=5)
+
+    def _start_prod(self, dist_dir: str) -> bool:
+        self._proc = subprocess.Popen(
+            self._npx("start", "-p", str(self.port)),
+            cwd=str(self.repo_root),
+            env=self._env(dist_dir),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            shell=True if os.name == 'nt' else False,
+        )
+        if _wait_until_up(self.base_url, PROD_START_TIMEOUT, self._proc):
+            self._serving_dir = dist_dir
+            logging.info(f"[qa-server] next start serving {dist_dir} on port {self.port}")
+            return True
+        logging.error(f"[qa-server] next start did not answer on port {self.port}")
+        self._stop_prod()
+        return False
+
+    def _ensure_prod(self) -> bool:
+        """Rebuild if sources changed since the last build, then (re)start `next start` on the newest build."""
+        source_mtime = self._source_mtime()
+        if source_mtime > max(self._built_at, self._failed_at):
+            # Build next to the served dist dir; renders in flight keep using it meanwhile
+            dist_dir = PROD_DIST_DIRS[1] if self._serving_dir == PROD_DIST_DIRS[0] else PROD_DIST_DIRS[0]
+            if self._build(dist_dir):
+                self._built_at, self._built_dir = source_mtime, dist_dir
+            else:
+                self._failed_at = source_mtime
+        if self._running() and self._serving_dir == self._built_dir:
+            return True
+        if self._built_dir is None:
+            return False
+        # next start loads the build once, so it has to restart to serve a new one
+        with self._renders.writing():
+            self._stop_prod()
+            return self._start_prod(self._built_dir)
+
+    # --- warm-up -------------------------------------------------------------
+
+    def warm_up(self, client_id: str) -> threading.Thread:
+        """Prepare the server and request a client page in the background."""
+        def _run():
+            started = time.monotonic()
+            base_url = self.ensure_ready(client_id)
+            if not base_url:
+                return
+            try:
+                with self.rendering():
+                    requests.get(f"{base_url}/clients/{client_id}", timeout=WARM_UP_TIMEOUT)
+                logging.info(
+                    f"[qa-server] warmed up /clients/{client_id} in {time.monotonic() - started:.1f}s"
+                )
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"[qa-server] warm-up request for {client_id} failed: {e}")
+
+        thread = threading.Thread(target=_run, name=f"qa-warm-up-{client_id}", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop_prod()
+
+
+_DEV_LOCK = threading.Lock()
+_server: Optional[QaServer] = None
+_server_lock = threading.Lock()
+
+
+def get_server() -> QaServer:
+    """Return the process-wide QA server (created on first use)."""
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = QaServer()
+        return _server
+
+
+def ensure_ready(client_id: Optional[str] = None) -> Optional[str]:
+    """Base URL of a ready QA server for the client's page, or None if none could be started."""
+    return get_server().ensure_ready(client_id)
+
+
+def rendering():
+    """Context manager held around QA page loads (see QaServer.rendering)."""
+    return get_server().rendering()
+
+
+def warm_up(client_id: str) -> None:
+    """Start preparing the QA server for a freshly written page."""
+    get_server().warm_up(client_id)
+
+
+def shutdown() -> None:
+    """Stop the production server this process started (registered with atexit)."""
+    with _server_lock:
+        server = _server
+    if server is not None:
+        server.close()
+
+
+atexit.register(shutdown)
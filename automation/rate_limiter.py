@@ -0,0 +1,292 @@
+"""
+Shared token-bucket rate limiter for LLM API calls.
+
+The API helpers used to find out about rate limits from 429 responses and
+then sleep a fixed amount, so every concurrent stage (visual designer,
+architect, parallel workers) hit the limit together and retried together.
+This module throttles calls *before* they are sent: each model gets a
+requests-per-minute and a tokens-per-minute bucket, configured under
+"rate_limits" in tracker_config.json:
+
+    "rate_limits": {
+        "anthropic/claude-sonnet-4-5-20250929": {
+            "requests_per_minute": 50,
+            "tokens_per_minute": 80000
+        }
+    }
+
+Buckets live in a WAL-mode SQLite database under data/, so every thread and
+every factory process on the machine draws from the same budget. A caller
+that would overdraw a bucket sleeps locally until it refills instead of
+sending a request that would be rejected. When a 429 still gets through
+(limits shared with other tools, wrong config), `penalize` blocks the model
+for everyone until the provider's retry-after has passed.
+
+Models without a configured limit are only subject to penalties. Database
+errors are logged and never raised; the limiter then lets calls through.
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from automation.cost_tracker import load_config
+
+
+DB_PATH = Path("data/rate_limits.db")
+
+# Upper bound on a single sleep so config changes and penalties are re-read
+MAX_WAIT_SLICE = 5.0
+
+# Tokens counted per image block: Anthropic bills ~width*height/750 and
+# downscales anything over ~1.15 megapixels, so a full tile is about 1.6k
+IMAGE_TOKENS = 1600
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key        TEXT PRIMARY KEY,
+    level      REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS penalties (
+    model_key     TEXT PRIMARY KEY,
+    blocked_until REAL NOT NULL
+);
+"""
+
+_initialized: set = set()
+_init_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    """Open a short-lived connection; SQLite handles cross-process locking."""
+    db_path = Path(DB_PATH)
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path), timeout=30, isolation_level=None)
+    try:
+        key = str(db_path.resolve())
+        with _init_lock:
+            if key not in _initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(_SCHEMA)
+                _initialized.add(key)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def limits_for(provider: str, model: str) -> Tuple[Optional[float], Optional[float]]:
+    """Return (requests_per_minute, tokens_per_minute) for a model; None means unlimited."""
+    limits = load_config().get("rate_limits", {}).get(f"{provider}/{model}", {})
+    rpm = limits.get("requests_per_minute")
+    tpm = limits.get("tokens_per_minute")
+    return (float(rpm) if rpm else None, float(tpm) if tpm else None)
+
+
+def _split_images(value: Any) -> Tuple[Any, int]:
+    """Copy of a request with its image blocks removed, and how many there were."""
+    if isinstance(value, dict):
+        if value.get("type") == "image":
+            return None, 1
+        images = 0
+        kept = {}
+        for key, item in value.items():
+            kept[key], count = _split_images(item)
+            images += count
+        return kept, images
+    if isinstance(value, (list, tuple)):
+        images = 0
+        kept = []
+        for item in value:
+            item, count = _split_images(item)
+            images += count
+            kept.append(item)
+        return kept, images
+    return value, 0
+
+
+def estimate_tokens(max_tokens: int = 0, **request: Any) -> int:
+    """
+    Rough token count for a request: ~4 characters per prompt token, plus
+    IMAGE_TOKENS per image block (their base64 data is not text the model
+    reads), plus the output budget (providers count max_tokens against output
+    limits up front).
+    """
+    text, images = _split_images(request)
+    prompt_chars = len(json.dumps(text, ensure_ascii=False, default=str))
+    return prompt_chars // 4 + images * IMAGE_TOKENS + int(max_tokens or 0)
+
+
+def _refilled(conn: sqlite3.Connection, key: str, capacity: float, now: float) -> float:
+    """Current level of a bucket (full if it does not exist yet)."""
+    row = conn.execute("SELECT level, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return capacity
+    level, updated_at = row
+    return min(capacity, level + (now - updated_at) * capacity / 60.0)
+
+
+def _try_acquire(model_key: str, rpm: Optional[float], tpm: Optional[float], tokens: int) -> float:
+    """
+    Take one request and `tokens` tokens if available.
+
+    Returns 0.0 on success, otherwise the seconds to wait before trying again.
+    """
+    now = time.time()
+    with _connect() as conn:
+        # IMMEDIATE takes the write lock up front so check-and-take is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT blocked_until FROM penalties WHERE model_key = ?", (model_key,)
+            ).fetchone()
+            if row and row[0] > now:
+                conn.execute("COMMIT")
+                return row[0] - now
+
+            wanted = []
+            if rpm:
+                wanted.append((f"{model_key}:requests", rpm, 1.0))
+            if tpm:
+                # A request larger than the whole bucket would otherwise wait forever
+                wanted.append((f"{model_key}:tokens", tpm, float(min(tokens, tpm))))
+
+            levels = [(key, capacity, need, _refilled(conn, key, capacity, now)) for key, capacity, need in wanted]
+            wait = max(
+                ((need - level) * 60.0 / capacity for key, capacity, need, level in levels if level < need),
+                default=0.0,
+            )
+            if wait <= 0:
+                for key, capacity, need, level in levels:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO buckets (key, level, updated_at) VALUES (?, ?, ?)",
+                        (key, level - need, now),
+                    )
+            conn.execute("COMMIT")
+            return wait
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def acquire(provider: str, model: str, tokens: int = 0) -> float:
+    """
+    Block until the model's request and token budgets allow another call.
+
+    Parameters:
+        provider: "anthropic" or "openai"
+        model: Model name as sent to the API
+        tokens: Estimated tokens for the call (see estimate_tokens)
+
+    Returns:
+        Seconds spent waiting
+    """
+    waited = 0.0
+    while True:
+        delay = _next_delay(provider, model, tokens)
+        if delay <= 0:
+            return waited
+        time.sleep(delay)
+        waited += delay
+
+
+async def acquire_async(provider: str, model: str, tokens: int = 0) -> float:
+    """
+    Async twin of acquire: waits with asyncio.sleep so the event loop keeps
+    running. Each attempt's SQLite transaction (which may wait up to the 30s
+    busy timeout for other processes) runs in a worker thread.
+    """
+    waited = 0.0
+    while True:
+        delay = await asyncio.to_thread(_next_delay, provider, model, tokens)
+        if delay <= 0:
+            return waited
+        await asyncio.sleep(delay)
+        waited += delay
+
+
+def _next_delay(provider: str, model: str, tokens: int) -> float:
+    """One acquisition attempt; returns 0 when acquired, else how long to sleep."""
+    try:
+        rpm, tpm = limits_for(provider, model)
+        wait = _try_acquire(f"{provider}/{model}", rpm, tpm, tokens)
+    except sqlite3.Error as exc:
+        logging.warning(f"Rate limiter: failed to acquire for {model}, not throttling: {exc}")
+        return 0.0
+    return min(wait, MAX_WAIT_SLICE) if wait > 0 else 0.0
+
+
+def refund(provider: str, model: str, reserved: int, used: Optional[int]) -> None:
+    """
+    Return over-reserved tokens to the bucket once the real usage is known.
+
+    acquire() reserves prompt estimate + max_tokens; most responses use far
+    fewer output tokens, so crediting the difference keeps throughput close
+    to the real budget. An oversized request only took the whole bucket, so
+    at most that much is credited back.
+    """
+    if used is None or used >= reserved:
+        return
+    try:
+        _, tpm = limits_for(provider, model)
+        if not tpm or used >= min(reserved, tpm):
+            return
+        key = f"{provider}/{model}:tokens"
+        now = time.time()
+        with _connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            level = _refilled(conn, key, tpm, now)
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, level, updated_at) VALUES (?, ?, ?)",
+                (key, min(tpm, level + min(reserved, tpm) - used), now),
+            )
+            conn.execute("COMMIT")
+    except sqlite3.Error as exc:
+        logging.warning(f"Rate limiter: failed to refund tokens for {model}: {exc}")
+
+
+def penalize(provider: str, model: str, seconds: float) -> None:
+    """Block every caller of a model for `seconds` (after a 429 got through)."""
+    until = time.time() + max(0.0, seconds)
+    try:
+        with _connect() as conn:
+            conn.execute(
+                "INSERT INTO penalties (model_key, blocked_until) VALUES (?, ?) "
+                "ON CONFLICT(model_key) DO UPDATE SET blocked_until = MAX(blocked_until, excluded.blocked_until)",
+                (f"{provider}/{model}", until),
+            )
+    except sqlite3.Error as exc:
+        logging.warning(f"Rate limiter: failed to record penalty for {model}: {exc}")
+
+
+def retry_after_seconds(exc: BaseException, default: float) -> float:
+    """Read the retry-after header from an API error, falling back to `default`."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else default
+    except (TypeError, ValueError, AttributeError):
+        return default
+
+
+def bucket_levels(provider: str, model: str) -> Dict[str, float]:
+    """Current request/token bucket levels for a model (for logging and tests)."""
+    rpm, tpm = limits_for(provider, model)
+    now = time.time()
+    levels: Dict[str, float] = {}
+    try:
+        with _connect() as conn:
+            if rpm:
+                levels["requests"] = _refilled(conn, f"{provider}/{model}:requests", rpm, now)
+            if tpm:
+                levels["tokens"] = _refilled(conn, f"{provider}/{model}:tokens", tpm, now)
+    except sqlite3.Error as exc:
+        logging.warning(f"Rate limiter: failed to read buckets for {model}: {exc}")
+    return levels
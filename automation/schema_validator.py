@@ -70,7 +70,9 @@ def validate_api_cost_entry(entry: Dict[str, Any]) -> tuple[bool, Optional[str]]
         "input_tokens": number,
         "output_tokens": number,
         "cost_usd": number,
-        "metadata": dict (optional)
+        "metadata": dict (optional),
+        "cache_creation_input_tokens": number (optional),
+        "cache_read_input_tokens": number (optional)
     }
     
     Returns:
@@ -114,6 +116,11 @@ def validate_api_cost_entry(entry: Dict[str, Any]) -> tuple[bool, Optional[str]]
     if "metadata" in entry and not isinstance(entry["metadata"], dict):
         return False, "metadata must be a dictionary"
     
+    # Optional prompt-cache token classes
+    for field in ("cache_creation_input_tokens", "cache_read_input_tokens"):
+        if field in entry and not isinstance(entry[field], int):
+            return False, f"{field} must be an integer"
+    
     return True, None
 
 
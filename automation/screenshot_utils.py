@@ -0,0 +1,423 @@
+"""
+Screenshot preprocessing for the QA vision model, perceptual hashing of
+renders and a per-client cache of vision verdicts.
+
+Preprocessing
+-------------
+Full-page screenshots are tall (a mobile page is often 390x6000+) and the
+vision API scales any image whose long edge exceeds 1568px down to fit, so a
+full mobile page used to arrive about 100px wide: unreadable, yet still paid
+for. prepare() turns the captured bytes into what the model is sent, entirely
+in memory (the qa_<viewport>.jpg artifact is written once and never re-read):
+
+    1. tile the page into fold-sized segments (one viewport height each, or
+       taller when a page would need more than GF_QA_VISION_MAX_TILES)
+    2. downscale so all tiles of a viewport fit GF_QA_VISION_TOKEN_BUDGET image
+       tokens (about width*height/750), never below half size so text stays
+       legible, and never above the API's own per-image limits
+    3. encode each tile as JPEG or WebP at GF_QA_VISION_QUALITY
+
+With GF_QA_VISION_CHANGED_TILES=true a repair attempt only sends the tiles
+whose perceptual hash changed since the previous review, together with that
+review's verdict, instead of the whole page again.
+
+Verdict cache
+-------------
+
+Every QA attempt used to send its screenshots to MODEL_QA, even when a repair
+attempt rendered a page that looked exactly like the previous one (the fix
+touched something invisible, or the builder regenerated the same layout).
+run_qa now hashes each screenshot and reuses the previous vision verdict when
+the render is unchanged or within a small perceptual distance of it.
+
+Hashes are difference hashes (dHash) computed per horizontal band of the
+full-page screenshot: a single 64-bit hash of an 8000px tall page would not
+notice a changed section, while a 256-bit hash per ~viewport-sized band does.
+Two screenshots are comparable only if they have the same size and number of
+bands; their distance is the largest Hamming distance between matching bands.
+
+Verdicts are stored in clients/<id>/qa_vision_cache.json, keyed by the model
+and review prompt so a prompt change never replays a stale verdict.
+
+Configuration via environment variables:
+    GF_QA_VISION_CACHE=true          reuse verdicts for near-identical renders
+    GF_QA_VISION_CACHE_DISTANCE=6    max differing bits per band/tile (0 = identical only)
+    GF_QA_VISION_TILES=true          tile long pages into fold-sized segments
+    GF_QA_VISION_MAX_TILES=8         most tiles per viewport
+    GF_QA_VISION_TOKEN_BUDGET=4000   image tokens per viewport
+    GF_QA_VISION_FORMAT=jpeg         jpeg or webp
+    GF_QA_VISION_QUALITY=80          encoder quality (1-95)
+    GF_QA_VISION_CHANGED_TILES=false send only tiles changed since the last review
+
+Requires Pillow; without it the captured JPEG is sent as one image, nothing is
+hashed and every check calls the model.
+"""
+import io
+import json
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from automation.file_utils import atomic_write
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+
+CACHE_FILE = "qa_vision_cache.json"
+HASH_SIZE = 16  # 16x16 comparisons = 256 bits per band
+BAND_HEIGHT = 1024  # Screenshot pixels per hashed band
+DEFAULT_MAX_DISTANCE = 6
+MAX_ENTRIES = 20  # Verdicts kept per client
+
+CAPTURE_QUALITY = 90  # JPEG quality of the captured full-page screenshot (the qa_<viewport>.jpg artifact)
+PIXELS_PER_TOKEN = 750  # Vision API image cost: about width*height/750 tokens
+API_MAX_EDGE = 1568  # The API downscales images with a longer edge than this...
+API_MAX_PIXELS = 1_150_000  # ...or more pixels than this, so tiles never exceed either
+MIN_SCALE = 0.5  # Below this, body text is no longer legible; the budget gives way instead
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_MAX_TILES = 8
+DEFAULT_QUALITY = 80
+MEDIA_TYPES = {"jpeg": "image/jpeg", "webp": "image/webp"}
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.getenv(name, default).strip().lower() not in ("0", "false", "no", "off")
+
+
+def _env_int(name: str, default: int, minimum: int = 0) -> int:
+    try:
+        return max(minimum, int(os.getenv(name, default)))
+    except ValueError:
+        return default
+
+
+def is_enabled() -> bool:
+    return _env_flag("GF_QA_VISION_CACHE", "true")
+
+
+def max_distance() -> int:
+    return _env_int("GF_QA_VISION_CACHE_DISTANCE", DEFAULT_MAX_DISTANCE)
+
+
+def changed_tiles_only() -> bool:
+    return _env_flag("GF_QA_VISION_CHANGED_TILES", "false")
+
+
+@dataclass
+class VisionSettings:
+    """How screenshots are turned into vision-model images (see module docstring)."""
+    tiles: bool = True
+    max_tiles: int = DEFAULT_MAX_TILES
+    token_budget: int = DEFAULT_TOKEN_BUDGET
+    image_format: str = "jpeg"
+    quality: int = DEFAULT_QUALITY
+
+    @classmethod
+    def from_env(cls) -> "VisionSettings":
+        image_format = os.getenv("GF_QA_VISION_FORMAT", "jpeg").strip().lower()
+        return cls(
+            tiles=_env_flag("GF_QA_VISION_TILES", "true"),
+            max_tiles=_env_int("GF_QA_VISION_MAX_TILES", DEFAULT_MAX_TILES, minimum=1),
+            token_budget=_env_int("GF_QA_VISION_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET, minimum=1),
+            image_format=image_format if image_format in MEDIA_TYPES else "jpeg",
+            quality=min(95, _env_int("GF_QA_VISION_QUALITY", DEFAULT_QUALITY, minimum=1)),
+        )
+
+
+@dataclass
+class VisionTile:
+    """One encoded segment of a screenshot, ready for the vision request."""
+    index: int
+    top: int  # Rows of the original screenshot this tile covers
+    bottom: int
+    data: bytes
+    media_type: str
+    width: int  # Encoded size
+    height: int
+    hash: Optional[str] = None
+
+    @property
+    def tokens(self) -> int:
+        return math.ceil(self.width * self.height / PIXELS_PER_TOKEN)
+
+
+@dataclass
+class PreparedScreenshot:
+    """A captured screenshot turned into vision tiles, plus its render hash."""
+    size: Tuple[int, int]
+    tile_height: int
+    tiles: List[VisionTile] = field(default_factory=list)
+    scale: float = 1.0
+    render_hash: Optional[Dict[str, Any]] = None
+
+    @property
+    def tokens(self) -> int:
+        return sum(tile.tokens for tile in self.tiles)
+
+    def tile_hashes(self) -> Optional[Dict[str, Any]]:
+        """Tile geometry and hashes, as remembered for changed-tile reviews."""
+        if any(tile.hash is None for tile in self.tiles):
+            return None
+        return {
+            "size": list(self.size),
+            "tile_height": self.tile_height,
+            "hashes": [tile.hash for tile in self.tiles],
+        }
+
+
+def dhash(image: "Image.Image", hash_size: int = HASH_SIZE) -> int:
+    """Difference hash: one bit per horizontally adjacent pixel pair of a downscaled grayscale image."""
+    small = image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def _hex_dhash(image: "Image.Image") -> str:
+    return f"{dhash(image):0{HASH_SIZE * HASH_SIZE // 4}x}"
+
+
+def _bit_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def screenshot_hash(
+    source: Union[str, bytes, "Image.Image"], band_height: int = BAND_HEIGHT
+) -> Optional[Dict[str, Any]]:
+    """
+    Hash a screenshot band by band.
+
+    Parameters:
+        source: Image file path, encoded image bytes, or an open Pillow image
+
+    Returns:
+        {"size": [width, height], "bands": [hex, ...]}, or None if Pillow is
+        unavailable or the image cannot be read
+    """
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        if isinstance(source, Image.Image):
+            return _band_hashes(source, band_height)
+        with Image.open(io.BytesIO(source) if isinstance(source, bytes) else source) as img:
+            return _band_hashes(img, band_height)
+    except (OSError, ValueError) as e:
+        label = source if isinstance(source, str) else "screenshot"
+        logging.warning(f"[vision-cache] could not hash {label}: {e}")
+        return None
+
+
+def _band_hashes(img: "Image.Image", band_height: int) -> Dict[str, Any]:
+    width, height = img.size
+    bands = [
+        _hex_dhash(img.crop((0, top, width, min(height, top + band_height))))
+        for top in range(0, height, band_height)
+    ]
+    return {"size": [width, height], "bands": bands}
+
+
+def hash_distance(a: Dict[str, Any], b: Dict[str, Any]) -> Optional[int]:
+    """Largest per-band Hamming distance, or None if the screenshots are not comparable."""
+    if not a or not b or a.get("size") != b.get("size") or len(a.get("bands", [])) != len(b.get("bands", [])):
+        return None
+    return max((_bit_distance(x, y) for x, y in zip(a["bands"], b["bands"])), default=0)
+
+
+# --- vision preprocessing ------------------------------------------------------
+
+def _scale_for(width: int, height: int, tile_height: int, settings: VisionSettings) -> float:
+    """Scale that fits the token budget (not below MIN_SCALE) and the API's per-image limits."""
+    budget_scale = math.sqrt(settings.token_budget * PIXELS_PER_TOKEN / (width * height))
+    scale = min(1.0, max(MIN_SCALE, budget_scale))
+    api_scale = min(
+        API_MAX_EDGE / max(width, tile_height),
+        math.sqrt(API_MAX_PIXELS / (width * tile_height)),
+    )
+    return min(scale, api_scale)
+
+
+def _encode(image: "Image.Image", settings: VisionSettings) -> Tuple[bytes, str]:
+    buffer = io.BytesIO()
+    if settings.image_format == "webp":
+        try:
+            image.save(buffer, "WEBP", quality=settings.quality, method=4)
+            return buffer.getvalue(), MEDIA_TYPES["webp"]
+        except (OSError, KeyError) as e:
+            logging.warning(f"[vision] WebP encoding unavailable ({e}), using JPEG")
+            buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=settings.quality, optimize=True)
+    return buffer.getvalue(), MEDIA_TYPES["jpeg"]
+
+
+def prepare(data: bytes, fold_height: int, settings: Optional[VisionSettings] = None) -> PreparedScreenshot:
+    """
+    Turn a captured full-page screenshot into vision tiles, in memory.
+
+    Parameters:
+        data: Encoded screenshot (as returned by page.screenshot)
+        fold_height: Viewport height, the natural tile height
+        settings: Defaults to VisionSettings.from_env()
+
+    Returns:
+        PreparedScreenshot; without Pillow (or for undecodable data) a single
+        tile carrying the captured JPEG unchanged and no hashes
+    """
+    settings = settings or VisionSettings.from_env()
+    if PIL_AVAILABLE:
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                img.load()
+                return _prepare_image(img.convert("RGB"), fold_height, settings)
+        except (OSError, ValueError) as e:
+            logging.warning(f"[vision] could not preprocess screenshot ({e}), sending it unchanged")
+    else:
+        logging.info("[vision] Pillow unavailable, sending the full screenshot unchanged")
+    return PreparedScreenshot(
+        size=(0, 0),
+        tile_height=0,
+        tiles=[VisionTile(0, 0, 0, data, MEDIA_TYPES["jpeg"], 0, 0)],
+        render_hash=screenshot_hash(data),
+    )
+
+
+def _prepare_image(img: "Image.Image", fold_height: int, settings: VisionSettings) -> PreparedScreenshot:
+    width, height = img.size
+    if settings.tiles:
+        tile_height = max(fold_height, math.ceil(height / settings.max_tiles), 1)
+    else:
+        tile_height = height
+    scale = _scale_for(width, height, min(tile_height, height), settings)
+    prepared = PreparedScreenshot(
+        size=(width, height), tile_height=tile_height, scale=scale, render_hash=screenshot_hash(img)
+    )
+    for index, top in enumerate(range(0, height, tile_height)):
+        bottom = min(height, top + tile_height)
+        tile = img.crop((0, top, width, bottom))
+        tile_hash = _hex_dhash(tile)
+        if scale < 1.0:
+            tile = tile.resize(
+                (max(1, round(width * scale)), max(1, round((bottom - top) * scale))),
+                Image.Resampling.LANCZOS,
+            )
+        encoded, media_type = _encode(tile, settings)
+        prepared.tiles.append(VisionTile(index, top, bottom, encoded, media_type, tile.width, tile.height, tile_hash))
+    return prepared
+
+
+def changed_tiles(prepared: PreparedScreenshot, previous: Optional[Dict[str, Any]], distance: Optional[int] = None) -> List[VisionTile]:
+    """
+    Tiles that differ from a previous render of the same viewport.
+
+    Every tile counts as changed when there is no previous render, or when its
+    size or tiling differs (content shifted, so tiles no longer line up).
+    """
+    current = prepared.tile_hashes()
+    if (
+        current is None
+        or not previous
+        or previous.get("size") != current["size"]
+        or previous.get("tile_height") != current["tile_height"]
+        or len(previous.get("hashes", [])) != len(current["hashes"])
+    ):
+        return list(prepared.tiles)
+    distance = max_distance() if distance is None else distance
+    return [
+        tile for tile, before in zip(prepared.tiles, previous["hashes"])
+        if _bit_distance(tile.hash, before) > distance
+    ]
+
+
+def _cache_path(client_path: str) -> str:
+    return os.path.join(client_path, CACHE_FILE)
+
+
+def _load_doc(client_path: str) -> Dict[str, Any]:
+    try:
+        with open(_cache_path(client_path), "r", encoding="utf-8") as f:
+            doc = json.load(f)
+        if not isinstance(doc, dict):
+            raise ValueError("cache is not a JSON object")
+        return doc
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.warning(f"[vision-cache] ignoring unreadable cache for {os.path.basename(client_path)}: {e}")
+        return {}
+
+
+def _load(client_path: str) -> List[Dict[str, Any]]:
+    entries = _load_doc(client_path).get("entries", [])
+    return entries if isinstance(entries, list) else []
+
+
+def lookup(
+    client_path: str,
+    key: str,
+    hashes: Dict[str, Dict[str, Any]],
+    distance: Optional[int] = None,
+) -> Optional[Tuple[str, int]]:
+    """
+    Find a stored verdict for renders within `distance` of `hashes`.
+
+    Parameters:
+        client_path: Client directory
+        key: Identifies the model and prompt the verdict came from
+        hashes: Screenshot hash per viewport name (see screenshot_hash)
+        distance: Max per-band distance; defaults to GF_QA_VISION_CACHE_DISTANCE
+
+    Returns:
+        (verdict, distance) of the closest match, or None
+    """
+    if not hashes:
+        return None
+    distance = max_distance() if distance is None else distance
+    best: Optional[Tuple[str, int]] = None
+    for entry in _load(client_path):
+        if entry.get("key") != key or set(entry.get("hashes", {})) != set(hashes):
+            continue
+        distances = [hash_distance(hashes[name], entry["hashes"][name]) for name in hashes]
+        if any(d is None or d > distance for d in distances):
+            continue
+        worst = max(distances, default=0)
+        if best is None or worst < best[1]:
+            best = (entry.get("verdict", ""), worst)
+    return best
+
+
+def store(client_path: str, key: str, hashes: Dict[str, Dict[str, Any]], verdict: str) -> None:
+    """Record a vision verdict for these renders, keeping the newest MAX_ENTRIES."""
+    if not hashes:
+        return
+    doc = _load_doc(client_path)
+    entries = doc.get("entries") if isinstance(doc.get("entries"), list) else []
+    entries.append({"key": key, "hashes": hashes, "verdict": verdict, "created_at": time.time()})
+    doc["entries"] = entries[-MAX_ENTRIES:]
+    atomic_write(_cache_path(client_path), json.dumps(doc, indent=2))
+
+
+def last_review(client_path: str, key: str) -> Optional[Dict[str, Any]]:
+    """The previous review's tile hashes per viewport and verdict, if it used the same model and prompt."""
+    review = _load_doc(client_path).get("last_review")
+    if not isinstance(review, dict) or review.get("key") != key:
+        return None
+    return review
+
+
+def remember_review(client_path: str, key: str, tiles: Dict[str, Dict[str, Any]], verdict: str) -> None:
+    """Remember this review's tiles so the next attempt can send only what changed."""
+    if not tiles:
+        return
+    doc = _load_doc(client_path)
+    doc["last_review"] = {"key": key, "tiles": tiles, "verdict": verdict, "created_at": time.time()}
+    atomic_write(_cache_path(client_path), json.dumps(doc, indent=2))
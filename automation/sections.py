@@ -0,0 +1,158 @@
+"""
+Addressable Markdown sections for partial regeneration.
+
+When the copy or strategy critic rejected a document, the whole brief (up to
+2000 output tokens) or content.md (up to 4000) used to be regenerated, even
+when the feedback was about one testimonial or the hero headline. The critics'
+JSON verdicts name a target per issue (automation/critic_verdict.py); this
+module maps those targets onto the document's headings so only the named
+sections are rewritten and spliced back.
+
+A section is a heading and everything up to the next heading of the same or a
+shallower level, so "## Layout Strategy" contains its "### Section 1: Hero".
+Targets match headings by their words ("Hero" finds "## Hero Section" and
+"### Section 1: Hero"); an exact title wins over a partial one, and a target
+that matches several headings equally is ambiguous. Headings inside code fences
+are ignored.
+"""
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_WORD = re.compile(r"[a-z0-9]+")
+_NUMBERING = re.compile(r"^section \d+\s*")
+
+
+@dataclass
+class Section:
+    title: str
+    level: int
+    start: int  # Line index of the heading
+    end: int  # Line index after the section's last line
+
+
+def _words(title: str) -> List[str]:
+    text = _NUMBERING.sub("", " ".join(_WORD.findall(title.lower())))
+    return text.split()
+
+
+def outline(text: str) -> List[Section]:
+    """Every heading of the document with the span of lines it covers."""
+    lines = text.splitlines()
+    headings = []
+    in_fence = False
+    for index, line in enumerate(lines):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+            continue
+        match = None if in_fence else _HEADING.match(line)
+        if match:
+            headings.append((index, len(match.group(1)), match.group(2)))
+    result = []
+    for position, (start, level, title) in enumerate(headings):
+        end = next((other for other, other_level, _ in headings[position + 1:] if other_level <= level), len(lines))
+        result.append(Section(title=title, level=level, start=start, end=end))
+    return result
+
+
+def find(text_or_outline, target: str) -> Optional[Section]:
+    """The section a critic target refers to (None if no heading or several headings match)."""
+    headings = outline(text_or_outline) if isinstance(text_or_outline, str) else text_or_outline
+    wanted = _words(target)
+    if not wanted:
+        return None
+    exact = [section for section in headings if _words(section.title) == wanted]
+    if exact:
+        return exact[0] if len(exact) == 1 else None
+    wanted_set = set(wanted)
+    partial = []
+    for section in headings:
+        words = set(_words(section.title))
+        if words and (wanted_set <= words or words <= wanted_set):
+            partial.append(section)
+    return partial[0] if len(partial) == 1 else None
+
+
+def resolve(text: str, targets: Iterable[str]) -> Optional[List[Section]]:
+    """
+    Sections for every target, in document order, without nested duplicates.
+
+    Returns:
+        List of sections, or None if any target cannot be placed
+    """
+    headings = outline(text)
+    found = []
+    for target in targets:
+        section = find(headings, target)
+        if section is None:
+            return None
+        found.append(section)
+    # A section inside another selected one is rewritten with its parent
+    found.sort(key=lambda s: (s.start, -s.end))
+    result: List[Section] = []
+    for section in found:
+        if result and section.start < result[-1].end:
+            continue
+        result.append(section)
+    return result
+
+
+def share(text: str, selected: List[Section]) -> float:
+    """Fraction of the document's lines covered by the selected sections."""
+    total = len(text.splitlines()) or 1
+    return sum(section.end - section.start for section in selected) / total
+
+
+def splice(text: str, selected: List[Section], rewritten: str) -> Optional[str]:
+    """
+    Replace the selected sections with their rewritten versions.
+
+    `rewritten` is the model's answer: the sections with their headings, in
+    any order and at any heading level (levels are restored to the original).
+    A selected section missing from the answer keeps its current text.
+
+    Returns:
+        The spliced document, or None if no selected section was found in the answer
+    """
+    answer_outline = outline(rewritten or "")
+    answer_lines = (rewritten or "").splitlines()
+    matches = {id(section): find(answer_outline, section.title) for section in selected}
+    # An answer section also ends where the next rewritten section starts, whatever its level
+    starts = sorted(match.start for match in matches.values() if match is not None)
+    lines = text.splitlines()
+    replaced = 0
+    for section in sorted(selected, key=lambda s: s.start, reverse=True):
+        match = matches[id(section)]
+        if match is None:
+            continue
+        end = min([match.end] + [start for start in starts if start > match.start])
+        body = answer_lines[match.start + 1:end]
+        shift = section.level - match.level
+        if shift:
+            body = [_relevel(line, shift) for line in body]
+        new_lines = [lines[section.start]] + _trim(body)
+        # Keep the blank line that separated the section from the next heading
+        if section.end < len(lines) and new_lines[-1].strip():
+            new_lines.append("")
+        lines[section.start:section.end] = new_lines
+        replaced += 1
+    if not replaced:
+        return None
+    return "\n".join(lines) + ("\n" if text.endswith("\n") else "")
+
+
+def _relevel(line: str, shift: int) -> str:
+    match = _HEADING.match(line)
+    if not match:
+        return line
+    level = max(1, min(6, len(match.group(1)) + shift))
+    return f"{'#' * level} {match.group(2)}"
+
+
+def _trim(body: List[str]) -> List[str]:
+    while body and not body[-1].strip():
+        body = body[:-1]
+    return body
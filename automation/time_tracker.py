@@ -16,6 +16,9 @@ from watchdog.observers import Observer
 CONFIG_PATH = Path("automation/tracker_config.json")
 TIME_LOG_DIR = Path("data/time_logs")
 
+# Serializes read-modify-write of the daily log when workers run in parallel
+_LOG_LOCK = threading.Lock()
+
 
 def load_config() -> Dict[str, Any]:
     if CONFIG_PATH.exists():
@@ -116,9 +119,10 @@ def log_time_entry(
         "metadata": metadata,
     }
     path = _log_file_for_day(now)
-    entries = _load_day_entries(path)
-    entries.append(entry)
-    _persist_day_entries(path, entries)
+    with _LOG_LOCK:
+        entries = _load_day_entries(path)
+        entries.append(entry)
+        _persist_day_entries(path, entries)
     # Format to match _log_aligned style: emoji + padded label + message
     label = "Time tracking"
     padded_label = f"{label:<20}"
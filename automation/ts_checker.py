@@ -0,0 +1,216 @@
+"""
+Warm TypeScript checker for generated pages.
+
+check_syntax used to spawn a cold `npx tsc --project ...` for every builder
+attempt: seconds of Node startup and full program construction each time.
+This module keeps one long-lived Node worker (ts_checker_worker.js) holding a
+TypeScript LanguageService over the repo's tsconfig, and talks to it with
+JSON lines over stdin/stdout. Only the generated page is re-analysed per
+check, so a warm check takes a fraction of a second.
+
+The worker is started lazily, restarted automatically if it crashes, times
+out or has served MAX_CHECKS_PER_WORKER checks, and disabled after repeated
+failures or when Node/TypeScript is unavailable. check() returns None
+whenever the worker cannot answer, and callers fall back to `npx tsc`.
+
+Opt out with GF_TS_CHECKER=false.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+WORKER_SCRIPT = Path(__file__).resolve().with_name("ts_checker_worker.js")
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+STARTUP_TIMEOUT = 60.0  # First start parses lib files and React types
+CHECK_TIMEOUT = 30.0  # Same limit as the npx tsc fallback
+MAX_CHECKS_PER_WORKER = 500  # Recycle the worker to bound its memory
+DISABLE_AFTER_FAILURES = 3  # Consecutive failures before falling back for good
+
+
+def is_enabled() -> bool:
+    return os.getenv("GF_TS_CHECKER", "true").strip().lower() not in ("0", "false", "no", "off")
+
+
+@lru_cache(maxsize=None)
+def find_node() -> Optional[str]:
+    """Locate the node executable once per process."""
+    return shutil.which("node")
+
+
+class WorkerUnavailable(Exception):
+    """The worker could not answer; `permanent` means retrying will not help."""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def _pump(stream, lines: "queue.Queue[Optional[str]]") -> None:
+    """Forward worker stdout lines to a queue (None marks EOF) so reads can time out."""
+    try:
+        for line in stream:
+            lines.put(line)
+    except (OSError, ValueError):
+        pass
+    finally:
+        lines.put(None)
+
+
+class TsChecker:
+    """
+    Client for one long-lived checker worker.
+
+    Checks are serialized (the LanguageService is single-threaded); the
+    worker is (re)started on demand.
+    """
+
+    def __init__(self, repo_root: Path = REPO_ROOT, command: Optional[List[str]] = None):
+        self._repo_root = Path(repo_root)
+        self._command = command
+        self._lock = threading.Lock()
+        self._proc: Optional[subprocess.Popen] = None
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._next_id = 0
+        self._checks = 0
+        self._failures = 0
+        self.disabled_reason: Optional[str] = None
+        self.starts = 0
+
+    def _command_line(self) -> List[str]:
+        if self._command:
+            return list(self._command)
+        node = find_node()
+        if not node:
+            raise WorkerUnavailable("node not found", permanent=True)
+        return [node, str(WORKER_SCRIPT), str(self._repo_root)]
+
+    def _read(self, deadline: float) -> Dict[str, Any]:
+        try:
+            line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            raise TimeoutError("TypeScript checker did not answer in time")
+        if line is None:
+            raise WorkerUnavailable("TypeScript checker exited")
+        return json.loads(line)
+
+    def _start(self) -> None:
+        started = time.monotonic()
+        self._lines = queue.Queue()
+        self._proc = subprocess.Popen(
+            self._command_line(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+            cwd=str(self._repo_root),
+        )
+        threading.Thread(target=_pump, args=(self._proc.stdout, self._lines), daemon=True).start()
+        self._checks = 0
+        self.starts += 1
+        ready = self._read(started + STARTUP_TIMEOUT)
+        if not ready.get("ready"):
+            # Missing typescript / broken tsconfig: restarting will not fix it
+            raise WorkerUnavailable(ready.get("error") or "TypeScript checker failed to start", permanent=True)
+        logging.info(
+            f"[ts-checker] TypeScript {ready.get('version', '?')} worker ready in {time.monotonic() - started:.1f}s"
+        )
+
+    def _stop(self) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait(timeout=2)
+
+    def check(self, code: str, timeout: float = CHECK_TIMEOUT) -> Optional[List[str]]:
+        """
+        Type-check a page.
+
+        Returns:
+            tsc-style error lines ("page.tsx(3,7): error TS1005: ..."), an empty
+            list if the page compiles, or None if the worker is unavailable
+        """
+        if self.disabled_reason:
+            return None
+        with self._lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None or self._checks >= MAX_CHECKS_PER_WORKER:
+                    self._stop()
+                    self._start()
+                self._next_id += 1
+                request_id = self._next_id
+                self._proc.stdin.write(json.dumps({"id": request_id, "code": code}) + "\n")
+                self._proc.stdin.flush()
+                deadline = time.monotonic() + timeout
+                reply = self._read(deadline)
+                while reply.get("id") != request_id:
+                    reply = self._read(deadline)
+                self._checks += 1
+                if "error" in reply:
+                    raise WorkerUnavailable(reply["error"])
+                self._failures = 0
+                return [str(line) for line in reply.get("diagnostics") or []]
+            except (OSError, ValueError, TimeoutError, WorkerUnavailable) as exc:
+                self._stop()
+                self._failures += 1
+                if getattr(exc, "permanent", False) or self._failures >= DISABLE_AFTER_FAILURES:
+                    self.disabled_reason = str(exc)
+                    logging.warning(f"[ts-checker] disabled, falling back to npx tsc: {exc}")
+                else:
+                    logging.warning(f"[ts-checker] check failed, worker will restart: {exc}")
+                return None
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+
+_checker: Optional[TsChecker] = None
+_checker_lock = threading.Lock()
+
+
+def get_checker() -> TsChecker:
+    """Return the process-wide checker (created on first use)."""
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = TsChecker()
+        return _checker
+
+
+def check(code: str) -> Optional[List[str]]:
+    """Check a page with the shared worker; None means use the npx tsc fallback."""
+    if not is_enabled():
+        return None
+    return get_checker().check(code)
+
+
+def shutdown() -> None:
+    """Stop the shared worker (registered with atexit)."""
+    with _checker_lock:
+        checker = _checker
+    if checker is not None:
+        checker.close()
+
+
+atexit.register(shutdown)
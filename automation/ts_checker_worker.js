@@ -0,0 +1,147 @@
+/**
+ * Long-lived TypeScript checker for automation/ts_checker.py.
+ *
+ * Keeps a LanguageService over the repo's tsconfig warm (lib files, React and
+ * component types stay parsed), so each check of a generated page only
+ * re-analyses that one file instead of paying Node startup and full program
+ * construction like a cold `npx tsc`.
+ *
+ * Protocol (one JSON object per line):
+ *   stdout on start: {"ready": true, "version": "5.x"} or {"ready": false, "error": "..."}
+ *   stdin:           {"id": 1, "code": "<page.tsx source>"}
+ *   stdout:          {"id": 1, "diagnostics": ["page.tsx(3,7): error TS1005: ';' expected."]}
+ *                    or {"id": 1, "error": "..."}
+ *
+ * Usage: node ts_checker_worker.js <repo-root>
+ */
+'use strict';
+
+const fs = require('fs');
+const path = require('path');
+const readline = require('readline');
+
+const repoRoot = path.resolve(process.argv[2] || process.cwd());
+
+function send(message) {
+  process.stdout.write(JSON.stringify(message) + '\n');
+}
+
+function loadCompilerOptions(ts) {
+  // Same overrides check_syntax applies to its temporary tsconfig
+  const overrides = { noEmit: true, skipLibCheck: true, isolatedModules: true, incremental: false, baseUrl: repoRoot };
+  const configPath = ts.findConfigFile(repoRoot, ts.sys.fileExists, 'tsconfig.json');
+  if (!configPath) {
+    return Object.assign({
+      jsx: ts.JsxEmit.Preserve,
+      esModuleInterop: true,
+      moduleResolution: ts.ModuleResolutionKind.Bundler || ts.ModuleResolutionKind.NodeJs,
+      target: ts.ScriptTarget.ES2017,
+      module: ts.ModuleKind.ESNext,
+      paths: { '@/*': ['./*'] },
+    }, overrides);
+  }
+  const config = ts.readConfigFile(configPath, ts.sys.readFile);
+  const parsed = ts.parseJsonConfigFileContent(config.config || {}, ts.sys, path.dirname(configPath), undefined, configPath);
+  return Object.assign({}, parsed.options, overrides);
+}
+
+function diskVersion(fileName) {
+  // mtime as version: edits to components are picked up without a restart
+  try {
+    return String(fs.statSync(fileName).mtimeMs);
+  } catch (err) {
+    return '0';
+  }
+}
+
+function createChecker(ts) {
+  // The page under check is a virtual file inside the repo so "@/..." paths and
+  // node_modules resolve exactly as they do for app/clients/<id>/page.tsx
+  const checkFile = path.join(repoRoot, '__ghost_factory_check__', 'page.tsx');
+  const options = loadCompilerOptions(ts);
+  let checkText = '';
+  let checkVersion = 0;
+
+  const host = {
+    getScriptFileNames: () => [checkFile],
+    getScriptVersion: (fileName) => (fileName === checkFile ? String(checkVersion) : diskVersion(fileName)),
+    getScriptSnapshot: (fileName) => {
+      if (fileName === checkFile) {
+        return ts.ScriptSnapshot.fromString(checkText);
+      }
+      const text = ts.sys.readFile(fileName);
+      return text === undefined ? undefined : ts.ScriptSnapshot.fromString(text);
+    },
+    getCurrentDirectory: () => repoRoot,
+    getCompilationSettings: () => options,
+    getDefaultLibFileName: (opts) => ts.getDefaultLibFilePath(opts),
+    fileExists: (fileName) => fileName === checkFile || ts.sys.fileExists(fileName),
+    readFile: (fileName) => (fileName === checkFile ? checkText : ts.sys.readFile(fileName)),
+    readDirectory: ts.sys.readDirectory,
+    directoryExists: ts.sys.directoryExists,
+    getDirectories: ts.sys.getDirectories,
+  };
+  const service = ts.createLanguageService(host, ts.createDocumentRegistry());
+
+  function formatDiagnostic(diagnostic) {
+    // Same shape as tsc's output so check_syntax's filtering/formatting applies unchanged
+    const message = ts.flattenDiagnosticMessageText(diagnostic.messageText, '\n');
+    const category = ts.DiagnosticCategory[diagnostic.category].toLowerCase();
+    if (diagnostic.file && diagnostic.start !== undefined) {
+      const { line, character } = diagnostic.file.getLineAndCharacterOfPosition(diagnostic.start);
+      const name = diagnostic.file.fileName === checkFile ? 'page.tsx' : path.relative(repoRoot, diagnostic.file.fileName);
+      return `${name}(${line + 1},${character + 1}): ${category} TS${diagnostic.code}: ${message}`;
+    }
+    return `${category} TS${diagnostic.code}: ${message}`;
+  }
+
+  return function check(code) {
+    checkText = code;
+    checkVersion += 1;
+    const diagnostics = service.getSyntacticDiagnostics(checkFile).concat(service.getSemanticDiagnostics(checkFile));
+    return diagnostics
+      .filter((diagnostic) => diagnostic.category === ts.DiagnosticCategory.Error)
+      .map(formatDiagnostic);
+  };
+}
+
+function main() {
+  let ts;
+  try {
+    ts = require(require.resolve('typescript', { paths: [repoRoot] }));
+  } catch (err) {
+    send({ ready: false, error: `typescript not found from ${repoRoot}: ${err.message}` });
+    process.exitCode = 1;
+    return;
+  }
+
+  let check;
+  try {
+    check = createChecker(ts);
+    // Warm up: parse lib files and React types once before accepting requests
+    check("import React from 'react';\nexport default function Page() { return <main />; }\n");
+  } catch (err) {
+    send({ ready: false, error: `warm-up failed: ${err.message}` });
+    process.exitCode = 1;
+    return;
+  }
+  send({ ready: true, version: ts.version });
+
+  const input = readline.createInterface({ input: process.stdin });
+  input.on('line', (line) => {
+    let request;
+    try {
+      request = JSON.parse(line);
+    } catch (err) {
+      send({ id: null, error: 'invalid JSON request' });
+      return;
+    }
+    try {
+      send({ id: request.id, diagnostics: check(String(request.code || '')) });
+    } catch (err) {
+      send({ id: request.id, error: String((err && err.stack) || err) });
+    }
+  });
+}
+
+main();
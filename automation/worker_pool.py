@@ -0,0 +1,101 @@
+"""
+Worker pool utilities for processing multiple clients concurrently.
+
+Dispatches a list of jobs to N worker threads and records how busy each
+worker was, so the batch loop can report per-worker utilization.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List
+
+
+@dataclass
+class WorkerStats:
+    """Busy time and job count for a single worker thread."""
+    name: str
+    jobs: int = 0
+    busy_seconds: float = 0.0
+    failures: int = 0
+
+
+@dataclass
+class PoolReport:
+    """Summary of a worker pool run."""
+    jobs: int
+    wall_seconds: float
+    workers: Dict[str, WorkerStats] = field(default_factory=dict)
+
+    def utilization(self, worker_name: str) -> float:
+        """Fraction of the pool's wall time this worker spent running jobs (0.0-1.0)."""
+        stats = self.workers.get(worker_name)
+        if not stats or self.wall_seconds <= 0:
+            return 0.0
+        return min(stats.busy_seconds / self.wall_seconds, 1.0)
+
+    def summary_lines(self) -> List[str]:
+        """Human-readable per-worker utilization lines, sorted by worker name."""
+        lines = []
+        for name in sorted(self.workers):
+            stats = self.workers[name]
+            failed = f", {stats.failures} failed" if stats.failures else ""
+            lines.append(
+                f"{name}: {stats.jobs} job(s){failed}, busy {stats.busy_seconds:.1f}s "
+                f"({self.utilization(name) * 100:.0f}% of {self.wall_seconds:.1f}s)"
+            )
+        return lines
+
+
+def run_pool(items: Iterable[Any], func: Callable[[Any], Any], jobs: int = 1,
+             thread_name_prefix: str = "factory-worker") -> PoolReport:
+    """
+    Run func(item) for every item using up to `jobs` worker threads.
+
+    Threads are used (not processes) because the pipeline is dominated by
+    network-bound LLM calls and shares module-level clients and config.
+    Exceptions raised by func are logged and counted as failures; they never
+    stop the other workers. A func that handles its own errors reports a
+    failure by returning False (any other return value is a success).
+
+    Args:
+        items: Work items (e.g. client IDs) to dispatch
+        func: Callable invoked once per item
+        jobs: Maximum number of concurrent workers (values < 1 are treated as 1)
+        thread_name_prefix: Prefix for worker thread names
+
+    Returns:
+        PoolReport with wall time and per-worker busy time
+    """
+    items = list(items)
+    jobs = max(1, int(jobs))
+    report = PoolReport(jobs=len(items), wall_seconds=0.0)
+    stats_lock = threading.Lock()
+
+    def _run(item: Any) -> None:
+        name = threading.current_thread().name
+        start = time.monotonic()
+        failed = False
+        try:
+            failed = func(item) is False
+        except Exception as e:
+            failed = True
+            logging.error(f"Worker {name} failed on {item!r}: {e}")
+        finally:
+            elapsed = time.monotonic() - start
+            with stats_lock:
+                stats = report.workers.setdefault(name, WorkerStats(name=name))
+                stats.jobs += 1
+                stats.busy_seconds += elapsed
+                if failed:
+                    stats.failures += 1
+
+    start = time.monotonic()
+    if items:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(items)),
+                                thread_name_prefix=thread_name_prefix) as executor:
+            # Consume results so the pool drains before we measure wall time
+            list(executor.map(_run, items))
+    report.wall_seconds = time.monotonic() - start
+    return report
@@ -0,0 +1,22 @@
+'use client'
+
+import { useEffect } from 'react'
+
+/**
+ * HydrationMarker - Signals that the page has hydrated
+ *
+ * Sets `data-gf-hydrated` on the <html> element once React has hydrated the
+ * page, so visual QA can take its screenshot as soon as the page is
+ * interactive instead of sleeping for a fixed time.
+ *
+ * Renders nothing. Included once by app/clients/layout.tsx.
+ */
+export function HydrationMarker() {
+  useEffect(() => {
+    document.documentElement.dataset.gfHydrated = 'true'
+  }, [])
+
+  return null
+}
+
+export default HydrationMarker
@@ -1,5 +1,9 @@
 /** @type {import('next').NextConfig} */
 const nextConfig = {
+  // Visual QA builds into its own directory (GF_NEXT_DIST_DIR=.next-qa) so a
+  // production build never clobbers a running dev server's .next
+  distDir: process.env.GF_NEXT_DIST_DIR || '.next',
+
   // Enable React strict mode for better development experience
   reactStrictMode: true,
 
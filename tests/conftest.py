@@ -0,0 +1,27 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+from automation import job_queue, qa_server, rate_limiter
+
+
+@pytest.fixture(autouse=True)
+def isolated_job_queue(tmp_path, monkeypatch):
+    """Point the persistent job queue at a per-test database"""
+    monkeypatch.setattr(job_queue, "DB_PATH", tmp_path / "jobs.db")
+    yield tmp_path / "jobs.db"
+
+
+@pytest.fixture(autouse=True)
+def isolated_rate_limiter(tmp_path, monkeypatch):
+    """Point the shared rate-limit buckets at a per-test database"""
+    monkeypatch.setattr(rate_limiter, "DB_PATH", tmp_path / "rate_limits.db")
+    yield tmp_path / "rate_limits.db"
+
+
+@pytest.fixture(autouse=True)
+def no_qa_server_warm_up(monkeypatch):
+    """Keep builder tests from starting or requesting a real Next.js server"""
+    monkeypatch.setattr(qa_server, "warm_up", lambda client_id: None)
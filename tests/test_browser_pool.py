@@ -0,0 +1,256 @@
+"""
+Unit tests for automation/browser_pool.py
+
+Tests cover:
+- Reusing one warm browser across checks with a fresh context per check
+- Multi-page checks sharing one browser
+- Relaunching a disconnected browser and recycling after N pages
+- Running checks on the browser's own thread and propagating errors
+- Per-check overhead reporting and shutdown
+"""
+
+import threading
+
+import pytest
+
+from automation import browser_pool
+
+
+class FakeContext:
+    def __init__(self, browser, options):
+        self.browser = browser
+        self.options = options
+        self.closed = False
+
+    def new_page(self):
+        return {"context": self, "thread": threading.get_ident()}
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+    def new_context(self, **options):
+        context = FakeContext(self, options)
+        self.contexts.append(context)
+        return context
+
+    def close(self):
+        self.closed = True
+        self.connected = False
+
+
+class FakeDriver:
+    def __init__(self):
+        self.browsers = []
+        self.stopped = False
+        self.chromium = self
+
+    def launch(self, **options):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.fixture
+def make_pool():
+    """Build pools backed by a fake Playwright driver"""
+    pools = []
+
+    def _make(**kwargs):
+        drivers = []
+
+        def factory():
+            driver = FakeDriver()
+            drivers.append(driver)
+            return driver
+
+        pool = browser_pool.BrowserPool(driver_factory=factory, **kwargs)
+        pool.drivers = drivers
+        pools.append(pool)
+        return pool
+
+    yield _make
+    for pool in pools:
+        pool.close()
+
+
+class TestWarmBrowser:
+    """Test suite for browser reuse and context isolation"""
+
+    def test_browser_launched_once(self, make_pool):
+        """Test consecutive checks share one browser"""
+        pool = make_pool()
+        for _ in range(3):
+            pool.run(lambda page: None)
+
+        assert len(pool.drivers) == 1
+        assert len(pool.drivers[0].browsers) == 1
+        assert pool.stats()["launches"] == 1
+        assert pool.stats()["checks"] == 3
+
+    def test_fresh_context_per_check(self, make_pool):
+        """Test every check gets its own context, closed afterwards"""
+        pool = make_pool()
+        first, _ = pool.run(lambda page: page["context"], viewport={"width": 390, "height": 844})
+        second, _ = pool.run(lambda page: page["context"])
+
+        assert first is not second
+        assert first.closed and second.closed
+        assert first.options == {"viewport": {"width": 390, "height": 844}}
+
+    def test_cold_then_warm_stats(self, make_pool):
+        """Test only the first check reports a launch"""
+        pool = make_pool()
+        _, cold = pool.run(lambda page: None)
+        _, warm = pool.run(lambda page: None)
+
+        assert cold.cold is True
+        assert warm.cold is False
+        assert warm.launch_ms == 0
+        assert warm.overhead_ms == warm.context_ms + warm.teardown_ms
+        assert (cold.browser_pages, warm.browser_pages) == (1, 2)
+
+    def test_check_runs_on_browser_thread(self, make_pool):
+        """Test the check is called on the thread owning the browser"""
+        pool = make_pool()
+        (page_thread, check_thread), _ = pool.run(lambda page: (page["thread"], threading.get_ident()))
+
+        assert page_thread == check_thread
+        assert check_thread != threading.get_ident()
+
+    def test_run_pages_shares_one_browser(self, make_pool):
+        """Test a multi-page check gets one isolated context per page on the same browser"""
+        pool = make_pool()
+        contexts, stats = pool.run_pages(
+            lambda pages: [page["context"] for page in pages],
+            [{"viewport": {"width": 390, "height": 844}}, {"viewport": {"width": 1440, "height": 900}}],
+        )
+
+        assert contexts[0] is not contexts[1]
+        assert contexts[0].browser is contexts[1].browser
+        assert [context.options["viewport"]["width"] for context in contexts] == [390, 1440]
+        assert all(context.closed for context in contexts)
+        assert stats.browser_pages == 2
+
+
+class TestHealthAndRecycling:
+    """Test suite for health checks and recycling"""
+
+    def test_disconnected_browser_relaunched(self, make_pool):
+        """Test a crashed browser is replaced before the next check"""
+        pool = make_pool()
+        pool.run(lambda page: None)
+        pool.drivers[0].browsers[0].connected = False
+        _, stats = pool.run(lambda page: None)
+
+        assert len(pool.drivers[0].browsers) == 2
+        assert stats.cold is True
+
+    def test_recycled_after_max_pages(self, make_pool):
+        """Test the browser is closed and relaunched after max_pages checks"""
+        pool = make_pool(max_pages=2)
+        for _ in range(5):
+            pool.run(lambda page: None)
+
+        browsers = pool.drivers[0].browsers
+        assert len(browsers) == 3
+        assert browsers[0].closed and browsers[1].closed
+        assert not browsers[2].closed
+
+    def test_check_error_propagates(self, make_pool):
+        """Test a failing check raises in the caller and the pool keeps working"""
+        pool = make_pool()
+
+        def failing(page):
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError, match="boom"):
+            pool.run(failing)
+        result, _ = pool.run(lambda page: "ok")
+
+        assert result == "ok"
+        assert all(context.closed for context in pool.drivers[0].browsers[0].contexts)
+        assert len(pool.drivers[0].browsers) == 1
+
+
+class TestLifecycle:
+    """Test suite for pool sizing and shutdown"""
+
+    def test_close_stops_browsers_and_driver(self, make_pool):
+        """Test close() closes browsers and stops Playwright"""
+        pool = make_pool()
+        pool.run(lambda page: None)
+        pool.close()
+
+        assert pool.drivers[0].browsers[0].closed
+        assert pool.drivers[0].stopped
+        with pytest.raises(RuntimeError):
+            pool.run(lambda page: None)
+
+    def test_unused_pool_launches_nothing(self, make_pool):
+        """Test creating and closing a pool without checks starts no browser"""
+        pool = make_pool(size=2)
+        pool.close()
+
+        assert pool.drivers == []
+
+    def test_parallel_checks_use_separate_browsers(self, make_pool):
+        """Test a pool of two serves concurrent checks on two browsers"""
+        pool = make_pool(size=2)
+        barrier = threading.Barrier(2, timeout=5)
+        results = []
+
+        def check(page):
+            barrier.wait()
+            return page["context"].browser
+
+        threads = [threading.Thread(target=lambda: results.append(pool.run(check)[0])) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(results) == 2
+        assert results[0] is not results[1]
+
+    def test_timeout_starts_when_check_is_dequeued(self, make_pool):
+        """Test time queued behind another check does not count against the timeout"""
+        pool = make_pool()
+        busy, release = threading.Event(), threading.Event()
+        first = threading.Thread(target=lambda: pool.run(lambda page: busy.set() or release.wait(5)))
+        first.start()
+        assert busy.wait(5)
+        timer = threading.Timer(0.3, release.set)
+        timer.start()
+        try:
+            # Queued ~0.3s behind the first check, then runs well within its 0.2s
+            result, _ = pool.run(lambda page: "done", timeout=0.2)
+        finally:
+            release.set()
+            first.join()
+
+        assert result == "done"
+
+    def test_env_configures_shared_pool(self, monkeypatch):
+        """Test GF_QA_BROWSERS and GF_QA_BROWSER_MAX_PAGES configure get_pool()"""
+        monkeypatch.setenv("GF_QA_BROWSERS", "3")
+        monkeypatch.setenv("GF_QA_BROWSER_MAX_PAGES", "7")
+        monkeypatch.setattr(browser_pool, "_pool", None)
+        try:
+            pool = browser_pool.get_pool()
+            assert (pool.size, pool.max_pages) == (3, 7)
+            assert browser_pool.get_pool() is pool
+        finally:
+            browser_pool.shutdown()
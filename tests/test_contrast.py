@@ -0,0 +1,196 @@
+"""
+Unit tests for automation/contrast.py
+
+Tests cover:
+- Parsing hex, rgb() and Tailwind color values
+- WCAG relative luminance and contrast ratios
+- Theme verdicts: passing, failing, unresolved and unknown palettes
+- Designer feedback formatting
+- OKLCH palette repair: lightness-only changes, hue kept, delta limit
+"""
+
+import math
+
+import pytest
+
+from automation import contrast
+
+
+class TestParseColor:
+    """Test suite for resolving theme color values"""
+
+    @pytest.mark.parametrize("value, expected", [
+        ("#1E3A8A", (30, 58, 138)),
+        ("#fff", (255, 255, 255)),
+        ("#0F172AFF", (15, 23, 42)),
+        ("rgb(30, 58, 138)", (30, 58, 138)),
+        ("rgba(30 58 138 / 0.5)", (30, 58, 138)),
+        ("white", (255, 255, 255)),
+        ("slate-900", (15, 23, 42)),
+        ("bg-stone-100", (245, 245, 244)),
+        (" Slate-900 ", (15, 23, 42)),
+    ])
+    def test_supported_formats(self, value, expected):
+        """Test every supported color syntax resolves to sRGB"""
+        assert contrast.parse_color(value) == expected
+
+    @pytest.mark.parametrize("value", ["navy", "#12345", "rgb(300, 0, 0)", "", None, 42])
+    def test_unsupported_values(self, value):
+        """Test unknown names, bad hex and non-strings give None"""
+        assert contrast.parse_color(value) is None
+
+
+class TestContrastRatio:
+    """Test suite for the WCAG formulas"""
+
+    def test_extremes(self):
+        """Test black on white is 21:1 and a color on itself is 1:1"""
+        assert contrast.contrast_ratio(contrast.BLACK, contrast.WHITE) == pytest.approx(21.0)
+        assert contrast.contrast_ratio((30, 58, 138), (30, 58, 138)) == pytest.approx(1.0)
+
+    def test_known_values(self):
+        """Test ratios match published WCAG values"""
+        assert contrast.contrast_ratio((0x76, 0x76, 0x76), contrast.WHITE) == pytest.approx(4.54, abs=0.01)
+        assert contrast.contrast_ratio((0x77, 0x77, 0x77), contrast.WHITE) == pytest.approx(4.48, abs=0.01)
+
+    def test_order_independent(self):
+        """Test the ratio does not depend on argument order"""
+        a, b = (37, 99, 235), (15, 23, 42)
+        assert contrast.contrast_ratio(a, b) == contrast.contrast_ratio(b, a)
+
+    def test_best_text_color(self):
+        """Test white is chosen on dark colors and black on light ones"""
+        assert contrast.best_text_color((15, 23, 42)) == contrast.WHITE
+        assert contrast.best_text_color((245, 158, 11)) == contrast.BLACK
+
+
+class TestCheckTheme:
+    """Test suite for theme verdicts"""
+
+    def test_accessible_theme_passes(self):
+        """Test a navy/gold palette on white passes every pair"""
+        verdict = contrast.check_theme({"primary": "#1E3A8A", "secondary": "#3B82F6", "accent": "#D97706", "background": "white"})
+
+        assert verdict["status"] == "PASS"
+        assert [check["name"] for check in verdict["checks"]] == [pair[0] for pair in contrast.THEME_PAIRS]
+        assert verdict["failures"] == [] and verdict["unresolved"] == []
+
+    def test_light_palette_fails(self):
+        """Test pastel colors on white fail with their ratios"""
+        verdict = contrast.check_theme({"primary": "#93C5FD", "secondary": "#BFDBFE", "accent": "#FEF3C7", "background": "white"})
+
+        assert verdict["status"] == "FAIL"
+        failures = {check["name"]: check for check in verdict["failures"]}
+        assert set(failures) == {"primary_on_background", "secondary_on_background", "accent_on_background"}
+        assert failures["primary_on_background"]["ratio"] == pytest.approx(1.8, abs=0.01)
+        # The a11y critic prompt's FAIL example: cream accent on white is nearly invisible
+        assert failures["accent_on_background"]["ratio"] == pytest.approx(1.11, abs=0.01)
+        assert failures["primary_on_background"]["background"] == "#FFFFFF"
+
+    def test_dark_background(self):
+        """Test Tailwind dark backgrounds are resolved and checked"""
+        verdict = contrast.check_theme({"primary": "#2563EB", "background": "slate-900"})
+
+        assert verdict["status"] == "FAIL"
+        assert verdict["failures"][0]["background"] == "#0F172A"
+
+    def test_threshold_not_rounded(self):
+        """Test a ratio just under 4.5 fails even though it rounds to 4.5"""
+        verdict = contrast.check_theme({"primary": "#777777", "background": "white"})
+
+        assert verdict["failures"][0]["name"] == "primary_on_background"
+
+    def test_missing_roles_skipped(self):
+        """Test roles the theme does not set are not checked and background defaults to white"""
+        verdict = contrast.check_theme({"primary": "#000"})
+
+        assert verdict["status"] == "PASS"
+        assert {check["name"] for check in verdict["checks"]} == {"primary_on_background", "text_on_background", "text_on_primary"}
+        assert verdict["unresolved"] == []
+
+    def test_unparseable_colors_unresolved(self):
+        """Test colors that cannot be parsed are reported, and a theme without any is UNKNOWN"""
+        partial = contrast.check_theme({"primary": "navy", "background": "white"})
+        unknown = contrast.check_theme({"primary": "navy", "background": "linear-gradient(red, blue)"})
+
+        assert partial["status"] == "PASS"
+        assert "primary_on_background" in partial["unresolved"]
+        assert unknown["status"] == "UNKNOWN"
+        assert unknown["checks"] == []
+
+
+class TestFormatFeedback:
+    """Test suite for designer feedback"""
+
+    def test_failures_listed(self):
+        """Test feedback starts with FAIL and lists each failing pair"""
+        verdict = contrast.check_theme({"primary": "#93C5FD", "background": "white"})
+
+        feedback = contrast.format_feedback(verdict)
+        assert feedback.startswith("FAIL: 1 color pair(s) below WCAG AA contrast")
+        assert "Primary on background (#93C5FD on #FFFFFF): contrast 1.8:1 (needs >= 4.5:1)" in feedback
+
+    def test_pass(self):
+        """Test a passing verdict formats as PASS"""
+        assert contrast.format_feedback(contrast.check_theme({"primary": "#000"})) == "PASS"
+
+
+class TestRepairTheme:
+    """Test suite for the OKLCH palette repair"""
+
+    @staticmethod
+    def _hue(value):
+        _, a, b = contrast.to_oklab(contrast.parse_color(value))
+        return math.degrees(math.atan2(b, a))
+
+    def test_oklch_round_trip(self):
+        """Test converting to OKLab and back returns the same sRGB color"""
+        for value in ("#1E3A8A", "#F59E0B", "#93C5FD", "#000000", "#FFFFFF"):
+            rgb = contrast.parse_color(value)
+            lightness, a, b = contrast.to_oklab(rgb)
+            assert contrast.from_oklch(lightness, math.hypot(a, b), math.atan2(b, a)) == rgb
+
+    def test_small_repair_passes_and_keeps_hue(self):
+        """Test a slightly too light primary is darkened just enough, keeping its hue"""
+        theme = {"primary": "#3B82F6", "secondary": "#1E40AF", "accent": "#D97706", "background": "white", "font_body": "Inter"}
+
+        repaired, report = contrast.repair_theme(theme)
+
+        assert report["status"] == "PASS"
+        assert report["within_delta"] is True
+        assert [change["role"] for change in report["changes"]] == ["primary"]
+        assert contrast.check_theme(repaired)["status"] == "PASS"
+        assert abs(self._hue(repaired["primary"]) - self._hue("#3B82F6")) < 3
+        # Untouched roles and non-color keys keep their original values
+        assert repaired["background"] == "white"
+        assert repaired["font_body"] == "Inter"
+        assert theme["primary"] == "#3B82F6"
+
+    def test_dark_background_lightens(self):
+        """Test colors on a dark background are made lighter, not darker"""
+        theme = {"primary": "#1E40AF", "background": "slate-900"}
+
+        repaired, report = contrast.repair_theme(theme)
+
+        assert report["status"] == "PASS"
+        before = contrast.relative_luminance(contrast.parse_color("#1E40AF"))
+        assert contrast.relative_luminance(contrast.parse_color(repaired["primary"])) > before
+
+    def test_large_shift_outside_delta(self):
+        """Test a repair that changes a color a lot passes but is flagged as outside the limit"""
+        theme = {"primary": "#93C5FD", "background": "white"}
+
+        repaired, report = contrast.repair_theme(theme, max_delta=0.1)
+
+        assert report["status"] == "PASS"
+        assert report["within_delta"] is False
+        assert report["max_delta"] > 0.1
+
+    def test_passing_theme_unchanged(self):
+        """Test a theme that already passes is returned as is"""
+        theme = {"primary": "#1E3A8A", "background": "white"}
+
+        repaired, report = contrast.repair_theme(theme)
+
+        assert repaired == theme
+        assert report == {"status": "PASS", "changes": [], "max_delta": 0.0, "within_delta": True}
@@ -238,6 +238,52 @@ class TestRecordApiCost:
             # Verify _append_entry was called
             mock_append.assert_called_once()
     
+    def test_record_api_cost_cache_hit_is_free(self, mock_time, temp_data_dir):
+        """Test a cache hit costs $0 and records what it saved"""
+        cfg = {
+            "api_pricing": {
+                "anthropic/claude-opus-4-5-20251101": {
+                    "input_per_million": 15.0,
+                    "output_per_million": 75.0
+                }
+            }
+        }
+        
+        with patch('automation.cost_tracker.load_config', return_value=cfg), \
+             patch('automation.cost_tracker._append_entry') as mock_append:
+            
+            result = cost_tracker.record_api_cost(
+                provider="anthropic",
+                model="claude-opus-4-5-20251101",
+                client_id="test-client",
+                activity="pipeline_architect",
+                input_tokens=100000,
+                output_tokens=50000,
+                cache_hit=True,
+            )
+            
+            assert result["cost_usd"] == 0.0
+            assert result["cache_hit"] is True
+            assert result["saved_usd"] == 5.25
+            assert mock_append.call_args[0][2] is result
+    
+    def test_record_api_cost_without_cache_hit_has_no_flag(self, mock_time, temp_data_dir):
+        """Test regular calls keep the original entry shape"""
+        with patch('automation.cost_tracker.load_config', return_value={}), \
+             patch('automation.cost_tracker._append_entry'):
+            
+            result = cost_tracker.record_api_cost(
+                provider="anthropic",
+                model="claude-opus-4-5-20251101",
+                client_id="test-client",
+                activity="pipeline_architect",
+                input_tokens=10,
+                output_tokens=10,
+            )
+            
+            assert "cache_hit" not in result
+            assert "saved_usd" not in result
+    
     def test_record_api_cost_uses_estimates_when_tokens_not_provided(self, mock_time, temp_data_dir):
         """Test that token estimates are used when tokens not provided"""
         cfg = {
@@ -454,6 +500,122 @@ class TestRecordApiCost:
                 assert decimals <= 4
 
 
+class TestPromptCacheCosts:
+    """Test suite for prompt-cache write/read token classes in record_api_cost"""
+    
+    @pytest.fixture
+    def record(self):
+        """Call record_api_cost with a fixed config and no ledger writes"""
+        def _record(cfg, **kwargs):
+            with patch('automation.cost_tracker.load_config', return_value=cfg), \
+                 patch('automation.cost_tracker._append_entry'):
+                return cost_tracker.record_api_cost(
+                    provider="anthropic",
+                    model="claude-sonnet-4-5-20250929",
+                    client_id="test-client",
+                    activity="pipeline_builder",
+                    **kwargs,
+                )
+        return _record
+    
+    def test_explicit_cache_rates(self, record):
+        """Test cache writes and reads are billed at their configured rates"""
+        cfg = {"api_pricing": {"anthropic/claude-sonnet-4-5-20250929": {
+            "input_per_million": 3.0,
+            "output_per_million": 15.0,
+            "cache_write_per_million": 3.75,
+            "cache_read_per_million": 0.30,
+        }}}
+        
+        result = record(
+            cfg, input_tokens=1_000_000, output_tokens=0,
+            cache_creation_tokens=1_000_000, cache_read_tokens=1_000_000,
+        )
+        
+        # 3.00 input + 3.75 write + 0.30 read
+        assert result["cost_usd"] == 7.05
+        assert result["cache_creation_input_tokens"] == 1_000_000
+        assert result["cache_read_input_tokens"] == 1_000_000
+        assert result["prompt_cache_savings_usd"] == 2.7
+    
+    def test_default_cache_rates_follow_input_price(self, record):
+        """Test missing cache rates default to 1.25x / 0.1x the input price"""
+        cfg = {"api_pricing": {"anthropic/claude-sonnet-4-5-20250929": {
+            "input_per_million": 4.0,
+            "output_per_million": 20.0,
+        }}}
+        
+        result = record(
+            cfg, input_tokens=0, output_tokens=0,
+            cache_creation_tokens=1_000_000, cache_read_tokens=1_000_000,
+        )
+        
+        assert result["cost_usd"] == 5.4
+    
+    def test_tier_uses_total_prompt_size(self, record):
+        """Test cached tokens count toward the long-context tier threshold"""
+        cfg = {"api_pricing": {"anthropic/claude-sonnet-4-5-20250929": {"tiered_pricing": {
+            "threshold": 200000,
+            "below_threshold": {"input_per_million": 3.0, "output_per_million": 15.0, "cache_read_per_million": 0.3},
+            "above_threshold": {"input_per_million": 6.0, "output_per_million": 22.5, "cache_read_per_million": 0.6},
+        }}}}
+        
+        result = record(cfg, input_tokens=1000, output_tokens=0, cache_read_tokens=300_000)
+        
+        assert result["cost_usd"] == round(300_000 / 1_000_000 * 0.6 + 1000 / 1_000_000 * 3.0, 4)
+    
+    def test_no_cache_fields_without_cache_tokens(self, record):
+        """Test uncached calls keep the original entry shape"""
+        result = record({}, input_tokens=10, output_tokens=10)
+        
+        assert "cache_creation_input_tokens" not in result
+        assert "cache_read_input_tokens" not in result
+        assert "prompt_cache_savings_usd" not in result
+    
+    def test_cache_fields_pass_schema_validation(self):
+        """Test entries with cache token classes are accepted by the validator"""
+        from automation.schema_validator import validate_api_cost_entry
+        entry = {
+            "timestamp": "2025-01-15T10:30:00", "provider": "anthropic", "model": "m",
+            "activity": "a", "client_id": None, "input_tokens": 1, "output_tokens": 1,
+            "cost_usd": 0.1, "cache_creation_input_tokens": 5, "cache_read_input_tokens": 7,
+        }
+        
+        assert validate_api_cost_entry(entry) == (True, None)
+        entry["cache_read_input_tokens"] = "7"
+        assert validate_api_cost_entry(entry)[0] is False
+
+
+class TestCriticStats:
+    """Test suite for critic_stats"""
+
+    def test_minor_fails_counted_per_activity(self, tmp_path):
+        """Test verdict metadata in the ledger is summarized per critic"""
+        entries = [
+            {"activity": "pipeline_architect_critic", "cost_usd": 0.01,
+             "metadata": {"verdict": "fail", "severity": "major", "retry": True}},
+            {"activity": "pipeline_architect_critic", "cost_usd": 0.01,
+             "metadata": {"verdict": "fail", "severity": "minor", "retry": False}},
+            {"activity": "pipeline_architect_critic", "cost_usd": 0.01,
+             "metadata": {"verdict": "pass", "severity": "none", "retry": False}},
+            {"activity": "pipeline_architect", "cost_usd": 0.05, "metadata": {"attempt": 1}},
+        ]
+        (tmp_path / "2026-01.json").write_text(json.dumps(entries), encoding="utf-8")
+
+        with patch('automation.cost_tracker.API_COST_DIR', tmp_path):
+            stats = cost_tracker.critic_stats("2026-01")
+
+        assert stats == {"pipeline_architect_critic": {
+            "reviews": 3, "retries": 1, "fails": 2, "minor_fails_accepted": 1,
+            "cost_usd": 0.03, "minor_fail_accept_rate": 0.5,
+        }}
+
+    def test_missing_ledger(self, tmp_path):
+        """Test a month without a ledger has no stats"""
+        with patch('automation.cost_tracker.API_COST_DIR', tmp_path):
+            assert cost_tracker.critic_stats("2026-01") == {}
+
+
 class TestRecordHostingCosts:
     """Test suite for record_hosting_costs function"""
     
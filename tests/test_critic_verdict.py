@@ -0,0 +1,116 @@
+"""
+Unit tests for automation/critic_verdict.py
+
+Tests cover:
+- Parsing JSON verdicts with and without code fences or surrounding prose
+- Strict decisions: unknown verdicts, missing severities, minor failures
+- Falling back to a leading PASS/FAIL token
+- Regeneration feedback and cost ledger metadata
+"""
+
+import json
+
+import pytest
+
+from automation import critic_verdict
+
+
+FAIL_JSON = {
+    "verdict": "fail",
+    "severity": "critical",
+    "summary": "Fabricated trial.",
+    "issues": [{"target": "Offer", "problem": "Mentions a 14-day trial", "fix": "Remove the trial"}],
+}
+
+
+class TestParseJson:
+    """Test suite for JSON verdicts"""
+
+    @pytest.mark.parametrize("wrap", [
+        "{}",
+        "```json\n{}\n```",
+        "Here is my review:\n{}\nThanks.",
+    ])
+    def test_wrappings_accepted(self, wrap):
+        """Test the verdict is found inside a code fence or surrounding prose"""
+        verdict = critic_verdict.parse(wrap.replace("{}", json.dumps(FAIL_JSON)))
+
+        assert verdict.status == "fail"
+        assert verdict.severity == "critical"
+        assert verdict.retry is True
+        assert verdict.targets == ["Offer"]
+        assert verdict.issues[0].fix == "Remove the trial"
+
+    def test_pass_mentioning_fail_does_not_retry(self):
+        """Test a passing verdict whose text mentions failure is not a retry"""
+        verdict = critic_verdict.parse(json.dumps({
+            "verdict": "pass", "severity": "none", "summary": "Nothing here would fail review.", "issues": [],
+        }))
+
+        assert verdict.status == "pass"
+        assert verdict.retry is False
+        assert critic_verdict.ledger_metadata(verdict)["verdict"] == "pass"
+
+    def test_minor_fail_does_not_retry(self):
+        """Test a failure the critic rates minor is accepted"""
+        verdict = critic_verdict.parse(json.dumps(dict(FAIL_JSON, severity="minor")))
+
+        assert verdict.status == "fail"
+        assert verdict.retry is False
+
+    def test_fail_without_severity_is_major(self):
+        """Test a fail with a missing or unknown severity still retries"""
+        verdict = critic_verdict.parse('{"Verdict": "FAIL", "severity": "bad", "issues": ["Placeholder text in Hero"]}')
+
+        assert verdict.severity == "major"
+        assert verdict.retry is True
+        assert verdict.issues[0].problem == "Placeholder text in Hero"
+
+    def test_unknown_verdict_falls_through(self):
+        """Test a JSON object without a pass/fail verdict is not treated as a decision"""
+        verdict = critic_verdict.parse('{"verdict": "maybe"}')
+
+        assert verdict.status == "unclear"
+        assert verdict.retry is False
+
+
+class TestParseText:
+    """Test suite for the plain text fallback"""
+
+    @pytest.mark.parametrize("text, status", [
+        ("PASS", "pass"),
+        ("**FAIL**: Issues found. Don't PASS this.", "fail"),
+        ("```text\nPASS\n```", "pass"),
+        ("# FAIL\n1. Missing FAQ", "fail"),
+    ])
+    def test_leading_token(self, text, status):
+        """Test a leading PASS/FAIL token decides the verdict"""
+        verdict = critic_verdict.parse(text)
+
+        assert verdict.status == status
+        assert verdict.format == "text"
+
+    def test_fail_in_prose_is_unclear(self):
+        """Test "fail" in the middle of an answer is no longer a rejection"""
+        verdict = critic_verdict.parse("Looks good overall; nothing that would fail an audit.")
+
+        assert verdict.status == "unclear"
+        assert verdict.retry is False
+
+    def test_empty(self):
+        """Test an empty answer is unclear"""
+        assert critic_verdict.parse(None).status == "unclear"
+
+
+class TestFeedback:
+    """Test suite for regeneration feedback"""
+
+    def test_json_feedback_lists_targets_and_fixes(self):
+        """Test JSON verdicts are rendered as a numbered list"""
+        feedback = critic_verdict.parse(json.dumps(FAIL_JSON)).feedback()
+
+        assert feedback == "FAIL (critical): Fabricated trial.\n1. Offer: Mentions a 14-day trial Fix: Remove the trial"
+
+    def test_text_feedback_is_raw(self):
+        """Test text verdicts are passed on unchanged"""
+        assert critic_verdict.parse("FAIL: Missing FAQ").feedback() == "FAIL: Missing FAQ"
@@ -3,10 +3,11 @@ Comprehensive unit tests for automation/factory.py
 
 Tests cover the new and modified functionality from the current branch:
 - run_visual_designer (new parallel agent for theme generation)
-- run_architect (modified with parallel Visual Designer execution)
-- run_copywriter (new function with Copy Critic loop)
-- run_builder (modified with theme.json support)
+- _write_brief (Strategist + Critic loop)
+- _write_content (Copywriter + Copy Critic loop)
+- _build_page (Builder with theme.json support)
 - select_niche_persona (modified with new niche mappings: webinar_funnel)
+- run_pipeline / run_pipeline_async (the stage DAG)
 
 Test Strategy:
 - Mock all external API calls (Anthropic, OpenAI)
@@ -14,16 +15,22 @@ Test Strategy:
 - Mock time_tracker and cost_tracker modules
 - Test happy paths, edge cases, and error conditions
 - Verify retry logic and critic loops
-- Test parallel execution with ThreadPoolExecutor
+- Test stage overlap in the pipeline DAG
 """
 
+import asyncio
+import base64
 import pytest
 import json
 import os
 import tempfile
+import threading
+import time
 import shutil
-from unittest.mock import Mock, patch, MagicMock, mock_open, call, ANY
+import subprocess
+from unittest.mock import Mock, AsyncMock, patch, MagicMock, mock_open, call, ANY
 from pathlib import Path
+from types import SimpleNamespace
 
 # Import module under test
 from automation import factory
@@ -38,7 +45,9 @@ class TestSelectNichePersona:
         with patch('automation.factory.client_anthropic') as mock_anthropic, \
              patch('automation.factory._load_prompt') as mock_load, \
              patch('automation.factory._record_model_cost') as mock_cost, \
-             patch('automation.factory._extract_response_text') as mock_extract:
+             patch('automation.factory._extract_response_text') as mock_extract, \
+             patch('automation.factory.niche_classifier.classify', return_value=None) as mock_classify, \
+             patch('automation.factory.niche_classifier.learn') as mock_learn:
             
             mock_load.return_value = "Mock router prompt"
             
@@ -46,7 +55,9 @@ class TestSelectNichePersona:
                 'anthropic': mock_anthropic,
                 'load_prompt': mock_load,
                 'record_cost': mock_cost,
-                'extract_text': mock_extract
+                'extract_text': mock_extract,
+                'classify': mock_classify,
+                'learn': mock_learn
             }
     
     def test_saas_classification(self, mock_dependencies):
@@ -160,6 +171,51 @@ class TestSelectNichePersona:
         )
 
 
+    def test_confident_local_classifier_skips_router(self, mock_dependencies, tmp_path):
+        """Test a confident local prediction is used and persisted without an LLM call"""
+        mock_dependencies['classify'].return_value = ("ecommerce.md", 0.99)
+
+        result = factory.select_niche_persona("client110", "Coffee shop with shipping...", str(tmp_path))
+
+        assert result == "ecommerce.md"
+        mock_dependencies['anthropic'].messages.create.assert_not_called()
+        # Every strategy prompt is offered to the classifier, each once
+        assert set(mock_dependencies['classify'].call_args[0][2]) == set(factory.NICHE_PROMPTS.values())
+        saved = json.loads((tmp_path / "niche.json").read_text(encoding="utf-8"))
+        assert saved == {"niche": "ecommerce", "prompt": "ecommerce.md", "source": "local", "confidence": 0.99}
+
+    def test_router_choice_persisted_and_learned(self, mock_dependencies, tmp_path):
+        """Test an LLM-routed niche is saved next to the intake and fed to the classifier"""
+        mock_dependencies['extract_text'].return_value = "PERSONAL_BRAND"
+
+        factory.select_niche_persona("client111", "Business coach...", str(tmp_path))
+
+        saved = json.loads((tmp_path / "niche.json").read_text(encoding="utf-8"))
+        assert saved == {"niche": "personal_brand", "prompt": "personal_brand.md", "source": "router"}
+        mock_dependencies['learn'].assert_called_once_with("Business coach...", "personal_brand.md", factory.WATCH_DIR)
+
+    def test_saved_choice_reused(self, mock_dependencies, tmp_path):
+        """Test a re-run reuses niche.json without classifying again"""
+        (tmp_path / "niche.json").write_text(
+            json.dumps({"niche": "webinar_funnel", "prompt": "webinar.md", "source": "router"}), encoding="utf-8"
+        )
+
+        result = factory.select_niche_persona("client112", "Anything...", str(tmp_path))
+
+        assert result == "webinar.md"
+        mock_dependencies['classify'].assert_not_called()
+        mock_dependencies['anthropic'].messages.create.assert_not_called()
+
+    def test_unknown_niche_not_persisted(self, mock_dependencies, tmp_path):
+        """Test a fallback default is not saved, so a retry asks the router again"""
+        mock_dependencies['extract_text'].return_value = "INVALID_NICHE"
+
+        factory.select_niche_persona("client113", "Unknown business...", str(tmp_path))
+
+        assert not (tmp_path / "niche.json").exists()
+        mock_dependencies['learn'].assert_not_called()
+
+
 class TestRunVisualDesigner:
     """Test suite for the NEW run_visual_designer function"""
     
@@ -189,7 +245,8 @@ Vibe: Professional and modern
              patch('automation.factory.time_tracker') as mock_tracker, \
              patch('automation.factory._load_prompt') as mock_load, \
              patch('automation.factory._record_model_cost') as mock_cost, \
-             patch('automation.factory._extract_response_text') as mock_extract:
+             patch('automation.factory._extract_response_text') as mock_extract, \
+             patch('automation.factory.memory.record_failure') as mock_record:
             
             mock_load.return_value = "Palette generator prompt"
             mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock())
@@ -199,7 +256,8 @@ Vibe: Professional and modern
                 'tracker': mock_tracker,
                 'load': mock_load,
                 'cost': mock_cost,
-                'extract': mock_extract
+                'extract': mock_extract,
+                'record_failure': mock_record
             }
     
     def test_creates_valid_theme_json(self, temp_client_dir, mock_all):
@@ -207,7 +265,7 @@ Vibe: Professional and modern
         theme_data = {
             "primary": "#1E3A8A",
             "secondary": "#3B82F6",
-            "accent": "#F59E0B",
+            "accent": "#D97706",
             "background": "white",
             "font_heading": "Inter",
             "font_body": "Inter",
@@ -221,7 +279,7 @@ Vibe: Professional and modern
         
         assert result is not None
         assert result["primary"] == "#1E3A8A"
-        assert result["accent"] == "#F59E0B"
+        assert result["accent"] == "#D97706"
         
         # Verify file was created
         theme_path = os.path.join(temp_client_dir, "theme.json")
@@ -313,9 +371,76 @@ Vibe: Professional and modern
         assert call_args[0] == "pipeline_visual_designer"
         assert call_args[2] == {"stage": "visual_designer"}
 
+    def test_contrast_failure_regenerates_without_critic_call(self, temp_client_dir, mock_all):
+        """Test a theme failing the local contrast check is regenerated with the computed ratios"""
+        failing = {"primary": "#93C5FD", "secondary": "#1E40AF", "accent": "#D97706", "background": "white"}
+        passing = dict(failing, primary="#1E3A8A")
+        mock_all['extract'].side_effect = [json.dumps(failing), json.dumps(passing)]
+
+        result = factory.run_visual_designer(temp_client_dir)
+
+        assert result["primary"] == "#1E3A8A"
+        calls = mock_all['anthropic'].messages.create.call_args_list
+        assert [c[1]['model'] for c in calls] == [factory.MODEL_COPY, factory.MODEL_COPY]
+        retry_content = calls[1][1]['messages'][0]['content']
+        assert "Primary on background (#93C5FD on #FFFFFF): contrast 1.8:1 (needs >= 4.5:1)" in retry_content
+        assert mock_all['record_failure'].call_args[1]['category'] == "a11y"
+        mock_all['load'].assert_called_once_with("design/palette_generator.md")
+
+    def test_small_contrast_failure_repaired_locally(self, temp_client_dir, mock_all):
+        """Test a theme that needs only a small lightness shift is repaired without another designer call"""
+        failing = {"primary": "#3B82F6", "secondary": "#1E40AF", "accent": "#D97706", "background": "white"}
+        mock_all['extract'].return_value = json.dumps(failing)
 
-class TestRunArchitectParallelExecution:
-    """Test suite for run_architect with parallel Visual Designer"""
+        result = factory.run_visual_designer(temp_client_dir)
+
+        assert mock_all['anthropic'].messages.create.call_count == 1
+        assert result["primary"] != "#3B82F6"
+        assert factory.contrast.check_theme(result)["status"] == "PASS"
+        with open(os.path.join(temp_client_dir, "theme.json"), encoding="utf-8") as f:
+            assert json.load(f) == result
+        assert mock_all['record_failure'].call_args[1]['metadata']['repair'][0]['role'] == "primary"
+
+    def test_repair_beyond_delta_accepted_on_last_attempt(self, temp_client_dir, mock_all):
+        """Test a large repair is used rather than a failing theme once retries run out"""
+        failing = {"primary": "#93C5FD", "secondary": "#1E40AF", "accent": "#D97706", "background": "white"}
+        mock_all['extract'].return_value = json.dumps(failing)
+
+        result = factory.run_visual_designer(temp_client_dir)
+
+        assert mock_all['anthropic'].messages.create.call_count == factory.MAX_A11Y_RETRIES
+        assert factory.contrast.check_theme(result)["status"] == "PASS"
+
+    def test_llm_critic_opt_in_gets_computed_contrast(self, temp_client_dir, mock_all):
+        """Test GF_A11Y_LLM_CRITIC asks the critic for subjective review after contrast passes"""
+        theme = {"primary": "#1E3A8A", "secondary": "#3B82F6", "accent": "#D97706", "background": "white"}
+        mock_all['extract'].side_effect = [json.dumps(theme), "PASS"]
+
+        with patch('automation.factory.A11Y_LLM_CRITIC', True):
+            factory.run_visual_designer(temp_client_dir)
+
+        calls = mock_all['anthropic'].messages.create.call_args_list
+        assert [c[1]['model'] for c in calls] == [factory.MODEL_COPY, factory.MODEL_CRITIC]
+        assert "## Computed Contrast" in calls[1][1]['messages'][0]['content']
+        mock_all['load'].assert_any_call("critique/a11y_critic.md")
+
+    def test_unparseable_theme_falls_back_to_critic(self, temp_client_dir, mock_all):
+        """Test the critic reviews a theme whose colors cannot be checked locally"""
+        theme = {"primary": "navy", "background": "brand-cream"}
+        mock_all['extract'].side_effect = [json.dumps(theme), "PASS"]
+
+        factory.run_visual_designer(temp_client_dir)
+
+        calls = mock_all['anthropic'].messages.create.call_args_list
+        assert len(calls) == 2
+        assert "Please evaluate the accessibility" in calls[1][1]['messages'][0]['content']
+        assert "## Computed Contrast" not in calls[1][1]['messages'][0]['content']
+
+
+class TestWriteBrief:
+    """Test suite for the Strategist + Critic loop (_write_brief)"""
+
+    INTAKE = "# Intake\nCompany: Test\nProduct: Analytics"
     
     @pytest.fixture
     def temp_client_dir(self):
@@ -325,7 +450,7 @@ class TestRunArchitectParallelExecution:
         os.makedirs(client_path)
         
         with open(os.path.join(client_path, "intake.md"), "w") as f:
-            f.write("# Intake\nCompany: Test\nProduct: Analytics")
+            f.write(self.INTAKE)
         
         yield client_path
         shutil.rmtree(temp_dir)
@@ -337,15 +462,10 @@ class TestRunArchitectParallelExecution:
              patch('automation.factory.time_tracker') as mock_tracker, \
              patch('automation.factory._load_prompt') as mock_load, \
              patch('automation.factory._record_model_cost') as mock_cost, \
-             patch('automation.factory._extract_response_text') as mock_extract, \
-             patch('automation.factory.select_niche_persona') as mock_niche, \
-             patch('automation.factory.run_copywriter') as mock_copy, \
-             patch('automation.factory.run_visual_designer') as mock_designer:
+             patch('automation.factory._extract_response_text') as mock_extract:
             
             mock_load.return_value = "Mock prompt"
-            mock_niche.return_value = "saas.md"
             mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock())
-            mock_designer.return_value = {"primary": "#123"}
             
             yield {
                 'anthropic': mock_anthropic,
@@ -353,79 +473,13 @@ class TestRunArchitectParallelExecution:
                 'load': mock_load,
                 'cost': mock_cost,
                 'extract': mock_extract,
-                'niche': mock_niche,
-                'copywriter': mock_copy,
-                'designer': mock_designer
             }
     
-    def test_spawns_visual_designer_in_parallel(self, temp_client_dir, mock_all):
-        """Test that visual designer is spawned using ThreadPoolExecutor"""
-        mock_all['extract'].side_effect = ["Brief content", "PASS"]
-        
-        with patch('automation.factory.ThreadPoolExecutor') as mock_executor:
-            mock_future = Mock()
-            mock_future.result.return_value = {"primary": "#000"}
-            mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
-            
-            factory.run_architect(temp_client_dir)
-            
-            # Verify executor was created with 1 worker
-            mock_executor.assert_called_once_with(max_workers=1)
-            
-            # Verify designer was submitted
-            submit_call = mock_executor.return_value.__enter__.return_value.submit
-            submit_call.assert_called_once()
-            assert submit_call.call_args[0][0] == factory.run_visual_designer
-    
-    def test_waits_for_visual_designer_completion(self, temp_client_dir, mock_all):
-        """Test that architect waits for visual designer with timeout"""
-        mock_all['extract'].side_effect = ["Brief", "PASS"]
-        
-        with patch('automation.factory.ThreadPoolExecutor') as mock_executor:
-            mock_future = Mock()
-            mock_future.result.return_value = {"primary": "#456"}
-            mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
-            
-            factory.run_architect(temp_client_dir)
-            
-            # Verify result() was called with 60 second timeout
-            mock_future.result.assert_called_once_with(timeout=60)
-    
-    def test_handles_visual_designer_timeout_gracefully(self, temp_client_dir, mock_all):
-        """Test graceful handling of visual designer timeout"""
-        mock_all['extract'].side_effect = ["Brief", "PASS"]
-        
-        with patch('automation.factory.ThreadPoolExecutor') as mock_executor:
-            mock_future = Mock()
-            mock_future.result.side_effect = TimeoutError("Timeout")
-            mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
-            
-            # Should not raise exception
-            factory.run_architect(temp_client_dir)
-            
-            # Pipeline should continue
-            mock_all['copywriter'].assert_called_once()
-    
-    def test_handles_visual_designer_exception(self, temp_client_dir, mock_all):
-        """Test handling of visual designer exceptions"""
-        mock_all['extract'].side_effect = ["Brief", "PASS"]
-        
-        with patch('automation.factory.ThreadPoolExecutor') as mock_executor:
-            mock_future = Mock()
-            mock_future.result.side_effect = Exception("Designer failed")
-            mock_executor.return_value.__enter__.return_value.submit.return_value = mock_future
-            
-            # Should not raise
-            factory.run_architect(temp_client_dir)
-            
-            # Should continue to copywriter
-            mock_all['copywriter'].assert_called_once()
-    
     def test_critic_loop_pass_on_first_attempt(self, temp_client_dir, mock_all):
         """Test critic loop when brief passes on first attempt"""
         mock_all['extract'].side_effect = ["Brief content", "PASS"]
         
-        factory.run_architect(temp_client_dir)
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
         
         # Should only make 2 API calls (strategist + critic)
         assert mock_all['anthropic'].messages.create.call_count == 2
@@ -443,11 +497,42 @@ class TestRunArchitectParallelExecution:
             "PASS"
         ]
         
-        factory.run_architect(temp_client_dir)
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
         
         # Should make 4 calls (strategist, critic, strategist, critic)
         assert mock_all['anthropic'].messages.create.call_count == 4
     
+    def test_json_pass_mentioning_fail_does_not_retry(self, temp_client_dir, mock_all):
+        """Test a structured pass verdict is accepted even if its summary mentions failure"""
+        mock_all['extract'].side_effect = [
+            "Brief",
+            '{"verdict": "pass", "severity": "minor", "summary": "Would not fail review.", '
+            '"issues": [{"target": "FAQ", "problem": "Could be longer"}]}'
+        ]
+
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
+
+        assert mock_all['anthropic'].messages.create.call_count == 2
+        critic_metadata = mock_all['cost'].call_args_list[1][0][5]
+        assert critic_metadata["verdict"] == "pass"
+        assert critic_metadata["retry"] is False
+
+    def test_json_fail_feedback_reaches_strategist(self, temp_client_dir, mock_all):
+        """Test a major structured failure retries with its issues as feedback"""
+        mock_all['extract'].side_effect = [
+            "Brief",
+            '```json\n{"verdict": "fail", "severity": "major", "summary": "Missing FAQ.", '
+            '"issues": [{"target": "FAQ", "problem": "Required FAQ section missing", "fix": "Add it"}]}\n```',
+            "Improved brief",
+            '{"verdict": "pass", "severity": "none", "issues": []}'
+        ]
+
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
+
+        calls = mock_all['anthropic'].messages.create.call_args_list
+        assert len(calls) == 4
+        assert "1. FAQ: Required FAQ section missing Fix: Add it" in calls[2][1]['messages'][0]['content']
+
     def test_critic_loop_max_retries(self, temp_client_dir, mock_all):
         """Test that critic loop respects MAX_CRITIC_RETRIES"""
         # All attempts fail
@@ -455,7 +540,7 @@ class TestRunArchitectParallelExecution:
             "Brief", "FAIL: Issues"
         ] * factory.MAX_CRITIC_RETRIES
         
-        factory.run_architect(temp_client_dir)
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
         
         # Should make exactly MAX_CRITIC_RETRIES * 2 calls
         expected_calls = factory.MAX_CRITIC_RETRIES * 2
@@ -469,7 +554,7 @@ class TestRunArchitectParallelExecution:
         brief_content = "Final brief content"
         mock_all['extract'].side_effect = [brief_content, "PASS"]
         
-        factory.run_architect(temp_client_dir)
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
         
         # Verify both files exist
         orig_path = os.path.join(temp_client_dir, "brief.orig.md")
@@ -496,14 +581,14 @@ class TestRunArchitectParallelExecution:
             "PASS"
         ]
         
-        factory.run_architect(temp_client_dir)
+        factory._write_brief(temp_client_dir, self.INTAKE, "saas.md")
         
         # Should retry (4 calls total)
         assert mock_all['anthropic'].messages.create.call_count == 4
 
 
-class TestRunCopywriter:
-    """Test suite for NEW run_copywriter function with Copy Critic loop"""
+class TestWriteContent:
+    """Test suite for the Copywriter + Copy Critic loop (_write_content)"""
     
     @pytest.fixture
     def temp_client_dir(self):
@@ -528,8 +613,7 @@ class TestRunCopywriter:
              patch('automation.factory.time_tracker') as mock_tracker, \
              patch('automation.factory._load_prompt') as mock_load, \
              patch('automation.factory._record_model_cost') as mock_cost, \
-             patch('automation.factory._extract_response_text') as mock_extract, \
-             patch('automation.factory.run_builder') as mock_builder:
+             patch('automation.factory._extract_response_text') as mock_extract:
             
             mock_load.return_value = "Copy critic prompt"
             mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock())
@@ -540,14 +624,13 @@ class TestRunCopywriter:
                 'load': mock_load,
                 'cost': mock_cost,
                 'extract': mock_extract,
-                'builder': mock_builder
             }
     
     def test_pass_on_first_attempt(self, temp_client_dir, mock_all):
         """Test copywriter when critic passes immediately"""
         mock_all['extract'].side_effect = ["Great content", "PASS"]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Should make 2 calls (copywriter + critic)
         assert mock_all['anthropic'].messages.create.call_count == 2
@@ -555,9 +638,7 @@ class TestRunCopywriter:
         # Verify files created
         assert os.path.exists(os.path.join(temp_client_dir, "content.md"))
         assert os.path.exists(os.path.join(temp_client_dir, "content.orig.md"))
-        
-        # Verify builder was called
-        mock_all['builder'].assert_called_once_with(temp_client_dir)
+
     
     def test_retry_on_critic_fail(self, temp_client_dir, mock_all):
         """Test retry when copy critic fails"""
@@ -568,7 +649,7 @@ class TestRunCopywriter:
             "PASS"
         ]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Should make 4 calls
         assert mock_all['anthropic'].messages.create.call_count == 4
@@ -584,15 +665,14 @@ class TestRunCopywriter:
             "Content", "FAIL: Issues"
         ] * factory.MAX_CRITIC_RETRIES
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Should make MAX_CRITIC_RETRIES * 2 calls
         expected = factory.MAX_CRITIC_RETRIES * 2
         assert mock_all['anthropic'].messages.create.call_count == expected
         
-        # Should still save and continue
+        # Should still save the last content
         assert os.path.exists(os.path.join(temp_client_dir, "content.md"))
-        mock_all['builder'].assert_called_once()
     
     def test_empty_response_retries(self, temp_client_dir, mock_all):
         """Test retry on empty copywriter response"""
@@ -602,7 +682,7 @@ class TestRunCopywriter:
             "PASS"
         ]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Should retry and succeed
         with open(os.path.join(temp_client_dir, "content.md")) as f:
@@ -618,7 +698,7 @@ class TestRunCopywriter:
         mock_all['extract'].side_effect = ["Content", "PASS"]
         
         # Should not raise error
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         assert os.path.exists(os.path.join(temp_client_dir, "content.md"))
     
@@ -627,7 +707,7 @@ class TestRunCopywriter:
         final_content = "Final website content"
         mock_all['extract'].side_effect = [final_content, "PASS"]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Verify both files
         with open(os.path.join(temp_client_dir, "content.orig.md")) as f:
@@ -644,25 +724,35 @@ class TestRunCopywriter:
             "This looks okay but not sure"  # No PASS/FAIL
         ]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
-        # Should accept and continue
+        # Should accept the content
         assert os.path.exists(os.path.join(temp_client_dir, "content.md"))
-        mock_all['builder'].assert_called_once()
     
+    def test_minor_json_fail_accepted(self, temp_client_dir, mock_all):
+        """Test a failure the copy critic rates minor does not regenerate the content"""
+        mock_all['extract'].side_effect = [
+            "Content",
+            '{"verdict": "fail", "severity": "minor", "summary": "Hero could be punchier.", "issues": []}'
+        ]
+
+        factory._write_content(temp_client_dir)
+
+        assert mock_all['anthropic'].messages.create.call_count == 2
+
     def test_uses_sonnet_model(self, temp_client_dir, mock_all):
         """Test that copywriter uses MODEL_COPY (Sonnet)"""
         mock_all['extract'].side_effect = ["Content", "PASS"]
         
-        factory.run_copywriter(temp_client_dir)
+        factory._write_content(temp_client_dir)
         
         # Check first call (copywriter)
         call_kwargs = mock_all['anthropic'].messages.create.call_args_list[0][1]
         assert call_kwargs['model'] == factory.MODEL_COPY
 
 
-class TestRunBuilder:
-    """Test suite for run_builder with theme.json support"""
+class TestBuildPage:
+    """Test suite for the Builder (_build_page) with theme.json support"""
     
     @pytest.fixture
     def temp_client_dir(self):
@@ -716,11 +806,11 @@ class TestRunBuilder:
         
         with patch('os.path.exists', return_value=True), \
              patch('builtins.open', mock_open(read_data="Library")):
-            factory.run_builder(temp_client_dir)
+            factory._build_page(temp_client_dir)
         
         # Verify theme was included in system prompt
         call_kwargs = mock_all['anthropic'].messages.create.call_args[1]
-        system_prompt = call_kwargs['system']
+        system_prompt = factory._system_text(call_kwargs['system'])
         
         assert "DESIGN THEME" in system_prompt
         assert "#1E3A8A" in system_prompt
@@ -734,11 +824,11 @@ class TestRunBuilder:
         
         with patch('os.path.exists', return_value=True), \
              patch('builtins.open', mock_open(read_data="Library")):
-            factory.run_builder(temp_client_dir)
+            factory._build_page(temp_client_dir)
         
         # Should not include theme section
         call_kwargs = mock_all['anthropic'].messages.create.call_args[1]
-        system_prompt = call_kwargs['system']
+        system_prompt = factory._system_text(call_kwargs['system'])
         
         assert "DESIGN THEME" not in system_prompt
     
@@ -754,7 +844,7 @@ class TestRunBuilder:
         with patch('os.path.exists', return_value=True), \
              patch('builtins.open', mock_open(read_data="Library")):
             # Should not raise error
-            factory.run_builder(temp_client_dir)
+            factory._build_page(temp_client_dir)
     
     def test_includes_color_application_instructions(self, temp_client_dir, mock_all):
         """Test that theme prompt includes specific application instructions"""
@@ -777,10 +867,10 @@ class TestRunBuilder:
         
         with patch('os.path.exists', return_value=True), \
              patch('builtins.open', mock_open(read_data="Library")):
-            factory.run_builder(temp_client_dir)
+            factory._build_page(temp_client_dir)
         
         call_kwargs = mock_all['anthropic'].messages.create.call_args[1]
-        system_prompt = call_kwargs['system']
+        system_prompt = factory._system_text(call_kwargs['system'])
         
         # Verify specific instructions
         assert 'primary" color for main CTAs' in system_prompt
@@ -804,7 +894,7 @@ export default function Page() {
         
         with patch('os.path.exists', return_value=True), \
              patch('builtins.open', mock_open(read_data="Library")):
-            factory.run_builder(temp_client_dir)
+            factory._build_page(temp_client_dir)
         
         # Verify file exists
         page_path = os.path.join(temp_client_dir, "page.tsx")
@@ -859,7 +949,7 @@ class TestEdgeCasesAndErrorHandling:
                 mock_api.messages.create.return_value = mock_response
                 
                 # Should handle unicode
-                factory.run_builder(client_path)
+                factory._build_page(client_path)
     
     def test_very_long_content(self):
         """Test handling of very long content responses"""
@@ -877,14 +967,13 @@ class TestEdgeCasesAndErrorHandling:
                  patch('automation.factory.time_tracker.track_span'), \
                  patch('automation.factory._load_prompt', return_value="prompt"), \
                  patch('automation.factory._record_model_cost'), \
-                 patch('automation.factory._extract_response_text') as mock_extract, \
-                 patch('automation.factory.run_builder'):
+                 patch('automation.factory._extract_response_text') as mock_extract:
                 
                 # 10k character content
                 long_content = "Lorem ipsum " * 1000
                 mock_extract.side_effect = [long_content, "PASS"]
                 
-                factory.run_copywriter(client_path)
+                factory._write_content(client_path)
                 
                 # Verify saved
                 with open(os.path.join(client_path, "content.md")) as f:
@@ -920,4 +1009,1754 @@ class TestPromptFileValidation:
             assert "WEBINAR_FUNNEL" in content or "webinar" in content.lower()
 
 
-# Run tests with: pytest tests/test_factory.py -v
\ No newline at end of file
+# Run tests with: pytest tests/test_factory.py -v
+
+class TestBuilderResume:
+    """Test suite for resuming the builder from a job queue checkpoint"""
+
+    @pytest.fixture
+    def client_path(self, tmp_path, monkeypatch):
+        """Run in a scratch working tree with an already written page.tsx"""
+        monkeypatch.chdir(tmp_path)
+        client_path = tmp_path / "clients" / "resume-client"
+        client_path.mkdir(parents=True)
+        (client_path / "brief.md").write_text("# Brief", encoding="utf-8")
+        (client_path / "content.md").write_text("# Content", encoding="utf-8")
+        page_dir = tmp_path / "app" / "clients" / "resume-client"
+        page_dir.mkdir(parents=True)
+        (page_dir / "page.tsx").write_text("// interrupted", encoding="utf-8")
+        return str(client_path)
+
+    @pytest.fixture
+    def mock_builder(self):
+        """Mock the LLM, syntax check, QA and finalization"""
+        with patch('automation.factory._llm_messages_create') as mock_llm, \
+             patch('automation.factory._extract_response_text', return_value="```tsx\nexport default 1\n```"), \
+             patch('automation.factory.check_syntax', return_value=(True, "")), \
+             patch('automation.factory.run_qa', return_value=("PASS", "ok", None)), \
+             patch('automation.factory.finalize_client') as mock_finalize, \
+             patch('automation.factory.memory'), \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock())
+            yield {'llm': mock_llm, 'finalize': mock_finalize}
+
+    def test_skips_existing_page_without_checkpoint(self, client_path, mock_builder):
+        """Test a finished page with no checkpoint is still skipped"""
+        assert factory._build_page(client_path) is None
+
+        mock_builder['llm'].assert_not_called()
+
+    def test_resumes_attempt_and_feedback(self, client_path, mock_builder):
+        """Test an interrupted builder resumes at its attempt with its feedback"""
+        factory.job_queue.checkpoint("resume-client", "builder", 2, {"syntax": "TS1005: ';' expected"})
+
+        assert factory._build_page(client_path) == ("PASS", "ok")
+
+        mock_builder['llm'].assert_called_once()
+        assert "TS1005: ';' expected" in mock_builder['llm'].call_args[1]['user_content']
+        assert factory.job_queue.get_job("resume-client")["attempt"] == 2
+
+
+class TestRunPipeline:
+    """Test suite for the DAG-scheduled pipeline"""
+
+    @pytest.fixture
+    def client_path(self):
+        """Create a client directory with only an intake"""
+        temp_dir = tempfile.mkdtemp()
+        client_path = os.path.join(temp_dir, "dag-client")
+        os.makedirs(client_path)
+        with open(os.path.join(client_path, "intake.md"), "w") as f:
+            f.write("# Intake")
+        yield client_path
+        shutil.rmtree(temp_dir)
+
+    @pytest.fixture
+    def mock_stages(self):
+        """Mock every stage body, recording start/end times"""
+        timeline = {}
+
+        def stage(name, seconds, result=None):
+            def run(*args, **kwargs):
+                start = time.monotonic()
+                time.sleep(seconds)
+                timeline[name] = (start, time.monotonic())
+                return result
+            return run
+
+        def steps(name, seconds, result=None):
+            # Step generators without LLM requests
+            def run(*args, **kwargs):
+                return stage(name, seconds, result)()
+                yield
+            return run
+
+        with patch('automation.factory._visual_designer_steps', side_effect=steps("designer", 0.3, {"primary": "#000"})), \
+             patch('automation.factory._route_steps', side_effect=steps("router", 0.0, "saas.md")) as mock_router, \
+             patch('automation.factory._write_brief_steps', side_effect=steps("strategist", 0.15)) as mock_brief, \
+             patch('automation.factory._write_content_steps', side_effect=steps("copywriter", 0.15)), \
+             patch('automation.factory._build_page', side_effect=stage("builder", 0.0, ("PASS", "ok"))), \
+             patch('automation.factory.finalize_client') as mock_finalize, \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            # __exit__ must return False or the span would swallow stage failures
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+            yield {
+                'timeline': timeline,
+                'router': mock_router,
+                'brief': mock_brief,
+                'finalize': mock_finalize,
+            }
+
+    def test_designer_overlaps_strategist_and_copywriter(self, client_path, mock_stages):
+        """Test the theme is generated while the brief and copy are written"""
+        report = factory.run_pipeline(client_path)
+
+        timeline = mock_stages['timeline']
+        assert timeline["designer"][0] < timeline["copywriter"][0] < timeline["designer"][1]
+        assert timeline["builder"][0] >= timeline["designer"][1]
+        assert timeline["builder"][0] >= timeline["copywriter"][1]
+        assert report.wall_seconds < 0.5  # Serial chain would take ~0.6s
+        mock_stages['finalize'].assert_called_once_with(client_path, "PASS", "ok")
+
+    def test_router_output_feeds_strategist(self, client_path, mock_stages):
+        """Test the niche picked by the router reaches the strategist"""
+        factory.run_pipeline(client_path)
+
+        mock_stages['router'].assert_called_once_with("dag-client", "# Intake", client_path)
+        mock_stages['brief'].assert_called_once_with(client_path, "# Intake", "saas.md")
+
+    def test_existing_brief_skips_router_and_strategist(self, client_path, mock_stages):
+        """Test a re-run resumes after stages whose output already exists"""
+        with open(os.path.join(client_path, "brief.md"), "w") as f:
+            f.write("# Brief")
+
+        report = factory.run_pipeline(client_path)
+
+        mock_stages['router'].assert_not_called()
+        mock_stages['brief'].assert_not_called()
+        assert report.results["strategist"].status == "skipped"
+        mock_stages['finalize'].assert_called_once()
+
+    def test_designer_failure_does_not_stop_build(self, client_path, mock_stages):
+        """Test a failing Visual Designer is tolerated"""
+        with patch('automation.factory._visual_designer_steps', side_effect=RuntimeError("no theme")):
+            report = factory.run_pipeline(client_path)
+
+        assert report.results["visual_designer"].status == "failed"
+        mock_stages['finalize'].assert_called_once()
+
+    def test_strategist_failure_is_raised(self, client_path, mock_stages):
+        """Test a required stage failure propagates and skips downstream stages"""
+        with patch('automation.factory._write_brief_steps', side_effect=RuntimeError("no brief")):
+            with pytest.raises(RuntimeError, match="no brief"):
+                factory.run_pipeline(client_path)
+
+        mock_stages['finalize'].assert_not_called()
+
+
+class TestBatchWorkerPool:
+    """Test suite for the --jobs worker pool in the batch loop"""
+
+    @pytest.fixture
+    def watch_dir(self):
+        """Create a temporary clients directory"""
+        temp_dir = tempfile.mkdtemp()
+        for client_id in ["alpha", "beta", "done"]:
+            os.makedirs(os.path.join(temp_dir, client_id))
+        for client_id in ["alpha", "beta"]:
+            with open(os.path.join(temp_dir, client_id, "intake.md"), "w") as f:
+                f.write("# Intake")
+        os.makedirs(os.path.join(temp_dir, ".hidden"))
+        with patch('automation.factory.WATCH_DIR', temp_dir):
+            yield temp_dir
+        shutil.rmtree(temp_dir)
+
+    def test_find_pending_clients(self, watch_dir):
+        """Test only unlocked clients with intake.md are pending"""
+        assert factory.sync_job_queue() == 2
+
+        with patch('automation.factory.is_locked', side_effect=lambda cid: cid == "beta"):
+            pending = factory.find_pending_clients()
+
+        assert pending == ["alpha"]
+
+    def test_find_pending_clients_reads_job_queue(self, watch_dir):
+        """Test pending clients come from the queue, not a directory scan"""
+        with patch('automation.factory.is_locked', return_value=False):
+            assert factory.find_pending_clients() == []
+
+            factory.job_queue.enqueue("beta")
+            assert factory.find_pending_clients() == ["beta"]
+
+    def test_poll_picks_up_hand_dropped_and_reopened_intakes(self, watch_dir):
+        """Test every polling pass rescans WATCH_DIR, even without new git data or sanitized intakes"""
+        with patch('automation.factory.git_pull', return_value=False), \
+             patch('automation.factory.run_intake_sanitizer', return_value=0), \
+             patch('automation.factory.is_locked', return_value=False):
+            assert sorted(factory._poll_intakes()) == ["alpha", "beta"]
+
+            factory.job_queue.mark_done("alpha")
+            os.rename(os.path.join(watch_dir, "alpha", "intake.md"), os.path.join(watch_dir, "alpha", "intake-processed.md"))
+            with open(os.path.join(watch_dir, "done", "intake.md"), "w") as f:
+                f.write("# Intake")
+            assert sorted(factory._poll_intakes()) == ["beta", "done"]
+
+            # Re-opening a finished client puts it back in the queue
+            with open(os.path.join(watch_dir, "alpha", "intake.md"), "w") as f:
+                f.write("# Intake v2")
+            assert sorted(factory._poll_intakes()) == ["alpha", "beta", "done"]
+
+    def test_find_pending_clients_falls_back_to_scan(self, watch_dir):
+        """Test an unreadable queue falls back to the WATCH_DIR scan instead of processing nothing"""
+        with patch('automation.factory.job_queue.pending_clients', return_value=None), \
+             patch('automation.factory.is_locked', return_value=False):
+            assert sorted(factory.find_pending_clients()) == ["alpha", "beta"]
+
+    def test_run_batch_processes_all_clients(self, watch_dir):
+        """Test that run_batch runs the pipeline for every client"""
+        with patch('automation.factory.run_pipeline') as mock_pipeline, \
+             patch('automation.factory.client_lock'):
+            report = factory.run_batch(["alpha", "beta"], jobs=2)
+
+        called_paths = sorted(c[0][0] for c in mock_pipeline.call_args_list)
+        assert called_paths == [os.path.join(watch_dir, "alpha"), os.path.join(watch_dir, "beta")]
+        assert report.jobs == 2
+
+    def test_run_batch_counts_pipeline_crashes(self, watch_dir):
+        """Test crashes caught by process_client still show up as pool failures"""
+        def pipeline(path):
+            if path.endswith("beta"):
+                raise ValueError("boom")
+
+        with patch('automation.factory.run_pipeline', side_effect=pipeline), \
+             patch('automation.factory.client_lock'):
+            report = factory.run_batch(["alpha", "beta"], jobs=2)
+
+        assert sum(w.failures for w in report.workers.values()) == 1
+
+    def test_process_client_reports_stage_runtime_error_as_crash(self, watch_dir):
+        """Test a RuntimeError from the pipeline is a failure, not a lock skip"""
+        with patch('automation.factory.run_pipeline', side_effect=RuntimeError("Strategist failed")), \
+             patch('automation.factory.client_lock'):
+            assert factory.process_client("alpha") is False
+
+        assert factory.job_queue.get_job("alpha")["last_error"] == "Strategist failed"
+
+    def test_process_client_skips_when_lock_unavailable(self, watch_dir):
+        """Test that a held lock is reported, not raised"""
+        with patch('automation.factory.run_pipeline') as mock_pipeline, \
+             patch('automation.factory.client_lock', side_effect=RuntimeError("locked")):
+            assert factory.process_client("alpha") is None
+
+        mock_pipeline.assert_not_called()
+
+    def test_process_client_isolates_pipeline_crash(self, watch_dir):
+        """Test that a crashing pipeline returns False instead of raising"""
+        with patch('automation.factory.run_pipeline', side_effect=ValueError("boom")), \
+             patch('automation.factory.client_lock'):
+            assert factory.process_client("alpha") is False
+
+        job = factory.job_queue.get_job("alpha")
+        assert job["status"] == "pending"
+        assert job["last_error"] == "boom"
+
+    @pytest.fixture
+    def git_repo(self, tmp_path, monkeypatch):
+        """A repository on main with a bare origin, dirty shared files and two in-flight clients"""
+        def git(*args, cwd=tmp_path / "work"):
+            return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+
+        subprocess.run(["git", "init", "-q", "--bare", str(tmp_path / "origin.git")], check=True)
+        work = tmp_path / "work"
+        (work / "data" / "costs").mkdir(parents=True)
+        git("init", "-q", "-b", "main")
+        git("config", "user.email", "factory@example.com")
+        git("config", "user.name", "Factory")
+        (work / "data" / "costs" / "ledger.jsonl").write_text("{}\n")
+        git("add", "-A")
+        git("commit", "-q", "-m", "init")
+        git("remote", "add", "origin", str(tmp_path / "origin.git"))
+        for client_id in ("alpha", "beta"):
+            (work / "clients" / client_id).mkdir(parents=True)
+            (work / "clients" / client_id / "intake.md").write_text("# Intake")
+        # Another worker is appending to the ledger while alpha finalizes
+        (work / "data" / "costs" / "ledger.jsonl").write_text("{}\n{}\n")
+        monkeypatch.chdir(work)
+        monkeypatch.setattr(factory, "WATCH_DIR", "clients")
+        return git
+
+    def test_git_commit_stages_only_client_paths(self, git_repo):
+        """Test the client commit never stages other in-flight clients' files"""
+        assert factory.git_commit_and_push("alpha") is True
+
+        files = git_repo("ls-tree", "-r", "--name-only", "client-alpha").splitlines()
+        assert "clients/alpha/intake.md" in files
+        assert not any("beta" in name for name in files)
+        assert git_repo("rev-parse", "client-alpha") == git_repo("--git-dir=../origin.git", "rev-parse", "client-alpha")
+
+    def test_git_commit_leaves_shared_tree_alone(self, git_repo):
+        """Test committing two clients never checks out a branch or touches other workers' files"""
+        assert factory.git_commit_and_push("alpha") is True
+        assert factory.git_commit_and_push("beta") is True
+
+        assert git_repo("rev-parse", "--abbrev-ref", "HEAD") == "main"
+        assert git_repo("status", "--porcelain", "--", "data") == "M data/costs/ledger.jsonl"
+        assert git_repo("show", "client-beta:data/costs/ledger.jsonl") == "{}\n{}"
+
+    def test_finalize_keeps_job_when_commit_fails(self, watch_dir):
+        """Test a failed commit leaves the intake pending and checkpoints the finalize stage"""
+        factory.job_queue.enqueue("alpha")
+        with patch('automation.factory.git_commit_and_push', return_value=False), \
+             patch('automation.factory.send_discord_alert'):
+            with pytest.raises(RuntimeError):
+                factory.finalize_client(os.path.join(watch_dir, "alpha"), "PASS", "ok")
+
+        assert os.path.exists(os.path.join(watch_dir, "alpha", "intake.md"))
+        assert factory.job_queue.get_job("alpha")["status"] != "done"
+        assert factory.job_queue.resume_point("alpha", "finalize")[1]["qa_status"] == "PASS"
+
+    def test_parse_args_jobs(self):
+        """Test --jobs parsing and the positional client ID"""
+        args = factory._parse_args(["--jobs", "4"])
+        assert args.jobs == 4
+        assert args.client_id is None
+
+        args = factory._parse_args(["demo-saas"])
+        assert args.jobs == factory.DEFAULT_JOBS
+        assert args.client_id == "demo-saas"
+
+    def test_parse_args_rejects_zero_jobs(self):
+        """Test --jobs 0 is rejected"""
+        with pytest.raises(SystemExit):
+            factory._parse_args(["--jobs", "0"])
+
+    def test_parse_args_watch(self):
+        """Test --watch is off by default and combines with --jobs"""
+        assert factory._parse_args([]).watch is False
+
+        args = factory._parse_args(["--watch", "-j", "3"])
+        assert args.watch is True
+        assert args.jobs == 3
+
+
+class TestAsyncPipeline:
+    """Test suite for the asyncio-native pipeline mode"""
+
+    def test_sync_driver_serves_step_requests(self):
+        """Test _run_llm_steps sends each yielded request and returns the result"""
+        def steps():
+            first = yield {"model": "m", "client_id": "c", "activity": "a", "messages": []}
+            second = yield {"model": "m", "client_id": "c", "activity": "b", "messages": []}
+            return (first, second)
+
+        with patch('automation.factory._anthropic_messages_create', side_effect=["r1", "r2"]) as mock_create:
+            assert factory._run_llm_steps(steps()) == ("r1", "r2")
+
+        assert [c[1]['activity'] for c in mock_create.call_args_list] == ["a", "b"]
+
+    def test_sync_driver_throws_api_errors_into_steps(self):
+        """Test API errors unwind the generator's with-blocks before propagating"""
+        exited = []
+
+        def steps():
+            try:
+                yield {"model": "m", "client_id": "c", "activity": "a"}
+            finally:
+                exited.append(True)
+
+        with patch('automation.factory._anthropic_messages_create', side_effect=ValueError("api down")):
+            with pytest.raises(ValueError, match="api down"):
+                factory._run_llm_steps(steps())
+
+        assert exited == [True]
+
+    def test_async_driver_serves_step_requests(self):
+        """Test the async driver runs the same generators"""
+        def steps():
+            response = yield {"model": "m", "client_id": "c", "activity": "a"}
+            return response.upper()
+
+        async def fake_create(**kwargs):
+            return "ok"
+
+        with patch('automation.factory._anthropic_messages_create_async', side_effect=fake_create):
+            assert asyncio.run(factory._run_llm_steps_async(steps())) == "OK"
+
+    def test_async_backoff_uses_asyncio_sleep(self):
+        """Test 429 retries wait with asyncio.sleep, never time.sleep"""
+        rate_limited = Exception("Error code: 429")
+        client = MagicMock()
+        client.messages.create = AsyncMock(side_effect=[rate_limited, "response"])
+        clock = [1000.0]
+
+        async def fake_sleep(seconds):
+            clock[0] += seconds
+
+        async def call():
+            with patch('automation.factory._async_llm_resources', return_value=(client, asyncio.Semaphore(1))):
+                return await factory._anthropic_messages_create_async("m", "c", "a", max_tokens=1)
+
+        with patch('automation.factory.asyncio.sleep', new=AsyncMock(side_effect=fake_sleep)) as mock_sleep, \
+             patch('automation.rate_limiter.time.time', side_effect=lambda: clock[0]), \
+             patch('automation.factory.time.sleep') as mock_time_sleep:
+            assert asyncio.run(call()) == "response"
+
+        mock_sleep.assert_awaited_once_with(5)
+        mock_time_sleep.assert_not_called()
+
+    def test_async_semaphore_caps_in_flight_requests(self):
+        """Test ASYNC_MAX_LLM_CALLS bounds concurrent requests"""
+        state = {"current": 0, "peak": 0}
+
+        async def fake_request(**kwargs):
+            state["current"] += 1
+            state["peak"] = max(state["peak"], state["current"])
+            await asyncio.sleep(0.02)
+            state["current"] -= 1
+            return "response"
+
+        async def call_many():
+            with patch('automation.factory.AsyncAnthropic') as mock_client_cls:
+                mock_client_cls.return_value.messages.create = fake_request
+                mock_client_cls.return_value.close = AsyncMock()
+                try:
+                    await asyncio.gather(*(
+                        factory._anthropic_messages_create_async("m", "c", "a") for _ in range(6)
+                    ))
+                finally:
+                    await factory._close_async_llm_resources()
+
+        with patch('automation.factory.ASYNC_MAX_LLM_CALLS', 2):
+            asyncio.run(call_many())
+
+        assert state["peak"] == 2
+
+    @pytest.fixture
+    def client_path(self):
+        """Create a client directory with only an intake"""
+        temp_dir = tempfile.mkdtemp()
+        client_path = os.path.join(temp_dir, "async-client")
+        os.makedirs(client_path)
+        with open(os.path.join(client_path, "intake.md"), "w") as f:
+            f.write("# Intake")
+        yield client_path
+        shutil.rmtree(temp_dir)
+
+    def test_pipeline_overlaps_designer_and_runs_builder_in_thread(self, client_path):
+        """Test the theme overlaps the text stages and the builder waits for it"""
+        timeline = {}
+
+        def fake_steps(name, seconds, result=None):
+            def steps(*args):
+                start = time.monotonic()
+                yield {"model": "m", "client_id": "async-client", "activity": name, "delay": seconds}
+                timeline[name] = (start, time.monotonic())
+                return result
+            return steps
+
+        async def fake_create(**kwargs):
+            await asyncio.sleep(kwargs["delay"])
+
+        def fake_build(path):
+            timeline["builder"] = (time.monotonic(), time.monotonic())
+            return ("PASS", "ok")
+
+        with patch('automation.factory._anthropic_messages_create_async', side_effect=fake_create), \
+             patch('automation.factory._visual_designer_steps', side_effect=fake_steps("designer", 0.3)), \
+             patch('automation.factory._route_steps', side_effect=fake_steps("router", 0.0, "saas.md")), \
+             patch('automation.factory._write_brief_steps', side_effect=fake_steps("strategist", 0.15)) as mock_brief, \
+             patch('automation.factory._write_content_steps', side_effect=fake_steps("copywriter", 0.15)), \
+             patch('automation.factory._build_page', side_effect=fake_build), \
+             patch('automation.factory.finalize_client') as mock_finalize, \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+            asyncio.run(factory.run_pipeline_async(client_path))
+
+        assert timeline["designer"][0] < timeline["copywriter"][0] < timeline["designer"][1]
+        assert timeline["builder"][0] >= timeline["designer"][1]
+        mock_brief.assert_called_once_with(client_path, "# Intake", "saas.md")
+        mock_finalize.assert_called_once_with(client_path, "PASS", "ok")
+
+    def test_async_batch_keeps_many_pipelines_in_flight(self):
+        """Test dozens of waiting pipelines share one thread"""
+        threads = set()
+
+        async def fake_pipeline(path, builder_slots=None):
+            threads.add(threading.current_thread().name)
+            await asyncio.sleep(0.2)
+
+        client_ids = [f"client-{i}" for i in range(24)]
+        with patch('automation.factory.run_pipeline_async', side_effect=fake_pipeline), \
+             patch('automation.factory.client_lock'):
+            start = time.monotonic()
+            results = factory.run_async_batch(client_ids, max_in_flight=24)
+            elapsed = time.monotonic() - start
+
+        assert results == [True] * 24
+        assert elapsed < 1.0  # Serial would take ~4.8s
+        assert len(threads) == 1
+
+    def test_async_batch_isolates_crashes(self):
+        """Test one failing pipeline does not cancel the others"""
+        async def fake_pipeline(path, builder_slots=None):
+            if path.endswith("bad"):
+                raise ValueError("boom")
+
+        with patch('automation.factory.run_pipeline_async', side_effect=fake_pipeline), \
+             patch('automation.factory.client_lock'):
+            results = factory.run_async_batch(["good", "bad"], max_in_flight=2)
+
+        assert results == [True, False]
+        assert factory.job_queue.get_job("bad")["last_error"] == "boom"
+
+    def test_parse_args_async(self):
+        """Test --async parsing and its conflict with --watch"""
+        args = factory._parse_args(["--async", "-j", "24"])
+        assert args.use_async is True
+        assert args.jobs == 24
+
+        with pytest.raises(SystemExit):
+            factory._parse_args(["--async", "--watch"])
+
+
+class TestBestOfN:
+    """Test suite for best-of-N candidates in the strategist and copywriter critic loops"""
+
+    @staticmethod
+    def _branch(name, delay=0.0):
+        def steps():
+            response = yield {"model": "m", "client_id": "c", "activity": name, "delay": delay}
+            return response
+        return steps()
+
+    @staticmethod
+    def _two_step_branch(name, delay, made):
+        def steps():
+            response = yield {"model": "m", "client_id": "c", "activity": name, "delay": delay}
+            made.append(response)
+            response = yield {"model": "m", "client_id": "c", "activity": f"{name}-again", "delay": 0.0}
+            made.append(response)
+            return response
+        return steps()
+
+    @staticmethod
+    def _slow_create(**kwargs):
+        time.sleep(kwargs.pop("delay"))
+        return kwargs["activity"]
+
+    @pytest.mark.parametrize("value, niche, expected", [
+        ("1", "saas.md", 1),
+        ("3", "saas.md", 3),
+        ("saas:3,local_service:1,default:2", "saas.md", 3),
+        ("saas:3,local_service:1,default:2", "webinar.md", 2),
+        ("saas:3", "webinar.md", 1),
+        ("lots", None, 1),
+        ("50", None, factory.MAX_BEST_OF_N),
+    ])
+    def test_best_of_n_config(self, value, niche, expected):
+        """Test GF_CRITIC_BEST_OF_N accepts a count or counts per niche"""
+        with patch('automation.factory.CRITIC_BEST_OF_N', value):
+            assert factory._best_of_n(niche) == expected
+
+    def test_sync_parallel_stops_at_first_done(self):
+        """Test the blocking driver stops the rest once a branch satisfies done, after their in-flight request"""
+        made = []
+
+        def steps():
+            results = yield factory._ParallelSteps(
+                [self._branch("fast"), self._two_step_branch("slow", 0.5, made)], done=lambda r: r == "fast"
+            )
+            return results
+
+        with patch('automation.factory._anthropic_messages_create', side_effect=self._slow_create):
+            assert factory._run_llm_steps(steps()) == ["fast", None]
+        assert made == ["slow"]
+
+    def test_parallel_tolerates_failed_branch(self):
+        """Test a failing branch yields None while the others complete"""
+        def create(**kwargs):
+            if kwargs["activity"] == "bad":
+                raise ValueError("api down")
+            return kwargs["activity"]
+
+        def steps():
+            return (yield factory._ParallelSteps([self._branch("good"), self._branch("bad")]))
+
+        with patch('automation.factory._anthropic_messages_create', side_effect=create):
+            assert factory._run_llm_steps(steps()) == ["good", None]
+
+    def test_async_parallel_stops_rest(self):
+        """Test the async driver stops the rest once a branch satisfies done, after their in-flight request"""
+        made = []
+
+        async def create(**kwargs):
+            await asyncio.sleep(kwargs.pop("delay"))
+            return kwargs["activity"]
+
+        def steps():
+            return (yield factory._ParallelSteps(
+                [self._two_step_branch("slow", 0.5, made), self._branch("fast")], done=lambda r: r == "fast"
+            ))
+
+        with patch('automation.factory._anthropic_messages_create_async', side_effect=create):
+            assert asyncio.run(factory._run_llm_steps_async(steps())) == [None, "fast"]
+        assert made == ["slow"]
+
+    def test_abandoned_candidate_cost_is_recorded(self, tmp_path):
+        """Test the best-of-N tally includes the request a stopped candidate had in flight"""
+        counter = iter(range(1, 100))
+        lock = threading.Lock()
+        both_started = threading.Barrier(2, timeout=5)
+
+        def create(**kwargs):
+            if kwargs["activity"] == "pipeline_architect":
+                with lock:
+                    number = next(counter)
+                both_started.wait()
+                if number == 2:
+                    time.sleep(0.3)
+                return Mock(content=[Mock(text=f"Brief {number}")])
+            return Mock(content=[Mock(text='{"verdict": "pass", "severity": "none", "issues": []}')])
+
+        with patch('automation.factory.CRITIC_BEST_OF_N', "2"), \
+             patch('automation.factory._anthropic_messages_create', side_effect=create) as mock_create, \
+             patch('automation.factory._load_prompt', return_value="prompt"), \
+             patch('automation.factory._record_model_cost', return_value={"cost_usd": 0.01}), \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            assert factory._write_brief(str(tmp_path), "# Intake", "saas.md") == "Brief 1"
+
+        assert mock_create.call_count == 3
+        assert mock_tracker.log_time_entry.call_args[0][4]["calls"] == 3
+        assert mock_tracker.log_time_entry.call_args[0][4]["cost_usd"] == 0.03
+
+    def test_strategist_picks_passing_candidate(self, tmp_path):
+        """Test concurrent briefs are critiqued and the passing one is saved after one round"""
+        counter = iter(range(1, 100))
+        lock = threading.Lock()
+
+        def create(**kwargs):
+            if kwargs["activity"] == "pipeline_architect":
+                with lock:
+                    return Mock(content=[Mock(text=f"Brief {next(counter)}")])
+            brief = kwargs["messages"][0]["content"]
+            if "Brief 2" in brief:
+                # A minor issue keeps the round open (a clean pass would cancel the other candidate)
+                return Mock(content=[Mock(text='{"verdict": "pass", "severity": "minor", "issues": ["Short FAQ"]}')])
+            return Mock(content=[Mock(text='{"verdict": "fail", "severity": "major", "summary": "Wrong offer", "issues": []}')])
+
+        with patch('automation.factory.CRITIC_BEST_OF_N', "2"), \
+             patch('automation.factory._anthropic_messages_create', side_effect=create) as mock_create, \
+             patch('automation.factory._load_prompt', return_value="prompt"), \
+             patch('automation.factory._record_model_cost', return_value={"cost_usd": 0.01}), \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            assert factory._write_brief(str(tmp_path), "# Intake", "saas.md") == "Brief 2"
+
+        assert mock_create.call_count == 4
+        entry = mock_tracker.log_time_entry.call_args
+        assert entry[0][0] == "critic_best_of_n"
+        assert entry[0][4] == {
+            "stage": "strategist", "niche": "saas", "best_of": 2, "rounds": 1, "calls": 4, "cost_usd": 0.04,
+        }
+
+
+class TestSectionRegeneration:
+    """Test suite for rewriting only the sections a critic rejected"""
+
+    BRIEF = "# Brief\n\n## Hero\nOld hero.\n\n## Features\nFast.\n\n## Pricing\nCheap.\n\n## FAQ\nNone.\n"
+
+    def _run(self, tmp_path, critic_answers, rewrite="## Hero\nNew hero.\n"):
+        answers = iter(critic_answers)
+
+        def create(**kwargs):
+            if kwargs["activity"] == "pipeline_architect":
+                if "## Sections to Rewrite" in kwargs["messages"][0]["content"]:
+                    return Mock(content=[Mock(text=rewrite)])
+                return Mock(content=[Mock(text=self.BRIEF)])
+            return Mock(content=[Mock(text=next(answers))])
+
+        with patch('automation.factory._anthropic_messages_create', side_effect=create) as mock_create, \
+             patch('automation.factory._load_prompt', return_value="prompt"), \
+             patch('automation.factory._record_model_cost', return_value=None), \
+             patch('automation.factory.time_tracker'):
+            brief = factory._write_brief(str(tmp_path), "# Intake", "saas.md")
+        requests = [c.kwargs for c in mock_create.call_args_list if c.kwargs["activity"] == "pipeline_architect"]
+        return brief, requests
+
+    def test_rewrites_only_targeted_section(self, tmp_path):
+        """Test a failed verdict naming one heading asks for that section and splices it back"""
+        fail = '{"verdict": "fail", "severity": "major", "issues": [{"target": "Hero", "problem": "Vague"}]}'
+        brief, requests = self._run(tmp_path, [fail, '{"verdict": "pass", "severity": "none"}'])
+
+        assert len(requests) == 2
+        retry = requests[1]
+        assert "- Hero" in retry["messages"][0]["content"]
+        assert retry["max_tokens"] == factory.SECTION_MAX_TOKENS
+        assert brief == self.BRIEF.replace("Old hero.", "New hero.")
+
+    def test_unresolved_target_regenerates_everything(self, tmp_path):
+        """Test a target that matches no heading falls back to a full regeneration"""
+        fail = '{"verdict": "fail", "severity": "major", "issues": [{"target": "Tone", "problem": "Too formal"}]}'
+        brief, requests = self._run(tmp_path, [fail, '{"verdict": "pass", "severity": "none"}'])
+
+        assert len(requests) == 2
+        assert "## Sections to Rewrite" not in requests[1]["messages"][0]["content"]
+        assert requests[1]["max_tokens"] == 2000
+        assert brief == self.BRIEF
+
+    def test_unspliceable_rewrite_regenerates_everything(self, tmp_path):
+        """Test a rewrite missing its headings keeps the rejected brief and falls back to a full regeneration"""
+        fail = '{"verdict": "fail", "severity": "major", "issues": [{"target": "Hero", "problem": "Vague"}]}'
+        brief, requests = self._run(
+            tmp_path, [fail, '{"verdict": "pass", "severity": "none"}'], rewrite="Here is the new hero."
+        )
+
+        assert len(requests) == 3
+        assert "## Sections to Rewrite" in requests[1]["messages"][0]["content"]
+        assert "## Sections to Rewrite" not in requests[2]["messages"][0]["content"]
+        assert "Vague" in requests[2]["messages"][0]["content"]
+        assert brief == self.BRIEF
+
+    def test_unspliceable_last_rewrite_keeps_previous_brief(self, tmp_path):
+        """Test a failed splice on the last attempt saves the previous draft instead of raising"""
+        fail = '{"verdict": "fail", "severity": "major", "issues": [{"target": "Hero", "problem": "Vague"}]}'
+        with patch('automation.factory.MAX_CRITIC_RETRIES', 2):
+            brief, requests = self._run(tmp_path, [fail], rewrite="Here is the new hero.")
+
+        assert len(requests) == 2
+        assert brief == self.BRIEF
+
+    def test_disabled_regenerates_everything(self, tmp_path):
+        """Test GF_SECTION_REGEN=false always regenerates the whole document"""
+        fail = '{"verdict": "fail", "severity": "major", "issues": [{"target": "Hero", "problem": "Vague"}]}'
+        with patch('automation.factory.SECTION_REGEN', False):
+            _, requests = self._run(tmp_path, [fail, '{"verdict": "pass", "severity": "none"}'])
+        assert "## Sections to Rewrite" not in requests[1]["messages"][0]["content"]
+
+    def test_section_plan_rejects_large_share(self):
+        """Test sections covering more than half the document are regenerated in full"""
+        verdict = factory.critic_verdict.parse(
+            '{"verdict": "fail", "severity": "major", "issues": ['
+            '{"target": "Hero", "problem": "a"}, {"target": "Features", "problem": "b"}, '
+            '{"target": "Pricing", "problem": "c"}]}'
+        )
+        assert factory._section_plan(self.BRIEF, verdict) is None
+        verdict.issues = verdict.issues[:1]
+        assert [s.title for s in factory._section_plan(self.BRIEF, verdict)] == ["Hero"]
+
+
+class TestLlmCache:
+    """Test suite for the opt-in LLM response cache in the API helpers"""
+
+    @pytest.fixture
+    def cache_on(self, tmp_path, monkeypatch):
+        """Enable the cache in a temporary directory"""
+        monkeypatch.setenv("GF_LLM_CACHE", "true")
+        monkeypatch.setattr(factory.llm_cache, "CACHE_DIR", tmp_path / "llm_cache")
+
+    def _response(self, text):
+        return SimpleNamespace(
+            content=[SimpleNamespace(type="text", text=text)],
+            stop_reason="end_turn",
+            usage=SimpleNamespace(input_tokens=100, output_tokens=20),
+        )
+
+    def test_identical_request_is_served_from_cache(self, cache_on):
+        """Test the second identical call does not hit the API"""
+        with patch('automation.factory.client_anthropic') as mock_anthropic:
+            mock_anthropic.messages.create.return_value = self._response("Brief")
+            kwargs = dict(max_tokens=100, system="sys", messages=[{"role": "user", "content": "intake"}])
+
+            first = factory._anthropic_messages_create("m", "c", "pipeline_architect", **kwargs)
+            second = factory._anthropic_messages_create("m", "c", "pipeline_architect", **kwargs)
+
+        assert mock_anthropic.messages.create.call_count == 1
+        assert factory._extract_response_text(second) == "Brief"
+        assert getattr(first, "cache_hit", False) is False
+        assert second.cache_hit is True
+
+    def test_different_request_misses(self, cache_on):
+        """Test a changed prompt is not served from cache"""
+        with patch('automation.factory.client_anthropic') as mock_anthropic:
+            mock_anthropic.messages.create.return_value = self._response("Brief")
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, system="v1", messages=[])
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, system="v2", messages=[])
+
+        assert mock_anthropic.messages.create.call_count == 2
+
+    def test_empty_response_is_not_cached(self, cache_on):
+        """Test empty responses are retried against the API"""
+        with patch('automation.factory.client_anthropic') as mock_anthropic:
+            mock_anthropic.messages.create.return_value = self._response("")
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, messages=[])
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, messages=[])
+
+        assert mock_anthropic.messages.create.call_count == 2
+
+    def test_cache_disabled_by_default(self, tmp_path, monkeypatch):
+        """Test nothing is cached unless GF_LLM_CACHE is set"""
+        monkeypatch.delenv("GF_LLM_CACHE", raising=False)
+        monkeypatch.setattr(factory.llm_cache, "CACHE_DIR", tmp_path / "llm_cache")
+        with patch('automation.factory.client_anthropic') as mock_anthropic:
+            mock_anthropic.messages.create.return_value = self._response("Brief")
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, messages=[])
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=100, messages=[])
+
+        assert mock_anthropic.messages.create.call_count == 2
+        assert not (tmp_path / "llm_cache").exists()
+
+    def test_cache_hit_recorded_as_free(self, cache_on):
+        """Test cache hits reach cost_tracker with cache_hit=True"""
+        with patch('automation.factory.cost_tracker') as mock_costs:
+            factory._record_model_cost("anthropic", "m", "a", "c", SimpleNamespace(
+                usage=SimpleNamespace(input_tokens=1, output_tokens=1), cache_hit=True,
+            ))
+            factory._record_model_cost("anthropic", "m", "a", "c", Mock())
+
+        hits = [c[1]["cache_hit"] for c in mock_costs.record_api_cost.call_args_list]
+        assert hits == [True, False]
+
+    def test_openai_requests_are_cached(self, cache_on):
+        """Test _llm_messages_create caches the OpenAI route too"""
+        completion = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="code"), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=5, completion_tokens=5),
+        )
+        with patch('automation.factory.client_openai') as mock_openai, \
+             patch('automation.factory._record_model_cost') as mock_cost:
+            mock_openai.chat.completions.create.return_value = completion
+            factory._llm_messages_create("gpt-x", "c", "pipeline_builder", "sys", "user", 100)
+            cached = factory._llm_messages_create("gpt-x", "c", "pipeline_builder", "sys", "user", 100)
+
+        assert mock_openai.chat.completions.create.call_count == 1
+        assert factory._extract_response_text(cached) == "code"
+        assert mock_cost.call_count == 2
+
+
+class TestPromptCaching:
+    """Test suite for prompt-cache breakpoints and usage extraction"""
+
+    def test_system_blocks_mark_each_section(self):
+        """Test every non-empty section ends in a cache breakpoint"""
+        blocks = factory._system_blocks("static", "", None, "client")
+
+        assert [b["text"] for b in blocks] == ["static", "client"]
+        assert all(b["cache_control"] == {"type": "ephemeral"} for b in blocks)
+        assert factory._system_text(blocks) == "static\n\nclient"
+        assert factory._system_text("plain") == "plain"
+
+    def test_router_system_prompt_is_cached(self):
+        """Test stage prompts are sent as cacheable system blocks"""
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory._load_prompt', return_value="Router prompt"), \
+             patch('automation.factory._record_model_cost'), \
+             patch('automation.factory._extract_response_text', return_value="saas"):
+            factory.select_niche_persona("client123", "intake")
+
+        system = mock_anthropic.messages.create.call_args[1]["system"]
+        assert system == [{"type": "text", "text": "Router prompt", "cache_control": {"type": "ephemeral"}}]
+
+    def test_openai_receives_flattened_system_prompt(self):
+        """Test system blocks are flattened for OpenAI models"""
+        with patch('automation.factory.client_openai') as mock_openai, \
+             patch('automation.factory._record_model_cost'):
+            factory._llm_messages_create(
+                "gpt-x", "c", "pipeline_builder", factory._system_blocks("a", "b"), "user", 100
+            )
+
+        messages = mock_openai.chat.completions.create.call_args[1]["messages"]
+        assert messages[0] == {"role": "system", "content": "a\n\nb"}
+
+    def test_extract_anthropic_cache_usage(self):
+        """Test Anthropic cache write/read tokens are extracted"""
+        response = SimpleNamespace(usage=SimpleNamespace(
+            input_tokens=50, output_tokens=900,
+            cache_creation_input_tokens=0, cache_read_input_tokens=12000,
+        ))
+
+        assert factory._extract_usage_tokens(response) == (50, 900, 0, 12000)
+
+    def test_extract_dict_usage(self):
+        """Test dict usage payloads are read"""
+        response = SimpleNamespace(usage={"input_tokens": 10, "output_tokens": 20})
+
+        assert factory._extract_usage_tokens(response) == (10, 20, None, None)
+
+    def test_extract_openai_cached_tokens(self):
+        """Test OpenAI cached prompt tokens are split out of prompt_tokens"""
+        response = SimpleNamespace(usage=SimpleNamespace(
+            prompt_tokens=5000, completion_tokens=300,
+            prompt_tokens_details=SimpleNamespace(cached_tokens=4096),
+        ))
+
+        assert factory._extract_usage_tokens(response) == (904, 300, None, 4096)
+
+    def test_mock_usage_falls_back_to_estimates(self):
+        """Test non-integer usage values are ignored"""
+        assert factory._extract_usage_tokens(Mock())[:2] == (None, None)
+
+    def test_builder_prefix_is_shared_across_clients(self, tmp_path, monkeypatch):
+        """Test the cached builder prefix is identical for every client; the theme is not in it"""
+        monkeypatch.chdir(tmp_path)
+        for client_id, color in (("alpha", "#111111"), ("beta", "#222222")):
+            client_path = tmp_path / "clients" / client_id
+            client_path.mkdir(parents=True)
+            (client_path / "brief.md").write_text("# Brief", encoding="utf-8")
+            (client_path / "content.md").write_text("# Content", encoding="utf-8")
+            (client_path / "theme.json").write_text(json.dumps({"primary": color}), encoding="utf-8")
+
+        with patch('automation.factory._llm_messages_create') as mock_llm, \
+             patch('automation.factory._extract_response_text', return_value="```tsx\nexport default 1\n```"), \
+             patch('automation.factory.check_syntax', return_value=(True, "")), \
+             patch('automation.factory.run_qa', return_value=("PASS", "ok", None)), \
+             patch('automation.factory.memory') as mock_memory, \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            mock_memory.get_memory_prompt.return_value = "LEARNED RULES"
+            mock_memory.get_golden_reference_prompt.return_value = "GOLDEN"
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+            factory._build_page(str(tmp_path / "clients" / "alpha"))
+            factory._build_page(str(tmp_path / "clients" / "beta"))
+
+        (alpha_static, alpha_client), (beta_static, beta_client) = [
+            c[1]["system"] for c in mock_llm.call_args_list
+        ]
+        assert alpha_static == beta_static
+        assert "#111111" in alpha_client["text"] and "#222222" in beta_client["text"]
+        assert "LEARNED RULES" in alpha_client["text"] and "GOLDEN" in alpha_client["text"]
+
+
+class TestRateLimiting:
+    """Test suite for the shared rate limiter in the API helpers"""
+
+    def test_each_attempt_waits_for_budget(self):
+        """Test every attempt acquires budget and a 429 penalizes the model"""
+        rate_limited = Exception("Error code: 429")
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory.rate_limiter') as mock_limiter:
+            mock_limiter.estimate_tokens.return_value = 1234
+            mock_limiter.acquire.return_value = 0.0
+            mock_limiter.retry_after_seconds.return_value = 9
+            mock_anthropic.messages.create.side_effect = [rate_limited, "response"]
+
+            assert factory._anthropic_messages_create("m", "c", "a", max_tokens=1) == "response"
+
+        assert mock_limiter.acquire.call_args_list == [call("anthropic", "m", 1234)] * 2
+        mock_limiter.penalize.assert_called_once_with("anthropic", "m", 9)
+
+    def test_gives_up_after_max_attempts(self):
+        """Test persistent 429s still raise"""
+        rate_limited = Exception("Error code: 429")
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory.rate_limiter') as mock_limiter:
+            mock_limiter.acquire.return_value = 0.0
+            mock_limiter.retry_after_seconds.return_value = 1
+            mock_anthropic.messages.create.side_effect = rate_limited
+
+            with pytest.raises(Exception, match="429"):
+                factory._anthropic_messages_create("m", "c", "a", max_tokens=1)
+
+        assert mock_anthropic.messages.create.call_count == 3
+
+    def test_rate_limited_attempt_is_refunded(self):
+        """Test a 429 returns the attempt's whole reservation before backing off"""
+        rate_limited = Exception("Error code: 429")
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory.rate_limiter') as mock_limiter:
+            mock_limiter.estimate_tokens.return_value = 1234
+            mock_limiter.acquire.return_value = 0.0
+            mock_limiter.retry_after_seconds.return_value = 1
+            mock_anthropic.messages.create.side_effect = [rate_limited, SimpleNamespace(usage=None)]
+
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=1)
+
+        mock_limiter.refund.assert_called_once_with("anthropic", "m", 1234, used=0)
+
+    def test_unused_tokens_are_refunded(self):
+        """Test the reservation is settled against real usage"""
+        response = SimpleNamespace(usage=SimpleNamespace(input_tokens=100, output_tokens=50))
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory.rate_limiter') as mock_limiter:
+            mock_limiter.estimate_tokens.return_value = 5000
+            mock_limiter.acquire.return_value = 0.0
+            mock_anthropic.messages.create.return_value = response
+
+            factory._anthropic_messages_create("m", "c", "a", max_tokens=1)
+
+        mock_limiter.refund.assert_called_once_with("anthropic", "m", 5000, 150)
+
+
+class TestBuilderStreaming:
+    """Test suite for code-block extraction and the streaming builder call"""
+
+    @staticmethod
+    def _anthropic_events(chunks, output_tokens=None):
+        """Build a raw Anthropic event stream that records how far it was read"""
+        consumed = []
+
+        class _Stream:
+            closed = False
+
+            def __iter__(self):
+                events = [SimpleNamespace(type="message_start", message=SimpleNamespace(
+                    usage=SimpleNamespace(input_tokens=100, cache_creation_input_tokens=0, cache_read_input_tokens=900)))]
+                events += [SimpleNamespace(type="content_block_delta", delta=SimpleNamespace(type="text_delta", text=c)) for c in chunks]
+                if output_tokens is not None:
+                    events.append(SimpleNamespace(type="message_delta", delta=SimpleNamespace(stop_reason="end_turn"),
+                                                  usage=SimpleNamespace(output_tokens=output_tokens)))
+                for event in events:
+                    consumed.append(event)
+                    yield event
+
+            def close(self):
+                self.closed = True
+
+        return _Stream(), consumed
+
+    @pytest.mark.parametrize("text,expected", [
+        ("```tsx\nconst a = 1;\n```", "const a = 1;"),
+        ("```ts\nconst b = 2;\n```\n```tsx\nconst a = 1;\n```", "const a = 1;"),
+        ("Intro\n```\nplain\n```", "plain"),
+        ("```bash\nnpm i\n```\n```typescript\nconst c = 3;\n```", "const c = 3;"),
+        ("no code here", None),
+        ("```tsx\nunterminated", None),
+        ("```tsx const a = 1;```", "const a = 1;"),
+        ("```tsx title=page\nconst a = 1;\n```", "const a = 1;"),
+    ])
+    def test_extract_code_block(self, text, expected):
+        """Test the single-pass extractor keeps the old pattern precedence"""
+        assert factory._extract_code_block(text) == expected
+
+    def test_stream_stops_at_closing_fence(self):
+        """Test the stream is closed as soon as the code block ends"""
+        chunks = ["Here you go:\n```tsx\nexport default", " function Page() {}\n``", "`\n\nThis page uses", " the Hero component..."]
+        stream, consumed = self._anthropic_events(chunks, output_tokens=500)
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory._record_model_cost') as mock_cost:
+            mock_anthropic.messages.create.return_value = stream
+            response = factory._llm_messages_stream("claude-x", "c", "pipeline_builder", "sys", "user", 8000)
+
+        text = factory._extract_response_text(response)
+        assert text.endswith("```")
+        assert factory._extract_code_block(text) == "export default function Page() {}"
+        assert stream.closed
+        # message_start + the three chunks up to the closing fence; the prose is never read
+        assert len(consumed) == 4
+        assert mock_anthropic.messages.create.call_args[1]["stream"] is True
+        metadata = mock_cost.call_args[0][5]
+        assert metadata["stopped_at_fence"] is True
+        assert metadata["ttft_seconds"] >= 0
+        assert response.usage.input_tokens == 100
+        assert response.usage.cache_read_input_tokens == 900
+
+    def test_inline_fence_does_not_stop_stream(self):
+        """Test a one-line ```span``` in prose before the page does not end the stream"""
+        assert factory._code_block_end("Run ``` npm i ``` first.\n```tsx\nconst a = 1;\n") is None
+        assert factory._code_block_end("Run ``` npm i ``` first.\n```tsx\nconst a = 1;\n```") is not None
+
+    def test_stream_without_fence_reads_to_end(self):
+        """Test responses without a code block are read fully with real usage"""
+        stream, consumed = self._anthropic_events(["Sorry, ", "I cannot."], output_tokens=7)
+        with patch('automation.factory.client_anthropic') as mock_anthropic, \
+             patch('automation.factory._record_model_cost'):
+            mock_anthropic.messages.create.return_value = stream
+            response = factory._llm_messages_stream("claude-x", "c", "pipeline_builder", "sys", "user", 8000)
+
+        assert factory._extract_response_text(response) == "Sorry, I cannot."
+        assert response.usage.output_tokens == 7
+        assert response.stop_reason == "end_turn"
+        assert response.streaming["stopped_at_fence"] is False
+
+    def test_openai_stream(self):
+        """Test OpenAI chunk streams are consumed the same way"""
+        chunks = [
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="```tsx\nx\n"), finish_reason=None)]),
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content="```\nmore"), finish_reason=None)]),
+            SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=" prose"), finish_reason="stop")]),
+        ]
+        with patch('automation.factory.client_openai') as mock_openai, \
+             patch('automation.factory._record_model_cost'):
+            mock_openai.chat.completions.create.return_value = iter(chunks)
+            response = factory._llm_messages_stream("gpt-x", "c", "pipeline_builder", "sys", "user", 100)
+
+        assert factory._extract_response_text(response) == "```tsx\nx\n```"
+        assert mock_openai.chat.completions.create.call_args[1]["stream"] is True
+
+    def test_builder_uses_stream_when_enabled(self, tmp_path, monkeypatch):
+        """Test BUILDER_STREAMING routes the builder through the streaming call"""
+        monkeypatch.chdir(tmp_path)
+        client_path = tmp_path / "clients" / "stream-client"
+        client_path.mkdir(parents=True)
+        (client_path / "brief.md").write_text("# Brief", encoding="utf-8")
+        (client_path / "content.md").write_text("# Content", encoding="utf-8")
+        streamed = SimpleNamespace(content=[SimpleNamespace(text="```tsx\nexport default 1\n```")])
+
+        with patch('automation.factory.BUILDER_STREAMING', True), \
+             patch('automation.factory._llm_messages_stream', return_value=streamed) as mock_stream, \
+             patch('automation.factory._llm_messages_create') as mock_create, \
+             patch('automation.factory.check_syntax', return_value=(True, "")) as mock_syntax, \
+             patch('automation.factory.run_qa', return_value=("PASS", "ok", None)), \
+             patch('automation.factory.memory'), \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+            assert factory._build_page(str(client_path)) == ("PASS", "ok")
+
+        mock_stream.assert_called_once()
+        mock_create.assert_not_called()
+        assert mock_syntax.call_args[0][0] == "export default 1"
+
+
+class TestSyntaxCheckWorker:
+    """Test suite for check_syntax's warm TypeScript worker path"""
+
+    def test_warm_checker_pass(self):
+        """Test a clean warm check never spawns npx tsc"""
+        with patch('automation.factory.ts_checker.check', return_value=[]), \
+             patch('automation.factory.subprocess.run') as mock_run:
+            assert factory.check_syntax("export default 1", "c") == (True, "")
+
+        mock_run.assert_not_called()
+
+    def test_warm_checker_errors(self):
+        """Test warm diagnostics go through the usual filtering"""
+        diagnostics = ["page.tsx(3,7): error TS1005: ';' expected."]
+        with patch('automation.factory.ts_checker.check', return_value=diagnostics), \
+             patch('automation.factory.subprocess.run') as mock_run:
+            ok, errors = factory.check_syntax("const a = ", "c")
+
+        assert ok is False
+        assert "TS1005" in errors
+        mock_run.assert_not_called()
+
+    def test_falls_back_to_npx(self):
+        """Test an unavailable worker falls back to npx tsc"""
+        with patch('automation.factory.ts_checker.check', return_value=None), \
+             patch('automation.factory._find_npx', return_value="npx"), \
+             patch('automation.factory.subprocess.run', return_value=Mock(returncode=0, stdout="", stderr="")) as mock_run:
+            assert factory.check_syntax("export default 1", "c") == (True, "")
+
+        assert mock_run.call_args[0][0][:2] == ["npx", "tsc"]
+
+
+class TestQaBrowserPool:
+    """Test suite for run_qa's use of the warm browser pool"""
+
+    @pytest.fixture
+    def client_path(self, tmp_path):
+        path = tmp_path / "clients" / "qa-client"
+        path.mkdir(parents=True)
+        return path
+
+    def _span(self):
+        return MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+
+    def _fake_pool(self, page, stats):
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), stats)
+        return pool
+
+    def test_qa_uses_pooled_page(self, client_path):
+        """Test run_qa captures through the pool with the mobile viewport"""
+        page = Mock()
+        page.screenshot.return_value = b"jpeg"
+        stats = factory.browser_pool.CheckStats(context_ms=12.0, browser_pages=2)
+        pool = self._fake_pool(page, stats)
+        msg = Mock(content=[Mock(text="PASS")])
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844"), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span', return_value=self._span()), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[]), \
+             patch('automation.factory._anthropic_messages_create', return_value=msg), \
+             patch('automation.factory._record_model_cost'), \
+             patch('automation.factory._log_aligned') as mock_log:
+            status, report, screenshot = factory.run_qa(str(client_path))
+
+        assert status == "PASS"
+        assert screenshot == str(client_path / "qa_mobile.jpg")
+        assert pool.run_pages.call_args[0][1] == [{"viewport": {"width": 390, "height": 844}}]
+        assert page.goto.call_args[0] == ("http://localhost:3000/clients/qa-client",)
+        page.wait_for_timeout.assert_not_called()
+        overhead_logs = [c for c in mock_log.call_args_list if "browser overhead" in str(c)]
+        assert "12ms (warm, page 2)" in str(overhead_logs[0])
+
+    def test_pool_failure_reports_error(self, client_path):
+        """Test a browser failure surfaces as a QA ERROR"""
+        pool = Mock()
+        pool.run_pages.side_effect = RuntimeError("browser crashed")
+
+        with patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span', return_value=self._span()), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool):
+            status, report, _ = factory.run_qa(str(client_path))
+
+        assert status == "ERROR"
+        assert "browser crashed" in report
+
+
+class TestTextContrastAudit:
+    """Test suite for the single-evaluate invisible text audit"""
+
+    def test_single_round_trip(self):
+        """Test the audit runs as one evaluate() with the contrast thresholds"""
+        issue = {
+            "element": "p.ghost", "text_color": "rgb(250, 250, 250)", "background_color": "rgb(255, 255, 255)",
+            "text_preview": "Hidden", "contrast_ratio": 1.04, "large_text": False, "severity": "invisible",
+        }
+        page = Mock()
+        page.evaluate.return_value = {"issues": [issue], "checked": 120, "elapsed_ms": 8.5}
+
+        assert factory.check_invisible_text_playwright(page) == [issue]
+        page.evaluate.assert_called_once()
+        script, args = page.evaluate.call_args[0]
+        assert script is factory._TEXT_CONTRAST_AUDIT_JS
+        assert args == {
+            "invisibleMax": factory.INVISIBLE_TEXT_MAX_CONTRAST,
+            "lowMax": factory.LOW_CONTRAST_MAX_RATIO,
+            "maxIssues": factory.TEXT_AUDIT_MAX_ISSUES,
+        }
+        page.query_selector_all.assert_not_called()
+
+    def test_thresholds_match_old_color_difference(self):
+        """Test the forced-FAIL cut-offs stay near the old RGB-difference check"""
+        from automation.contrast import contrast_ratio
+
+        white = (255, 255, 255)
+        # Old "hard to read": average channel difference below 30
+        assert contrast_ratio(white, (225, 225, 225)) < factory.LOW_CONTRAST_MAX_RATIO
+        # Old "invisible": average channel difference below 13
+        assert contrast_ratio(white, (245, 245, 245)) < factory.INVISIBLE_TEXT_MAX_CONTRAST
+        # gray-400 on white (~2.5:1) is low for WCAG AA but never failed QA
+        assert contrast_ratio(white, (0x9c, 0xa3, 0xaf)) >= factory.LOW_CONTRAST_MAX_RATIO
+
+    def test_evaluate_failure_returns_no_issues(self):
+        """Test a page error is logged and treated as no findings"""
+        page = Mock()
+        page.evaluate.side_effect = RuntimeError("Execution context was destroyed")
+
+        with patch('automation.factory._log_aligned') as mock_log:
+            assert factory.check_invisible_text_playwright(page) == []
+
+        assert "Invisible text check failed" in str(mock_log.call_args)
+
+    def test_report_lists_contrast_ratio(self, tmp_path):
+        """Test run_qa fails the page and reports the contrast ratio"""
+        client_path = tmp_path / "clients" / "contrast-client"
+        client_path.mkdir(parents=True)
+        page = Mock()
+        page.screenshot.return_value = b"jpeg"
+        page.evaluate.return_value = {"issues": [{
+            "element": "span", "text_color": "rgb(0, 0, 0)", "background_color": "rgb(0, 0, 0)",
+            "text_preview": "Call now", "contrast_ratio": 1.0, "large_text": False, "severity": "invisible",
+        }]}
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), factory.browser_pool.CheckStats())
+
+        with patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span',
+                   return_value=MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[]), \
+             patch('automation.factory._anthropic_messages_create', return_value=Mock(content=[Mock(text="PASS")])), \
+             patch('automation.factory._record_model_cost'):
+            status, report, _ = factory.run_qa(str(client_path))
+
+        assert status == "FAIL"
+        assert "(contrast 1.0:1)" in report
+
+
+class TestImageAudit:
+    """Test suite for the single-evaluate image health audit"""
+
+    def _page(self, images):
+        page = Mock()
+        page.evaluate.return_value = {"images": images, "elapsed_ms": 3.0}
+        return page
+
+    def test_single_round_trip(self):
+        """Test all images are fetched with one evaluate() and loaded ones pass"""
+        page = self._page([
+            {"kind": "img", "element": "img.hero", "src": "http://localhost:3000/images/hero.jpg",
+             "original": "/images/hero.jpg", "optimized": None, "alt": "Hero", "loaded": True, "status": 200},
+        ])
+
+        assert factory.check_missing_images_playwright(page) == []
+        page.evaluate.assert_called_once_with(factory._IMAGE_AUDIT_JS)
+        page.query_selector_all.assert_not_called()
+
+    def test_broken_background_reported(self):
+        """Test a failed CSS background image is reported with its element"""
+        page = self._page([
+            {"kind": "background", "element": "section.hero", "src": "http://localhost:3000/images/bg.webp",
+             "original": "http://localhost:3000/images/bg.webp", "optimized": None, "alt": "",
+             "loaded": False, "status": 500},
+            {"kind": "background", "element": "div.lazy", "src": "http://localhost:3000/images/later.webp",
+             "original": "http://localhost:3000/images/later.webp", "optimized": None, "alt": "",
+             "loaded": None, "status": 0},
+        ])
+
+        issues = factory.check_missing_images_playwright(page)
+
+        assert len(issues) == 1
+        assert issues[0]["element"] == "section.hero"
+        assert issues[0]["kind"] == "background"
+        assert issues[0]["issue_type"] == "broken"
+
+    def test_404_attributed_to_element_once(self):
+        """Test a listener 404 is matched to its <img> instead of reported twice"""
+        optimized = "http://localhost:3000/_next/image?url=%2Fimages%2Flogo.png&w=256&q=75"
+        page = self._page([
+            {"kind": "img", "element": "img.logo", "src": optimized, "original": "/images/logo.png",
+             "optimized": optimized, "alt": "Logo", "loaded": False, "status": 404},
+        ])
+        network_errors = [
+            {"url": optimized, "status": 404, "type": "network_404"},
+            {"url": "http://localhost:3000/images/preload.jpg", "status": 404, "type": "network_404"},
+        ]
+
+        issues = factory.check_missing_images_playwright(page, network_errors)
+
+        assert [issue["element"] for issue in issues] == ["img.logo", "network_request"]
+        assert issues[0]["issue_type"] == "404_not_found"
+        assert issues[0]["src"] == "/images/logo.png"
+        assert issues[0]["optimized_src"] == optimized
+        assert issues[1]["src"] == "/images/preload.jpg"
+        assert issues[1]["filename"] == "preload.jpg"
+
+    def test_evaluate_failure_keeps_network_404s(self):
+        """Test listener 404s are still reported when the page audit fails"""
+        page = Mock()
+        page.evaluate.side_effect = RuntimeError("Target closed")
+
+        with patch('automation.factory._log_aligned'):
+            issues = factory.check_missing_images_playwright(
+                page, [{"url": "http://localhost:3000/images/a.png", "status": 404}]
+            )
+
+        assert [issue["src"] for issue in issues] == ["/images/a.png"]
+
+
+class TestPageReadiness:
+    """Test suite for readiness-driven QA page loads"""
+
+    def test_waits_for_each_readiness_signal(self):
+        """Test network idle, hydration marker and media are awaited under one ceiling"""
+        page = Mock()
+        page.evaluate.return_value = True
+
+        with patch('automation.factory.QA_WAIT_FOR_HYDRATION', True):
+            readiness = factory._wait_for_page_ready(page, "http://localhost:3000/clients/a", timeout_ms=5000)
+
+        assert readiness["timed_out"] == []
+        assert readiness["time_to_ready_ms"] >= 0
+        assert page.goto.call_args == call("http://localhost:3000/clients/a", wait_until="domcontentloaded", timeout=5000)
+        assert page.wait_for_load_state.call_args[0] == ("networkidle",)
+        assert page.wait_for_load_state.call_args[1]["timeout"] <= 5000
+        assert page.wait_for_selector.call_args[0] == (factory.QA_HYDRATION_SELECTOR,)
+        assert page.evaluate.call_args[0][0] is factory._MEDIA_READY_JS
+        page.wait_for_timeout.assert_not_called()
+
+    def test_timeouts_are_recorded_not_raised(self):
+        """Test steps that hit the ceiling are reported and the check continues"""
+        page = Mock()
+        page.wait_for_selector.side_effect = factory.PlaywrightTimeoutError("no marker")
+        page.evaluate.return_value = False
+
+        with patch('automation.factory.QA_WAIT_FOR_HYDRATION', True):
+            readiness = factory._wait_for_page_ready(page, "http://localhost:3000/clients/a", timeout_ms=5000)
+
+        assert readiness["timed_out"] == ["hydration", "media"]
+
+    def test_hydration_wait_optional(self):
+        """Test the hydration marker is skipped when disabled"""
+        page = Mock()
+        page.evaluate.return_value = True
+
+        with patch('automation.factory.QA_WAIT_FOR_HYDRATION', False):
+            factory._wait_for_page_ready(page, "http://localhost:3000/clients/a", timeout_ms=5000)
+
+        page.wait_for_selector.assert_not_called()
+
+    def test_exhausted_budget_skips_remaining_steps(self):
+        """Test a slow navigation leaves later steps skipped instead of waiting again"""
+        page = Mock()
+        clock = iter([0.0, 10.0, 10.0, 10.0, 10.0, 10.0, 10.0])
+
+        with patch('automation.factory.QA_WAIT_FOR_HYDRATION', True), \
+             patch('automation.factory.time.monotonic', side_effect=lambda: next(clock)):
+            readiness = factory._wait_for_page_ready(page, "http://localhost:3000/clients/a", timeout_ms=5000)
+
+        assert readiness["timed_out"] == ["network_idle", "hydration", "media"]
+        page.wait_for_load_state.assert_not_called()
+        page.evaluate.assert_not_called()
+
+    def test_time_to_ready_recorded_per_client(self, tmp_path):
+        """Test run_qa stores time-to-ready in the QA time-tracking span"""
+        client_path = tmp_path / "clients" / "ready-client"
+        client_path.mkdir(parents=True)
+        page = Mock()
+        page.screenshot.return_value = b"jpeg"
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), factory.browser_pool.CheckStats())
+        span = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+        readiness = {"time_to_ready_ms": 420, "timed_out": []}
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844"), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span', return_value=span) as mock_span, \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory._wait_for_page_ready', return_value=readiness), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[]), \
+             patch('automation.factory._anthropic_messages_create', return_value=Mock(content=[Mock(text="PASS")])), \
+             patch('automation.factory._record_model_cost'):
+            factory.run_qa(str(client_path))
+
+        activity, client_id, metadata = mock_span.call_args[0]
+        assert (activity, client_id) == ("pipeline_qa", "ready-client")
+        assert metadata == {
+            "stage": "qa", "time_to_ready_ms": 420, "timed_out": [], "viewport_ready_ms": {"mobile": 420},
+            "vision_images": 1, "vision_image_tokens": 0,
+        }
+
+
+class TestMultiViewportQa:
+    """Test suite for parallel multi-viewport QA"""
+
+    def test_parse_viewports(self):
+        """Test viewport specs are parsed and invalid entries skipped"""
+        with patch('automation.factory._log_aligned') as mock_log:
+            viewports = factory._parse_viewports("Mobile:390x844, desktop:1440x900, bogus, tablet:0x10")
+
+        assert viewports == [("mobile", 390, 844), ("desktop", 1440, 900)]
+        assert mock_log.call_count == 2
+        assert factory._parse_viewports("") == [("mobile", 390, 844)]
+
+    def test_merge_findings_across_viewports(self):
+        """Test an issue seen in several viewports is reported once with its viewports"""
+        broken = {"element": "img.logo", "src": "/images/logo.png", "issue_type": "broken"}
+        merged = factory._merge_viewport_findings(
+            {"mobile": [broken], "desktop": [dict(broken), {"element": "img.hero", "src": "/images/hero.jpg", "issue_type": "broken"}]},
+            ("src", "issue_type"),
+        )
+
+        assert [(issue["src"], issue["viewports"]) for issue in merged] == [
+            ("/images/logo.png", ["mobile", "desktop"]),
+            ("/images/hero.jpg", ["desktop"]),
+        ]
+
+    def test_viewports_rendered_concurrently(self, tmp_path):
+        """Test every page starts navigating before any is awaited, with one vision call for all"""
+        client_path = tmp_path / "clients" / "multi-client"
+        client_path.mkdir(parents=True)
+        events = []
+        pages = []
+        for name in ("mobile", "desktop"):
+            page = Mock(name=name)
+            page.goto.side_effect = lambda *a, name=name, **k: events.append(("goto", name))
+            page.screenshot.return_value = b"jpeg"
+            pages.append(page)
+
+        def fake_ready(page, url, navigate=True, started=None):
+            events.append(("ready", page._mock_name))
+            return {"time_to_ready_ms": 300 if page._mock_name == "mobile" else 500, "timed_out": []}
+
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn(pages), factory.browser_pool.CheckStats())
+        logo = {"element": "img.logo", "src": "/images/logo.png", "original_src": "/images/logo.png",
+                "optimized_src": None, "alt": "", "kind": "img", "issue_type": "broken"}
+        msg = Mock(content=[Mock(text="PASS")])
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844,desktop:1440x900"), \
+             patch('automation.factory.QA_VISION_POLICY', "enrich"), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span',
+                   return_value=MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory._wait_for_page_ready', side_effect=fake_ready), \
+             patch('automation.factory.check_missing_images_playwright', side_effect=lambda page, errors: [dict(logo)]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[]), \
+             patch('automation.factory._anthropic_messages_create', return_value=msg) as mock_create, \
+             patch('automation.factory._record_model_cost'):
+            status, report, screenshot = factory.run_qa(str(client_path))
+
+        assert events == [("goto", "mobile"), ("goto", "desktop"), ("ready", "mobile"), ("ready", "desktop")]
+        assert pool.run_pages.call_args[0][1] == [
+            {"viewport": {"width": 390, "height": 844}},
+            {"viewport": {"width": 1440, "height": 900}},
+        ]
+        assert (client_path / "qa_mobile.jpg").exists() and (client_path / "qa_desktop.jpg").exists()
+        assert screenshot == str(client_path / "qa_mobile.jpg")
+
+        mock_create.assert_called_once()
+        content = mock_create.call_args.kwargs["messages"][0]["content"]
+        assert [block["type"] for block in content].count("image") == 2
+        assert "2 viewports (mobile, desktop)" in content[-1]["text"]
+
+        assert status == "FAIL"
+        assert report.count("/images/logo.png") == 1
+        assert "[mobile, desktop]" in report
+
+
+class TestQaServerWarmUp:
+    """Test suite for warming the QA server after the builder writes a page"""
+
+    def test_page_warmed_before_qa(self, tmp_path, monkeypatch):
+        """Test the builder warms the new page up before running QA"""
+        monkeypatch.chdir(tmp_path)
+        client_path = tmp_path / "clients" / "warm-client"
+        client_path.mkdir(parents=True)
+        (client_path / "brief.md").write_text("# Brief", encoding="utf-8")
+        (client_path / "content.md").write_text("# Content", encoding="utf-8")
+        events = []
+
+        with patch('automation.factory._llm_messages_create'), \
+             patch('automation.factory._extract_response_text', return_value="```tsx\nexport default 1\n```"), \
+             patch('automation.factory.check_syntax', return_value=(True, "")), \
+             patch('automation.factory.qa_server.warm_up', side_effect=lambda client_id: events.append(("warm_up", client_id))), \
+             patch('automation.factory.run_qa', side_effect=lambda path: events.append(("qa", os.path.basename(path))) or ("PASS", "ok", None)), \
+             patch('automation.factory.memory'), \
+             patch('automation.factory.time_tracker') as mock_tracker:
+            mock_tracker.track_span.return_value = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+            factory._build_page(str(client_path))
+
+        assert events == [("warm_up", "warm-client"), ("qa", "warm-client")]
+        assert (tmp_path / "app" / "clients" / "warm-client" / "page.tsx").exists()
+
+
+class TestVisionVerdictCache:
+    """Test suite for reusing vision verdicts on unchanged renders"""
+
+    def _run_qa(self, client_path, render_hash, verdict="PASS"):
+        page = Mock()
+        page.screenshot.return_value = b"jpeg"
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), factory.browser_pool.CheckStats())
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844"), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span',
+                   return_value=MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory._wait_for_page_ready', return_value={"time_to_ready_ms": 1, "timed_out": []}), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[]), \
+             patch('automation.factory.screenshot_utils.screenshot_hash', return_value=render_hash), \
+             patch('automation.factory._anthropic_messages_create',
+                   return_value=Mock(content=[Mock(text=verdict)])) as mock_create, \
+             patch('automation.factory._record_model_cost'):
+            status, report, _ = factory.run_qa(str(client_path))
+        return status, report, mock_create
+
+    def test_unchanged_render_skips_vision_call(self, tmp_path):
+        """Test a second QA run with the same render reuses the stored verdict"""
+        client_path = tmp_path / "clients" / "cache-client"
+        client_path.mkdir(parents=True)
+        render_hash = {"size": [390, 2000], "bands": ["0" * 64, "f" * 64]}
+
+        first_status, _, first_create = self._run_qa(client_path, render_hash, verdict="FAIL: hero overlaps nav")
+        second_status, report, second_create = self._run_qa(client_path, render_hash)
+
+        first_create.assert_called_once()
+        second_create.assert_not_called()
+        assert first_status == second_status == "FAIL"
+        assert report.startswith("FAIL: hero overlaps nav")
+
+    def test_changed_render_calls_vision(self, tmp_path):
+        """Test a visibly different render gets a fresh verdict"""
+        client_path = tmp_path / "clients" / "cache-client"
+        client_path.mkdir(parents=True)
+
+        self._run_qa(client_path, {"size": [390, 2000], "bands": ["0" * 64, "0" * 64]}, verdict="FAIL: broken")
+        status, _, mock_create = self._run_qa(client_path, {"size": [390, 2000], "bands": ["0" * 64, "f" * 64]})
+
+        mock_create.assert_called_once()
+        assert status == "PASS"
+
+    def test_disabled_cache(self, tmp_path, monkeypatch):
+        """Test GF_QA_VISION_CACHE=false always calls the model"""
+        monkeypatch.setenv("GF_QA_VISION_CACHE", "false")
+        client_path = tmp_path / "clients" / "cache-client"
+        client_path.mkdir(parents=True)
+        render_hash = {"size": [390, 2000], "bands": ["0" * 64]}
+
+        self._run_qa(client_path, render_hash)
+        _, _, mock_create = self._run_qa(client_path, render_hash)
+
+        mock_create.assert_called_once()
+        assert not (client_path / "qa_vision_cache.json").exists()
+
+
+class TestVisionPreprocessing:
+    """Test suite for sending preprocessed screenshot tiles to the vision model"""
+
+    def _prepared(self, hashes, height=844):
+        tiles = [
+            factory.screenshot_utils.VisionTile(i, i * height, (i + 1) * height, f"tile{i}".encode(), "image/webp", 390, height, h)
+            for i, h in enumerate(hashes)
+        ]
+        return factory.screenshot_utils.PreparedScreenshot(size=(390, height * len(hashes)), tile_height=height, tiles=tiles)
+
+    def _run_qa(self, client_path, prepared, verdict="PASS"):
+        page = Mock()
+        page.screenshot.return_value = b"captured"
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), factory.browser_pool.CheckStats())
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844"), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span',
+                   return_value=MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))), \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory._wait_for_page_ready', return_value={"time_to_ready_ms": 1, "timed_out": []}), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[]), \
+             patch('automation.factory.screenshot_utils.prepare', return_value=prepared) as mock_prepare, \
+             patch('automation.factory._anthropic_messages_create',
+                   return_value=Mock(content=[Mock(text=verdict)])) as mock_create, \
+             patch('automation.factory._record_model_cost'):
+            status, report, _ = factory.run_qa(str(client_path))
+        return status, mock_prepare, mock_create
+
+    def test_tiles_sent_in_memory_with_positions(self, tmp_path):
+        """Test the capture is written once and its tiles are sent labelled with their position"""
+        client_path = tmp_path / "clients" / "tile-client"
+        client_path.mkdir(parents=True)
+
+        status, mock_prepare, mock_create = self._run_qa(client_path, self._prepared(["00", "ff"]))
+
+        assert status == "PASS"
+        assert (client_path / "qa_mobile.jpg").read_bytes() == b"captured"
+        assert mock_prepare.call_args[0][:2] == (b"captured", 844)
+        content = mock_create.call_args.kwargs["messages"][0]["content"]
+        assert content[0]["text"] == "Section 1 of 2 (page y 0-844px):"
+        assert content[1]["source"]["media_type"] == "image/webp"
+        assert content[3]["source"]["data"] == base64.b64encode(b"tile1").decode("utf-8")
+
+    def test_repair_sends_only_changed_tiles(self, tmp_path, monkeypatch):
+        """Test a repair attempt sends changed tiles with the previous verdict"""
+        monkeypatch.setenv("GF_QA_VISION_CHANGED_TILES", "true")
+        client_path = tmp_path / "clients" / "tile-client"
+        client_path.mkdir(parents=True)
+
+        self._run_qa(client_path, self._prepared(["00", "00", "00"]), verdict="FAIL: footer links overlap")
+        _, _, mock_create = self._run_qa(client_path, self._prepared(["00", "ff" * 32, "00"]))
+
+        content = mock_create.call_args.kwargs["messages"][0]["content"]
+        images = [block for block in content if block["type"] == "image"]
+        assert [block["source"]["data"] for block in images] == [base64.b64encode(b"tile1").decode("utf-8")]
+        assert "Section 2 of 3" in content[0]["text"]
+        assert "FAIL: footer links overlap" in content[-1]["text"]
+
+    def test_full_review_without_changed_tiles_option(self, tmp_path):
+        """Test every tile is sent again when GF_QA_VISION_CHANGED_TILES is off"""
+        client_path = tmp_path / "clients" / "tile-client"
+        client_path.mkdir(parents=True)
+
+        self._run_qa(client_path, self._prepared(["00", "00"]), verdict="FAIL: broken")
+        _, _, mock_create = self._run_qa(client_path, self._prepared(["00", "ff" * 32]))
+
+        content = mock_create.call_args.kwargs["messages"][0]["content"]
+        assert [block["type"] for block in content].count("image") == 2
+
+
+class TestLayoutOverflowAudit:
+    """Test suite for the single-evaluate layout overflow audit"""
+
+    def test_single_round_trip(self):
+        """Test the audit runs as one evaluate() and returns the overflowing elements"""
+        overflow = {"element": "div.hero-grid", "right": 602, "overflow_px": 212, "viewport_width": 390, "text_preview": ""}
+        page = Mock()
+        page.evaluate.return_value = {"overflows": [overflow], "page_width": 602, "viewport_width": 390, "elapsed_ms": 2.0}
+
+        assert factory.check_layout_overflow_playwright(page) == [overflow]
+        script, args = page.evaluate.call_args[0]
+        assert script is factory._LAYOUT_OVERFLOW_AUDIT_JS
+        assert args == {"tolerance": factory.LAYOUT_OVERFLOW_TOLERANCE_PX, "maxIssues": factory.LAYOUT_AUDIT_MAX_ISSUES}
+
+    def test_evaluate_failure_returns_no_issues(self):
+        """Test a page error is logged and treated as no findings"""
+        page = Mock()
+        page.evaluate.side_effect = RuntimeError("Target closed")
+
+        with patch('automation.factory._log_aligned') as mock_log:
+            assert factory.check_layout_overflow_playwright(page) == []
+
+        assert "Layout overflow check failed" in str(mock_log.call_args)
+
+
+class TestQaVisionPolicy:
+    """Test suite for running the vision model only after the automated checks"""
+
+    def _run_qa(self, tmp_path, policy, missing_images=(), overflows=()):
+        client_path = tmp_path / "clients" / "gate-client"
+        client_path.mkdir(parents=True, exist_ok=True)
+        page = Mock()
+        page.screenshot.return_value = b"captured"
+        pool = Mock()
+        pool.run_pages.side_effect = lambda fn, contexts: (fn([page] * len(contexts)), factory.browser_pool.CheckStats())
+        span = MagicMock(__enter__=Mock(), __exit__=Mock(return_value=False))
+
+        with patch('automation.factory.QA_VIEWPORTS', "mobile:390x844"), \
+             patch('automation.factory.QA_VISION_POLICY', policy), \
+             patch('automation.factory.qa_server.ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.factory.time_tracker.track_span', return_value=span) as mock_span, \
+             patch('automation.factory.browser_pool.get_pool', return_value=pool), \
+             patch('automation.factory._wait_for_page_ready', return_value={"time_to_ready_ms": 1, "timed_out": []}), \
+             patch('automation.factory.check_missing_images_playwright', return_value=[dict(i) for i in missing_images]), \
+             patch('automation.factory.check_invisible_text_playwright', return_value=[]), \
+             patch('automation.factory.check_layout_overflow_playwright', return_value=[dict(i) for i in overflows]), \
+             patch('automation.factory._anthropic_messages_create',
+                   return_value=Mock(content=[Mock(text="PASS")])) as mock_create, \
+             patch('automation.factory._record_model_cost'):
+            status, report, _ = factory.run_qa(str(client_path))
+        return status, report, mock_create, mock_span.call_args[0][2]
+
+    broken_logo = {"element": "img.logo", "src": "/images/logo.png", "original_src": "/images/logo.png",
+                   "optimized_src": None, "alt": "", "kind": "img", "issue_type": "broken"}
+    wide_grid = {"element": "div.grid", "right": 520, "overflow_px": 130, "viewport_width": 390, "text_preview": "Plans"}
+
+    def test_gate_skips_vision_when_checks_fail(self, tmp_path):
+        """Test failing DOM audits fail the page without a vision call"""
+        status, report, mock_create, metadata = self._run_qa(tmp_path, "gate", missing_images=[self.broken_logo])
+
+        mock_create.assert_not_called()
+        assert status == "FAIL"
+        assert report.startswith("FAIL: Automated checks found missing images (vision review skipped)")
+        assert "/images/logo.png" in report
+        assert metadata["vision_skipped"] is True
+
+    def test_gate_calls_vision_when_checks_pass(self, tmp_path):
+        """Test the vision model reviews pages the DOM audits pass"""
+        status, _, mock_create, metadata = self._run_qa(tmp_path, "gate")
+
+        mock_create.assert_called_once()
+        assert status == "PASS"
+        assert "vision_skipped" not in metadata
+
+    def test_enrich_calls_vision_despite_failures(self, tmp_path):
+        """Test GF_QA_VISION_POLICY=enrich still asks the model for repair feedback"""
+        status, report, mock_create, _ = self._run_qa(tmp_path, "enrich", overflows=[self.wide_grid])
+
+        mock_create.assert_called_once()
+        assert status == "FAIL"
+        assert report.startswith("FAIL: Layout overflow detected")
+        assert "**div.grid**: extends 130px past the right edge of the 390px viewport" in report
+
+    def test_off_never_calls_vision(self, tmp_path):
+        """Test GF_QA_VISION_POLICY=off passes on the automated checks alone"""
+        status, _, mock_create, _ = self._run_qa(tmp_path, "off")
+
+        mock_create.assert_not_called()
+        assert status == "PASS"
+
+    def test_unknown_policy_gates(self, tmp_path):
+        """Test an unrecognized policy behaves like gate"""
+        _, _, mock_create, _ = self._run_qa(tmp_path, "sometimes")
+
+        mock_create.assert_called_once()
@@ -0,0 +1,173 @@
+"""
+Unit tests for automation/intake_watcher.py
+
+Tests cover:
+- Filtering of intake files vs. unrelated files
+- Debouncing of repeated events into a single callback
+- Waiting for partially written files to settle
+- End-to-end pickup latency with a real watchdog observer
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from automation.intake_watcher import IntakeWatcher
+
+
+@pytest.fixture
+def watch_dir():
+    """Create a temporary clients directory"""
+    temp_dir = tempfile.mkdtemp()
+    yield temp_dir
+    shutil.rmtree(temp_dir)
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+class TestIntakeFiltering:
+    """Test suite for which paths count as intake events"""
+
+    def test_intake_md_is_tracked(self, watch_dir):
+        """Test clients/<id>/intake.md is tracked"""
+        watcher = IntakeWatcher(watch_dir, Mock())
+        watcher.record_event(Path(watch_dir) / "acme" / "intake.md")
+
+        assert watcher.pending_count() == 1
+
+    def test_raw_intake_is_tracked(self, watch_dir):
+        """Test clients/<id>/intake-raw.md is tracked"""
+        watcher = IntakeWatcher(watch_dir, Mock())
+        watcher.record_event(Path(watch_dir) / "acme" / "intake-raw.md")
+
+        assert watcher.pending_count() == 1
+
+    @pytest.mark.parametrize("relative", [
+        "acme/brief.md",
+        "acme/intake-processed.md",
+        "acme/assets/intake.md",
+        ".hidden/intake.md",
+        "bad..id/intake.md",
+        "intake.md",
+    ])
+    def test_other_paths_are_ignored(self, watch_dir, relative):
+        """Test pipeline outputs, nested files and invalid IDs are ignored"""
+        watcher = IntakeWatcher(watch_dir, Mock())
+        watcher.record_event(Path(watch_dir) / relative)
+
+        assert watcher.pending_count() == 0
+
+
+class TestDebounce:
+    """Test suite for debouncing partial writes"""
+
+    def test_repeated_events_fire_once(self, watch_dir):
+        """Test a burst of events produces a single callback"""
+        callback = Mock()
+        path = os.path.join(watch_dir, "acme", "intake.md")
+        _write(path, "# Intake")
+        watcher = IntakeWatcher(watch_dir, callback, debounce_seconds=0.05)
+
+        for _ in range(5):
+            watcher.record_event(Path(path))
+        time.sleep(0.1)
+        watcher._flush_settled()
+
+        callback.assert_called_once_with("acme", "intake.md")
+        assert watcher.pending_count() == 0
+
+    def test_does_not_fire_before_debounce(self, watch_dir):
+        """Test nothing fires while events are still arriving"""
+        callback = Mock()
+        path = os.path.join(watch_dir, "acme", "intake.md")
+        _write(path, "# Intake")
+        watcher = IntakeWatcher(watch_dir, callback, debounce_seconds=10)
+
+        watcher.record_event(Path(path))
+        watcher._flush_settled()
+
+        callback.assert_not_called()
+
+    def test_waits_while_file_is_growing(self, watch_dir):
+        """Test a size change without an event delays the callback"""
+        callback = Mock()
+        path = os.path.join(watch_dir, "acme", "intake.md")
+        _write(path, "# Int")
+        watcher = IntakeWatcher(watch_dir, callback, debounce_seconds=0.05)
+        watcher.record_event(Path(path))
+
+        _write(path, "# Intake with more content")
+        time.sleep(0.1)
+        watcher._flush_settled()
+        callback.assert_not_called()
+
+        time.sleep(0.1)
+        watcher._flush_settled()
+        callback.assert_called_once_with("acme", "intake.md")
+
+    def test_vanished_file_is_dropped(self, watch_dir):
+        """Test a file removed before settling never fires"""
+        callback = Mock()
+        path = os.path.join(watch_dir, "acme", "intake.md")
+        _write(path, "# Intake")
+        watcher = IntakeWatcher(watch_dir, callback, debounce_seconds=0.01)
+        watcher.record_event(Path(path))
+        os.remove(path)
+
+        time.sleep(0.05)
+        watcher._flush_settled()
+
+        callback.assert_not_called()
+        assert watcher.pending_count() == 0
+
+    def test_callback_errors_are_contained(self, watch_dir):
+        """Test a failing callback does not break the watcher"""
+        callback = Mock(side_effect=RuntimeError("boom"))
+        path = os.path.join(watch_dir, "acme", "intake.md")
+        _write(path, "# Intake")
+        watcher = IntakeWatcher(watch_dir, callback, debounce_seconds=0.01)
+        watcher.record_event(Path(path))
+
+        time.sleep(0.05)
+        watcher._flush_settled()
+
+        callback.assert_called_once()
+
+
+@pytest.mark.integration
+class TestWatcherObserver:
+    """End-to-end test with a real watchdog observer"""
+
+    def test_new_intake_is_reported_within_a_second(self, watch_dir):
+        """Test a dropped intake is reported in well under a second"""
+        reported = []
+        watcher = IntakeWatcher(
+            watch_dir, lambda cid, name: reported.append((cid, name, time.monotonic())),
+            debounce_seconds=0.2,
+        )
+        watcher.start()
+        try:
+            os.makedirs(os.path.join(watch_dir, "acme"))
+            time.sleep(0.2)  # Let the observer pick up the new directory
+            dropped_at = time.monotonic()
+            _write(os.path.join(watch_dir, "acme", "intake.md"), "# Intake")
+
+            deadline = time.monotonic() + 3
+            while not reported and time.monotonic() < deadline:
+                time.sleep(0.02)
+        finally:
+            watcher.stop()
+
+        assert reported, "intake was never reported"
+        client_id, filename, reported_at = reported[0]
+        assert (client_id, filename) == ("acme", "intake.md")
+        assert reported_at - dropped_at < 1.0
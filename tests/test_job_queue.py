@@ -0,0 +1,177 @@
+"""
+Unit tests for automation/job_queue.py
+
+Tests cover:
+- Enqueueing and the pending-jobs query
+- Stage transitions and builder checkpoints
+- Resuming after a crash (running -> pending)
+- Re-queueing finished clients when a new intake arrives
+
+The database is redirected to a per-test path by tests/conftest.py.
+"""
+
+import sqlite3
+
+import pytest
+
+from automation import job_queue
+
+
+class TestEnqueue:
+    """Test suite for enqueue and pending_clients"""
+
+    def test_enqueue_creates_pending_job(self):
+        """Test a new client starts pending at the architect stage"""
+        assert job_queue.enqueue("acme") is True
+
+        job = job_queue.get_job("acme")
+        assert job["status"] == "pending"
+        assert job["stage"] == "architect"
+        assert job["attempt"] == 0
+        assert job_queue.pending_clients() == ["acme"]
+
+    def test_enqueue_is_idempotent(self):
+        """Test enqueueing twice keeps a single row"""
+        job_queue.enqueue("acme")
+        job_queue.enqueue("acme")
+
+        assert job_queue.pending_clients() == ["acme"]
+
+    def test_pending_is_oldest_first(self):
+        """Test pending clients are ordered by last update"""
+        for client_id in ["first", "second", "third"]:
+            job_queue.enqueue(client_id)
+
+        assert job_queue.pending_clients() == ["first", "second", "third"]
+
+    def test_enqueue_keeps_checkpoint_of_unfinished_job(self):
+        """Test a pending job is not reset by a repeated intake event"""
+        job_queue.checkpoint("acme", "builder", 3, {"syntax": "err"})
+        job_queue.release("acme")
+
+        job_queue.enqueue("acme")
+
+        assert job_queue.resume_point("acme", "builder") == (3, {"syntax": "err"})
+
+    def test_enqueue_requeues_done_job_from_scratch(self):
+        """Test a new intake for a finished client starts over"""
+        job_queue.checkpoint("acme", "builder", 4, {"visual": "bad"})
+        job_queue.mark_done("acme")
+
+        job_queue.enqueue("acme")
+
+        job = job_queue.get_job("acme")
+        assert job["status"] == "pending"
+        assert job["stage"] == "architect"
+        assert job["attempt"] == 0
+        assert job["last_feedback"] is None
+
+
+class TestStagesAndCheckpoints:
+    """Test suite for stage tracking and resume points"""
+
+    def test_running_jobs_are_not_pending(self):
+        """Test a running job drops out of the pending query"""
+        job_queue.enqueue("acme")
+        job_queue.mark_running("acme")
+
+        assert job_queue.pending_clients() == []
+
+    def test_set_stage_resets_attempt_on_change(self):
+        """Test moving to a new stage clears the previous stage's checkpoint"""
+        job_queue.checkpoint("acme", "copywriter", 2, {"critic": "FAIL"})
+
+        job_queue.set_stage("acme", "builder")
+
+        job = job_queue.get_job("acme")
+        assert job["stage"] == "builder"
+        assert job["attempt"] == 0
+        assert job["last_feedback"] is None
+
+    def test_set_stage_keeps_checkpoint_on_resume(self):
+        """Test re-entering the same stage keeps its attempt and feedback"""
+        job_queue.checkpoint("acme", "builder", 2, {"syntax": "TS1005"})
+
+        job_queue.set_stage("acme", "builder")
+
+        assert job_queue.resume_point("acme", "builder") == (2, {"syntax": "TS1005"})
+
+    def test_set_stage_rejects_unknown_stage(self):
+        """Test an unknown stage name is a programming error"""
+        with pytest.raises(ValueError):
+            job_queue.set_stage("acme", "deploy")
+
+    def test_resume_point_for_other_stage(self):
+        """Test a checkpoint only applies to its own stage"""
+        job_queue.checkpoint("acme", "builder", 2, {"syntax": "x"})
+
+        assert job_queue.resume_point("acme", "copywriter") == (0, {})
+
+    def test_resume_point_ignores_done_jobs(self):
+        """Test a finished job never resumes"""
+        job_queue.checkpoint("acme", "builder", 2, {"syntax": "x"})
+        job_queue.mark_done("acme")
+
+        assert job_queue.resume_point("acme", "builder") == (0, {})
+
+    def test_resume_point_unknown_client(self):
+        """Test a client with no row has nothing to resume"""
+        assert job_queue.resume_point("missing", "builder") == (0, {})
+
+
+class TestCrashRecovery:
+    """Test suite for recovering from crashes"""
+
+    def test_recover_interrupted_requeues_running_jobs(self):
+        """Test jobs left running by a dead process become pending again"""
+        job_queue.enqueue("acme")
+        job_queue.mark_running("acme")
+        job_queue.enqueue("beta")
+        job_queue.mark_running("beta")
+        job_queue.mark_done("beta")
+
+        assert job_queue.recover_interrupted() == 1
+        assert job_queue.pending_clients() == ["acme"]
+
+    def test_release_records_error_and_keeps_checkpoint(self):
+        """Test a crashed pipeline is re-queued with its error"""
+        job_queue.checkpoint("acme", "builder", 1, {"syntax": "x"})
+
+        job_queue.release("acme", error="boom")
+
+        job = job_queue.get_job("acme")
+        assert job["status"] == "pending"
+        assert job["last_error"] == "boom"
+        assert job["attempt"] == 1
+
+    def test_release_leaves_done_jobs_alone(self):
+        """Test releasing after finalize does not re-queue the client"""
+        job_queue.enqueue("acme")
+        job_queue.mark_done("acme")
+
+        job_queue.release("acme")
+
+        assert job_queue.get_job("acme")["status"] == "done"
+
+    def test_state_survives_new_connections(self, isolated_job_queue):
+        """Test checkpoints are durable on disk in WAL mode"""
+        job_queue.checkpoint("acme", "builder", 2, {"visual": "overlap"})
+
+        conn = sqlite3.connect(str(isolated_job_queue))
+        try:
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            row = conn.execute("SELECT attempt FROM jobs WHERE client_id = 'acme'").fetchone()
+        finally:
+            conn.close()
+
+        assert mode == "wal"
+        assert row[0] == 2
+
+    def test_database_errors_are_not_raised(self, monkeypatch, tmp_path):
+        """Test a broken database degrades to no-ops instead of crashing"""
+        monkeypatch.setattr(job_queue, "DB_PATH", tmp_path)  # A directory, not a file
+
+        assert job_queue.enqueue("acme") is False
+        # None, not [], so the factory can tell "nothing pending" from "queue unreadable"
+        assert job_queue.pending_clients() is None
+        assert job_queue.get_job("acme") is None
@@ -0,0 +1,170 @@
+"""
+Unit tests for automation/llm_cache.py
+
+Tests cover:
+- Opt-in switch and stable content-addressed keys
+- Round-tripping Anthropic and OpenAI responses
+- TTL expiry and LRU eviction under a size bound
+- Skipping empty responses
+"""
+
+import json
+import os
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from automation import llm_cache
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """Point the cache at a temporary directory"""
+    monkeypatch.setattr(llm_cache, "CACHE_DIR", tmp_path / "llm_cache")
+    return tmp_path / "llm_cache"
+
+
+def _anthropic_response(text="Hello", input_tokens=10, output_tokens=5):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text)],
+        stop_reason="end_turn",
+        usage=SimpleNamespace(input_tokens=input_tokens, output_tokens=output_tokens),
+    )
+
+
+class TestSwitchAndKeys:
+    """Test suite for is_enabled and cache_key"""
+
+    @pytest.mark.parametrize("value,expected", [
+        ("true", True), ("1", True), ("on", True), ("", False), ("false", False),
+    ])
+    def test_is_enabled(self, monkeypatch, value, expected):
+        """Test the GF_LLM_CACHE environment switch"""
+        monkeypatch.setenv("GF_LLM_CACHE", value)
+        assert llm_cache.is_enabled() is expected
+
+    def test_key_ignores_argument_order(self):
+        """Test keyword order does not change the key"""
+        a = llm_cache.cache_key("anthropic", "m", system="s", max_tokens=5, messages=[{"role": "user", "content": "hi"}])
+        b = llm_cache.cache_key("anthropic", "m", messages=[{"role": "user", "content": "hi"}], max_tokens=5, system="s")
+        assert a == b
+
+    @pytest.mark.parametrize("change", [
+        {"model": "other"},
+        {"system": "different"},
+        {"max_tokens": 6},
+        {"messages": [{"role": "user", "content": "bye"}]},
+    ])
+    def test_key_changes_with_any_input(self, change):
+        """Test model, system, messages and max_tokens all affect the key"""
+        base = {"model": "m", "system": "s", "max_tokens": 5, "messages": [{"role": "user", "content": "hi"}]}
+        changed = {**base, **change}
+        model, changed_model = base.pop("model"), changed.pop("model")
+        assert llm_cache.cache_key("anthropic", model, **base) != llm_cache.cache_key("anthropic", changed_model, **changed)
+
+
+class TestStore:
+    """Test suite for get/put round trips"""
+
+    def test_miss_returns_none(self, cache_dir):
+        """Test an unknown key is a miss"""
+        assert llm_cache.get("0" * 64) is None
+
+    def test_anthropic_round_trip(self, cache_dir):
+        """Test a stored Anthropic response comes back with the same text and usage"""
+        key = llm_cache.cache_key("anthropic", "m", system="s")
+        llm_cache.put(key, llm_cache.anthropic_payload(_anthropic_response("Brief text", 120, 40)))
+
+        response = llm_cache.to_response(llm_cache.get(key))
+
+        assert response.cache_hit is True
+        assert response.content[0].text == "Brief text"
+        assert response.usage.input_tokens == 120
+        assert response.usage.output_tokens == 40
+        assert response.stop_reason == "end_turn"
+
+    def test_openai_round_trip(self, cache_dir):
+        """Test a stored OpenAI response keeps the chat completion shape"""
+        original = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Code"), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=7, completion_tokens=3),
+        )
+        key = llm_cache.cache_key("openai", "gpt-x")
+        llm_cache.put(key, llm_cache.openai_payload(original))
+
+        response = llm_cache.to_response(llm_cache.get(key))
+
+        assert response.choices[0].message.content == "Code"
+        assert response.usage.prompt_tokens == 7
+        assert response.cache_hit is True
+
+    def test_empty_responses_have_no_payload(self):
+        """Test empty responses are never cached"""
+        assert llm_cache.anthropic_payload(_anthropic_response(text="")) is None
+        assert llm_cache.anthropic_payload(SimpleNamespace(content=[])) is None
+        assert llm_cache.openai_payload(SimpleNamespace(choices=[])) is None
+
+    def test_expired_entry_is_a_miss(self, cache_dir, monkeypatch):
+        """Test entries older than the TTL are dropped"""
+        monkeypatch.setenv("GF_LLM_CACHE_TTL_HOURS", "1")
+        key = llm_cache.cache_key("anthropic", "m")
+        llm_cache.put(key, {"provider": "anthropic", "texts": ["x"]})
+
+        with patch('automation.llm_cache.time.time', return_value=time.time() + 7200):
+            assert llm_cache.get(key) is None
+        assert not llm_cache._entry_path(key).exists()
+
+    def test_corrupt_entry_is_a_miss(self, cache_dir):
+        """Test unreadable entries are removed instead of raising"""
+        key = "ab" + "0" * 62
+        path = llm_cache._entry_path(key)
+        path.parent.mkdir(parents=True)
+        path.write_text("{not json", encoding="utf-8")
+
+        assert llm_cache.get(key) is None
+        assert not path.exists()
+
+
+class TestEviction:
+    """Test suite for the LRU size bound"""
+
+    def _fill(self, count):
+        keys = []
+        for i in range(count):
+            key = llm_cache.cache_key("anthropic", "m", n=i)
+            llm_cache.put(key, {"provider": "anthropic", "texts": ["x" * 1000]})
+            # Spread mtimes so LRU order is deterministic
+            stamp = time.time() - (count - i) * 10
+            os.utime(llm_cache._entry_path(key), (stamp, stamp))
+            keys.append(key)
+        return keys
+
+    def test_evicts_least_recently_used(self, cache_dir):
+        """Test eviction removes the oldest entries first"""
+        keys = self._fill(5)
+        newest = sum(llm_cache._entry_path(k).stat().st_size for k in keys[2:])
+
+        removed = llm_cache.evict(max_bytes=newest)
+
+        assert removed == 2
+        assert [llm_cache._entry_path(k).exists() for k in keys] == [False, False, True, True, True]
+
+    def test_get_refreshes_recency(self, cache_dir):
+        """Test reading an entry protects it from eviction"""
+        keys = self._fill(3)
+        sizes = [llm_cache._entry_path(k).stat().st_size for k in keys]
+
+        llm_cache.get(keys[0])
+        llm_cache.evict(max_bytes=sizes[0] + sizes[2])
+
+        assert llm_cache._entry_path(keys[0]).exists()
+        assert not llm_cache._entry_path(keys[1]).exists()
+
+    def test_put_enforces_size_bound(self, cache_dir, monkeypatch):
+        """Test the store never grows past GF_LLM_CACHE_MAX_MB"""
+        monkeypatch.setenv("GF_LLM_CACHE_MAX_MB", str(3 * 1100 / (1024 * 1024)))
+        self._fill(6)
+
+        assert len(list(cache_dir.glob("*/*.json"))) <= 3
@@ -0,0 +1,58 @@
+"""
+Tests for automation/lock_utils.py - per-client lock files
+"""
+import os
+import time
+
+import pytest
+
+from automation import lock_utils
+
+
+@pytest.fixture
+def lock_dir(tmp_path, monkeypatch):
+    """Keep lock files in a temporary directory"""
+    monkeypatch.setattr(lock_utils, "LOCK_DIR", tmp_path / "locks")
+    return tmp_path / "locks"
+
+
+def _age(path, seconds):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestClientLock:
+    """Test suite for acquiring and releasing client locks"""
+
+    def test_acquire_and_release(self, lock_dir):
+        """Test a held lock blocks a second acquire until released"""
+        assert lock_utils.acquire_lock("alpha") is True
+        assert lock_utils.is_locked("alpha") is True
+        assert lock_utils.acquire_lock("alpha") is False
+
+        lock_utils.release_lock("alpha")
+        assert lock_utils.acquire_lock("alpha") is True
+
+    def test_stale_timestamp_is_removed(self, lock_dir):
+        """Test a lock older than LOCK_TIMEOUT_SECONDS is replaced"""
+        path = lock_utils.get_lock_path("alpha")
+        path.write_text(str(time.time() - lock_utils.LOCK_TIMEOUT_SECONDS - 1))
+
+        assert lock_utils.acquire_lock("alpha") is True
+
+    @pytest.mark.parametrize("content", ["", "not-a-timestamp"])
+    def test_old_empty_or_corrupt_lock_is_removed(self, lock_dir, content):
+        """Test an empty or corrupt lock left by a crashed worker does not block the client forever"""
+        path = lock_utils.get_lock_path("alpha")
+        path.write_text(content)
+        _age(path, lock_utils.LOCK_WRITE_GRACE_SECONDS + 1)
+
+        assert lock_utils.is_locked("alpha") is False
+        assert lock_utils.acquire_lock("alpha") is True
+
+    def test_fresh_empty_lock_is_held(self, lock_dir):
+        """Test a just-created lock whose timestamp is not written yet still counts as held"""
+        lock_utils.get_lock_path("alpha").write_text("")
+
+        assert lock_utils.is_locked("alpha") is True
+        assert lock_utils.acquire_lock("alpha") is False
@@ -0,0 +1,174 @@
+"""
+Unit tests for automation/niche_classifier.py
+
+Tests cover:
+- Naive Bayes predictions on separable intakes, scoring every niche
+- Held-out calibration of the confidence
+- Thresholds: minimum routed examples per niche and confidence
+- Training only from LLM-routed niche.json files
+- Persisting and loading a client's niche choice
+"""
+
+import json
+import random
+
+import pytest
+
+from automation import niche_classifier
+
+
+SAMPLES = {
+    "saas.md": "Our platform helps enterprise teams automate software deployment and scale their cloud solution.",
+    "local_service.md": "Family plumbing business serving the Austin service area, book a quote for emergency repairs.",
+    "ecommerce.md": "Small batch coffee roaster selling beans online with free shipping and a monthly subscription shop.",
+    "personal_brand.md": "Leadership coach and author offering one-on-one coaching, a weekly newsletter and an online course.",
+    "webinar.md": "Register for our free live masterclass, limited seats for the ninety minute training workshop.",
+}
+NICHES = set(SAMPLES)
+
+
+@pytest.fixture(autouse=True)
+def fresh_classifier(monkeypatch):
+    """Each test trains its own process-wide classifier"""
+    monkeypatch.setattr(niche_classifier, "_classifier", None)
+    monkeypatch.delenv("GF_NICHE_CLASSIFIER", raising=False)
+    monkeypatch.delenv("GF_NICHE_CONFIDENCE", raising=False)
+    monkeypatch.delenv("GF_NICHE_MIN_EXAMPLES", raising=False)
+
+
+def _trained(copies=5):
+    classifier = niche_classifier.NicheClassifier()
+    for _ in range(copies):
+        for niche, text in SAMPLES.items():
+            classifier.learn(text, niche)
+    return classifier
+
+
+def _client(root, name, intake, choice=None):
+    client = root / name
+    client.mkdir()
+    (client / "intake.md").write_text(intake, encoding="utf-8")
+    if choice:
+        (client / "niche.json").write_text(json.dumps(choice), encoding="utf-8")
+    return client
+
+
+class TestNicheClassifier:
+    """Test suite for the naive Bayes model"""
+
+    def test_predicts_niche_with_confidence(self):
+        """Test a new intake sharing a niche's vocabulary is classified confidently"""
+        niche, confidence = _trained().predict("Roaster shop with coffee subscription and shipping")
+
+        assert niche == "ecommerce.md"
+        assert confidence > 0.95
+
+    def test_ambiguous_intake_low_confidence(self):
+        """Test an intake with no known words falls back to the priors"""
+        niche, confidence = _trained().predict("Lorem ipsum dolor sit amet")
+
+        assert confidence == pytest.approx(1 / len(SAMPLES))
+
+    def test_unlearned_niches_are_scored(self):
+        """Test niches without examples still take probability mass from the learned ones"""
+        classifier = niche_classifier.NicheClassifier()
+        classifier.learn(SAMPLES["saas.md"], "saas.md")
+
+        _, learned_only = classifier.predict("Lorem ipsum")
+        _, all_niches = classifier.predict("Lorem ipsum", NICHES)
+
+        assert learned_only == 1.0
+        assert all_niches < 0.5
+
+    def test_held_out_calibration_tempers_overconfident_posteriors(self):
+        """Test a high posterior from a model that is wrong on held-out intakes is not trusted"""
+        rng = random.Random(1)
+        words = [f"term{i}" for i in range(300)]
+        niches = sorted(NICHES)
+        classifier = niche_classifier.NicheClassifier()
+        for i in range(50):
+            # Labels unrelated to the words: naive Bayes still reports near-certain posteriors
+            classifier.learn(" ".join(rng.sample(words, 150)), niches[i % len(niches)])
+
+        posteriors = [classifier.predict(" ".join(rng.sample(words, 150)), NICHES)[1] for _ in range(20)]
+        overconfident = max(posteriors)
+
+        assert overconfident > 0.95
+        assert classifier.calibrated(overconfident, NICHES) < 0.5
+
+    def test_calibration_needs_held_out_evidence(self):
+        """Test a posterior below every held-out score gets no confidence"""
+        classifier = _trained(copies=10)
+
+        assert classifier.calibrated(0.2, NICHES) == 0.5
+        assert classifier.calibrated(1.0, NICHES) > 0.95
+
+    def test_empty_model_returns_none(self):
+        """Test nothing is predicted before anything was learned"""
+        assert niche_classifier.NicheClassifier().predict("coffee") is None
+
+
+class TestClassify:
+    """Test suite for the confidence gate in front of the LLM router"""
+
+    def test_too_few_examples_defers_to_router(self, tmp_path, monkeypatch):
+        """Test the classifier is not trusted until it has seen enough routed intakes"""
+        monkeypatch.setattr(niche_classifier, "_classifier", _trained(copies=1))
+
+        assert niche_classifier.classify(SAMPLES["saas.md"], str(tmp_path), NICHES) is None
+
+    def test_every_niche_needs_examples(self, tmp_path, monkeypatch):
+        """Test a model that never saw one of the niches is not trusted, however large"""
+        classifier = _trained(copies=10)
+        for _ in range(30):
+            classifier.learn(SAMPLES["saas.md"], "saas.md")
+        monkeypatch.setattr(niche_classifier, "_classifier", classifier)
+
+        assert niche_classifier.classify(SAMPLES["saas.md"], str(tmp_path), NICHES | {"extra.md"}) is None
+
+    def test_confident_prediction_returned(self, tmp_path, monkeypatch):
+        """Test a prediction with high held-out accuracy from a trusted model skips the router"""
+        monkeypatch.setattr(niche_classifier, "_classifier", _trained(copies=10))
+
+        niche, confidence = niche_classifier.classify(SAMPLES["saas.md"], str(tmp_path), NICHES)
+        assert niche == "saas.md"
+        assert 0.95 <= confidence < 1
+
+    def test_low_confidence_defers_to_router(self, tmp_path, monkeypatch):
+        """Test a prediction below GF_NICHE_CONFIDENCE is not used"""
+        monkeypatch.setattr(niche_classifier, "_classifier", _trained(copies=10))
+
+        assert niche_classifier.classify("Lorem ipsum dolor sit amet", str(tmp_path), NICHES) is None
+
+    def test_disabled(self, tmp_path, monkeypatch):
+        """Test GF_NICHE_CLASSIFIER=false always defers to the router"""
+        monkeypatch.setattr(niche_classifier, "_classifier", _trained(copies=10))
+        monkeypatch.setenv("GF_NICHE_CLASSIFIER", "false")
+
+        assert niche_classifier.classify(SAMPLES["saas.md"], str(tmp_path), NICHES) is None
+
+
+class TestTraining:
+    """Test suite for training from persisted niche choices"""
+
+    def test_learns_only_router_labels(self, tmp_path):
+        """Test only LLM-routed clients are learned, never the classifier's own choices"""
+        _client(tmp_path, "a", SAMPLES["saas.md"], {"niche": "saas_b2b", "prompt": "saas.md", "source": "router"})
+        _client(tmp_path, "b", SAMPLES["local_service.md"], {"niche": "local_service", "prompt": "local_service.md", "source": "local"})
+        _client(tmp_path, "c", SAMPLES["ecommerce.md"])
+        _client(tmp_path, "d", SAMPLES["saas.md"], {"niche": "saas", "prompt": "saas.md", "source": "router"})
+
+        classifier = niche_classifier.train_from_clients(str(tmp_path))
+
+        # Router aliases of one strategy prompt are the same niche
+        assert classifier.doc_counts == {"saas.md": 2}
+
+    def test_save_and_load_choice(self, tmp_path):
+        """Test a saved choice round-trips and a corrupt file reads as unclassified"""
+        niche_classifier.save_choice(str(tmp_path), "saas_b2b", "saas.md", "local", 0.987654)
+
+        assert niche_classifier.load_choice(str(tmp_path)) == {
+            "niche": "saas_b2b", "prompt": "saas.md", "source": "local", "confidence": 0.9877
+        }
+        (tmp_path / "niche.json").write_text("{not json", encoding="utf-8")
+        assert niche_classifier.load_choice(str(tmp_path)) is None
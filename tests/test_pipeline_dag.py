@@ -0,0 +1,278 @@
+"""
+Unit tests for automation/pipeline_dag.py
+
+Tests cover:
+- Graph validation (missing inputs, duplicate producers, cycles)
+- Independent nodes overlapping while dependent nodes wait
+- Artifact passing between nodes
+- Failure handling (required vs optional nodes)
+- Skipped nodes and critical path reporting
+- The asyncio executor (run_dag_async)
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from automation.pipeline_dag import Node, run_dag, run_dag_async, DagReport, NodeResult
+
+
+def _sleep_node(name, seconds, requires=(), produces=(), **kwargs):
+    def func(inputs):
+        time.sleep(seconds)
+    return Node(name, func, requires=tuple(requires), produces=tuple(produces), **kwargs)
+
+
+class TestValidation:
+    """Test suite for graph validation"""
+
+    def test_missing_input_rejected(self):
+        """Test a node requiring an unproduced artifact is rejected"""
+        with pytest.raises(ValueError, match="nothing produces"):
+            run_dag([Node("a", lambda i: None, requires=("brief.md",))])
+
+    def test_duplicate_producer_rejected(self):
+        """Test two nodes producing the same artifact are rejected"""
+        nodes = [
+            Node("a", lambda i: None, produces=("x",)),
+            Node("b", lambda i: None, produces=("x",)),
+        ]
+        with pytest.raises(ValueError, match="produced by both"):
+            run_dag(nodes)
+
+    def test_cycle_rejected(self):
+        """Test a dependency cycle is rejected before anything runs"""
+        ran = []
+        nodes = [
+            Node("a", lambda i: ran.append("a"), requires=("y",), produces=("x",)),
+            Node("b", lambda i: ran.append("b"), requires=("x",), produces=("y",)),
+        ]
+        with pytest.raises(ValueError, match="cycle"):
+            run_dag(nodes)
+        assert ran == []
+
+    def test_initial_artifacts_satisfy_requirements(self):
+        """Test artifacts passed in `initial` count as available"""
+        seen = {}
+        report = run_dag(
+            [Node("a", lambda i: seen.update(i), requires=("intake.md",))],
+            initial={"intake.md": "text"},
+        )
+        assert seen == {"intake.md": "text"}
+        assert report.results["a"].status == "ok"
+
+
+class TestScheduling:
+    """Test suite for concurrent scheduling"""
+
+    def test_independent_branch_overlaps_chain(self):
+        """Test a side branch runs alongside a dependent chain"""
+        nodes = [
+            _sleep_node("designer", 0.3, requires=["intake"], produces=["theme"]),
+            _sleep_node("strategist", 0.15, requires=["intake"], produces=["brief"]),
+            _sleep_node("copywriter", 0.15, requires=["brief"], produces=["content"]),
+            _sleep_node("builder", 0.05, requires=["content", "theme"]),
+        ]
+        report = run_dag(nodes, initial={"intake": "x"})
+
+        # Serial: 0.65s. DAG: max(0.3, 0.15 + 0.15) + 0.05 = 0.35s
+        assert report.wall_seconds < 0.55
+        assert report.results["builder"].started >= report.results["designer"].finished
+        assert report.results["builder"].started >= report.results["copywriter"].finished
+        assert report.results["copywriter"].started >= report.results["strategist"].finished
+
+    def test_artifacts_flow_downstream(self):
+        """Test returned artifact values reach dependent nodes"""
+        received = {}
+        nodes = [
+            Node("router", lambda i: {"niche": "saas.md"}, requires=("intake",), produces=("niche",)),
+            Node("strategist", lambda i: received.update(i), requires=("intake", "niche")),
+        ]
+        report = run_dag(nodes, initial={"intake": "text"})
+
+        assert received == {"intake": "text", "niche": "saas.md"}
+        assert report.artifacts["niche"] == "saas.md"
+
+    def test_unreturned_artifacts_are_none(self):
+        """Test declared artifacts that are not returned are recorded as None"""
+        report = run_dag([Node("a", lambda i: None, produces=("file.md",))])
+
+        assert "file.md" in report.artifacts
+        assert report.artifacts["file.md"] is None
+
+    def test_skipped_node_unblocks_downstream(self):
+        """Test skip_if marks the node skipped and downstream still runs"""
+        ran = []
+        nodes = [
+            Node("strategist", lambda i: ran.append("strategist"), produces=("brief",), skip_if=lambda: True),
+            Node("copywriter", lambda i: ran.append("copywriter"), requires=("brief",)),
+        ]
+        report = run_dag(nodes)
+
+        assert ran == ["copywriter"]
+        assert report.results["strategist"].status == "skipped"
+
+    def test_runs_on_worker_threads(self):
+        """Test nodes run off the calling thread"""
+        threads = []
+        run_dag([Node("a", lambda i: threads.append(threading.current_thread().name))],
+                thread_name_prefix="pipeline-test")
+
+        assert threads[0].startswith("pipeline-test")
+
+
+class TestFailures:
+    """Test suite for failure propagation"""
+
+    def test_required_failure_blocks_downstream_only(self):
+        """Test a failing node blocks its dependents but not other branches"""
+        ran = []
+
+        def boom(inputs):
+            raise ValueError("strategist down")
+
+        nodes = [
+            Node("strategist", boom, produces=("brief",)),
+            Node("copywriter", lambda i: ran.append("copywriter"), requires=("brief",)),
+            Node("designer", lambda i: ran.append("designer"), produces=("theme",)),
+        ]
+        report = run_dag(nodes)
+
+        assert ran == ["designer"]
+        assert report.results["strategist"].status == "failed"
+        assert report.results["copywriter"].status == "blocked"
+        with pytest.raises(ValueError, match="strategist down"):
+            report.raise_for_failure()
+
+    def test_optional_failure_does_not_block(self):
+        """Test dependents of an optional node still run after it fails"""
+        received = {}
+
+        def boom(inputs):
+            raise RuntimeError("no theme")
+
+        nodes = [
+            Node("designer", boom, produces=("theme",), optional=True),
+            Node("builder", lambda i: received.update(i), requires=("theme",)),
+        ]
+        report = run_dag(nodes)
+
+        assert received == {"theme": None}
+        assert report.results["designer"].status == "failed"
+        report.raise_for_failure()  # Optional failures are not raised
+
+
+class TestAsyncExecutor:
+    """Test suite for run_dag_async"""
+
+    @staticmethod
+    def _async_node(name, seconds, requires=(), produces=(), **kwargs):
+        async def func(inputs):
+            await asyncio.sleep(seconds)
+        return Node(name, func, requires=tuple(requires), produces=tuple(produces), **kwargs)
+
+    def test_independent_branch_overlaps_chain_on_one_thread(self):
+        """Test coroutine nodes overlap on the event loop without worker threads"""
+        threads = set()
+
+        def track(node):
+            func = node.func
+
+            async def wrapped(inputs):
+                threads.add(threading.current_thread().name)
+                await func(inputs)
+            node.func = wrapped
+            return node
+
+        nodes = [
+            track(self._async_node("designer", 0.3, requires=["intake"], produces=["theme"])),
+            track(self._async_node("strategist", 0.15, requires=["intake"], produces=["brief"])),
+            track(self._async_node("copywriter", 0.15, requires=["brief"], produces=["content"])),
+            track(self._async_node("builder", 0.05, requires=["content", "theme"])),
+        ]
+        report = asyncio.run(run_dag_async(nodes, initial={"intake": "x"}))
+
+        assert report.wall_seconds < 0.55
+        assert report.results["builder"].started >= report.results["designer"].finished
+        assert report.critical_path()[-1] == "builder"
+        assert len(threads) == 1
+
+    def test_artifacts_and_plain_results(self):
+        """Test artifacts flow downstream and non-awaitable results are accepted"""
+        received = {}
+
+        async def strategist(inputs):
+            received.update(inputs)
+
+        nodes = [
+            Node("router", lambda i: {"niche": "saas.md"}, requires=("intake",), produces=("niche",)),
+            Node("strategist", strategist, requires=("intake", "niche")),
+        ]
+        asyncio.run(run_dag_async(nodes, initial={"intake": "text"}))
+
+        assert received == {"intake": "text", "niche": "saas.md"}
+
+    def test_failures_block_downstream_only(self):
+        """Test the async executor shares run_dag's failure semantics"""
+        ran = []
+
+        async def boom(inputs):
+            raise ValueError("strategist down")
+
+        async def record(inputs):
+            ran.append("designer")
+
+        nodes = [
+            Node("strategist", boom, produces=("brief",)),
+            Node("copywriter", lambda i: ran.append("copywriter"), requires=("brief",)),
+            Node("designer", record, produces=("theme",), optional=True, skip_if=lambda: False),
+        ]
+        report = asyncio.run(run_dag_async(nodes))
+
+        assert ran == ["designer"]
+        assert report.results["copywriter"].status == "blocked"
+        with pytest.raises(ValueError, match="strategist down"):
+            report.raise_for_failure()
+
+
+class TestReport:
+    """Test suite for DagReport critical path and summaries"""
+
+    def test_critical_path_follows_slowest_inputs(self):
+        """Test the critical path walks back through the latest-finishing inputs"""
+        nodes = [
+            _sleep_node("designer", 0.02, requires=["intake"], produces=["theme"]),
+            _sleep_node("strategist", 0.1, requires=["intake"], produces=["brief"]),
+            _sleep_node("copywriter", 0.1, requires=["brief"], produces=["content"]),
+            _sleep_node("builder", 0.01, requires=["content", "theme"]),
+        ]
+        report = run_dag(nodes, initial={"intake": "x"})
+
+        assert report.critical_path() == ["strategist", "copywriter", "builder"]
+
+    def test_critical_path_ignores_skipped_nodes(self):
+        """Test skipped nodes take no time and are left out of the path"""
+        report = DagReport(wall_seconds=1.0)
+        report.results["a"] = NodeResult("a", status="skipped")
+        report.results["b"] = NodeResult("b", status="ok", started=0.0, finished=1.0)
+        report.upstream = {"a": [], "b": ["a"]}
+
+        assert report.critical_path() == ["b"]
+
+    def test_critical_path_empty(self):
+        """Test an empty run has no critical path"""
+        assert DagReport().critical_path() == []
+
+    def test_summary_lines(self):
+        """Test one summary line per node"""
+        report = run_dag([
+            Node("a", lambda i: None, produces=("x",)),
+            Node("b", lambda i: None, requires=("x",), skip_if=lambda: True),
+        ])
+
+        lines = report.summary_lines()
+        assert len(lines) == 2
+        assert lines[0].startswith("a: ok")
+        assert lines[1] == "b: skipped"
@@ -0,0 +1,226 @@
+"""
+Unit tests for automation/qa_server.py
+
+Tests cover:
+- Dev mode: reusing a running dev server and starting one when it is down
+- Prod mode: rebuilding only when sources change and restarting next start
+- Falling back to the dev server when the production build fails
+- Keeping the previous build for other clients and waiting for renders before a restart
+- Warming up a freshly written page in the background
+"""
+
+import os
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from automation import qa_server
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A minimal Next.js tree with one client page"""
+    page = tmp_path / "app" / "clients" / "acme" / "page.tsx"
+    page.parent.mkdir(parents=True)
+    page.write_text("export default function Page() { return null }", encoding="utf-8")
+    (tmp_path / "next.config.js").write_text("module.exports = {}", encoding="utf-8")
+    return tmp_path
+
+
+def _touch_later(path, seconds=10):
+    stamp = time.time() + seconds
+    os.utime(path, (stamp, stamp))
+
+
+def _running_proc():
+    proc = Mock()
+    proc.poll.return_value = None
+    return proc
+
+
+class TestDevMode:
+    """Test suite for the dev server mode"""
+
+    def test_running_dev_server_reused(self, repo):
+        """Test an answering dev server is used without starting anything"""
+        server = qa_server.QaServer(mode="dev", repo_root=repo)
+
+        with patch('automation.qa_server._is_up', return_value=True), \
+             patch('automation.qa_server.subprocess.Popen') as mock_popen:
+            assert server.ensure_ready() == "http://localhost:3000"
+
+        mock_popen.assert_not_called()
+
+    def test_dev_server_started_when_down(self, repo):
+        """Test npm run dev is started when nothing answers"""
+        server = qa_server.QaServer(mode="dev", repo_root=repo)
+
+        with patch('automation.qa_server._is_up', return_value=False), \
+             patch('automation.qa_server._wait_until_up', return_value=True), \
+             patch('automation.qa_server.subprocess.Popen') as mock_popen:
+            assert server.ensure_ready() == "http://localhost:3000"
+
+        assert mock_popen.call_args[0][0] == ["npm", "run", "dev"]
+
+    def test_unavailable_server_returns_none(self, repo):
+        """Test None is returned when the dev server cannot be started"""
+        server = qa_server.QaServer(mode="dev", repo_root=repo)
+
+        with patch('automation.qa_server._is_up', return_value=False), \
+             patch('automation.qa_server._wait_until_up', return_value=False), \
+             patch('automation.qa_server.subprocess.Popen'):
+            assert server.ensure_ready() is None
+
+
+class TestProdMode:
+    """Test suite for the production build mode"""
+
+    def test_build_then_start(self, repo):
+        """Test the first check builds into the QA dist dir and starts next start"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+
+        with patch('automation.qa_server.subprocess.run', return_value=Mock(returncode=0)) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen', return_value=_running_proc()) as mock_popen, \
+             patch('automation.qa_server._wait_until_up', return_value=True):
+            assert server.ensure_ready() == "http://localhost:3100"
+
+        assert mock_run.call_args[0][0][-1] == "build"
+        assert mock_run.call_args[1]["env"]["GF_NEXT_DIST_DIR"] == qa_server.PROD_DIST_DIR
+        assert mock_popen.call_args[0][0][-3:] == ["start", "-p", "3100"]
+        assert server.builds == 1
+
+    def test_unchanged_sources_not_rebuilt(self, repo):
+        """Test a second check with no source changes reuses the running server"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+
+        with patch('automation.qa_server.subprocess.run', return_value=Mock(returncode=0)) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen', return_value=_running_proc()) as mock_popen, \
+             patch('automation.qa_server._wait_until_up', return_value=True):
+            server.ensure_ready()
+            server.ensure_ready()
+
+        assert mock_run.call_count == 1
+        assert mock_popen.call_count == 1
+
+    def test_new_page_triggers_rebuild_and_restart(self, repo):
+        """Test a page written after the last build rebuilds and restarts the server"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+        first = _running_proc()
+
+        with patch('automation.qa_server.subprocess.run', return_value=Mock(returncode=0)) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen', side_effect=[first, _running_proc()]) as mock_popen, \
+             patch('automation.qa_server._wait_until_up', return_value=True):
+            server.ensure_ready()
+            _touch_later(repo / "app" / "clients" / "acme" / "page.tsx")
+            server.ensure_ready()
+
+        assert mock_run.call_count == 2
+        assert mock_popen.call_count == 2
+        first.terminate.assert_called_once()
+
+    def test_failed_build_falls_back_to_dev(self, repo):
+        """Test a failing build uses the dev server and is not retried until sources change"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+
+        with patch('automation.qa_server.subprocess.run',
+                   return_value=Mock(returncode=1, stdout="", stderr="Type error")) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen') as mock_popen, \
+             patch('automation.qa_server._is_up', return_value=True):
+            assert server.ensure_ready() == "http://localhost:3000"
+            assert server.ensure_ready() == "http://localhost:3000"
+
+        assert mock_run.call_count == 1
+        mock_popen.assert_not_called()
+
+    def test_rebuild_alternates_dist_dirs(self, repo):
+        """Test a rebuild never writes into the dist dir being served"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+
+        with patch('automation.qa_server.subprocess.run', return_value=Mock(returncode=0)) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen', side_effect=[_running_proc(), _running_proc()]) as mock_popen, \
+             patch('automation.qa_server._wait_until_up', return_value=True):
+            server.ensure_ready()
+            _touch_later(repo / "app" / "clients" / "acme" / "page.tsx")
+            server.ensure_ready()
+
+        built = [c[1]["env"]["GF_NEXT_DIST_DIR"] for c in mock_run.call_args_list]
+        served = [c[1]["env"]["GF_NEXT_DIST_DIR"] for c in mock_popen.call_args_list]
+        assert built == list(qa_server.PROD_DIST_DIRS)
+        assert served == built
+
+    def test_failed_rebuild_keeps_previous_build(self, repo):
+        """Test a broken page only sends its own client to the dev server"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+        proc = _running_proc()
+        broken = repo / "app" / "clients" / "broken" / "page.tsx"
+
+        with patch('automation.qa_server.subprocess.run', side_effect=[
+                 Mock(returncode=0), Mock(returncode=1, stdout="", stderr="Type error")]) as mock_run, \
+             patch('automation.qa_server.subprocess.Popen', return_value=proc) as mock_popen, \
+             patch('automation.qa_server._wait_until_up', return_value=True), \
+             patch('automation.qa_server._is_up', return_value=True):
+            assert server.ensure_ready("acme") == "http://localhost:3100"
+            broken.parent.mkdir(parents=True)
+            broken.write_text("export default broken", encoding="utf-8")
+            _touch_later(broken)
+            assert server.ensure_ready("broken") == "http://localhost:3000"
+            assert server.ensure_ready("acme") == "http://localhost:3100"
+
+        assert mock_run.call_count == 2
+        assert mock_popen.call_count == 1
+        proc.terminate.assert_not_called()
+
+    def test_restart_waits_for_renders(self, repo):
+        """Test next start is not restarted while a QA render is using it"""
+        server = qa_server.QaServer(mode="prod", port=3100, repo_root=repo)
+        first = _running_proc()
+        rendering, release = threading.Event(), threading.Event()
+
+        def render():
+            with server.rendering():
+                rendering.set()
+                release.wait(5)
+
+        with patch('automation.qa_server.subprocess.run', return_value=Mock(returncode=0)), \
+             patch('automation.qa_server.subprocess.Popen', side_effect=[first, _running_proc()]), \
+             patch('automation.qa_server._wait_until_up', return_value=True):
+            server.ensure_ready()
+            renderer = threading.Thread(target=render)
+            renderer.start()
+            assert rendering.wait(5)
+            _touch_later(repo / "app" / "clients" / "acme" / "page.tsx")
+            rebuild = threading.Thread(target=server.ensure_ready)
+            rebuild.start()
+            time.sleep(0.2)
+            assert not first.terminate.called
+            release.set()
+            rebuild.join(5)
+            renderer.join(5)
+
+        first.terminate.assert_called_once()
+
+
+class TestWarmUp:
+    """Test suite for background warm-up"""
+
+    def test_warm_up_requests_page(self, repo):
+        """Test warm-up prepares the server and requests the client page"""
+        server = qa_server.QaServer(mode="dev", repo_root=repo)
+
+        with patch.object(server, 'ensure_ready', return_value="http://localhost:3000"), \
+             patch('automation.qa_server.requests.get') as mock_get:
+            server.warm_up("acme").join(timeout=5)
+
+        assert mock_get.call_args[0][0] == "http://localhost:3000/clients/acme"
+
+    def test_warm_up_skips_request_without_server(self, repo):
+        """Test no request is made when no server could be started"""
+        server = qa_server.QaServer(mode="dev", repo_root=repo)
+
+        with patch.object(server, 'ensure_ready', return_value=None), \
+             patch('automation.qa_server.requests.get') as mock_get:
+            server.warm_up("acme").join(timeout=5)
+
+        mock_get.assert_not_called()
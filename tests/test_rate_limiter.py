@@ -0,0 +1,204 @@
+"""
+Unit tests for automation/rate_limiter.py
+
+Tests cover:
+- Request and token buckets with refill over time
+- Oversized requests, refunds and unconfigured models
+- Penalties after a 429 blocking every caller
+- Sharing one budget between processes
+- Async waiting
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from automation import rate_limiter
+
+
+MODEL = "claude-test"
+
+
+@pytest.fixture
+def clock():
+    """Fake wall clock shared by the limiter; sleeping advances it"""
+    now = [1000.0]
+
+    def _sleep(seconds):
+        now[0] += seconds
+
+    with patch('automation.rate_limiter.time.time', side_effect=lambda: now[0]), \
+         patch('automation.rate_limiter.time.sleep', side_effect=_sleep) as mock_sleep:
+        yield SimpleNamespace(now=now, sleep=mock_sleep)
+
+
+def _limits(rpm=None, tpm=None):
+    limits = {}
+    if rpm:
+        limits["requests_per_minute"] = rpm
+    if tpm:
+        limits["tokens_per_minute"] = tpm
+    return patch('automation.rate_limiter.load_config',
+                 return_value={"rate_limits": {f"anthropic/{MODEL}": limits}})
+
+
+class TestBuckets:
+    """Test suite for request/token budgets"""
+
+    def test_unconfigured_model_is_not_throttled(self, clock):
+        """Test models without limits pass straight through"""
+        with patch('automation.rate_limiter.load_config', return_value={}):
+            for _ in range(100):
+                assert rate_limiter.acquire("anthropic", MODEL, 10_000) == 0.0
+
+        clock.sleep.assert_not_called()
+
+    def test_requests_per_minute(self, clock):
+        """Test the third call within a minute waits for the request bucket to refill"""
+        with _limits(rpm=2):
+            assert rate_limiter.acquire("anthropic", MODEL) == 0.0
+            assert rate_limiter.acquire("anthropic", MODEL) == 0.0
+            waited = rate_limiter.acquire("anthropic", MODEL)
+
+        assert waited == pytest.approx(30.0)
+
+    def test_tokens_per_minute(self, clock):
+        """Test a call waits until enough tokens have refilled"""
+        with _limits(tpm=1000):
+            rate_limiter.acquire("anthropic", MODEL, 800)
+            waited = rate_limiter.acquire("anthropic", MODEL, 400)
+
+        # 200 left, 200 more needed at 1000/min
+        assert waited == pytest.approx(12.0)
+
+    def test_waits_are_sliced(self, clock):
+        """Test long waits are broken up so penalties and config changes are re-read"""
+        with _limits(rpm=1):
+            rate_limiter.acquire("anthropic", MODEL)
+            rate_limiter.acquire("anthropic", MODEL)
+
+        assert max(c[0][0] for c in clock.sleep.call_args_list) <= rate_limiter.MAX_WAIT_SLICE
+
+    def test_oversized_request_takes_whole_bucket(self, clock):
+        """Test a request larger than the budget does not wait forever"""
+        with _limits(tpm=1000):
+            assert rate_limiter.acquire("anthropic", MODEL, 5000) == 0.0
+            assert rate_limiter.bucket_levels("anthropic", MODEL)["tokens"] == pytest.approx(0.0)
+
+    def test_refund_credits_unused_tokens(self, clock):
+        """Test reserved-but-unused tokens return to the bucket"""
+        with _limits(tpm=1000):
+            rate_limiter.acquire("anthropic", MODEL, 900)
+            rate_limiter.refund("anthropic", MODEL, reserved=900, used=300)
+
+            assert rate_limiter.bucket_levels("anthropic", MODEL)["tokens"] == pytest.approx(700.0)
+            assert rate_limiter.acquire("anthropic", MODEL, 700) == 0.0
+
+    def test_refund_of_oversized_request_credits_only_what_was_taken(self, clock):
+        """Test an oversized request refunds against the whole bucket it took, not its estimate"""
+        with _limits(tpm=1000):
+            rate_limiter.acquire("anthropic", MODEL, 5000)
+            rate_limiter.refund("anthropic", MODEL, reserved=5000, used=400)
+
+            assert rate_limiter.bucket_levels("anthropic", MODEL)["tokens"] == pytest.approx(600.0)
+
+
+class TestPenalties:
+    """Test suite for blocking a model after a 429"""
+
+    def test_penalty_blocks_unconfigured_model(self, clock):
+        """Test a penalty applies even without configured limits"""
+        with patch('automation.rate_limiter.load_config', return_value={}):
+            rate_limiter.penalize("anthropic", MODEL, 12)
+            waited = rate_limiter.acquire("anthropic", MODEL)
+
+        assert waited == pytest.approx(12.0)
+
+    def test_shorter_penalty_does_not_shorten_block(self, clock):
+        """Test concurrent 429s keep the longest retry-after"""
+        with patch('automation.rate_limiter.load_config', return_value={}):
+            rate_limiter.penalize("anthropic", MODEL, 12)
+            rate_limiter.penalize("anthropic", MODEL, 3)
+
+            assert rate_limiter.acquire("anthropic", MODEL) == pytest.approx(12.0)
+
+    def test_retry_after_header(self):
+        """Test retry-after is read from the error response when present"""
+        with_header = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "7"}))
+
+        assert rate_limiter.retry_after_seconds(with_header, 5) == 7.0
+        assert rate_limiter.retry_after_seconds(Exception("429"), 5) == 5
+
+
+class TestSharing:
+    """Test suite for budgets shared across threads, processes and event loops"""
+
+    def test_budget_is_shared_with_other_processes(self, tmp_path):
+        """Test requests made by another process drain this process's bucket"""
+        script = (
+            "from unittest.mock import patch\n"
+            "from automation import rate_limiter\n"
+            f"rate_limiter.DB_PATH = {str(rate_limiter.DB_PATH)!r}\n"
+            "cfg = {'rate_limits': {'anthropic/%s': {'requests_per_minute': 3}}}\n"
+            "with patch('automation.rate_limiter.load_config', return_value=cfg):\n"
+            "    for _ in range(3):\n"
+            "        assert rate_limiter.acquire('anthropic', '%s') == 0.0\n"
+        ) % (MODEL, MODEL)
+        repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        subprocess.run([sys.executable, "-c", script], cwd=repo_root, check=True, timeout=60)
+
+        with _limits(rpm=3):
+            assert rate_limiter.bucket_levels("anthropic", MODEL)["requests"] < 1
+
+    def test_async_acquire_waits_with_asyncio(self):
+        """Test the async variant never blocks the event loop with time.sleep"""
+        now = [1000.0]
+
+        async def fake_sleep(seconds):
+            now[0] += seconds
+
+        with _limits(rpm=1), \
+             patch('automation.rate_limiter.time.time', side_effect=lambda: now[0]), \
+             patch('automation.rate_limiter.asyncio.sleep', new=AsyncMock(side_effect=fake_sleep)) as mock_sleep, \
+             patch('automation.rate_limiter.time.sleep') as mock_time_sleep:
+            asyncio.run(rate_limiter.acquire_async("anthropic", MODEL))
+            waited = asyncio.run(rate_limiter.acquire_async("anthropic", MODEL))
+
+        assert waited == pytest.approx(60.0)
+        assert mock_sleep.await_count >= 1
+        mock_time_sleep.assert_not_called()
+
+    def test_async_acquire_queries_sqlite_off_the_loop(self):
+        """Test the async variant runs its SQLite transaction in a worker thread"""
+        threads = []
+
+        def fake_next_delay(*args):
+            threads.append(threading.current_thread())
+            return 0.0
+
+        with patch('automation.rate_limiter._next_delay', side_effect=fake_next_delay):
+            asyncio.run(rate_limiter.acquire_async("anthropic", MODEL))
+
+        assert threads and threads[0] is not threading.main_thread()
+
+    def test_estimate_tokens_includes_output_budget(self):
+        """Test estimates cover the prompt and max_tokens"""
+        estimate = rate_limiter.estimate_tokens(max_tokens=1000, system="x" * 400, messages=[])
+
+        assert 1100 <= estimate <= 1120
+
+    def test_estimate_tokens_counts_images_per_block(self):
+        """Test image blocks cost a fixed estimate instead of their base64 length"""
+        image = {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": "A" * 160_000}}
+        text_only = rate_limiter.estimate_tokens(messages=[{"role": "user", "content": [{"type": "text", "text": "Review"}]}])
+        with_images = rate_limiter.estimate_tokens(
+            messages=[{"role": "user", "content": [{"type": "text", "text": "Review"}, image, image]}]
+        )
+
+        assert with_images - text_only == pytest.approx(2 * rate_limiter.IMAGE_TOKENS, abs=10)
@@ -0,0 +1,293 @@
+"""
+Unit tests for automation/screenshot_utils.py
+
+Tests cover:
+- Band-wise distances between screenshot hashes
+- Storing and looking up vision verdicts per client
+- dHash stability and sensitivity on real images (requires Pillow)
+- Tiling, token-budget downscaling and encoding of vision images
+- Detecting which tiles changed since the previous review
+"""
+
+import io
+import json
+
+import pytest
+
+from automation import screenshot_utils
+
+
+def _hash(*bands, size=(390, 2000)):
+    return {"size": list(size), "bands": [f"{band:064x}" for band in bands]}
+
+
+class TestHashDistance:
+    """Test suite for comparing screenshot hashes"""
+
+    def test_identical(self):
+        """Test identical hashes have distance 0"""
+        assert screenshot_utils.hash_distance(_hash(5, 9), _hash(5, 9)) == 0
+
+    def test_worst_band_counts(self):
+        """Test the distance is the largest per-band Hamming distance"""
+        assert screenshot_utils.hash_distance(_hash(0b0, 0b0), _hash(0b1, 0b111)) == 3
+
+    def test_different_sizes_not_comparable(self):
+        """Test renders of different size or band count never match"""
+        assert screenshot_utils.hash_distance(_hash(1), _hash(1, size=(390, 2100))) is None
+        assert screenshot_utils.hash_distance(_hash(1), _hash(1, 1)) is None
+
+
+class TestVerdictCache:
+    """Test suite for the per-client verdict store"""
+
+    def test_store_and_lookup(self, tmp_path):
+        """Test a near-identical render reuses the stored verdict"""
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0b1010)}, "PASS")
+
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0b1011)}, distance=2) == ("PASS", 1)
+        assert (tmp_path / screenshot_utils.CACHE_FILE).exists()
+
+    def test_distance_threshold(self, tmp_path):
+        """Test renders beyond the configured distance miss"""
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0)}, "PASS")
+
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0b111)}, distance=2) is None
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0b1)}, distance=0) is None
+
+    def test_key_and_viewports_must_match(self, tmp_path):
+        """Test verdicts from another prompt/model or viewport set are not reused"""
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0)}, "PASS")
+
+        assert screenshot_utils.lookup(str(tmp_path), "other", {"mobile": _hash(0)}) is None
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0), "desktop": _hash(0)}) is None
+
+    def test_closest_verdict_wins(self, tmp_path):
+        """Test the closest stored render's verdict is returned"""
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0b11)}, "FAIL: old")
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0b1)}, "PASS")
+
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0)}, distance=4) == ("PASS", 1)
+
+    def test_entries_bounded(self, tmp_path):
+        """Test only the newest MAX_ENTRIES verdicts are kept"""
+        for i in range(screenshot_utils.MAX_ENTRIES + 5):
+            screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(i)}, f"verdict {i}")
+
+        entries = json.loads((tmp_path / screenshot_utils.CACHE_FILE).read_text(encoding="utf-8"))["entries"]
+        assert len(entries) == screenshot_utils.MAX_ENTRIES
+        assert entries[-1]["verdict"] == f"verdict {screenshot_utils.MAX_ENTRIES + 4}"
+
+    def test_corrupt_cache_ignored(self, tmp_path):
+        """Test an unreadable cache file is treated as empty"""
+        (tmp_path / screenshot_utils.CACHE_FILE).write_text("{not json", encoding="utf-8")
+
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0)}) is None
+
+    def test_distance_from_env(self, monkeypatch):
+        """Test GF_QA_VISION_CACHE_DISTANCE configures the default distance"""
+        monkeypatch.setenv("GF_QA_VISION_CACHE_DISTANCE", "0")
+        assert screenshot_utils.max_distance() == 0
+        monkeypatch.setenv("GF_QA_VISION_CACHE_DISTANCE", "bogus")
+        assert screenshot_utils.max_distance() == screenshot_utils.DEFAULT_MAX_DISTANCE
+
+
+class TestScreenshotHash:
+    """Test suite for hashing real images"""
+
+    @pytest.fixture
+    def image_module(self):
+        pil = pytest.importorskip("PIL.Image")
+        return pil
+
+    def _page(self, image_module, path, block_color=(30, 30, 30), block_top=300):
+        img = image_module.new("RGB", (390, 2500), (255, 255, 255))
+        img.paste(block_color, (40, block_top, 350, block_top + 200))
+        img.save(path, "JPEG", quality=85)
+        return str(path)
+
+    def test_same_render_same_hash(self, image_module, tmp_path):
+        """Test re-encoding the same render gives the same hash"""
+        first = screenshot_utils.screenshot_hash(self._page(image_module, tmp_path / "a.jpg"))
+        second = screenshot_utils.screenshot_hash(self._page(image_module, tmp_path / "b.jpg"))
+
+        assert first["size"] == [390, 2500]
+        assert len(first["bands"]) == 3
+        assert screenshot_utils.hash_distance(first, second) == 0
+
+    def test_moved_section_detected(self, image_module, tmp_path):
+        """Test a changed section in one band exceeds the default distance"""
+        first = screenshot_utils.screenshot_hash(self._page(image_module, tmp_path / "a.jpg"))
+        moved = screenshot_utils.screenshot_hash(self._page(image_module, tmp_path / "b.jpg", block_top=1400))
+
+        assert screenshot_utils.hash_distance(first, moved) > screenshot_utils.DEFAULT_MAX_DISTANCE
+
+    def test_unreadable_file(self, image_module, tmp_path):
+        """Test a file that is not an image gives no hash"""
+        path = tmp_path / "broken.jpg"
+        path.write_bytes(b"not a jpeg")
+
+        assert screenshot_utils.screenshot_hash(str(path)) is None
+
+
+class TestVisionSettings:
+    """Test suite for preprocessing configuration"""
+
+    def test_defaults(self, monkeypatch):
+        """Test the defaults when nothing is configured"""
+        for name in ("GF_QA_VISION_TILES", "GF_QA_VISION_MAX_TILES", "GF_QA_VISION_TOKEN_BUDGET",
+                     "GF_QA_VISION_FORMAT", "GF_QA_VISION_QUALITY"):
+            monkeypatch.delenv(name, raising=False)
+
+        assert screenshot_utils.VisionSettings.from_env() == screenshot_utils.VisionSettings()
+
+    def test_from_env(self, monkeypatch):
+        """Test env values are parsed, clamped and invalid formats ignored"""
+        monkeypatch.setenv("GF_QA_VISION_TILES", "false")
+        monkeypatch.setenv("GF_QA_VISION_MAX_TILES", "0")
+        monkeypatch.setenv("GF_QA_VISION_TOKEN_BUDGET", "2500")
+        monkeypatch.setenv("GF_QA_VISION_FORMAT", "gif")
+        monkeypatch.setenv("GF_QA_VISION_QUALITY", "100")
+
+        settings = screenshot_utils.VisionSettings.from_env()
+        assert (settings.tiles, settings.max_tiles, settings.token_budget) == (False, 1, 2500)
+        assert (settings.image_format, settings.quality) == ("jpeg", 95)
+
+
+class TestPrepareWithoutPillow:
+    """Test suite for the fallback when screenshots cannot be processed"""
+
+    def test_raw_screenshot_sent(self, monkeypatch):
+        """Test the captured JPEG is sent unchanged as a single image"""
+        monkeypatch.setattr(screenshot_utils, "PIL_AVAILABLE", False)
+
+        prepared = screenshot_utils.prepare(b"captured-jpeg", 844)
+
+        assert [tile.data for tile in prepared.tiles] == [b"captured-jpeg"]
+        assert prepared.tiles[0].media_type == "image/jpeg"
+        assert prepared.render_hash is None
+        assert prepared.tile_hashes() is None
+
+    def test_undecodable_screenshot_sent_unchanged(self):
+        """Test bytes that are not an image fall back to a single raw tile"""
+        prepared = screenshot_utils.prepare(b"not an image", 844)
+
+        assert [tile.data for tile in prepared.tiles] == [b"not an image"]
+
+
+class TestPrepare:
+    """Test suite for tiling, downscaling and encoding (requires Pillow)"""
+
+    @pytest.fixture
+    def image_module(self):
+        return pytest.importorskip("PIL.Image")
+
+    def _screenshot(self, image_module, width, height, blocks=()):
+        img = image_module.new("RGB", (width, height), (255, 255, 255))
+        for top, color in blocks:
+            img.paste(color, (20, top, width - 20, top + 300))
+        buffer = io.BytesIO()
+        img.save(buffer, "JPEG", quality=90)
+        return buffer.getvalue()
+
+    def test_long_page_tiled_by_fold(self, image_module):
+        """Test a tall mobile page is split into viewport-height tiles at full size"""
+        data = self._screenshot(image_module, 390, 3000)
+
+        prepared = screenshot_utils.prepare(data, 844, screenshot_utils.VisionSettings())
+
+        assert [(tile.top, tile.bottom) for tile in prepared.tiles] == [(0, 844), (844, 1688), (1688, 2532), (2532, 3000)]
+        assert prepared.scale == 1.0
+        assert prepared.tiles[0].media_type == "image/jpeg"
+        assert image_module.open(io.BytesIO(prepared.tiles[0].data)).size == (390, 844)
+        assert prepared.render_hash["size"] == [390, 3000]
+
+    def test_downscaled_to_token_budget(self, image_module):
+        """Test a page over the token budget is downscaled to fit it"""
+        data = self._screenshot(image_module, 1440, 3600)
+        settings = screenshot_utils.VisionSettings(token_budget=5000)
+
+        prepared = screenshot_utils.prepare(data, 900, settings)
+
+        assert screenshot_utils.MIN_SCALE < prepared.scale < 1.0
+        assert prepared.tokens <= settings.token_budget * 1.02
+        assert all(tile.width <= screenshot_utils.API_MAX_EDGE for tile in prepared.tiles)
+
+    def test_budget_never_below_min_scale(self, image_module):
+        """Test a tiny budget stops at MIN_SCALE instead of making text illegible"""
+        data = self._screenshot(image_module, 390, 2000)
+
+        prepared = screenshot_utils.prepare(data, 844, screenshot_utils.VisionSettings(token_budget=10))
+
+        assert prepared.scale == screenshot_utils.MIN_SCALE
+        assert prepared.tiles[0].width == 195
+
+    def test_very_long_page_capped_tiles(self, image_module):
+        """Test max_tiles grows the tiles and each stays within the API image limits"""
+        data = self._screenshot(image_module, 390, 12000)
+
+        prepared = screenshot_utils.prepare(data, 844, screenshot_utils.VisionSettings(max_tiles=4))
+
+        assert len(prepared.tiles) == 4
+        assert prepared.tile_height == 3000
+        assert all(max(tile.width, tile.height) <= screenshot_utils.API_MAX_EDGE for tile in prepared.tiles)
+
+    def test_tiling_disabled(self, image_module):
+        """Test tiles=False sends the page as one image within the API limits"""
+        data = self._screenshot(image_module, 390, 6000)
+
+        prepared = screenshot_utils.prepare(data, 844, screenshot_utils.VisionSettings(tiles=False))
+
+        assert len(prepared.tiles) == 1
+        assert prepared.tiles[0].height <= screenshot_utils.API_MAX_EDGE
+
+    def test_webp_encoding(self, image_module):
+        """Test WebP output when requested"""
+        data = self._screenshot(image_module, 390, 844)
+
+        prepared = screenshot_utils.prepare(data, 844, screenshot_utils.VisionSettings(image_format="webp"))
+
+        assert prepared.tiles[0].media_type in ("image/webp", "image/jpeg")
+        if prepared.tiles[0].media_type == "image/webp":
+            assert prepared.tiles[0].data[8:12] == b"WEBP"
+
+    def test_only_changed_tiles(self, image_module):
+        """Test only the tile whose content changed is reported"""
+        settings = screenshot_utils.VisionSettings()
+        before = screenshot_utils.prepare(self._screenshot(image_module, 390, 2532, [(1000, (20, 20, 20))]), 844, settings)
+        after = screenshot_utils.prepare(self._screenshot(image_module, 390, 2532, [(1800, (20, 20, 20))]), 844, settings)
+
+        changed = screenshot_utils.changed_tiles(after, before.tile_hashes())
+
+        assert [tile.index for tile in changed] == [1, 2]
+        assert screenshot_utils.changed_tiles(before, before.tile_hashes()) == []
+
+    def test_resized_page_changes_every_tile(self, image_module):
+        """Test tiles are all sent again when the page height changed"""
+        settings = screenshot_utils.VisionSettings()
+        before = screenshot_utils.prepare(self._screenshot(image_module, 390, 2532), 844, settings)
+        after = screenshot_utils.prepare(self._screenshot(image_module, 390, 2600), 844, settings)
+
+        assert len(screenshot_utils.changed_tiles(after, before.tile_hashes())) == len(after.tiles)
+        assert len(screenshot_utils.changed_tiles(after, None)) == len(after.tiles)
+
+
+class TestLastReview:
+    """Test suite for remembering the previous review's tiles"""
+
+    def test_round_trip(self, tmp_path):
+        """Test the last review is returned for the same model/prompt key only"""
+        tiles = {"mobile": {"size": [390, 1688], "tile_height": 844, "hashes": ["ab", "cd"]}}
+        screenshot_utils.remember_review(str(tmp_path), "key", tiles, "FAIL: footer")
+
+        assert screenshot_utils.last_review(str(tmp_path), "key")["verdict"] == "FAIL: footer"
+        assert screenshot_utils.last_review(str(tmp_path), "other") is None
+
+    def test_verdicts_and_review_coexist(self, tmp_path):
+        """Test storing a verdict keeps the remembered review and vice versa"""
+        tiles = {"mobile": {"size": [390, 844], "tile_height": 844, "hashes": ["ab"]}}
+        screenshot_utils.remember_review(str(tmp_path), "key", tiles, "PASS")
+        screenshot_utils.store(str(tmp_path), "key", {"mobile": _hash(0)}, "PASS")
+
+        assert screenshot_utils.last_review(str(tmp_path), "key") is not None
+        assert screenshot_utils.lookup(str(tmp_path), "key", {"mobile": _hash(0)}) == ("PASS", 0)
@@ -0,0 +1,110 @@
+"""
+Tests for automation/sections.py - addressable Markdown sections
+"""
+import pytest
+
+from automation import sections
+
+
+BRIEF = """# Project Brief
+
+## Layout Strategy
+
+### Section 1: Hero
+Headline: Ship faster.
+
+### Section 2: Testimonials
+- "Great" - Ann
+
+## Brand
+Navy and gold.
+
+```markdown
+## Not a heading
+```
+"""
+
+
+class TestOutline:
+    """Test suite for heading discovery"""
+
+    def test_spans_nest_by_level(self):
+        """Test a section runs to the next heading of the same or a shallower level"""
+        by_title = {s.title: s for s in sections.outline(BRIEF)}
+        lines = BRIEF.splitlines()
+        layout = by_title["Layout Strategy"]
+        assert lines[layout.start] == "## Layout Strategy"
+        assert lines[layout.end] == "## Brand"
+        assert lines[by_title["Section 1: Hero"].end] == "### Section 2: Testimonials"
+
+    def test_ignores_headings_in_code_fences(self):
+        """Test headings inside fenced code are not sections"""
+        assert "Not a heading" not in [s.title for s in sections.outline(BRIEF)]
+
+
+class TestFind:
+    """Test suite for mapping critic targets to headings"""
+
+    @pytest.mark.parametrize("target, expected", [
+        ("Hero", "Section 1: Hero"),
+        ("testimonials", "Section 2: Testimonials"),
+        ("Brand", "Brand"),
+        ("Pricing", None),
+        ("", None),
+    ])
+    def test_matches_by_words(self, target, expected):
+        """Test targets match headings by their words, ignoring section numbering"""
+        section = sections.find(BRIEF, target)
+        assert (section.title if section else None) == expected
+
+    def test_exact_title_beats_partial(self):
+        """Test an exact heading wins over headings that merely contain the words"""
+        text = "## Hero\nA\n\n## Hero Image\nB\n"
+        assert sections.find(text, "Hero").title == "Hero"
+
+    def test_ambiguous_target(self):
+        """Test a target matching several headings equally is not resolved"""
+        text = "## Hero Headline\nA\n\n## Pricing Headline\nB\n"
+        assert sections.find(text, "Headline") is None
+
+
+class TestResolve:
+    """Test suite for resolving a verdict's targets"""
+
+    def test_nested_sections_are_dropped(self):
+        """Test a section inside another selected one is rewritten with its parent"""
+        resolved = sections.resolve(BRIEF, ["Hero", "Layout Strategy"])
+        assert [s.title for s in resolved] == ["Layout Strategy"]
+
+    def test_unknown_target_fails_the_plan(self):
+        """Test one unresolvable target means no partial plan"""
+        assert sections.resolve(BRIEF, ["Hero", "Tone"]) is None
+
+
+class TestSplice:
+    """Test suite for splicing rewritten sections back"""
+
+    def test_replaces_only_selected_sections(self):
+        """Test the rewritten section replaces the original and the rest is untouched"""
+        selected = sections.resolve(BRIEF, ["Hero"])
+        result = sections.splice(BRIEF, selected, "### Section 1: Hero\nHeadline: Launch today.\n")
+        assert "Headline: Launch today." in result
+        assert "Ship faster" not in result
+        assert result.replace("Launch today.", "Ship faster.") == BRIEF
+
+    def test_restores_heading_levels(self):
+        """Test an answer at a different heading level keeps the original levels"""
+        selected = sections.resolve(BRIEF, ["Layout Strategy", "Brand"])
+        answer = "# Layout Strategy\n## Hero\nNew hero.\n# Brand\nBurgundy."
+        result = sections.splice(BRIEF, selected, answer)
+        assert result == "# Project Brief\n\n## Layout Strategy\n### Hero\nNew hero.\n\n## Brand\nBurgundy.\n"
+
+    def test_missing_sections_return_none(self):
+        """Test an answer without any selected heading is rejected"""
+        selected = sections.resolve(BRIEF, ["Brand"])
+        assert sections.splice(BRIEF, selected, "Here is the improved copy.") is None
+
+    def test_share(self):
+        """Test share is the fraction of lines the selected sections cover"""
+        selected = sections.resolve(BRIEF, ["Brand"])
+        assert 0 < sections.share(BRIEF, selected) < 0.5
@@ -0,0 +1,141 @@
+"""
+Unit tests for automation/ts_checker.py
+
+Tests cover:
+- The JSON-lines protocol against a stand-in worker
+- Reusing one warm worker across checks
+- Restarting after crashes and timeouts, and recycling after N checks
+- Falling back (returning None) when the worker cannot start
+"""
+
+import shutil
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from automation import ts_checker
+
+
+FAKE_WORKER = textwrap.dedent("""
+    import json, sys, time
+    mode = sys.argv[1] if len(sys.argv) > 1 else "ok"
+    if mode == "broken":
+        print(json.dumps({"ready": False, "error": "typescript not found"}), flush=True)
+        sys.exit(1)
+    print(json.dumps({"ready": True, "version": "fake"}), flush=True)
+    for line in sys.stdin:
+        request = json.loads(line)
+        code = request["code"]
+        if "CRASH" in code:
+            sys.exit(3)
+        if "HANG" in code:
+            time.sleep(30)
+        diagnostics = ["page.tsx(1,1): error TS1005: ';' expected."] if "ERR" in code else []
+        print(json.dumps({"id": request["id"], "diagnostics": diagnostics}), flush=True)
+""")
+
+
+@pytest.fixture
+def make_checker(tmp_path):
+    """Build a TsChecker driving the stand-in worker"""
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER, encoding="utf-8")
+    checkers = []
+
+    def _make(mode="ok"):
+        checker = ts_checker.TsChecker(repo_root=tmp_path, command=[sys.executable, str(script), mode])
+        checkers.append(checker)
+        return checker
+
+    yield _make
+    for checker in checkers:
+        checker.close()
+
+
+class TestProtocol:
+    """Test suite for request/response handling"""
+
+    def test_clean_page_has_no_diagnostics(self, make_checker):
+        """Test a compiling page returns an empty list"""
+        assert make_checker().check("export default 1") == []
+
+    def test_errors_are_returned(self, make_checker):
+        """Test compiler errors come back as tsc-style lines"""
+        assert make_checker().check("ERR") == ["page.tsx(1,1): error TS1005: ';' expected."]
+
+    def test_worker_is_reused(self, make_checker):
+        """Test consecutive checks share one warm worker"""
+        checker = make_checker()
+        for _ in range(5):
+            checker.check("ok")
+
+        assert checker.starts == 1
+
+
+class TestRecovery:
+    """Test suite for restarts and fallback"""
+
+    def test_restarts_after_crash(self, make_checker):
+        """Test a crashed worker is replaced on the next check"""
+        checker = make_checker()
+
+        assert checker.check("CRASH") is None
+        assert checker.check("ok") == []
+        assert checker.starts == 2
+
+    def test_timeout_falls_back_and_restarts(self, make_checker):
+        """Test a hung worker is killed and the caller falls back"""
+        checker = make_checker()
+        checker.check("ok")
+
+        assert checker.check("HANG", timeout=0.5) is None
+        assert checker.check("ok") == []
+        assert checker.starts == 2
+
+    def test_recycles_after_max_checks(self, make_checker, monkeypatch):
+        """Test the worker is replaced after MAX_CHECKS_PER_WORKER checks"""
+        monkeypatch.setattr(ts_checker, "MAX_CHECKS_PER_WORKER", 2)
+        checker = make_checker()
+        for _ in range(5):
+            checker.check("ok")
+
+        assert checker.starts == 3
+
+    def test_unready_worker_disables_checker(self, make_checker):
+        """Test a worker that cannot load TypeScript is not retried"""
+        checker = make_checker("broken")
+
+        assert checker.check("ok") is None
+        assert "typescript not found" in checker.disabled_reason
+        assert checker.check("ok") is None
+        assert checker.starts == 1
+
+    def test_repeated_failures_disable_checker(self, make_checker, monkeypatch):
+        """Test the checker gives up after DISABLE_AFTER_FAILURES crashes in a row"""
+        monkeypatch.setattr(ts_checker, "DISABLE_AFTER_FAILURES", 2)
+        checker = make_checker()
+        checker.check("CRASH")
+        checker.check("CRASH")
+
+        assert checker.disabled_reason
+        assert checker.check("ok") is None
+
+    def test_opt_out(self, monkeypatch):
+        """Test GF_TS_CHECKER=false skips the worker entirely"""
+        monkeypatch.setenv("GF_TS_CHECKER", "false")
+
+        assert ts_checker.check("export default 1") is None
+
+    @pytest.mark.skipif(not shutil.which("node"), reason="node not installed")
+    def test_real_worker_reports_missing_typescript(self, tmp_path):
+        """Test the Node worker reports (rather than hangs on) a missing typescript package"""
+        checker = ts_checker.TsChecker(repo_root=tmp_path)
+        try:
+            result = checker.check("export default 1")
+        finally:
+            checker.close()
+
+        assert result is None
+        assert "typescript" in checker.disabled_reason
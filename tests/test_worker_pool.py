@@ -0,0 +1,113 @@
+"""
+Unit tests for automation/worker_pool.py
+
+Tests cover:
+- Every item is dispatched exactly once
+- Work actually overlaps when jobs > 1
+- Exceptions are isolated to the failing item
+- Per-worker utilization reporting
+"""
+
+import threading
+import time
+
+import pytest
+
+from automation.worker_pool import run_pool, PoolReport, WorkerStats
+
+
+class TestRunPool:
+    """Test suite for run_pool"""
+
+    def test_processes_every_item_once(self):
+        """Test that all items are dispatched exactly once"""
+        seen = []
+        lock = threading.Lock()
+
+        def work(item):
+            with lock:
+                seen.append(item)
+
+        report = run_pool(range(10), work, jobs=4)
+
+        assert sorted(seen) == list(range(10))
+        assert report.jobs == 10
+        assert sum(w.jobs for w in report.workers.values()) == 10
+
+    def test_runs_jobs_concurrently(self):
+        """Test that jobs > 1 overlaps slow items instead of running them serially"""
+        report = run_pool(range(4), lambda _: time.sleep(0.2), jobs=4)
+
+        # Serial would take ~0.8s
+        assert report.wall_seconds < 0.6
+        assert len(report.workers) == 4
+
+    def test_single_job_uses_one_worker(self):
+        """Test that jobs=1 keeps the old one-at-a-time behavior"""
+        report = run_pool(["a", "b", "c"], lambda _: None, jobs=1)
+
+        assert len(report.workers) == 1
+
+    def test_invalid_jobs_treated_as_one(self):
+        """Test that jobs < 1 does not raise"""
+        report = run_pool(["a"], lambda _: None, jobs=0)
+
+        assert report.jobs == 1
+
+    def test_exception_does_not_stop_other_items(self):
+        """Test that one failing item is counted but others still run"""
+        seen = []
+
+        def work(item):
+            if item == 2:
+                raise ValueError("boom")
+            seen.append(item)
+
+        report = run_pool([1, 2, 3], work, jobs=2)
+
+        assert sorted(seen) == [1, 3]
+        assert sum(w.failures for w in report.workers.values()) == 1
+
+    def test_false_return_counts_as_failure(self):
+        """Test that func can report a failure it handled itself by returning False"""
+        report = run_pool([True, False, None], lambda item: item, jobs=1)
+
+        assert sum(w.failures for w in report.workers.values()) == 1
+        assert "1 failed" in report.summary_lines()[0]
+
+    def test_empty_items(self):
+        """Test that an empty batch returns an empty report"""
+        report = run_pool([], lambda _: None, jobs=3)
+
+        assert report.jobs == 0
+        assert report.workers == {}
+
+
+class TestPoolReport:
+    """Test suite for PoolReport utilization math"""
+
+    def test_utilization_fraction(self):
+        """Test utilization is busy time over wall time"""
+        report = PoolReport(jobs=2, wall_seconds=10.0)
+        report.workers["w1"] = WorkerStats(name="w1", jobs=2, busy_seconds=5.0)
+
+        assert report.utilization("w1") == pytest.approx(0.5)
+
+    def test_utilization_unknown_worker(self):
+        """Test unknown workers report zero utilization"""
+        report = PoolReport(jobs=0, wall_seconds=1.0)
+
+        assert report.utilization("missing") == 0.0
+
+    def test_summary_lines(self):
+        """Test summary contains one line per worker"""
+        report = PoolReport(jobs=3, wall_seconds=4.0)
+        report.workers["w2"] = WorkerStats(name="w2", jobs=1, busy_seconds=1.0)
+        report.workers["w1"] = WorkerStats(name="w1", jobs=2, busy_seconds=4.0)
+
+        lines = report.summary_lines()
+
+        assert len(lines) == 2
+        assert lines[0].startswith("w1: 2 job(s)")
+        assert "100%" in lines[0]
+        assert "25%" in lines[1]
@@ -0,0 +1,32 @@
+/**
+ * Tests for HydrationMarker component
+ *
+ * Tests the data-gf-hydrated attribute visual QA waits for.
+ */
+
+import { describe, it, expect, afterEach } from 'vitest'
+import { render, cleanup } from '@testing-library/react'
+import React from 'react'
+
+import { HydrationMarker } from '@/components/HydrationMarker'
+
+describe('HydrationMarker', () => {
+  afterEach(() => {
+    cleanup()
+    delete document.documentElement.dataset.gfHydrated
+  })
+
+  it('marks the document as hydrated after mount', () => {
+    expect(document.documentElement.hasAttribute('data-gf-hydrated')).toBe(false)
+
+    render(<HydrationMarker />)
+
+    expect(document.documentElement.getAttribute('data-gf-hydrated')).toBe('true')
+  })
+
+  it('renders nothing', () => {
+    const { container } = render(<HydrationMarker />)
+
+    expect(container.innerHTML).toBe('')
+  })
+})